@@ -23,7 +23,22 @@ def runs_group():
 @click.option("--project", type=int, help="Project ID")
 @click.option("--branch", help="Git branch")
 @click.option("--commit", help="Git commit SHA")
-def run(suite: str, env: str, project: int, branch: str, commit: str):
+@click.option(
+    "--selection",
+    type=click.Choice(["all", "impacted"]),
+    default="all",
+    help="Run the full suite, or only tests affected by changes since --base",
+)
+@click.option("--base", "base_commit", help="Base commit SHA for --selection impacted")
+def run(
+    suite: str,
+    env: str,
+    project: int,
+    branch: str,
+    commit: str,
+    selection: str,
+    base_commit: str,
+):
     """Trigger a test run."""
     try:
         # Load qatron.yml to get project and suite info
@@ -63,6 +78,8 @@ def run(suite: str, env: str, project: int, branch: str, commit: str):
             "environment_id": 1,  # TODO: Get from API or config
             "branch": branch or "main",
             "commit": commit,
+            "selection": selection,
+            "base_commit": base_commit,
             "triggered_by": "cli",
         }
 
@@ -164,3 +181,51 @@ def artifacts(run_id: int, output: str):
         console.print(f"  S3: qatron-artifacts/runs/{run_id}/")
     except Exception as e:
         console.print(f"[red]✗[/red] Failed to download artifacts: {e}")
+
+
+def iter_sse_events(lines):
+    """Parse a server-sent event stream into (event, data) pairs."""
+    event, data = "message", []
+    for line in lines:
+        if line is None:
+            continue
+        if not line:
+            if data:
+                yield event, "\n".join(data)
+            event, data = "message", []
+        elif line.startswith(":"):
+            continue  # Keepalive comment
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            value = line[len("data:"):]
+            data.append(value[1:] if value.startswith(" ") else value)
+
+
+@runs_group.command()
+@click.argument("run_id", type=int)
+@click.option("--follow", "-f", is_flag=True, help="Keep streaming until the run finishes")
+@click.option("--shard", type=int, help="Only show output of this shard")
+def logs(run_id: int, follow: bool, shard: int):
+    """Show (or tail) the job output of a run."""
+    try:
+        client = APIClient()
+        params = {"follow": "true" if follow else "false"}
+        if shard is not None:
+            params["shard"] = shard
+        if not follow:
+            response = client.get(f"/runs/{run_id}/logs", params=params)
+            click.echo(response.text, nl=False)
+            return
+
+        response = client.get(f"/runs/{run_id}/logs", params=params, stream=True, timeout=(10, None))
+        for event, data in iter_sse_events(response.iter_lines(decode_unicode=True)):
+            if event == "log":
+                click.echo(data)
+            elif event == "end":
+                console.print(f"\n[bold]Run #{run_id} finished:[/bold] {data}")
+                return
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        console.print(f"[red]✗[/red] Failed to get run logs: {e}")
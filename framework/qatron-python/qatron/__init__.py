@@ -1,2 +1,2 @@
 """QAtron Python automation framework."""
-__version__ = "0.1.0"
+__version__ = "0.4.0"
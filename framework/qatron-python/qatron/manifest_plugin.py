@@ -0,0 +1,128 @@
+"""pytest plugin that writes a collection manifest.
+
+Collecting a large pytest-bdd suite is slow, so the worker keeps what a session
+collected and later runs an explicit node id list instead of collecting again. Enable
+with ``--qatron-manifest=PATH`` or the ``QATRON_MANIFEST_FILE`` environment variable;
+the manifest is written once collection finishes (before any marker or shard
+deselection, so it lists every collected test)::
+
+    {"version": 1, "rootdir": ".",
+     "tests": [{"nodeid": "...", "file": "tests/test_a.py", "markers": ["e2e"],
+                "scenario": {"feature": "features/a.feature", "name": "..."}}],
+     "files": {"tests/test_a.py": "<sha256>", "features/a.feature": "<sha256>"}}
+
+Paths and node ids are relative to ``rootdir``, itself relative to the directory pytest
+was invoked from. ``scenario`` is null for tests that are not pytest-bdd scenarios.
+``files`` hashes every test module and feature file the tests come from. Sessions with
+collection errors write no manifest, since they are missing tests.
+"""
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional
+
+import pytest
+
+MANIFEST_ENV_VAR = "QATRON_MANIFEST_FILE"
+MANIFEST_VERSION = 1
+
+
+def _relative(path: str, rootdir: str) -> str:
+    try:
+        return os.path.relpath(path, rootdir) if os.path.isabs(path) else path
+    except ValueError:
+        return path
+
+
+def _scenario(item, rootdir: str) -> Optional[Dict]:
+    """Feature file and scenario name of a pytest-bdd test, or None."""
+    function = getattr(item, "function", None)
+    scenario = getattr(function, "__scenario__", None)
+    feature = getattr(scenario, "feature", None)
+    if scenario is None or feature is None:
+        return None
+    return {
+        "feature": _relative(str(feature.filename), rootdir),
+        "name": scenario.name,
+    }
+
+
+def _sha256(path: str) -> Optional[str]:
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def build_manifest(items, rootdir: str) -> Dict:
+    """Manifest of the collected items (see the module docstring)."""
+    tests: List[Dict] = []
+    files: Dict[str, Optional[str]] = {}
+    for item in items:
+        path = _relative(str(item.path), rootdir)
+        scenario = _scenario(item, rootdir)
+        tests.append(
+            {
+                "nodeid": item.nodeid,
+                "file": path,
+                "markers": sorted({mark.name for mark in item.iter_markers()}),
+                "scenario": scenario,
+            }
+        )
+        if path not in files:
+            files[path] = _sha256(str(item.path))
+        if scenario and scenario["feature"] not in files:
+            files[scenario["feature"]] = _sha256(os.path.join(rootdir, scenario["feature"]))
+    return {"version": MANIFEST_VERSION, "tests": tests, "files": files}
+
+
+class ManifestWriter:
+    """Writes the manifest of the session's collected items."""
+
+    def __init__(self, path: str, rootdir: str, invocation_dir: str):
+        self.path = path
+        self.rootdir = rootdir
+        self.invocation_dir = invocation_dir
+        self.errors = 0
+
+    @pytest.hookimpl
+    def pytest_collectreport(self, report):
+        if report.failed:
+            self.errors += 1
+
+    # Before the mark and shard plugins deselect anything
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_collection_modifyitems(self, session, config, items):
+        if self.errors:
+            return
+        manifest = build_manifest(items, self.rootdir)
+        manifest["rootdir"] = os.path.relpath(self.rootdir, self.invocation_dir)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, separators=(",", ":"))
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("qatron")
+    group.addoption(
+        "--qatron-manifest",
+        action="store",
+        default=None,
+        metavar="PATH",
+        help=f"Write the collected tests as JSON to PATH (default: ${MANIFEST_ENV_VAR}).",
+    )
+
+
+def pytest_configure(config):
+    # Under xdist every worker collects the same tests; manifests come from plain sessions
+    if hasattr(config, "workerinput"):
+        return
+    path = config.getoption("qatron_manifest") or os.getenv(MANIFEST_ENV_VAR)
+    if path:
+        config.pluginmanager.register(
+            ManifestWriter(path, str(config.rootpath), str(config.invocation_params.dir)),
+            "qatron-manifest-writer",
+        )
@@ -0,0 +1,192 @@
+"""pytest plugin that records structured per-test results.
+
+Each finished test is appended to a JSON-lines file as soon as its teardown report
+arrives, so memory stays flat regardless of suite size. With pytest-xdist the
+controller writes the file; markers travel with each (serialized) report.
+
+Enable with ``--qatron-results=PATH`` or the ``QATRON_RESULTS_FILE`` environment
+variable. One line per test::
+
+    {"nodeid": "...", "outcome": "passed", "duration": 1.23,
+     "phases": {"setup": 0.01, "call": 1.2, "teardown": 0.02},
+     "markers": ["e2e"], "failure": null, "worker": "gw0"}
+
+``outcome`` is one of passed, failed, error (setup/teardown/collection failure),
+skipped, xfailed or xpassed. ``failure`` holds the exception type, the first line of
+the message, the crash location and a ``signature`` that groups identical failures.
+"""
+import hashlib
+import json
+import os
+import re
+from typing import Dict, Optional
+
+import pytest
+
+RESULTS_ENV_VAR = "QATRON_RESULTS_FILE"
+MARKERS_ATTR = "qatron_markers"
+MAX_MESSAGE_LENGTH = 500
+
+# Volatile fragments (addresses, numbers, quoted values) that vary between runs of
+# the same failure and would otherwise split one failure into many signatures
+_VOLATILE = re.compile(r"0x[0-9a-fA-F]+|\d+(\.\d+)?|'[^']*'|\"[^\"]*\"")
+
+
+def failure_signature(exc_type: str, message: str, location: str) -> str:
+    """Stable id for a failure: same exception, same normalized message, same crash site."""
+    normalized = _VOLATILE.sub("?", message)
+    raw = f"{exc_type}|{normalized}|{location}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _relative(path: str, rootdir: str) -> str:
+    """Path relative to rootdir, so signatures do not depend on the job's workspace path."""
+    try:
+        return os.path.relpath(path, rootdir) if os.path.isabs(path) else path
+    except ValueError:
+        return path
+
+
+def _failure_info(report, rootdir: str) -> Optional[Dict]:
+    """Extract exception type, message and crash location from a failed report."""
+    longrepr = report.longrepr
+    if longrepr is None:
+        return None
+    crash = getattr(longrepr, "reprcrash", None)
+    if crash is not None:
+        text = crash.message or ""
+        location = f"{_relative(str(crash.path), rootdir)}:{crash.lineno}"
+    else:
+        text = str(longrepr)
+        location = report.location[0] if report.location else ""
+    first_line = text.strip().splitlines()[0] if text.strip() else ""
+    exc_type, _, message = first_line.partition(": ")
+    if not message or " " in exc_type:
+        exc_type, message = "Error", first_line
+    return {
+        "type": exc_type,
+        "message": message[:MAX_MESSAGE_LENGTH],
+        "location": location,
+        "signature": failure_signature(exc_type, message, location),
+    }
+
+
+def _worker_id(report) -> Optional[str]:
+    """xdist worker (gw0, gw1, ...) that ran the test, or None without xdist."""
+    gateway = getattr(getattr(report, "node", None), "gateway", None)
+    return getattr(gateway, "id", None)
+
+
+class ResultRecorder:
+    """Collects phase reports per test and writes one JSON line per finished test."""
+
+    def __init__(self, path: str, rootdir: str):
+        """Open the results file (truncating any previous content)."""
+        self.path = path
+        self.rootdir = rootdir
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "w", encoding="utf-8")
+        self._pending: Dict[str, Dict] = {}
+
+    def _write(self, record: Dict) -> None:
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._file.flush()
+
+    @pytest.hookimpl
+    def pytest_runtest_logreport(self, report):
+        """Merge setup/call/teardown reports; emit the test once teardown has been seen."""
+        record = self._pending.setdefault(
+            report.nodeid,
+            {
+                "nodeid": report.nodeid,
+                "outcome": "passed",
+                "duration": 0.0,
+                "phases": {},
+                "markers": [],
+                "failure": None,
+                "worker": _worker_id(report),
+            },
+        )
+        record["phases"][report.when] = round(report.duration, 6)
+        record["duration"] = round(record["duration"] + report.duration, 6)
+        markers = getattr(report, MARKERS_ATTR, None)
+        if markers:
+            record["markers"] = list(markers)
+
+        outcome = self._phase_outcome(report)
+        if outcome and record["outcome"] in ("passed", "xpassed"):
+            record["outcome"] = outcome
+            if outcome in ("failed", "error"):
+                record["failure"] = _failure_info(report, self.rootdir)
+        elif outcome == "xpassed":
+            record["outcome"] = outcome
+
+        if report.when == "teardown":
+            self._write(self._pending.pop(report.nodeid))
+
+    @staticmethod
+    def _phase_outcome(report) -> Optional[str]:
+        """Outcome contributed by a single phase report (None if it passed)."""
+        if hasattr(report, "wasxfail"):
+            return "xfailed" if report.skipped else "xpassed"
+        if report.failed:
+            return "failed" if report.when == "call" else "error"
+        if report.skipped:
+            return "skipped"
+        return None
+
+    @pytest.hookimpl
+    def pytest_collectreport(self, report):
+        """Record collection errors so broken modules are not silently dropped from totals."""
+        if report.failed:
+            failure = _failure_info(report, self.rootdir)
+            self._write(
+                {
+                    "nodeid": report.nodeid,
+                    "outcome": "error",
+                    "duration": 0.0,
+                    "phases": {"collect": 0.0},
+                    "markers": [],
+                    "failure": failure,
+                    "worker": None,
+                }
+            )
+
+    @pytest.hookimpl
+    def pytest_sessionfinish(self):
+        """Flush tests whose teardown never reported (e.g. interrupted sessions)."""
+        for record in self._pending.values():
+            self._write(record)
+        self._pending.clear()
+        self._file.close()
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("qatron")
+    group.addoption(
+        "--qatron-results",
+        action="store",
+        default=None,
+        metavar="PATH",
+        help=f"Write per-test results as JSON lines to PATH (default: ${RESULTS_ENV_VAR}).",
+    )
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    """Attach marker names to each report (runs where the test runs, so it survives xdist)."""
+    outcome = yield
+    report = outcome.get_result()
+    setattr(report, MARKERS_ATTR, sorted({mark.name for mark in item.iter_markers()}))
+
+
+def pytest_configure(config):
+    # xdist workers report to the controller, which does the writing
+    if hasattr(config, "workerinput"):
+        return
+    path = config.getoption("qatron_results") or os.getenv(RESULTS_ENV_VAR)
+    if path:
+        recorder = ResultRecorder(path, str(config.rootpath))
+        config.pluginmanager.register(recorder, "qatron-result-recorder")
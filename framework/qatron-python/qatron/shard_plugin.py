@@ -0,0 +1,69 @@
+"""pytest plugin that restricts a session to one shard's tests.
+
+The orchestrator plans shards from historical durations and the worker passes the
+plan to pytest through environment variables:
+
+- ``QATRON_SELECT_FILE``: file with one node id per line; only those tests run
+- ``QATRON_DESELECT_FILE``: file with one node id per line; every other test runs
+  (the shard that also picks up tests added since the plan's history was recorded)
+- ``QATRON_SHARD``: ``index/total``; tests are split by a stable hash of their node id
+  (used when there is no history to plan from)
+
+Listed node ids that no longer exist are ignored rather than failing the session.
+"""
+import os
+import zlib
+from typing import Optional, Set, Tuple
+
+import pytest
+
+SELECT_ENV_VAR = "QATRON_SELECT_FILE"
+DESELECT_ENV_VAR = "QATRON_DESELECT_FILE"
+SHARD_ENV_VAR = "QATRON_SHARD"
+
+
+def read_nodeids(path: str) -> Set[str]:
+    with open(path, encoding="utf-8") as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """Parse "index/total" into (index, total)."""
+    index, _, total = value.partition("/")
+    shard_index, shard_total = int(index), int(total)
+    if shard_total < 1 or not 0 <= shard_index < shard_total:
+        raise ValueError(f"invalid {SHARD_ENV_VAR} value {value!r}")
+    return shard_index, shard_total
+
+
+def hash_shard(nodeid: str, shard_total: int) -> int:
+    """Shard a test belongs to when splitting by hash (stable across processes)."""
+    return zlib.crc32(nodeid.encode("utf-8")) % shard_total
+
+
+def _keep(nodeid: str, select: Optional[Set[str]], deselect: Optional[Set[str]], shard) -> bool:
+    if select is not None:
+        return nodeid in select
+    if deselect is not None:
+        return nodeid not in deselect
+    shard_index, shard_total = shard
+    return hash_shard(nodeid, shard_total) == shard_index
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_collection_modifyitems(config, items):
+    select_file = os.getenv(SELECT_ENV_VAR)
+    deselect_file = os.getenv(DESELECT_ENV_VAR)
+    shard_value = os.getenv(SHARD_ENV_VAR)
+    if not (select_file or deselect_file or shard_value):
+        return
+    select = read_nodeids(select_file) if select_file else None
+    deselect = read_nodeids(deselect_file) if deselect_file else None
+    shard = parse_shard(shard_value) if shard_value else None
+
+    kept, dropped = [], []
+    for item in items:
+        (kept if _keep(item.nodeid, select, deselect, shard) else dropped).append(item)
+    if dropped:
+        config.hook.pytest_deselected(items=dropped)
+        items[:] = kept
@@ -4,16 +4,29 @@ export interface ScenarioStep {
   type: string
   keyword: string
   text: string
+  line_number: number | null
 }
 
 export interface FeatureScenario {
   id: number
   name: string
-  type: string
+  type: string // scenario, scenario_outline or background
+  rule: string | null
+  line_number: number | null
   tags: string[]
   steps: ScenarioStep[]
 }
 
+export interface FeatureSummary {
+  id: number
+  name: string
+  file_path: string
+  description: string | null
+  tags: string[]
+  scenario_count: number
+  step_count: number
+}
+
 export interface ProjectFeature {
   id: number
   name: string
@@ -23,9 +36,43 @@ export interface ProjectFeature {
   scenarios: FeatureScenario[]
 }
 
+export interface ScenarioSearchHit {
+  scenario_id: number
+  name: string
+  type: string
+  rule: string | null
+  line_number: number | null
+  tags: string[]
+  feature: { id: number; name: string; file_path: string }
+  matched_steps: (ScenarioStep & { id: number })[]
+}
+
+export interface FeaturePage {
+  features: FeatureSummary[]
+  nextCursor: number | null
+}
+
 export const featuresApi = {
-  list: async (projectId: number): Promise<ProjectFeature[]> => {
-    const response = await apiClient.get(`/features/projects/${projectId}/features`)
+  listSummaries: async (projectId: number, cursor = 0): Promise<FeaturePage> => {
+    const response = await apiClient.get(`/features/projects/${projectId}/features`, {
+      params: { view: 'summary', cursor },
+    })
+    const next = response.headers['x-next-cursor']
+    return { features: response.data, nextCursor: next ? parseInt(next, 10) : null }
+  },
+
+  // Scenarios whose steps contain all words of q and that carry all tags (comma separated)
+  search: async (projectId: number, q: string, tags: string): Promise<ScenarioSearchHit[]> => {
+    const response = await apiClient.get(`/features/projects/${projectId}/features/search`, {
+      params: { q, tags },
+    })
+    return response.data
+  },
+
+  get: async (projectId: number, featureId: number): Promise<ProjectFeature> => {
+    const response = await apiClient.get(
+      `/features/projects/${projectId}/features/${featureId}`
+    )
     return response.data
   },
 
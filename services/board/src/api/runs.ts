@@ -1,4 +1,5 @@
-import { apiClient } from './client'
+import { API_BASE_URL, apiClient } from './client'
+import { useAuthStore } from '../store/authStore'
 
 export interface Run {
   id: number
@@ -58,3 +59,44 @@ export const runsApi = {
     return response.data
   },
 }
+
+/**
+ * Tail a run's job output via the SSE follow endpoint.
+ * fetch() is used instead of EventSource so the bearer token can be sent.
+ * Resolves with the final run status once the stream ends.
+ */
+export async function followRunLogs(
+  id: number,
+  onLines: (lines: string[]) => void,
+  signal: AbortSignal
+): Promise<string | undefined> {
+  const token = useAuthStore.getState().token
+  const response = await fetch(`${API_BASE_URL}/runs/${id}/logs?follow=true`, {
+    headers: token ? { Authorization: `Bearer ${token}` } : {},
+    signal,
+  })
+  if (!response.ok || !response.body) {
+    throw new Error(`Log stream failed (${response.status})`)
+  }
+  const reader = response.body.pipeThrough(new TextDecoderStream()).getReader()
+  let buffer = ''
+  for (;;) {
+    const { value, done } = await reader.read()
+    if (done) return undefined
+    buffer += value
+    let boundary = buffer.indexOf('\n\n')
+    while (boundary !== -1) {
+      const rawEvent = buffer.slice(0, boundary)
+      buffer = buffer.slice(boundary + 2)
+      boundary = buffer.indexOf('\n\n')
+      let event = 'message'
+      const data: string[] = []
+      for (const line of rawEvent.split('\n')) {
+        if (line.startsWith('event:')) event = line.slice(6).trim()
+        else if (line.startsWith('data:')) data.push(line.slice(line.startsWith('data: ') ? 6 : 5))
+      }
+      if (event === 'end') return data.join('\n')
+      if (event === 'log' && data.length) onLines(data)
+    }
+  }
+}
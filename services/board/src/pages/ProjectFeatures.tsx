@@ -1,7 +1,7 @@
 import { useState } from 'react'
 import { useParams, useNavigate } from 'react-router-dom'
-import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query'
-import { featuresApi, ProjectFeature } from '../api/features'
+import { useInfiniteQuery, useQuery, useMutation, useQueryClient } from '@tanstack/react-query'
+import { featuresApi, FeatureSummary } from '../api/features'
 import { projectsApi } from '../api/projects'
 import { getErrorMessage } from '../types'
 import './ProjectFeatures.css'
@@ -15,6 +15,9 @@ export default function ProjectFeatures() {
   const [pasteContent, setPasteContent] = useState('')
   const [filePath, setFilePath] = useState('features/amazon.feature')
   const [ingestError, setIngestError] = useState('')
+  const [searchText, setSearchText] = useState('')
+  const [searchTags, setSearchTags] = useState('')
+  const [search, setSearch] = useState<{ q: string; tags: string } | null>(null)
 
   const { data: project } = useQuery({
     queryKey: ['project', id],
@@ -22,11 +25,34 @@ export default function ProjectFeatures() {
     enabled: id > 0,
   })
 
-  const { data: features, isLoading } = useQuery({
+  // Summaries a page at a time; scenarios and steps are fetched when a card is expanded
+  const {
+    data: featurePages,
+    isLoading,
+    fetchNextPage,
+    hasNextPage,
+    isFetchingNextPage,
+  } = useInfiniteQuery({
     queryKey: ['features', id],
-    queryFn: () => featuresApi.list(id),
+    queryFn: ({ pageParam }) => featuresApi.listSummaries(id, pageParam),
+    initialPageParam: 0,
+    getNextPageParam: (lastPage) => lastPage.nextCursor ?? undefined,
     enabled: id > 0,
   })
+  const features = featurePages?.pages.flatMap((page) => page.features)
+
+  const { data: searchHits, isFetching: isSearching } = useQuery({
+    queryKey: ['feature-search', id, search],
+    queryFn: () => featuresApi.search(id, search!.q, search!.tags),
+    enabled: id > 0 && search !== null,
+  })
+
+  const handleSearch = (e: React.FormEvent) => {
+    e.preventDefault()
+    const q = searchText.trim()
+    const tags = searchTags.trim()
+    setSearch(q || tags ? { q, tags } : null)
+  }
 
   const ingestMutation = useMutation<
     { message: string; features_count: number },
@@ -114,6 +140,51 @@ export default function ProjectFeatures() {
         </form>
       </section>
 
+      <section className="features-search-section">
+        <h2>Search scenarios</h2>
+        <form onSubmit={handleSearch} className="search-form">
+          <input
+            type="text"
+            value={searchText}
+            onChange={(e) => setSearchText(e.target.value)}
+            placeholder="Step text, e.g. I log in as"
+          />
+          <input
+            type="text"
+            value={searchTags}
+            onChange={(e) => setSearchTags(e.target.value)}
+            placeholder="Tags, e.g. @payments, @smoke"
+          />
+          <button type="submit" className="btn-primary" disabled={isSearching}>
+            Search
+          </button>
+        </form>
+        {search && !isSearching && !searchHits?.length && (
+          <p className="empty-state">No matching scenarios.</p>
+        )}
+        {searchHits?.map((hit) => (
+          <div key={hit.scenario_id} className="scenario">
+            <strong>{hit.name}</strong>{' '}
+            <span className="feature-path">
+              {hit.feature.file_path}
+              {hit.line_number ? `:${hit.line_number}` : ''}
+            </span>
+            {hit.tags.map((t) => (
+              <span key={t} className="tag">
+                {t}
+              </span>
+            ))}
+            <ul className="steps">
+              {hit.matched_steps.map((step) => (
+                <li key={step.id}>
+                  <span className="step-keyword">{step.keyword}</span> {step.text}
+                </li>
+              ))}
+            </ul>
+          </div>
+        ))}
+      </section>
+
       <section className="features-list-section">
         <h2>Ingested features</h2>
         {isLoading ? (
@@ -125,22 +196,35 @@ export default function ProjectFeatures() {
         ) : (
           <div className="features-list">
             {features.map((f) => (
-              <FeatureCard key={f.id} feature={f} />
+              <FeatureCard key={f.id} projectId={id} feature={f} />
             ))}
           </div>
         )}
+        {hasNextPage && (
+          <button onClick={() => fetchNextPage()} disabled={isFetchingNextPage}>
+            {isFetchingNextPage ? 'Loading...' : 'Load more features'}
+          </button>
+        )}
       </section>
     </div>
   )
 }
 
-function FeatureCard({ feature }: { feature: ProjectFeature }) {
+function FeatureCard({ projectId, feature }: { projectId: number; feature: FeatureSummary }) {
   const [expanded, setExpanded] = useState(false)
+  const { data: tree, isLoading } = useQuery({
+    queryKey: ['features', projectId, feature.id],
+    queryFn: () => featuresApi.get(projectId, feature.id),
+    enabled: expanded,
+  })
   return (
     <div className="feature-card">
       <div className="feature-card-header" onClick={() => setExpanded(!expanded)}>
         <span className="feature-name">{feature.name}</span>
         <span className="feature-path">{feature.file_path}</span>
+        <span className="feature-counts">
+          {feature.scenario_count} scenarios, {feature.step_count} steps
+        </span>
         <span className="feature-toggle">{expanded ? '▼' : '▶'}</span>
       </div>
       {expanded && (
@@ -157,10 +241,11 @@ function FeatureCard({ feature }: { feature: ProjectFeature }) {
               ))}
             </div>
           )}
+          {isLoading && <div className="loading">Loading scenarios...</div>}
           <div className="scenarios">
-            {feature.scenarios?.map((s) => (
+            {tree?.scenarios?.map((s) => (
               <div key={s.id} className="scenario">
-                <strong>{s.name}</strong>
+                <strong>{s.type === 'background' ? `Background ${s.name}`.trim() : s.name}</strong>
                 <ul className="steps">
                   {s.steps?.map((step, i) => (
                     <li key={i}>
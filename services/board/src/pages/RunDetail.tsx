@@ -1,9 +1,49 @@
+import { useCallback, useEffect, useRef, useState } from 'react'
 import { useParams } from 'react-router-dom'
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query'
-import { runsApi } from '../api/runs'
+import { followRunLogs, runsApi } from '../api/runs'
 import { getErrorMessage } from '../types'
 import './RunDetail.css'
 
+// Older lines are dropped from the view so hour-long runs stay responsive
+const MAX_LOG_LINES = 5000
+
+function RunLogs({ runId, onFinished }: { runId: number; onFinished: () => void }) {
+  const [lines, setLines] = useState<string[]>([])
+  const [error, setError] = useState('')
+  const bottomRef = useRef<HTMLSpanElement>(null)
+
+  useEffect(() => {
+    const controller = new AbortController()
+    setLines([])
+    followRunLogs(
+      runId,
+      (newLines) => setLines((prev) => prev.concat(newLines).slice(-MAX_LOG_LINES)),
+      controller.signal
+    )
+      .then(() => onFinished())
+      .catch((err: unknown) => {
+        if (!controller.signal.aborted) setError(getErrorMessage(err, 'Log stream failed'))
+      })
+    return () => controller.abort()
+  }, [runId, onFinished])
+
+  useEffect(() => {
+    bottomRef.current?.scrollIntoView({ block: 'nearest' })
+  }, [lines])
+
+  return (
+    <div className="run-logs">
+      <h2>Logs</h2>
+      {error ? <p className="trigger-error">{error}</p> : null}
+      <pre className="run-logs-output">
+        {lines.length ? lines.join('\n') : 'No output yet.'}
+        <span ref={bottomRef} />
+      </pre>
+    </div>
+  )
+}
+
 export default function RunDetail() {
   const { runId } = useParams<{ runId: string }>()
   const runIdNum = parseInt(runId || '0', 10)
@@ -32,6 +72,9 @@ export default function RunDetail() {
     ? getErrorMessage(triggerErr, 'Trigger failed')
     : ''
   const isTriggerSuccess = triggerMutation.isSuccess && !triggerMutation.isPending
+  const refreshRun = useCallback(() => {
+    queryClient.invalidateQueries({ queryKey: ['runs', runIdNum] })
+  }, [queryClient, runIdNum])
 
   if (isLoading) {
     return <div className="loading">Loading run details...</div>
@@ -62,7 +105,7 @@ export default function RunDetail() {
               <p className="trigger-success">Run triggered. Status may update shortly.</p>
             )}
             <p className="trigger-info">
-              Runs are executed by the worker (clone repo, run pytest). No output appears in your IDE terminal. To see test logs: <code>cd deployment/docker-compose && docker compose logs worker -f</code>. Ensure orchestrator-worker and worker are running; project repo must be cloneable.
+              Runs are executed by the worker (clone repo, run pytest). Job output streams into the Logs panel below once the run starts. Ensure orchestrator-worker and worker are running; project repo must be cloneable.
             </p>
           </div>
         )}
@@ -137,6 +180,8 @@ export default function RunDetail() {
           </div>
         )}
       </div>
+
+      {run.status !== 'queued' && <RunLogs runId={run.id} onFinished={refreshRun} />}
     </div>
   )
 }
@@ -0,0 +1,39 @@
+"""Add run_log_chunks for live job log streaming.
+
+Revision ID: 20260301000000
+Revises: 20250218000000
+Create Date: 2026-03-01
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20260301000000"
+down_revision = "20250218000000"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "run_log_chunks",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("run_id", sa.Integer(), nullable=False),
+        sa.Column("shard_index", sa.Integer(), nullable=False, server_default=sa.text("0")),
+        sa.Column("seq", sa.Integer(), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("line_count", sa.Integer(), nullable=False, server_default=sa.text("0")),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(["run_id"], ["runs.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("run_id", "shard_index", "seq", name="uq_run_log_chunks_run_shard_seq"),
+    )
+    op.create_index(op.f("ix_run_log_chunks_id"), "run_log_chunks", ["id"], unique=False)
+    op.create_index(op.f("ix_run_log_chunks_run_id"), "run_log_chunks", ["run_id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_run_log_chunks_run_id"), table_name="run_log_chunks")
+    op.drop_index(op.f("ix_run_log_chunks_id"), table_name="run_log_chunks")
+    op.drop_table("run_log_chunks")
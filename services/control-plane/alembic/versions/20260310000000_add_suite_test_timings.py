@@ -0,0 +1,43 @@
+"""Add suite_test_timings for duration-aware sharding.
+
+Revision ID: 20260310000000
+Revises: 20260301000000
+Create Date: 2026-03-10
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20260310000000"
+down_revision = "20260301000000"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "suite_test_timings",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("suite_id", sa.Integer(), nullable=False),
+        sa.Column("nodeid", sa.String(length=1000), nullable=False),
+        sa.Column("duration_seconds", sa.Float(), nullable=False),
+        sa.Column("samples", sa.Integer(), nullable=False, server_default=sa.text("1")),
+        sa.Column("last_seen_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["suite_id"], ["suites.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("suite_id", "nodeid", name="uq_suite_test_timings_suite_nodeid"),
+    )
+    op.create_index(op.f("ix_suite_test_timings_id"), "suite_test_timings", ["id"], unique=False)
+    op.create_index(
+        op.f("ix_suite_test_timings_last_seen_at"),
+        "suite_test_timings",
+        ["last_seen_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_suite_test_timings_last_seen_at"), table_name="suite_test_timings")
+    op.drop_index(op.f("ix_suite_test_timings_id"), table_name="suite_test_timings")
+    op.drop_table("suite_test_timings")
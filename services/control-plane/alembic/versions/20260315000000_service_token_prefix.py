@@ -0,0 +1,30 @@
+"""Add service_tokens.token_prefix for HMAC-indexed service tokens.
+
+Existing rows keep their bcrypt hash (token_prefix NULL); each is rewritten to the
+HMAC form the first time its token is used.
+
+Revision ID: 20260315000000
+Revises: 20260310000000
+Create Date: 2026-03-15
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20260315000000"
+down_revision = "20260310000000"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("service_tokens", sa.Column("token_prefix", sa.String(length=16), nullable=True))
+    op.create_index(
+        op.f("ix_service_tokens_token_prefix"), "service_tokens", ["token_prefix"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_service_tokens_token_prefix"), table_name="service_tokens")
+    op.drop_column("service_tokens", "token_prefix")
@@ -0,0 +1,29 @@
+"""Add users.token_version for revoking stateless access tokens.
+
+Access tokens carry the user's token_version; bumping it invalidates every token
+issued before.
+
+Revision ID: 20260320000000
+Revises: 20260315000000
+Create Date: 2026-03-20
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20260320000000"
+down_revision = "20260315000000"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "users",
+        sa.Column("token_version", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("users", "token_version")
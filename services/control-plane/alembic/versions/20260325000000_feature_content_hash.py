@@ -0,0 +1,25 @@
+"""Add features.content_hash for incremental feature ingestion.
+
+Existing rows have no hash, so the next ingestion rewrites them once.
+
+Revision ID: 20260325000000
+Revises: 20260320000000
+Create Date: 2026-03-25
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20260325000000"
+down_revision = "20260320000000"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("features", sa.Column("content_hash", sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("features", "content_hash")
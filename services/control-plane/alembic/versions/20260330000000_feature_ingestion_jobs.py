@@ -0,0 +1,60 @@
+"""Add feature_ingestion_jobs for background feature ingestion.
+
+Revision ID: 20260330000000
+Revises: 20260325000000
+Create Date: 2026-03-30
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20260330000000"
+down_revision = "20260325000000"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "feature_ingestion_jobs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("project_id", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(length=20), nullable=False),
+        sa.Column("source_type", sa.String(length=20), nullable=False),
+        sa.Column("source", sa.String(length=1000), nullable=False),
+        sa.Column("commit", sa.String(length=64), nullable=True),
+        sa.Column("strip_components", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("total_files", sa.Integer(), nullable=True),
+        sa.Column("processed_files", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("features_added", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("features_updated", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("features_unchanged", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("features_removed", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("created_by_user_id", sa.Integer(), nullable=True),
+        sa.Column(
+            "created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True
+        ),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("completed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["project_id"], ["projects.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["created_by_user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_feature_ingestion_jobs_id"), "feature_ingestion_jobs", ["id"], unique=False
+    )
+    op.create_index(
+        op.f("ix_feature_ingestion_jobs_project_id"),
+        "feature_ingestion_jobs",
+        ["project_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    table = "feature_ingestion_jobs"
+    op.drop_index(op.f("ix_feature_ingestion_jobs_project_id"), table_name=table)
+    op.drop_index(op.f("ix_feature_ingestion_jobs_id"), table_name=table)
+    op.drop_table(table)
@@ -0,0 +1,25 @@
+"""Add feature_ingestion_jobs.base_commit for incremental git ingestion.
+
+Revision ID: 20260405000000
+Revises: 20260330000000
+Create Date: 2026-04-05
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20260405000000"
+down_revision = "20260330000000"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "feature_ingestion_jobs", sa.Column("base_commit", sa.String(length=64), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("feature_ingestion_jobs", "base_commit")
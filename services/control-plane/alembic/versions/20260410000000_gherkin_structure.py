@@ -0,0 +1,27 @@
+"""Add scenarios.rule and steps.doc_string for the full Gherkin structure.
+
+Backgrounds are stored as scenarios with scenario_type "background".
+
+Revision ID: 20260410000000
+Revises: 20260405000000
+Create Date: 2026-04-10
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20260410000000"
+down_revision = "20260405000000"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("scenarios", sa.Column("rule", sa.String(length=255), nullable=True))
+    op.add_column("steps", sa.Column("doc_string", sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("steps", "doc_string")
+    op.drop_column("scenarios", "rule")
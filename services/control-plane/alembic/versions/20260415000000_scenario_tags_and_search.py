@@ -0,0 +1,89 @@
+"""Add scenario_tags and full-text search indexes over steps and scenario names.
+
+scenario_tags is backfilled from the JSON tags of stored scenarios and their features
+(rule tags are added when a feature is next re-ingested). The GIN indexes are created on
+PostgreSQL only; other databases search with the in-process index.
+
+Revision ID: 20260415000000
+Revises: 20260410000000
+Create Date: 2026-04-15
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20260415000000"
+down_revision = "20260410000000"
+branch_labels = None
+depends_on = None
+
+
+def _tags(value):
+    try:
+        return json.loads(value) if value else []
+    except ValueError:
+        return []
+
+
+def upgrade() -> None:
+    scenario_tags = op.create_table(
+        "scenario_tags",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("project_id", sa.Integer(), nullable=False),
+        sa.Column("feature_id", sa.Integer(), nullable=False),
+        sa.Column("scenario_id", sa.Integer(), nullable=False),
+        sa.Column("tag", sa.String(length=255), nullable=False),
+        sa.ForeignKeyConstraint(["project_id"], ["projects.id"]),
+        sa.ForeignKeyConstraint(["feature_id"], ["features.id"]),
+        sa.ForeignKeyConstraint(["scenario_id"], ["scenarios.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_scenario_tags_project_tag", "scenario_tags", ["project_id", "tag"])
+    op.create_index(op.f("ix_scenario_tags_feature_id"), "scenario_tags", ["feature_id"])
+    op.create_index(op.f("ix_scenario_tags_scenario_id"), "scenario_tags", ["scenario_id"])
+
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.text(
+            "SELECT s.id, s.feature_id, f.project_id, s.tags, f.tags FROM scenarios s "
+            "JOIN features f ON f.id = s.feature_id WHERE s.scenario_type != 'background'"
+        )
+    )
+    batch = []
+    for scenario_id, feature_id, project_id, tags, feature_tags in rows:
+        for tag in dict.fromkeys(_tags(feature_tags) + _tags(tags)):
+            batch.append(
+                {
+                    "project_id": project_id,
+                    "feature_id": feature_id,
+                    "scenario_id": scenario_id,
+                    "tag": tag[:255],
+                }
+            )
+        if len(batch) >= 1000:
+            op.bulk_insert(scenario_tags, batch)
+            batch = []
+    if batch:
+        op.bulk_insert(scenario_tags, batch)
+
+    if bind.dialect.name == "postgresql":
+        op.execute(
+            "CREATE INDEX ix_steps_text_search ON steps USING gin (to_tsvector('english', text))"
+        )
+        op.execute(
+            "CREATE INDEX ix_scenarios_name_search ON scenarios "
+            "USING gin (to_tsvector('english', name))"
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_scenarios_name_search")
+        op.execute("DROP INDEX IF EXISTS ix_steps_text_search")
+    op.drop_index(op.f("ix_scenario_tags_scenario_id"), table_name="scenario_tags")
+    op.drop_index(op.f("ix_scenario_tags_feature_id"), table_name="scenario_tags")
+    op.drop_index("ix_scenario_tags_project_tag", table_name="scenario_tags")
+    op.drop_table("scenario_tags")
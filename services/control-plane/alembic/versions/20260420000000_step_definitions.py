@@ -0,0 +1,59 @@
+"""Add step_definitions and steps.step_definition_id.
+
+Existing steps stay unresolved until the project's next ingestion indexes its step
+definitions.
+
+Revision ID: 20260420000000
+Revises: 20260415000000
+Create Date: 2026-04-20
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20260420000000"
+down_revision = "20260415000000"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "step_definitions",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("project_id", sa.Integer(), nullable=False),
+        sa.Column("file_path", sa.String(length=500), nullable=False),
+        sa.Column("content_hash", sa.String(length=64), nullable=False),
+        sa.Column("line_number", sa.Integer(), nullable=True),
+        sa.Column("function_name", sa.String(length=255), nullable=False),
+        sa.Column("step_type", sa.String(length=20), nullable=False),
+        sa.Column("parser", sa.String(length=20), nullable=False),
+        sa.Column("pattern", sa.Text(), nullable=False),
+        sa.Column(
+            "created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True
+        ),
+        sa.ForeignKeyConstraint(["project_id"], ["projects.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_step_definitions_id"), "step_definitions", ["id"])
+    op.create_index(op.f("ix_step_definitions_project_id"), "step_definitions", ["project_id"])
+    op.add_column(
+        "steps",
+        sa.Column(
+            "step_definition_id",
+            sa.Integer(),
+            sa.ForeignKey("step_definitions.id", name="fk_steps_step_definition_id"),
+            nullable=True,
+        ),
+    )
+    op.create_index(op.f("ix_steps_step_definition_id"), "steps", ["step_definition_id"])
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_steps_step_definition_id"), table_name="steps")
+    op.drop_constraint("fk_steps_step_definition_id", "steps", type_="foreignkey")
+    op.drop_column("steps", "step_definition_id")
+    op.drop_index(op.f("ix_step_definitions_project_id"), table_name="step_definitions")
+    op.drop_index(op.f("ix_step_definitions_id"), table_name="step_definitions")
+    op.drop_table("step_definitions")
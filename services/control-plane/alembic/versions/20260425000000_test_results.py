@@ -0,0 +1,66 @@
+"""Add test_results, test_node_ids and failure_signatures.
+
+Revision ID: 20260425000000
+Revises: 20260420000000
+Create Date: 2026-04-25
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20260425000000"
+down_revision = "20260420000000"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "test_node_ids",
+        sa.Column("nodeid_hash", sa.BigInteger(), autoincrement=False, nullable=False),
+        sa.Column("nodeid", sa.Text(), nullable=False),
+        sa.PrimaryKeyConstraint("nodeid_hash"),
+    )
+    op.create_table(
+        "failure_signatures",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("signature", sa.String(length=64), nullable=False),
+        sa.Column("exception_type", sa.String(length=255), nullable=True),
+        sa.Column("message", sa.Text(), nullable=True),
+        sa.Column("location", sa.String(length=1000), nullable=True),
+        sa.Column(
+            "created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("signature"),
+    )
+    op.create_index(op.f("ix_failure_signatures_id"), "failure_signatures", ["id"])
+    op.create_table(
+        "test_results",
+        sa.Column("id", sa.BigInteger(), nullable=False),
+        sa.Column("run_id", sa.Integer(), nullable=False),
+        sa.Column("shard", sa.SmallInteger(), nullable=False),
+        sa.Column("nodeid_hash", sa.BigInteger(), nullable=False),
+        sa.Column("outcome", sa.SmallInteger(), nullable=False),
+        sa.Column("duration_ms", sa.Integer(), nullable=False),
+        sa.Column("failure_signature_id", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["run_id"], ["runs.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["failure_signature_id"], ["failure_signatures.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_test_results_run_nodeid", "test_results", ["run_id", "nodeid_hash"])
+    op.create_index("ix_test_results_nodeid_run", "test_results", ["nodeid_hash", "run_id"])
+    op.create_index(
+        "ix_test_results_failure_signature_id", "test_results", ["failure_signature_id"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_test_results_failure_signature_id", table_name="test_results")
+    op.drop_index("ix_test_results_nodeid_run", table_name="test_results")
+    op.drop_index("ix_test_results_run_nodeid", table_name="test_results")
+    op.drop_table("test_results")
+    op.drop_index(op.f("ix_failure_signatures_id"), table_name="failure_signatures")
+    op.drop_table("failure_signatures")
+    op.drop_table("test_node_ids")
@@ -0,0 +1,43 @@
+"""Add run_shard_results.
+
+Revision ID: 20260430000000
+Revises: 20260425000000
+Create Date: 2026-04-30
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20260430000000"
+down_revision = "20260425000000"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "run_shard_results",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("run_id", sa.Integer(), nullable=False),
+        sa.Column("shard_index", sa.Integer(), nullable=False),
+        sa.Column("shard_total", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(length=50), nullable=False),
+        sa.Column("total_tests", sa.Integer(), nullable=True),
+        sa.Column("passed_tests", sa.Integer(), nullable=True),
+        sa.Column("failed_tests", sa.Integer(), nullable=True),
+        sa.Column("skipped_tests", sa.Integer(), nullable=True),
+        sa.Column("duration_seconds", sa.Float(), nullable=True),
+        sa.Column(
+            "reported_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True
+        ),
+        sa.ForeignKeyConstraint(["run_id"], ["runs.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("run_id", "shard_index", name="uq_run_shard_results_run_shard"),
+    )
+    op.create_index(op.f("ix_run_shard_results_id"), "run_shard_results", ["id"])
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_run_shard_results_id"), table_name="run_shard_results")
+    op.drop_table("run_shard_results")
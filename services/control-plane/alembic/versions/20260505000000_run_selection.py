@@ -0,0 +1,31 @@
+"""Add runs.selection and runs.base_commit for test impact analysis.
+
+A run with selection "impacted" only runs the tests whose covered files changed since
+base_commit (or since the commit of the suite's latest coverage map).
+
+Revision ID: 20260505000000
+Revises: 20260430000000
+Create Date: 2026-05-05
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20260505000000"
+down_revision = "20260430000000"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "runs",
+        sa.Column("selection", sa.String(length=20), nullable=False, server_default="all"),
+    )
+    op.add_column("runs", sa.Column("base_commit", sa.String(length=40), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("runs", "base_commit")
+    op.drop_column("runs", "selection")
@@ -0,0 +1,34 @@
+"""Add test_result_batches so resent per-test result batches are not stored twice.
+
+Revision ID: 20260510000000
+Revises: 20260505000000
+Create Date: 2026-05-10
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20260510000000"
+down_revision = "20260505000000"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "test_result_batches",
+        sa.Column("run_id", sa.Integer(), nullable=False),
+        sa.Column("shard", sa.SmallInteger(), nullable=False),
+        sa.Column("seq", sa.Integer(), nullable=False),
+        sa.Column("row_count", sa.Integer(), nullable=False, server_default=sa.text("0")),
+        sa.Column(
+            "created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True
+        ),
+        sa.ForeignKeyConstraint(["run_id"], ["runs.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("run_id", "shard", "seq"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("test_result_batches")
@@ -4,11 +4,11 @@ from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 
 from app.core.audit import AUDIT_ACTION_LOGIN, log_audit_event
 from app.core.database import get_db
-from app.core.dependencies import get_current_user
+from app.core.dependencies import CurrentUser, get_current_user
 from app.core.security import create_access_token, get_password_hash, verify_password
 from app.core.config import settings
 from app.models.user import User
@@ -56,7 +56,12 @@ async def login(
     db: Session = Depends(get_db),
 ):
     """Login and get access token."""
-    user = db.query(User).filter(User.username == form_data.username).first()
+    user = (
+        db.query(User)
+        .options(selectinload(User.roles))
+        .filter(User.username == form_data.username)
+        .first()
+    )
     if not user or not verify_password(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -69,7 +74,14 @@ async def login(
             detail="Inactive user",
         )
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(data={"sub": str(user.id)}, expires_delta=access_token_expires)
+    # Organization and roles ride in the token so authorization needs no user lookup
+    claims = {
+        "sub": str(user.id),
+        "org": user.organization_id,
+        "roles": sorted(role.name for role in user.roles),
+        "ver": user.token_version or 0,
+    }
+    access_token = create_access_token(data=claims, expires_delta=access_token_expires)
 
     # Log audit event
     log_audit_event(
@@ -87,7 +99,11 @@ async def login(
 
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+    db: Session = Depends(get_db),
 ):
     """Get current authenticated user information."""
-    return current_user
+    user = db.query(User).filter(User.id == current_user.id).first()
+    if not user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    return user
@@ -1,18 +1,39 @@
 """BDD feature ingestion endpoints."""
+import asyncio
 import json
+import uuid
 from pathlib import Path
-from typing import Annotated, List
+from typing import Annotated, List, Literal
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.core.database import get_db
-from app.core.dependencies import get_current_user, require_role
-from app.models.user import User
-from app.models.feature import Feature, Scenario, Step
+from app.core.database import get_async_db, get_db
+from app.core.dependencies import CurrentUser, get_current_user, require_role
+from app.core.config import settings
+from app.models.feature import Feature, FeatureIngestionJob, Scenario, StepDefinition
 from app.models.project import Project
-from app.services.bdd_parser import GherkinParser
+from app.repositories.feature import AsyncFeatureRepository, FeatureRepository
+from app.repositories.project import AsyncProjectRepository
+from app.repositories.step_definition import (
+    AsyncStepDefinitionRepository,
+    StepDefinitionRepository,
+)
+from app.schemas.feature import FeatureIngestionJobResponse, GitIngestionCreate
+from app.services.bdd_parser import parse_feature_cached
+from app.services.feature_ingestion import (
+    SOURCE_ARCHIVE,
+    SOURCE_GIT,
+    SourceFiles,
+    last_indexed_commit,
+    split_unchanged,
+)
+from app.services.feature_scanner import parse_files, read_feature_files
+from app.services.feature_search import feature_search, load_results, parse_tags
+from app.services.feature_sources import ArchiveStore, ArchiveTooLarge
+from app.tasks.ingestion import enqueue_ingestion
 
 router = APIRouter()
 
@@ -33,69 +54,14 @@ class IngestFromContentBody(BaseModel):
     features: List[FeatureContentItem]
 
 
-def _store_parsed_features(db: Session, project_id: int, parsed_features: List[dict]) -> int:
-    """Store parsed feature data into DB. Returns count of features stored."""
-    ingested_count = 0
-    for feature_data in parsed_features:
-        feature = (
-            db.query(Feature)
-            .filter(Feature.project_id == project_id, Feature.file_path == feature_data["file_path"])
-            .first()
-        )
-        if not feature:
-            feature = Feature(
-                project_id=project_id,
-                name=feature_data["name"],
-                file_path=feature_data["file_path"],
-                description=feature_data.get("description"),
-                tags=json.dumps(feature_data.get("tags", [])),
-            )
-            db.add(feature)
-            db.flush()
-        else:
-            feature.name = feature_data["name"]
-            feature.description = feature_data.get("description")
-            feature.tags = json.dumps(feature_data.get("tags", []))
-            db.query(Scenario).filter(Scenario.feature_id == feature.id).delete()
-
-        for scenario_data in feature_data.get("scenarios", []):
-            scenario = Scenario(
-                feature_id=feature.id,
-                name=scenario_data["name"],
-                scenario_type=scenario_data.get("type", "scenario"),
-                tags=json.dumps(scenario_data.get("tags", [])),
-                examples=json.dumps(scenario_data.get("examples", [])) if scenario_data.get("examples") else None,
-            )
-            db.add(scenario)
-            db.flush()
-            for order, step_data in enumerate(scenario_data.get("steps", []), start=1):
-                step_text = step_data["text"]
-                keyword = step_data["type"].capitalize()
-                if step_text.lower().startswith(keyword.lower()):
-                    text = step_text[len(keyword) :].strip()
-                else:
-                    text = step_text
-                step = Step(
-                    scenario_id=scenario.id,
-                    step_type=step_data["type"],
-                    keyword=keyword,
-                    text=text,
-                    order=order,
-                    data_table=json.dumps(step_data.get("data_table")) if step_data.get("data_table") else None,
-                )
-                db.add(step)
-        ingested_count += 1
-    return ingested_count
-
-
 @router.post("/projects/{project_id}/ingest-features", status_code=status.HTTP_200_OK)
-async def ingest_features(
+def ingest_features(
     project_id: int,
     body: IngestFeaturesBody,
-    current_user: Annotated[User, Depends(require_role("admin"))],
+    current_user: Annotated[CurrentUser, Depends(require_role("admin"))],
     db: Session = Depends(get_db),
 ):
-    """Ingest BDD features from a repository."""
+    """Ingest BDD features, and the step definitions implementing them, from a repository."""
     repo_path = body.repo_path
     # Verify project access
     project = db.query(Project).filter(Project.id == project_id).first()
@@ -107,17 +73,30 @@ async def ingest_features(
     if not repo_path_obj.exists():
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Repository path does not exist")
 
-    parsed_features = GherkinParser.scan_repository(repo_path_obj)
-    ingested_count = _store_parsed_features(db, project_id, parsed_features)
-    db.commit()
-    return {"message": f"Successfully ingested {ingested_count} features", "features_count": ingested_count}
+    source = SourceFiles.split(read_feature_files(repo_path_obj, step_modules=True))
+    features = FeatureRepository(db)
+    changed, unchanged = split_unchanged(features, project_id, source.files)
+    parsed_features = parse_files(changed)
+    stats = features.store(project_id, parsed_features)
+    stats.unchanged += len(unchanged)
+    # A scan sees the whole repository, so features whose file is gone are removed
+    keep_paths = unchanged + [feature["file_path"] for feature in parsed_features]
+    stats.removed = features.prune(project_id, keep_paths)
+    definitions = StepDefinitionRepository(db)
+    definitions.store(project_id, source.step_modules, complete=True)
+    definitions.resolve_steps(project_id)
+    return {
+        "message": f"Successfully ingested {len(keep_paths)} features",
+        "features_count": len(keep_paths),
+        **stats.to_dict(),
+    }
 
 
 @router.post("/projects/{project_id}/ingest-features-from-content", status_code=status.HTTP_200_OK)
-async def ingest_features_from_content(
+def ingest_features_from_content(
     project_id: int,
     body: IngestFromContentBody,
-    current_user: Annotated[User, Depends(require_role("admin"))],
+    current_user: Annotated[CurrentUser, Depends(require_role("admin"))],
     db: Session = Depends(get_db),
 ):
     """Ingest BDD features from raw Gherkin content (e.g. paste from UI)."""
@@ -125,54 +104,326 @@ async def ingest_features_from_content(
     if not project or project.organization_id != current_user.organization_id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
 
+    features = FeatureRepository(db)
+    changed, unchanged = split_unchanged(
+        features, project_id, [(item.file_path, item.content) for item in body.features]
+    )
     parsed_features = []
-    for item in body.features:
-        parsed = GherkinParser.parse_feature_content(item.content, item.file_path)
+    for file_path, content in changed:
+        parsed = parse_feature_cached(content, file_path)
         if parsed:
             parsed_features.append(parsed)
-    if not parsed_features:
+    if not parsed_features and not unchanged:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="No valid feature content could be parsed",
         )
 
-    ingested_count = _store_parsed_features(db, project_id, parsed_features)
-    db.commit()
-    return {"message": f"Successfully ingested {ingested_count} features", "features_count": ingested_count}
+    stats = features.store(project_id, parsed_features)
+    stats.unchanged += len(unchanged)
+    StepDefinitionRepository(db).resolve_steps(project_id)
+    features_count = len(parsed_features) + len(unchanged)
+    return {
+        "message": f"Successfully ingested {features_count} features",
+        "features_count": features_count,
+        **stats.to_dict(),
+    }
+
+
+async def _start_job(db: AsyncSession, job: FeatureIngestionJob) -> FeatureIngestionJob:
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+    await asyncio.to_thread(enqueue_ingestion, job.id)
+    return job
+
+
+@router.post(
+    "/projects/{project_id}/ingestion-jobs/archive",
+    response_model=FeatureIngestionJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def create_archive_ingestion_job(
+    project_id: int,
+    request: Request,
+    current_user: Annotated[CurrentUser, Depends(require_role("admin"))],
+    strip_components: int = Query(0, ge=0, le=10),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Ingest the .feature files of a tar (optionally compressed) or zip archive sent as the
+    request body. The body is streamed to storage; parsing runs in a background job.
+    strip_components drops leading path directories, as tar does.
+    """
+    project_repo = AsyncProjectRepository(db)
+    if not await project_repo.get_for_organization(project_id, current_user.organization_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+
+    key = f"{settings.FEATURE_ARCHIVE_PREFIX}{project_id}/{uuid.uuid4().hex}"
+    try:
+        size = await ArchiveStore().save(key, request.stream())
+    except ArchiveTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    if size == 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Empty archive")
+
+    job = FeatureIngestionJob(
+        project_id=project_id,
+        source_type=SOURCE_ARCHIVE,
+        source=key,
+        strip_components=strip_components,
+        created_by_user_id=current_user.id,
+    )
+    return await _start_job(db, job)
+
+
+@router.post(
+    "/projects/{project_id}/ingestion-jobs/git",
+    response_model=FeatureIngestionJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def create_git_ingestion_job(
+    project_id: int,
+    body: GitIngestionCreate,
+    current_user: Annotated[CurrentUser, Depends(require_role("admin"))],
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Ingest the .feature files of a commit (of the project's repository by default).
+
+    If the project was last indexed from the same repository, only the files changed
+    since that commit are read, unless full_scan is set.
+    """
+    project_repo = AsyncProjectRepository(db)
+    project = await project_repo.get_for_organization(project_id, current_user.organization_id)
+    if not project:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+
+    repo_url = body.repo_url or str(project.repo_url)
+    base_commit = None
+    if not body.full_scan:
+        base_commit = await db.run_sync(
+            lambda session: last_indexed_commit(session, project_id, repo_url)
+        )
+    job = FeatureIngestionJob(
+        project_id=project_id,
+        source_type=SOURCE_GIT,
+        source=repo_url,
+        commit=body.commit,
+        base_commit=base_commit,
+        created_by_user_id=current_user.id,
+    )
+    return await _start_job(db, job)
+
+
+@router.get("/ingestion-jobs/{job_id}", response_model=FeatureIngestionJobResponse)
+async def get_ingestion_job(
+    job_id: int,
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Status, progress (processed_files of total_files) and counts of an ingestion job."""
+    job = await db.get(FeatureIngestionJob, job_id)
+    project_repo = AsyncProjectRepository(db)
+    if not job or not await project_repo.get_for_organization(
+        job.project_id, current_user.organization_id
+    ):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
+
+
+def _scenario_dict(scenario: Scenario) -> dict:
+    steps = sorted(scenario.steps, key=lambda step: step.order)
+    return {
+        "id": scenario.id,
+        "name": scenario.name,
+        "type": scenario.scenario_type,
+        "rule": scenario.rule,
+        "line_number": scenario.line_number,
+        "tags": json.loads(scenario.tags) if scenario.tags else [],
+        "steps": [
+            {
+                "type": s.step_type,
+                "keyword": s.keyword,
+                "text": s.text,
+                "line_number": s.line_number,
+            }
+            for s in steps
+        ],
+    }
+
+
+def _feature_dict(feature: Feature) -> dict:
+    return {
+        "id": feature.id,
+        "name": feature.name,
+        "file_path": feature.file_path,
+        "description": feature.description,
+        "tags": json.loads(feature.tags) if feature.tags else [],
+    }
 
 
 @router.get("/projects/{project_id}/features", response_model=List[dict])
 async def list_features(
     project_id: int,
-    current_user: Annotated[User, Depends(get_current_user)],
-    db: Session = Depends(get_db),
+    response: Response,
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+    cursor: int = 0,
+    limit: int = Query(100, ge=1, le=500),
+    view: Literal["full", "summary"] = "full",
+    db: AsyncSession = Depends(get_async_db),
 ):
-    """List BDD features for a project."""
+    """
+    List BDD features for a project, one page at a time (ordered by id).
+
+    Pass the X-Next-Cursor response header back as cursor for the next page; it is absent
+    on the last page. view=summary returns scenario/step counts instead of the trees (fetch
+    one tree with GET .../features/{feature_id}).
+    """
     # Verify project access
-    project = db.query(Project).filter(Project.id == project_id).first()
-    if not project or project.organization_id != current_user.organization_id:
+    repo = AsyncProjectRepository(db)
+    if not await repo.get_for_organization(project_id, current_user.organization_id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
 
-    features = db.query(Feature).filter(Feature.project_id == project_id).all()
-    result = []
-    for feature in features:
-        scenarios = db.query(Scenario).filter(Scenario.feature_id == feature.id).all()
-        scenario_list = []
-        for scenario in scenarios:
-            steps = db.query(Step).filter(Step.scenario_id == scenario.id).order_by(Step.order).all()
-            scenario_list.append({
-                "id": scenario.id,
-                "name": scenario.name,
-                "type": scenario.scenario_type,
-                "tags": json.loads(scenario.tags) if scenario.tags else [],
-                "steps": [{"type": s.step_type, "keyword": s.keyword, "text": s.text} for s in steps],
-            })
-        result.append({
-            "id": feature.id,
-            "name": feature.name,
-            "file_path": feature.file_path,
-            "description": feature.description,
-            "tags": json.loads(feature.tags) if feature.tags else [],
-            "scenarios": scenario_list,
-        })
+    features = AsyncFeatureRepository(db)
+    if view == "summary":
+        rows, next_cursor = await features.summaries(project_id, after_id=cursor, limit=limit)
+        result = [
+            {**_feature_dict(feature), "scenario_count": scenarios, "step_count": steps}
+            for feature, scenarios, steps in rows
+        ]
+    else:
+        page, next_cursor = await features.page(project_id, after_id=cursor, limit=limit)
+        result = [
+            {
+                **_feature_dict(feature),
+                "scenarios": [
+                    _scenario_dict(s) for s in sorted(feature.scenarios, key=lambda s: s.id)
+                ],
+            }
+            for feature in page
+        ]
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
     return result
+
+
+@router.get("/projects/{project_id}/features/search", response_model=List[dict])
+async def search_scenarios(
+    project_id: int,
+    response: Response,
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+    q: str = "",
+    tags: str = "",
+    cursor: int = 0,
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Scenarios whose steps (or name) contain all words of q and that have all of tags
+    (comma separated; feature, rule and Examples tags count). Each result lists its
+    matching steps. Paged by scenario id like the feature list (X-Next-Cursor).
+    """
+    repo = AsyncProjectRepository(db)
+    if not await repo.get_for_organization(project_id, current_user.organization_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+
+    page = await feature_search(db).search(
+        project_id, q.strip(), parse_tags(tags), after_id=cursor, limit=limit
+    )
+    if page.next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(page.next_cursor)
+    return await load_results(db, page)
+
+
+@router.get("/projects/{project_id}/features/{feature_id}", response_model=dict)
+async def get_feature(
+    project_id: int,
+    feature_id: int,
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+    db: AsyncSession = Depends(get_async_db),
+):
+    """One feature with its scenarios and steps."""
+    repo = AsyncProjectRepository(db)
+    if not await repo.get_for_organization(project_id, current_user.organization_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+    feature = await AsyncFeatureRepository(db).get_tree(project_id, feature_id)
+    if not feature:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Feature not found")
+    scenarios = sorted(feature.scenarios, key=lambda s: s.id)
+    return {**_feature_dict(feature), "scenarios": [_scenario_dict(s) for s in scenarios]}
+
+
+def _step_definition_dict(definition: StepDefinition, usage_count: int) -> dict:
+    return {
+        "id": definition.id,
+        "file_path": definition.file_path,
+        "line_number": definition.line_number,
+        "function_name": definition.function_name,
+        "step_type": definition.step_type,
+        "parser": definition.parser,
+        "pattern": definition.pattern,
+        "usage_count": usage_count,
+    }
+
+
+@router.get("/projects/{project_id}/step-definitions", response_model=List[dict])
+async def list_step_definitions(
+    project_id: int,
+    response: Response,
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+    unused: bool = False,
+    cursor: int = 0,
+    limit: int = Query(100, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    The project's indexed step definitions with how many stored steps each implements;
+    unused=true lists only definitions no step uses. Paged like the feature list.
+    """
+    repo = AsyncProjectRepository(db)
+    if not await repo.get_for_organization(project_id, current_user.organization_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+
+    rows, next_cursor = await AsyncStepDefinitionRepository(db).usage(
+        project_id, after_id=cursor, limit=limit, unused=unused
+    )
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+    return [_step_definition_dict(definition, usage_count) for definition, usage_count in rows]
+
+
+@router.get("/projects/{project_id}/steps/unimplemented", response_model=List[dict])
+async def list_unimplemented_steps(
+    project_id: int,
+    response: Response,
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+    cursor: int = 0,
+    limit: int = Query(100, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Stored steps that no indexed step definition matches, with where they are. Paged by
+    step id like the feature list (X-Next-Cursor).
+    """
+    repo = AsyncProjectRepository(db)
+    if not await repo.get_for_organization(project_id, current_user.organization_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+
+    rows, next_cursor = await AsyncStepDefinitionRepository(db).unimplemented(
+        project_id, after_id=cursor, limit=limit
+    )
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+    return [
+        {
+            "id": step.id,
+            "type": step.step_type,
+            "keyword": step.keyword,
+            "text": step.text,
+            "line_number": step.line_number,
+            "scenario": {"id": scenario.id, "name": scenario.name, "type": scenario.scenario_type},
+            "feature": {"id": feature.id, "name": feature.name, "file_path": feature.file_path},
+        }
+        for step, scenario, feature in rows
+    ]
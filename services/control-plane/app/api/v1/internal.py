@@ -2,14 +2,20 @@
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Header, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.models.environment import Environment
 from app.models.project import Project
 from app.models.run import Run
 from app.models.suite import Suite
+from app.repositories.results import AsyncTestResultRepository
+from app.repositories.run import AsyncRunRepository
+from app.repositories.run_log import RunLogRepository
+from app.repositories.timing import SuiteTestTimingRepository
+from app.schemas.run import RunLogBatch, ShardReport, TestResultBatch
 
 router = APIRouter()
 
@@ -36,25 +42,25 @@ def verify_internal(
 async def get_run_job_context(
     run_id: int,
     _: None = Depends(verify_internal),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Return job context for a run (repo_url, suite name, environment name, etc.).
     Used by the orchestrator to pass context to the worker. Internal only.
     """
-    run = db.query(Run).filter(Run.id == run_id).first()
+    run = await db.get(Run, run_id)
     if not run:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found")
 
-    project = db.query(Project).filter(Project.id == run.project_id).first()
+    project = await db.get(Project, run.project_id)
     if not project:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Project not found",
         )
 
-    suite = db.query(Suite).filter(Suite.id == run.suite_id).first()
-    environment = db.query(Environment).filter(Environment.id == run.environment_id).first()
+    suite = await db.get(Suite, run.suite_id) if run.suite_id else None
+    environment = await db.get(Environment, run.environment_id) if run.environment_id else None
     # Use defaults if suite/environment missing (e.g. run created before ensure-defaults)
     suite_name = suite.name if suite else "default"
     layer = (suite.layer if suite else None) or "e2e"
@@ -66,6 +72,8 @@ async def get_run_job_context(
         "repo_url": str(project.repo_url),
         "branch": run.branch or "HEAD",
         "commit": run.commit or "HEAD",
+        "selection": run.selection or "all",
+        "base_commit": run.base_commit,
         "suite_id": run.suite_id,
         "suite_name": suite_name,
         "layer": layer,
@@ -77,34 +85,70 @@ async def get_run_job_context(
 @router.put("/runs/{run_id}/results")
 async def update_run_results(
     run_id: int,
-    body: dict,
+    report: ShardReport,
     _: None = Depends(verify_internal),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
-    Update run with test results (status, counts). Used by the worker. Internal only.
-    """
-    from datetime import datetime
+    Record the status and counts of one shard of a run and its per-test durations. Used by
+    the worker. Internal only.
 
-    run = db.query(Run).filter(Run.id == run_id).first()
+    The run keeps running until every shard has reported; the report that completes the
+    set finalizes it (totals summed over shards, final status).
+    """
+    run = await db.get(Run, run_id)
     if not run:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found")
+    suite_id = run.suite_id
+
+    runs = AsyncRunRepository(db)
+    final_status = None
+    if report.status == "running":
+        await runs.mark_running(run_id)
+    else:
+        await runs.record_shard_result(run_id, report)
+        final_status = await runs.finalize(run_id)
+    # Per-test durations from the shard feed the orchestrator's duration-aware shard planner
+    if report.test_durations:
+        durations = report.test_durations
+        await db.run_sync(lambda s: SuiteTestTimingRepository(s).record(suite_id, durations))
+    return {"ok": True, "finalized": final_status}
+
+
+@router.post("/runs/{run_id}/logs", status_code=status.HTTP_202_ACCEPTED)
+async def append_run_logs(
+    run_id: int,
+    batch: RunLogBatch,
+    _: None = Depends(verify_internal),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Append a batch of job output lines streamed by the worker. Internal only.
+    Batches are idempotent per (shard_index, seq), so workers can retry freely.
+    """
+    if not await db.scalar(select(Run.id).where(Run.id == run_id)):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found")
+    stored = await db.run_sync(
+        lambda s: RunLogRepository(s).append(run_id, batch.shard_index, batch.seq, batch.lines)
+    )
+    return {"ok": True, "duplicate": not stored}
+
 
-    run.status = body.get("status", run.status)
-    if run.status == "running" and not run.started_at:
-        run.started_at = datetime.utcnow()
-    if "total_tests" in body:
-        run.total_tests = body["total_tests"]
-    if "passed_tests" in body:
-        run.passed_tests = body["passed_tests"]
-    if "failed_tests" in body:
-        run.failed_tests = body["failed_tests"]
-    if "skipped_tests" in body:
-        run.skipped_tests = body["skipped_tests"]
-    if run.status in ("completed", "failed"):
-        run.completed_at = datetime.utcnow()
-        if run.started_at:
-            run.duration_seconds = int((run.completed_at - run.started_at).total_seconds())
-    db.commit()
-    db.refresh(run)
-    return {"ok": True}
+@router.post("/runs/{run_id}/test-results", status_code=status.HTTP_202_ACCEPTED)
+async def add_test_results(
+    run_id: int,
+    batch: TestResultBatch,
+    _: None = Depends(verify_internal),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Store a batch of per-test results (records of the qatron plugin's result file) for one
+    shard of a run. Workers post the file in batches of up to TEST_RESULT_BATCH_MAX_ROWS.
+    Batches are idempotent per (shard_index, seq), so workers can retry freely. Internal only.
+    """
+    if not await db.scalar(select(Run.id).where(Run.id == run_id)):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found")
+    stored = await AsyncTestResultRepository(db).add_batch(
+        run_id, batch.shard_index, batch.seq, batch.results
+    )
+    return {"ok": True, "stored": stored or 0, "duplicate": stored is None}
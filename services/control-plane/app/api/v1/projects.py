@@ -2,6 +2,8 @@
 from typing import Annotated, List
 
 from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core.audit import (
@@ -10,22 +12,21 @@ from app.core.audit import (
     AUDIT_ACTION_PROJECT_UPDATED,
     log_audit_event,
 )
-from app.core.database import get_db
-from app.core.dependencies import get_current_user, require_role
-from app.models.user import User
+from app.core.database import get_async_db, get_db
+from app.core.dependencies import CurrentUser, get_current_user, require_role
 from app.models.project import Project
 from app.models.suite import Suite
 from app.models.environment import Environment
-from app.repositories.project import ProjectRepository
+from app.repositories.project import AsyncProjectRepository, ProjectRepository
 from app.schemas.project import ProjectCreate, ProjectResponse, ProjectUpdate
 
 router = APIRouter()
 
 
 @router.post("", response_model=ProjectResponse, status_code=status.HTTP_201_CREATED)
-async def create_project(
+def create_project(
     project_data: ProjectCreate,
-    current_user: Annotated[User, Depends(require_role("admin"))],
+    current_user: Annotated[CurrentUser, Depends(require_role("admin"))],
     request: Request,
     db: Session = Depends(get_db),
 ):
@@ -67,19 +68,18 @@ async def create_project(
 async def list_projects(
     skip: int = 0,
     limit: int = 100,
-    current_user: Annotated[User, Depends(get_current_user)] = None,
-    db: Session = Depends(get_db),
+    current_user: Annotated[CurrentUser, Depends(get_current_user)] = None,
+    db: AsyncSession = Depends(get_async_db),
 ):
     """List all projects."""
-    repo = ProjectRepository(db)
-    projects = repo.get_all(organization_id=current_user.organization_id, skip=skip, limit=limit)
-    return projects
+    repo = AsyncProjectRepository(db)
+    return await repo.get_all(organization_id=current_user.organization_id, skip=skip, limit=limit)
 
 
 @router.post("/{project_id}/ensure-defaults")
-async def ensure_project_defaults(
+def ensure_project_defaults(
     project_id: int,
-    current_user: Annotated[User, Depends(require_role("admin"))],
+    current_user: Annotated[CurrentUser, Depends(require_role("admin"))],
     db: Session = Depends(get_db),
 ):
     """Ensure project has at least one suite and one environment (for existing projects)."""
@@ -102,40 +102,41 @@ async def ensure_project_defaults(
 @router.get("/{project_id}/suites")
 async def list_project_suites(
     project_id: int,
-    current_user: Annotated[User, Depends(get_current_user)] = None,
-    db: Session = Depends(get_db),
+    current_user: Annotated[CurrentUser, Depends(get_current_user)] = None,
+    db: AsyncSession = Depends(get_async_db),
 ):
     """List suites for a project (for run creation)."""
-    project = db.query(Project).filter(Project.id == project_id).first()
-    if not project or project.organization_id != current_user.organization_id:
+    repo = AsyncProjectRepository(db)
+    if not await repo.get_for_organization(project_id, current_user.organization_id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
-    suites = db.query(Suite).filter(Suite.project_id == project_id).all()
+    suites = (await db.scalars(select(Suite).where(Suite.project_id == project_id))).all()
     return [{"id": s.id, "name": s.name, "layer": s.layer} for s in suites]
 
 
 @router.get("/{project_id}/environments")
 async def list_project_environments(
     project_id: int,
-    current_user: Annotated[User, Depends(get_current_user)] = None,
-    db: Session = Depends(get_db),
+    current_user: Annotated[CurrentUser, Depends(get_current_user)] = None,
+    db: AsyncSession = Depends(get_async_db),
 ):
     """List environments for a project (for run creation)."""
-    project = db.query(Project).filter(Project.id == project_id).first()
-    if not project or project.organization_id != current_user.organization_id:
+    repo = AsyncProjectRepository(db)
+    if not await repo.get_for_organization(project_id, current_user.organization_id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
-    envs = db.query(Environment).filter(Environment.project_id == project_id).all()
+    query = select(Environment).where(Environment.project_id == project_id)
+    envs = (await db.scalars(query)).all()
     return [{"id": e.id, "name": e.name, "base_url": e.base_url} for e in envs]
 
 
 @router.get("/{project_id}", response_model=ProjectResponse)
 async def get_project(
     project_id: int,
-    current_user: Annotated[User, Depends(get_current_user)] = None,
-    db: Session = Depends(get_db),
+    current_user: Annotated[CurrentUser, Depends(get_current_user)] = None,
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Get a project by ID."""
-    repo = ProjectRepository(db)
-    project = repo.get_by_id(project_id)
+    repo = AsyncProjectRepository(db)
+    project = await repo.get_by_id(project_id)
     if not project:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
     # Check organization access
@@ -145,10 +146,10 @@ async def get_project(
 
 
 @router.put("/{project_id}", response_model=ProjectResponse)
-async def update_project(
+def update_project(
     project_id: int,
     project_data: ProjectUpdate,
-    current_user: Annotated[User, Depends(require_role("admin"))],
+    current_user: Annotated[CurrentUser, Depends(require_role("admin"))],
     request: Request,
     db: Session = Depends(get_db),
 ):
@@ -174,9 +175,9 @@ async def update_project(
 
 
 @router.delete("/{project_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_project(
+def delete_project(
     project_id: int,
-    current_user: Annotated[User, Depends(require_role("admin"))],
+    current_user: Annotated[CurrentUser, Depends(require_role("admin"))],
     request: Request,
     db: Session = Depends(get_db),
 ):
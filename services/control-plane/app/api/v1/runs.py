@@ -2,24 +2,27 @@
 from typing import Annotated, List, Optional
 
 import httpx
-from fastapi import APIRouter, Depends, HTTPException, Request, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, sessionmaker
 
 from app.core.audit import AUDIT_ACTION_RUN_TRIGGERED, log_audit_event
 from app.core.config import settings
-from app.core.database import get_db
-from app.core.dependencies import get_current_user
-from app.models.user import User
-from app.repositories.run import RunRepository
-from app.schemas.run import RunCreate, RunResponse, RunUpdate
+from app.core.database import get_async_db, get_db
+from app.core.dependencies import CurrentUser, get_current_user
+from app.repositories.run import AsyncRunRepository, RunRepository
+from app.repositories.run_log import RunLogRepository
+from app.schemas.run import RunCreate, RunResponse, RunShardResultResponse, RunUpdate
+from app.services.log_follow import follow_run_logs
 
 router = APIRouter()
 
 
 @router.post("", response_model=RunResponse, status_code=status.HTTP_201_CREATED)
-async def create_run(
+def create_run(
     run_data: RunCreate,
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
     request: Request,
     db: Session = Depends(get_db),
 ):
@@ -88,12 +91,12 @@ async def list_runs(
     branch: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
-    current_user: Annotated[User, Depends(get_current_user)] = None,
-    db: Session = Depends(get_db),
+    current_user: Annotated[CurrentUser, Depends(get_current_user)] = None,
+    db: AsyncSession = Depends(get_async_db),
 ):
     """List all runs with optional filtering."""
-    repo = RunRepository(db)
-    runs = repo.get_all(
+    repo = AsyncRunRepository(db)
+    runs = await repo.get_all(
         project_id=project_id,
         suite_id=suite_id,
         environment_id=environment_id,
@@ -108,12 +111,12 @@ async def list_runs(
 @router.post("/{run_id}/trigger")
 async def trigger_run(
     run_id: int,
-    current_user: Annotated[User, Depends(get_current_user)],
-    db: Session = Depends(get_db),
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Trigger a queued run: send it to the orchestrator for execution."""
-    repo = RunRepository(db)
-    run = repo.get_by_id(run_id)
+    repo = AsyncRunRepository(db)
+    run = await repo.get_by_id(run_id)
     if not run:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found")
     if run.status != "queued":
@@ -146,12 +149,12 @@ async def trigger_run(
 @router.get("/{run_id}", response_model=RunResponse)
 async def get_run(
     run_id: int,
-    current_user: Annotated[User, Depends(get_current_user)] = None,
-    db: Session = Depends(get_db),
+    current_user: Annotated[CurrentUser, Depends(get_current_user)] = None,
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Get a run by ID."""
-    repo = RunRepository(db)
-    run = repo.get_by_id(run_id)
+    repo = AsyncRunRepository(db)
+    run = await repo.get_by_id(run_id)
     if not run:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found")
     return run
@@ -161,12 +164,67 @@ async def get_run(
 async def update_run(
     run_id: int,
     run_data: RunUpdate,
-    current_user: Annotated[User, Depends(get_current_user)],
-    db: Session = Depends(get_db),
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Update a run."""
-    repo = RunRepository(db)
-    run = repo.update(run_id, run_data)
+    repo = AsyncRunRepository(db)
+    run = await repo.update(run_id, run_data)
     if not run:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found")
     return run
+
+
+@router.get("/{run_id}/shards", response_model=List[RunShardResultResponse])
+async def get_run_shards(
+    run_id: int,
+    current_user: Annotated[CurrentUser, Depends(get_current_user)] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Results reported so far by the shards of a run."""
+    repo = AsyncRunRepository(db)
+    if not await repo.get_by_id(run_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found")
+    return await repo.get_shard_results(run_id)
+
+
+@router.get("/{run_id}/logs")
+def get_run_logs(
+    run_id: int,
+    follow: bool = False,
+    after: int = 0,
+    shard: Optional[int] = None,
+    last_event_id: Optional[int] = Header(None, alias="Last-Event-ID"),
+    current_user: Annotated[CurrentUser, Depends(get_current_user)] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Job output of a run.
+
+    Without follow, returns the log stored so far as plain text. With follow=true,
+    returns a server-sent event stream ("log" events, id = chunk cursor) that ends
+    with an "end" event once the run finishes. after / Last-Event-ID resume from a cursor.
+    """
+    repo = RunRepository(db)
+    if not repo.get_by_id(run_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found")
+    after = max(after, last_event_id or 0)
+
+    if follow:
+        session_factory = sessionmaker(bind=db.get_bind(), autocommit=False, autoflush=False)
+        return StreamingResponse(
+            follow_run_logs(session_factory, run_id, after_id=after, shard_index=shard),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    log_repo = RunLogRepository(db)
+    parts = []
+    while True:
+        chunks = log_repo.list_after(run_id, after, shard_index=shard)
+        if not chunks:
+            break
+        parts.extend(chunk.content for chunk in chunks)
+        after = chunks[-1].id
+    body = "\n".join(parts)
+    return PlainTextResponse(body + "\n" if body else "", headers={"X-Log-Cursor": str(after)})
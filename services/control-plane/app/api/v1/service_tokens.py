@@ -6,11 +6,11 @@ from sqlalchemy.orm import Session
 
 from app.core.audit import AUDIT_ACTION_SERVICE_TOKEN_CREATED, AUDIT_ACTION_SERVICE_TOKEN_REVOKED, log_audit_event
 from app.core.database import get_db
-from app.core.dependencies import require_role
-from app.core.security import generate_service_token, hash_service_token
+from app.core.dependencies import CurrentUser, require_role
+from app.core.security import generate_service_token, hash_service_token, service_token_prefix
 from app.models.service_token import ServiceToken
-from app.models.user import User
 from app.schemas.service_token import ServiceTokenCreate, ServiceTokenCreateResponse, ServiceTokenResponse
+from app.services.token_auth import forget_service_token
 
 router = APIRouter()
 
@@ -18,7 +18,7 @@ router = APIRouter()
 @router.post("", response_model=ServiceTokenCreateResponse, status_code=status.HTTP_201_CREATED)
 async def create_service_token(
     token_data: ServiceTokenCreate,
-    current_user: Annotated[User, Depends(require_role("admin"))],
+    current_user: Annotated[CurrentUser, Depends(require_role("admin"))],
     request: Request,
     db: Session = Depends(get_db),
 ):
@@ -49,6 +49,7 @@ async def create_service_token(
         name=token_data.name,
         description=token_data.description,
         token_hash=token_hash,
+        token_prefix=service_token_prefix(token),
         organization_id=token_data.organization_id,
         project_id=token_data.project_id,
         created_by_user_id=current_user.id,
@@ -79,7 +80,7 @@ async def create_service_token(
 
 @router.get("", response_model=List[ServiceTokenResponse])
 async def list_service_tokens(
-    current_user: Annotated[User, Depends(require_role("admin"))],
+    current_user: Annotated[CurrentUser, Depends(require_role("admin"))],
     db: Session = Depends(get_db),
 ):
     """List service tokens for current organization."""
@@ -95,7 +96,7 @@ async def list_service_tokens(
 @router.delete("/{token_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def revoke_service_token(
     token_id: int,
-    current_user: Annotated[User, Depends(require_role("admin"))],
+    current_user: Annotated[CurrentUser, Depends(require_role("admin"))],
     request: Request,
     db: Session = Depends(get_db),
 ):
@@ -113,6 +114,7 @@ async def revoke_service_token(
 
     token.is_active = False
     db.commit()
+    forget_service_token(token.id)
 
     # Log audit event
     log_audit_event(
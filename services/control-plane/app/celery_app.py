@@ -8,7 +8,7 @@ celery_app = Celery(
     "qatron_control_plane",
     broker=settings.CELERY_BROKER_URL,
     backend=settings.CELERY_RESULT_BACKEND,
-    include=["app.tasks.cleanup"],
+    include=["app.tasks.cleanup", "app.tasks.ingestion"],
 )
 
 celery_app.conf.update(
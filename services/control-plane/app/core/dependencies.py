@@ -1,59 +1,89 @@
 """FastAPI dependencies."""
-from datetime import datetime
-from typing import Annotated
+from dataclasses import dataclass
+from typing import Annotated, Any, Dict, FrozenSet, Optional
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 
 from app.core.database import get_db
-from app.core.security import decode_access_token, verify_password
-from app.models.service_token import ServiceToken
+from app.core.security import decode_access_token
 from app.models.user import User
+from app.services.token_auth import authenticate_service_token, user_token_is_current
 
 security = HTTPBearer()
 
 
+@dataclass(frozen=True)
+class CurrentUser:
+    """The authenticated caller: what authorization needs, without a database row."""
+
+    id: int
+    organization_id: int
+    role_names: FrozenSet[str] = frozenset()
+
+    @classmethod
+    def from_user(cls, user: User) -> "CurrentUser":
+        return cls(
+            id=user.id,
+            organization_id=user.organization_id,
+            role_names=frozenset(role.name for role in user.roles),
+        )
+
+
+def _load_user(db: Session, user_id: int) -> Optional[CurrentUser]:
+    """User and roles in one round trip (tokens without role claims, service tokens)."""
+    user = db.query(User).options(selectinload(User.roles)).filter(User.id == user_id).first()
+    if user and user.is_active:
+        return CurrentUser.from_user(user)
+    return None
+
+
+def _user_from_claims(db: Session, payload: Dict[str, Any]) -> Optional[CurrentUser]:
+    try:
+        user_id = int(payload.get("sub"))
+    except (TypeError, ValueError):
+        return None
+    if "org" not in payload or "roles" not in payload:
+        # Issued before tokens carried role claims
+        return _load_user(db, user_id)
+    # Deactivation or a token_version bump revokes the token (cached; usually no query)
+    if not user_token_is_current(db, user_id, payload.get("ver", 0)):
+        return None
+    return CurrentUser(
+        id=user_id,
+        organization_id=payload["org"],
+        role_names=frozenset(payload["roles"]),
+    )
+
+
 def get_current_user(
     credentials: Annotated[HTTPAuthorizationCredentials, Depends(security)],
     db: Session = Depends(get_db),
-) -> User:
-    """Get current authenticated user (JWT or service token)."""
+) -> CurrentUser:
+    """
+    Get current authenticated user (JWT or service token).
+
+    Access tokens carry user id, organization and role names as signed claims, so the
+    common case needs no database access.
+    """
     token = credentials.credentials
 
     # Try JWT first (user login)
     payload = decode_access_token(token)
     if payload:
-        sub = payload.get("sub")
-        if sub:
-            try:
-                user_id = int(sub)
-                user = db.query(User).filter(User.id == user_id).first()
-                if user and user.is_active:
-                    return user
-            except (TypeError, ValueError):
-                pass
-
-    # Try service token
-    # Service tokens are stored hashed, so we need to check all active tokens
-    # In production, use a more efficient lookup (e.g., token prefix index)
-    service_tokens = db.query(ServiceToken).filter(ServiceToken.is_active.is_(True)).all()
-    for st in service_tokens:
-        try:
-            if verify_password(token, st.token_hash):
-                # Check expiry
-                if st.expires_at and st.expires_at < datetime.utcnow():
-                    continue
-                # Update last_used_at
-                st.last_used_at = datetime.utcnow()
-                db.commit()
-                # Return a system user or create a proxy user
-                # For now, return the creator user
-                user = db.query(User).filter(User.id == st.created_by_user_id).first()
-                if user and user.is_active:
-                    return user
-        except Exception:
-            continue
+        current_user = _user_from_claims(db, payload)
+        if current_user:
+            return current_user
+
+    # Try service token (one indexed lookup by keyed hash, cached briefly in-process).
+    # A service token acts as the user who created it.
+    if payload is None:
+        user_id = authenticate_service_token(db, token)
+        if user_id is not None:
+            current_user = _load_user(db, user_id)
+            if current_user:
+                return current_user
 
     raise HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -65,9 +95,8 @@ def get_current_user(
 def require_role(role_name: str):
     """Dependency factory for requiring a specific role."""
 
-    def role_checker(current_user: User = Depends(get_current_user)) -> User:
-        role_names = [role.name for role in current_user.roles]
-        if role_name not in role_names:
+    def role_checker(current_user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
+        if role_name not in current_user.role_names:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"Requires {role_name} role",
@@ -0,0 +1,16 @@
+"""S3/MinIO client for the control plane."""
+import boto3
+
+from app.core.config import settings
+
+
+def get_client():
+    """S3 client for the configured endpoint and bucket credentials."""
+    return boto3.client(
+        "s3",
+        endpoint_url=settings.S3_ENDPOINT_URL,
+        aws_access_key_id=settings.S3_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+        region_name=settings.S3_REGION,
+        use_ssl=settings.S3_USE_SSL,
+    )
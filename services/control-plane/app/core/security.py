@@ -1,4 +1,7 @@
 """Security utilities for authentication and authorization."""
+import hashlib
+import hmac
+import secrets
 from datetime import datetime, timedelta
 from typing import Any, Optional
 
@@ -41,12 +44,39 @@ def decode_access_token(token: str) -> Optional[dict[str, Any]]:
         return None
 
 
+SERVICE_TOKEN_SCHEME = "qat"
+
+
 def generate_service_token() -> str:
-    """Generate a secure service token (random string)."""
-    import secrets
-    return secrets.token_urlsafe(32)  # 32 bytes = 43 characters base64url
+    """
+    Generate a secure service token: qat_<prefix>_<secret>.
+
+    The 12-hex-character prefix is public (shown in token listings to identify a token);
+    the secret is 32 random bytes (43 characters base64url).
+    """
+    return f"{SERVICE_TOKEN_SCHEME}_{secrets.token_hex(6)}_{secrets.token_urlsafe(32)}"
+
+
+def service_token_prefix(token: str) -> Optional[str]:
+    """Public prefix of a token from generate_service_token (None for other formats)."""
+    scheme, _, rest = token.partition("_")
+    prefix, _, secret = rest.partition("_")
+    if scheme != SERVICE_TOKEN_SCHEME or len(prefix) != 12 or not secret:
+        return None
+    return prefix
 
 
 def hash_service_token(token: str) -> str:
-    """Hash a service token for storage."""
-    return get_password_hash(token)  # Reuse bcrypt for consistency
+    """
+    Keyed hash of a service token for storage and lookup (HMAC-SHA256, hex).
+
+    Tokens carry 256 random bits, so a fast keyed hash is as safe as bcrypt here and lets
+    verification be a single lookup on the unique token_hash index.
+    """
+    key = (settings.SERVICE_TOKEN_HMAC_KEY or settings.SECRET_KEY).encode("utf-8")
+    return hmac.new(key, token.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def is_legacy_service_token_hash(token_hash: str) -> bool:
+    """True for hashes stored before HMAC lookup (bcrypt; verified by scanning)."""
+    return token_hash.startswith("$2")
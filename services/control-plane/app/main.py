@@ -8,8 +8,9 @@ from prometheus_client import make_asgi_app
 
 from app.api.v1 import api_router
 from app.core.config import settings
-from app.core.database import Base, engine
+from app.core.database import Base, SessionLocal, dispose_async_engine, engine
 from app.core.init_db import init_db
+from app.services.token_auth import last_used
 
 
 @asynccontextmanager
@@ -29,6 +30,13 @@ async def lifespan(app: FastAPI):
             else:
                 print(f"Warning: Could not initialize default data after {max_attempts} attempts: {e}")
     yield
+    # Service token uses buffered since the last batch
+    try:
+        with SessionLocal() as db:
+            last_used.flush(db)
+    except Exception as e:
+        print(f"Warning: Could not write service token last_used_at: {e}")
+    await dispose_async_engine()
 
 
 app = FastAPI(
@@ -47,6 +55,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Pagination cursors are returned in headers
+    expose_headers=["X-Next-Cursor", "X-Log-Cursor"],
 )
 
 # Include API router
@@ -2,14 +2,30 @@
 from app.models.audit_log import AuditLog
 from app.models.dataset import Dataset, DatasetVersion
 from app.models.environment import Environment
-from app.models.feature import Feature, Scenario, Step
+from app.models.feature import (
+    Feature,
+    FeatureIngestionJob,
+    Scenario,
+    ScenarioTag,
+    Step,
+    StepDefinition,
+)
 from app.models.infrastructure import InfrastructureResource
 from app.models.organization import Organization
 from app.models.project import Project
 from app.models.role import Role
-from app.models.run import Run, RunArtifact
+from app.models.run import (
+    FailureSignature,
+    Run,
+    RunArtifact,
+    RunLogChunk,
+    RunShardResult,
+    StoredTestResultBatch,
+    TestNodeId,
+    TestResult,
+)
 from app.models.service_token import ServiceToken
-from app.models.suite import Suite
+from app.models.suite import Suite, SuiteTestTiming
 from app.models.user import User
 
 __all__ = [
@@ -19,11 +35,21 @@ __all__ = [
     "Project",
     "Environment",
     "Suite",
+    "SuiteTestTiming",
     "Run",
     "RunArtifact",
+    "RunLogChunk",
+    "RunShardResult",
+    "TestResult",
+    "StoredTestResultBatch",
+    "TestNodeId",
+    "FailureSignature",
     "Feature",
     "Scenario",
     "Step",
+    "ScenarioTag",
+    "StepDefinition",
+    "FeatureIngestionJob",
     "Dataset",
     "DatasetVersion",
     "InfrastructureResource",
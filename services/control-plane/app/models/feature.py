@@ -1,5 +1,16 @@
 """Feature, Scenario, and Step models for BDD."""
-from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Integer, String, Text, func
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    func,
+)
 from sqlalchemy.orm import relationship
 
 from app.core.database import Base
@@ -16,7 +27,8 @@ class Feature(Base):
     name = Column(String(255), nullable=False)
     description = Column(Text)
     tags = Column(String(500))  # JSON array of tags
-    last_seen_commit = Column(String(40))  # Last commit where feature was seen
+    content_hash = Column(String(64))  # Of the file content; unchanged files are not re-stored
+    last_seen_commit = Column(String(40))  # Last indexed commit the feature was present at
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -29,14 +41,18 @@ class Scenario(Base):
     """BDD Scenario model."""
 
     __tablename__ = "scenarios"
+    # Ids are never reused (Postgres sequences already behave so); the in-memory search
+    # index relies on rewritten scenarios getting new ids
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id = Column(Integer, primary_key=True, index=True)
     feature_id = Column(Integer, ForeignKey("features.id"), nullable=False, index=True)
     name = Column(String(255), nullable=False)
     description = Column(Text)
     tags = Column(String(500))  # JSON array of tags
-    scenario_type = Column(String(50), default="scenario")  # scenario or scenario_outline
-    examples = Column(Text)  # JSON array of arrays for examples table
+    scenario_type = Column(String(50), default="scenario")  # scenario, scenario_outline, background
+    rule = Column(String(255))  # Name of the Rule the scenario (or background) belongs to
+    examples = Column(Text)  # JSON array of Examples blocks (name, tags, line_number, table)
     line_number = Column(Integer)
     is_flaky = Column(Boolean, default=False)
     is_quarantined = Column(Boolean, default=False)
@@ -62,7 +78,72 @@ class Step(Base):
     order = Column(Integer, nullable=False, default=0)  # Order within scenario
     line_number = Column(Integer)
     data_table = Column(Text)  # JSON array of arrays for data tables
+    doc_string = Column(Text)  # JSON {"content", "media_type"}
+    # Implementing step definition; NULL if none matches (or none are indexed)
+    step_definition_id = Column(Integer, ForeignKey("step_definitions.id"), index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relationships
     scenario = relationship("Scenario", back_populates="steps")
+
+
+class ScenarioTag(Base):
+    """
+    One effective tag of a scenario: its own, its feature's, its rule's and its Examples'.
+
+    Rewritten with the scenario; searched by (project_id, tag).
+    """
+
+    __tablename__ = "scenario_tags"
+    __table_args__ = (Index("ix_scenario_tags_project_tag", "project_id", "tag"),)
+
+    id = Column(Integer, primary_key=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
+    feature_id = Column(Integer, ForeignKey("features.id"), nullable=False, index=True)
+    scenario_id = Column(Integer, ForeignKey("scenarios.id"), nullable=False, index=True)
+    tag = Column(String(255), nullable=False)  # As written, with the leading @
+
+
+class StepDefinition(Base):
+    """A pytest-bdd step definition (@given/@when/@then/@step) indexed from a project's code."""
+
+    __tablename__ = "step_definitions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False, index=True)
+    file_path = Column(String(500), nullable=False)
+    content_hash = Column(String(64), nullable=False)  # Of the module; unchanged ones are skipped
+    line_number = Column(Integer)
+    function_name = Column(String(255), nullable=False)
+    step_type = Column(String(20), nullable=False)  # given, when, then, or step (any)
+    parser = Column(String(20), nullable=False)  # string, parse, cfparse or re
+    pattern = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class FeatureIngestionJob(Base):
+    """Background ingestion of a project's feature files (archive upload or git checkout)."""
+
+    __tablename__ = "feature_ingestion_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(
+        Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    status = Column(String(20), nullable=False, default="queued")  # queued/running/completed/failed
+    source_type = Column(String(20), nullable=False)  # archive or git
+    source = Column(String(1000), nullable=False)  # Archive object key, or repository URL
+    commit = Column(String(64))  # Git source only; the resolved SHA once the job ran
+    base_commit = Column(String(64))  # Git: only files changed since this commit were read
+    strip_components = Column(Integer, nullable=False, default=0)  # Archive source only
+    total_files = Column(Integer)  # Known once the source is read
+    processed_files = Column(Integer, nullable=False, default=0)
+    features_added = Column(Integer, nullable=False, default=0)
+    features_updated = Column(Integer, nullable=False, default=0)
+    features_unchanged = Column(Integer, nullable=False, default=0)
+    features_removed = Column(Integer, nullable=False, default=0)
+    error = Column(Text)
+    created_by_user_id = Column(Integer, ForeignKey("users.id"))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    completed_at = Column(DateTime(timezone=True))
@@ -1,5 +1,19 @@
 """Run model."""
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, JSON, String, Text, func
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    JSON,
+    SmallInteger,
+    String,
+    Text,
+    UniqueConstraint,
+    func,
+)
 from sqlalchemy.orm import relationship
 
 from app.core.database import Base
@@ -20,6 +34,9 @@ class Run(Base):
     branch = Column(String(255), index=True)
     commit = Column(String(40), index=True)  # Git commit SHA
     commit_message = Column(Text)
+    # "all", or "impacted": only tests covering files changed since base_commit
+    selection = Column(String(20), nullable=False, default="all", server_default="all")
+    base_commit = Column(String(40))
     triggered_by = Column(String(255))  # User or CI system
     started_at = Column(DateTime(timezone=True))
     completed_at = Column(DateTime(timezone=True))
@@ -38,6 +55,45 @@ class Run(Base):
     suite = relationship("Suite", back_populates="runs")
     environment = relationship("Environment", back_populates="runs")
     artifacts = relationship("RunArtifact", back_populates="run", cascade="all, delete-orphan")
+    log_chunks = relationship("RunLogChunk", cascade="all, delete-orphan", passive_deletes=True)
+    test_results = relationship("TestResult", cascade="all, delete-orphan", passive_deletes=True)
+    shard_results = relationship(
+        "RunShardResult", cascade="all, delete-orphan", passive_deletes=True
+    )
+
+
+# Statuses a run does not leave (the shard finalizer only moves a run into one once)
+TERMINAL_RUN_STATUSES = {
+    "completed",
+    "failed",
+    "partial_failed",
+    "timed_out",
+    "infra_failed",
+    "cancelled",
+}
+
+
+class RunShardResult(Base):
+    """Result reported by the worker of one shard; the run is finalized once all report."""
+
+    __tablename__ = "run_shard_results"
+    __table_args__ = (
+        # A resent report overwrites the shard's row instead of adding a second one
+        UniqueConstraint("run_id", "shard_index", name="uq_run_shard_results_run_shard"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    run_id = Column(Integer, ForeignKey("runs.id", ondelete="CASCADE"), nullable=False)
+    shard_index = Column(Integer, nullable=False, default=0)
+    shard_total = Column(Integer, nullable=False, default=1)  # Shards the run was split into
+    status = Column(String(50), nullable=False)  # completed or failed
+    # Null when the shard failed before reporting counts
+    total_tests = Column(Integer)
+    passed_tests = Column(Integer)
+    failed_tests = Column(Integer)
+    skipped_tests = Column(Integer)
+    duration_seconds = Column(Float)
+    reported_at = Column(DateTime(timezone=True), server_default=func.now())
 
 
 class RunArtifact(Base):
@@ -56,3 +112,84 @@ class RunArtifact(Base):
 
     # Relationships
     run = relationship("Run", back_populates="artifacts")
+
+
+class RunLogChunk(Base):
+    """A batch of job output lines streamed by a worker while the run executes."""
+
+    __tablename__ = "run_log_chunks"
+    __table_args__ = (
+        # Workers retry posts; (run, shard, seq) makes a resent batch a no-op
+        UniqueConstraint("run_id", "shard_index", "seq", name="uq_run_log_chunks_run_shard_seq"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    run_id = Column(Integer, ForeignKey("runs.id", ondelete="CASCADE"), nullable=False, index=True)
+    shard_index = Column(Integer, nullable=False, default=0)
+    seq = Column(Integer, nullable=False)  # Per-shard batch sequence number
+    content = Column(Text, nullable=False)  # Newline-joined lines
+    line_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# TestResult.outcome codes (index in this tuple), as reported by the qatron pytest plugin
+TEST_OUTCOMES = ("passed", "failed", "error", "skipped", "xfailed", "xpassed")
+
+
+class TestNodeId(Base):
+    """pytest node id behind a TestResult.nodeid_hash (written once per distinct test)."""
+
+    __tablename__ = "test_node_ids"
+
+    nodeid_hash = Column(BigInteger, primary_key=True, autoincrement=False)
+    nodeid = Column(Text, nullable=False)
+
+
+class FailureSignature(Base):
+    """A distinct failure (exception type, normalized message, crash site) across runs."""
+
+    __tablename__ = "failure_signatures"
+
+    id = Column(Integer, primary_key=True, index=True)
+    signature = Column(String(64), nullable=False, unique=True)  # Computed by the plugin
+    exception_type = Column(String(255))
+    message = Column(Text)  # First occurrence
+    location = Column(String(1000))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class TestResult(Base):
+    """
+    Outcome of one test in one shard of a run.
+
+    Kept narrow (no strings) since a project accumulates tens of millions of rows; the node
+    id and failure details live in test_node_ids and failure_signatures.
+    """
+
+    __tablename__ = "test_results"
+    __table_args__ = (
+        Index("ix_test_results_run_nodeid", "run_id", "nodeid_hash"),
+        # History of one test across runs (flakiness, durations)
+        Index("ix_test_results_nodeid_run", "nodeid_hash", "run_id"),
+        Index("ix_test_results_failure_signature_id", "failure_signature_id"),
+    )
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    run_id = Column(Integer, ForeignKey("runs.id", ondelete="CASCADE"), nullable=False)
+    shard = Column(SmallInteger, nullable=False, default=0)
+    nodeid_hash = Column(BigInteger, nullable=False)
+    outcome = Column(SmallInteger, nullable=False)  # Index in TEST_OUTCOMES
+    duration_ms = Column(Integer, nullable=False, default=0)
+    failure_signature_id = Column(Integer, ForeignKey("failure_signatures.id"))
+
+
+class StoredTestResultBatch(Base):
+    """A stored batch of per-test results; makes a resent (run, shard, seq) batch a no-op."""
+
+    __tablename__ = "test_result_batches"
+
+    run_id = Column(Integer, ForeignKey("runs.id", ondelete="CASCADE"), primary_key=True)
+    shard = Column(SmallInteger, primary_key=True)
+    seq = Column(Integer, primary_key=True)  # Per-shard batch sequence number
+    row_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -12,7 +12,8 @@ class ServiceToken(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False)  # Human-readable name
-    token_hash = Column(String(255), nullable=False, unique=True, index=True)  # Hashed token
+    token_hash = Column(String(255), nullable=False, unique=True, index=True)  # HMAC-SHA256 (hex)
+    token_prefix = Column(String(16), nullable=True, index=True)  # Public part of qat_<prefix>_...
     organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=False, index=True)
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=True, index=True)  # Optional project scope
     created_by_user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
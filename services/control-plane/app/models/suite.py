@@ -1,5 +1,17 @@
 """Suite model."""
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, JSON, String, Text, func
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Integer,
+    JSON,
+    String,
+    Text,
+    UniqueConstraint,
+    func,
+)
 from sqlalchemy.orm import relationship
 
 from app.core.database import Base
@@ -26,3 +38,19 @@ class Suite(Base):
     # Relationships
     project = relationship("Project", back_populates="suites")
     runs = relationship("Run", back_populates="suite")
+
+
+class SuiteTestTiming(Base):
+    """Smoothed duration of one test in a suite; the orchestrator balances shards with it."""
+
+    __tablename__ = "suite_test_timings"
+    __table_args__ = (
+        UniqueConstraint("suite_id", "nodeid", name="uq_suite_test_timings_suite_nodeid"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    suite_id = Column(Integer, ForeignKey("suites.id", ondelete="CASCADE"), nullable=False)
+    nodeid = Column(String(1000), nullable=False)  # pytest node id
+    duration_seconds = Column(Float, nullable=False)  # Exponentially weighted moving average
+    samples = Column(Integer, nullable=False, default=1)
+    last_seen_at = Column(DateTime(timezone=True), nullable=False, index=True)
@@ -0,0 +1,342 @@
+"""Feature repository."""
+import json
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import bindparam, delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+
+from app.models.feature import Feature, Scenario, ScenarioTag, Step
+
+# Scenarios and their steps in two extra queries per page, however many features it has
+FEATURE_TREE = selectinload(Feature.scenarios).selectinload(Scenario.steps)
+# Features written per transaction; ids per IN (...) list
+STORE_BATCH = 200
+ID_CHUNK = 500
+
+
+def _chunks(items: Sequence, size: int) -> Iterable[Sequence]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def _json_or_none(value) -> Optional[str]:
+    return json.dumps(value) if value else None
+
+
+def _scenarios(feature_data: dict) -> List[dict]:
+    """Backgrounds (stored as scenario_type "background") and scenarios, in file order."""
+    backgrounds = []
+    if feature_data.get("background"):
+        backgrounds.append({**feature_data["background"], "type": "background", "rule": None})
+    for rule in feature_data.get("rules", []):
+        if rule.get("background"):
+            backgrounds.append({**rule["background"], "type": "background", "rule": rule["name"]})
+    if not backgrounds:
+        return feature_data.get("scenarios", [])
+    scenarios = backgrounds + feature_data.get("scenarios", [])
+    return sorted(scenarios, key=lambda scenario: scenario.get("line_number") or 0)
+
+
+def _effective_tags(feature_data: dict, scenario_data: dict) -> List[str]:
+    """A scenario's tags with those it inherits (feature, rule) and its Examples' tags."""
+    if scenario_data.get("type") == "background":
+        return []
+    rule_tags = [
+        tag
+        for rule in feature_data.get("rules", [])
+        if rule["name"] == scenario_data.get("rule")
+        for tag in rule.get("tags", [])
+    ]
+    example_tags = [tag for block in scenario_data.get("examples", []) for tag in block["tags"]]
+    tags = feature_data.get("tags", []) + rule_tags + scenario_data.get("tags", []) + example_tags
+    return list(dict.fromkeys(tag[:255] for tag in tags))
+
+
+@dataclass
+class IngestStats:
+    """What an ingestion changed."""
+
+    added: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    removed: int = 0
+
+    def to_dict(self) -> Dict[str, int]:
+        return {
+            "added": self.added,
+            "updated": self.updated,
+            "unchanged": self.unchanged,
+            "removed": self.removed,
+        }
+
+
+class FeatureRepository:
+    """
+    Writes parsed features with set-based statements.
+
+    Features whose content_hash matches the stored one are skipped. Changed ones get their
+    scenarios and steps replaced with a few bulk INSERTs per batch instead of a flush per
+    row, and each batch commits on its own so no write transaction spans a whole repository.
+    """
+
+    def __init__(self, db: Session):
+        """Initialize repository with database session."""
+        self.db = db
+
+    def store(
+        self, project_id: int, parsed_features: List[dict], prune: bool = False
+    ) -> IngestStats:
+        """
+        Store parsed features (GherkinParser output) for a project.
+
+        With prune, parsed_features is the project's complete set: stored features whose
+        file is not in it are deleted.
+        """
+        stats = IngestStats()
+        existing = self._existing(project_id, [f["file_path"] for f in parsed_features])
+
+        changed = []
+        for feature_data in {f["file_path"]: f for f in parsed_features}.values():
+            stored = existing.get(feature_data["file_path"])
+            if stored and stored[1] and stored[1] == feature_data.get("content_hash"):
+                stats.unchanged += 1
+            else:
+                changed.append(feature_data)
+
+        for batch in _chunks(changed, STORE_BATCH):
+            self._write_batch(project_id, batch, existing, stats)
+            self.db.commit()
+
+        if prune:
+            stats.removed = self.prune(project_id, [f["file_path"] for f in parsed_features])
+        return stats
+
+    def content_hashes(self, project_id: int, paths: Sequence[str]) -> Dict[str, Optional[str]]:
+        """file_path -> content_hash of the project's stored features for these files."""
+        existing = self._existing(project_id, paths)
+        return {path: content_hash for path, (_, content_hash) in existing.items()}
+
+    def prune(self, project_id: int, keep_paths: Iterable[str]) -> int:
+        """Delete the project's features whose file is not in keep_paths; returns how many."""
+        keep = set(keep_paths)
+        stale = [fid for path, (fid, _) in self._existing(project_id).items() if path not in keep]
+        self.delete_features(stale)
+        self.db.commit()
+        return len(stale)
+
+    def delete_paths(self, project_id: int, paths: Sequence[str]) -> int:
+        """Delete the project's features for these files; returns how many existed."""
+        stale = [feature_id for feature_id, _ in self._existing(project_id, paths).values()]
+        self.delete_features(stale)
+        self.db.commit()
+        return len(stale)
+
+    def mark_seen(self, project_id: int, commit: str) -> None:
+        """Record that every stored feature of the project is present at commit."""
+        self.db.execute(
+            update(Feature).where(Feature.project_id == project_id).values(last_seen_commit=commit)
+        )
+        self.db.commit()
+
+    def _existing(
+        self, project_id: int, paths: Optional[Sequence[str]] = None
+    ) -> Dict[str, Tuple[int, Optional[str]]]:
+        """file_path -> (id, content_hash) of stored features (all, or just those paths)."""
+        query = select(Feature.id, Feature.file_path, Feature.content_hash).where(
+            Feature.project_id == project_id
+        )
+        if paths is None:
+            rows = self.db.execute(query).all()
+        else:
+            rows = [
+                row
+                for chunk in _chunks(list(paths), ID_CHUNK)
+                for row in self.db.execute(query.where(Feature.file_path.in_(chunk))).all()
+            ]
+        return {path: (feature_id, content_hash) for feature_id, path, content_hash in rows}
+
+    def delete_features(self, feature_ids: Sequence[int]) -> None:
+        """Delete features with their scenarios and steps (no commit)."""
+        for chunk in _chunks(list(feature_ids), ID_CHUNK):
+            self._delete_trees(chunk)
+            self.db.execute(delete(Feature).where(Feature.id.in_(chunk)))
+
+    def _delete_trees(self, feature_ids: Sequence[int]) -> None:
+        scenario_ids = select(Scenario.id).where(Scenario.feature_id.in_(feature_ids))
+        self.db.execute(delete(ScenarioTag).where(ScenarioTag.feature_id.in_(feature_ids)))
+        self.db.execute(delete(Step).where(Step.scenario_id.in_(scenario_ids)))
+        self.db.execute(delete(Scenario).where(Scenario.feature_id.in_(feature_ids)))
+
+    def _write_batch(
+        self,
+        project_id: int,
+        batch: Sequence[dict],
+        existing: Dict[str, Tuple[int, Optional[str]]],
+        stats: IngestStats,
+    ) -> None:
+        def columns(feature_data: dict) -> dict:
+            return {
+                "name": feature_data["name"],
+                "description": feature_data.get("description"),
+                "tags": json.dumps(feature_data.get("tags", [])),
+                "content_hash": feature_data.get("content_hash"),
+            }
+
+        updates = [f for f in batch if f["file_path"] in existing]
+        inserts = [f for f in batch if f["file_path"] not in existing]
+        feature_ids: Dict[str, int] = {}
+
+        if updates:
+            ids = [existing[f["file_path"]][0] for f in updates]
+            self._delete_trees(ids)
+            self.db.connection().execute(
+                update(Feature)
+                .where(Feature.id == bindparam("feature_id"))
+                .values(
+                    name=bindparam("name"),
+                    description=bindparam("description"),
+                    tags=bindparam("tags"),
+                    content_hash=bindparam("content_hash"),
+                ),
+                [{"feature_id": fid, **columns(f)} for fid, f in zip(ids, updates)],
+            )
+            feature_ids.update(zip((f["file_path"] for f in updates), ids))
+            stats.updated += len(updates)
+        if inserts:
+            rows = self.db.execute(
+                insert(Feature).returning(Feature.id, sort_by_parameter_order=True),
+                [
+                    {"project_id": project_id, "file_path": f["file_path"], **columns(f)}
+                    for f in inserts
+                ],
+            )
+            feature_ids.update(zip((f["file_path"] for f in inserts), rows.scalars()))
+            stats.added += len(inserts)
+
+        scenarios = [
+            (scenario_data, feature_ids[f["file_path"]], f)
+            for f in batch
+            for scenario_data in _scenarios(f)
+        ]
+        if not scenarios:
+            return
+        scenario_ids = self.db.execute(
+            insert(Scenario).returning(Scenario.id, sort_by_parameter_order=True),
+            [
+                {
+                    "feature_id": feature_id,
+                    "name": scenario_data["name"],
+                    "description": scenario_data.get("description") or None,
+                    "scenario_type": scenario_data.get("type", "scenario"),
+                    "rule": scenario_data.get("rule"),
+                    "tags": json.dumps(scenario_data.get("tags", [])),
+                    "examples": _json_or_none(scenario_data.get("examples")),
+                    "line_number": scenario_data.get("line_number"),
+                }
+                for scenario_data, feature_id, _ in scenarios
+            ],
+        ).scalars().all()
+
+        tags = [
+            {
+                "project_id": project_id,
+                "feature_id": feature_id,
+                "scenario_id": scenario_id,
+                "tag": tag,
+            }
+            for (scenario_data, feature_id, f), scenario_id in zip(scenarios, scenario_ids)
+            for tag in _effective_tags(f, scenario_data)
+        ]
+        if tags:
+            self.db.execute(insert(ScenarioTag), tags)
+
+        steps = [
+            self._step_row(scenario_id, order, step_data)
+            for (scenario_data, _, _), scenario_id in zip(scenarios, scenario_ids)
+            for order, step_data in enumerate(scenario_data.get("steps", []), start=1)
+        ]
+        if steps:
+            self.db.execute(insert(Step), steps)
+
+    @staticmethod
+    def _step_row(scenario_id: int, order: int, step_data: dict) -> dict:
+        step_text = step_data["text"]
+        keyword = step_data.get("keyword") or step_data["type"].capitalize()
+        if step_text.lower().startswith(keyword.lower()):
+            text = step_text[len(keyword) :].strip()
+        else:
+            text = step_text
+        return {
+            "scenario_id": scenario_id,
+            "step_type": step_data["type"],
+            "keyword": keyword,
+            "text": text,
+            "order": order,
+            "line_number": step_data.get("line_number"),
+            "data_table": _json_or_none(step_data.get("data_table")),
+            "doc_string": _json_or_none(step_data.get("doc_string")),
+        }
+
+
+class AsyncFeatureRepository:
+    """Read access to indexed BDD features, paged by id (keyset cursor)."""
+
+    def __init__(self, db: AsyncSession):
+        """Initialize repository with async database session."""
+        self.db = db
+
+    async def page(
+        self, project_id: int, after_id: int = 0, limit: int = 100
+    ) -> Tuple[List[Feature], Optional[int]]:
+        """Features with id > after_id, trees loaded; returns (features, next cursor)."""
+        query = (
+            select(Feature)
+            .where(Feature.project_id == project_id, Feature.id > after_id)
+            .order_by(Feature.id)
+            .limit(limit + 1)
+            .options(FEATURE_TREE)
+        )
+        features = list((await self.db.scalars(query)).all())
+        return self._split(features, limit, lambda feature: feature.id)
+
+    async def summaries(
+        self, project_id: int, after_id: int = 0, limit: int = 100
+    ) -> Tuple[List[tuple], Optional[int]]:
+        """(feature, scenario_count, step_count) rows in one query; returns (rows, next cursor)."""
+        scenario_count = (
+            select(func.count(Scenario.id))
+            .where(Scenario.feature_id == Feature.id, Scenario.scenario_type != "background")
+            .scalar_subquery()
+        )
+        step_count = (
+            select(func.count(Step.id))
+            .join(Scenario, Step.scenario_id == Scenario.id)
+            .where(Scenario.feature_id == Feature.id)
+            .scalar_subquery()
+        )
+        query = (
+            select(Feature, scenario_count, step_count)
+            .where(Feature.project_id == project_id, Feature.id > after_id)
+            .order_by(Feature.id)
+            .limit(limit + 1)
+        )
+        rows = [tuple(row) for row in (await self.db.execute(query)).all()]
+        return self._split(rows, limit, lambda row: row[0].id)
+
+    async def get_tree(self, project_id: int, feature_id: int) -> Optional[Feature]:
+        """One feature with its scenarios and steps."""
+        query = (
+            select(Feature)
+            .where(Feature.project_id == project_id, Feature.id == feature_id)
+            .options(FEATURE_TREE)
+        )
+        return await self.db.scalar(query)
+
+    @staticmethod
+    def _split(items: list, limit: int, key) -> Tuple[list, Optional[int]]:
+        if len(items) <= limit:
+            return items, None
+        items = items[:limit]
+        return items, key(items[-1])
@@ -1,6 +1,8 @@
 """Project repository."""
 from typing import List, Optional
 
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.models.project import Project
@@ -56,3 +58,61 @@ class ProjectRepository:
         self.db.delete(project)
         self.db.commit()
         return True
+
+
+class AsyncProjectRepository:
+    """Project operations on an AsyncSession."""
+
+    def __init__(self, db: AsyncSession):
+        """Initialize repository with async database session."""
+        self.db = db
+
+    async def create(self, project_data: ProjectCreate) -> Project:
+        """Create a new project."""
+        project = Project(**project_data.model_dump(mode="json"))
+        self.db.add(project)
+        await self.db.commit()
+        await self.db.refresh(project)
+        return project
+
+    async def get_by_id(self, project_id: int) -> Optional[Project]:
+        """Get project by ID."""
+        return await self.db.get(Project, project_id)
+
+    async def get_for_organization(
+        self, project_id: int, organization_id: int
+    ) -> Optional[Project]:
+        """Get a project if it belongs to the organization (None otherwise)."""
+        project = await self.get_by_id(project_id)
+        if project is None or project.organization_id != organization_id:
+            return None
+        return project
+
+    async def get_all(
+        self, organization_id: Optional[int] = None, skip: int = 0, limit: int = 100
+    ) -> List[Project]:
+        """Get all projects with optional filtering."""
+        query = select(Project)
+        if organization_id:
+            query = query.where(Project.organization_id == organization_id)
+        return list((await self.db.scalars(query.offset(skip).limit(limit))).all())
+
+    async def update(self, project_id: int, project_data: ProjectUpdate) -> Optional[Project]:
+        """Update a project."""
+        project = await self.get_by_id(project_id)
+        if not project:
+            return None
+        for field, value in project_data.model_dump(exclude_unset=True, mode="json").items():
+            setattr(project, field, value)
+        await self.db.commit()
+        await self.db.refresh(project)
+        return project
+
+    async def delete(self, project_id: int) -> bool:
+        """Delete a project."""
+        project = await self.get_by_id(project_id)
+        if not project:
+            return False
+        await self.db.delete(project)
+        await self.db.commit()
+        return True
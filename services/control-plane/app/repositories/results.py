@@ -0,0 +1,162 @@
+"""Per-test result repository (narrow rows, bulk writes)."""
+import hashlib
+from typing import Dict, Optional, Sequence
+
+from sqlalchemy import insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.run import (
+    TEST_OUTCOMES,
+    FailureSignature,
+    StoredTestResultBatch,
+    TestNodeId,
+    TestResult,
+)
+from app.schemas.run import TestFailure, TestResultRecord
+
+LOOKUP_CHUNK = 500
+# Column order of the rows given to COPY
+RESULT_COLUMNS = (
+    "run_id",
+    "shard",
+    "nodeid_hash",
+    "outcome",
+    "duration_ms",
+    "failure_signature_id",
+)
+
+
+def nodeid_hash(nodeid: str) -> int:
+    """Signed 64-bit hash of a pytest node id (TestResult.nodeid_hash)."""
+    digest = hashlib.blake2b(nodeid.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def _chunks(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+class AsyncTestResultRepository:
+    """
+    Bulk writes of per-test results: one statement per batch for the rows (COPY on
+    PostgreSQL, a multi-row INSERT elsewhere) instead of an ORM object per test.
+
+    Node ids and failure signatures are stored once in their own tables; a batch only
+    writes those it has not seen before. Batches are keyed by (run, shard, seq): the key
+    is claimed in the same transaction as the rows, so a resent batch stores nothing.
+    """
+
+    def __init__(self, db: AsyncSession):
+        """Initialize repository with async database session."""
+        self.db = db
+        self.dialect = db.get_bind().dialect.name
+
+    def _insert_missing(self, model, *keys: str):
+        """INSERT that skips rows whose key exists (a concurrent batch may add them first)."""
+        if self.dialect == "postgresql":
+            return postgresql.insert(model).on_conflict_do_nothing(index_elements=list(keys))
+        if self.dialect == "sqlite":
+            return sqlite.insert(model).on_conflict_do_nothing(index_elements=list(keys))
+        return insert(model)
+
+    async def add_batch(
+        self, run_id: int, shard: int, seq: int, records: Sequence[TestResultRecord]
+    ) -> Optional[int]:
+        """
+        Store batch seq of results for one shard of a run; returns the rows written, or
+        None if the batch was already stored.
+        """
+        if not records:
+            return 0
+        try:
+            claimed = await self.db.execute(
+                self._insert_missing(StoredTestResultBatch, "run_id", "shard", "seq").values(
+                    run_id=run_id, shard=shard, seq=seq, row_count=len(records)
+                )
+            )
+        except IntegrityError:
+            await self.db.rollback()
+            return None
+        if claimed.rowcount != 1:
+            # A concurrent retry of the batch waits on the key, then finds it taken
+            await self.db.rollback()
+            return None
+
+        hashes = [nodeid_hash(record.nodeid) for record in records]
+        await self._add_node_ids(dict(zip(hashes, (record.nodeid for record in records))))
+        failures = {
+            record.failure.signature: record.failure for record in records if record.failure
+        }
+        signature_ids = await self._signature_ids(failures) if failures else {}
+
+        rows = [
+            (
+                run_id,
+                shard,
+                node_hash,
+                TEST_OUTCOMES.index(record.outcome),
+                max(0, round(record.duration * 1000)),
+                signature_ids.get(record.failure.signature) if record.failure else None,
+            )
+            for record, node_hash in zip(records, hashes)
+        ]
+        if self.dialect == "postgresql":
+            connection = await (await self.db.connection()).get_raw_connection()
+            await connection.driver_connection.copy_records_to_table(
+                TestResult.__tablename__, records=rows, columns=RESULT_COLUMNS
+            )
+        else:
+            await self.db.execute(
+                insert(TestResult), [dict(zip(RESULT_COLUMNS, row)) for row in rows]
+            )
+        await self.db.commit()
+        return len(rows)
+
+    async def _add_node_ids(self, nodeids: Dict[int, str]) -> None:
+        known = set()
+        for chunk in _chunks(list(nodeids), LOOKUP_CHUNK):
+            found = await self.db.scalars(
+                select(TestNodeId.nodeid_hash).where(TestNodeId.nodeid_hash.in_(chunk))
+            )
+            known.update(found)
+        missing = [
+            {"nodeid_hash": node_hash, "nodeid": nodeid}
+            for node_hash, nodeid in nodeids.items()
+            if node_hash not in known
+        ]
+        if missing:
+            await self.db.execute(self._insert_missing(TestNodeId, "nodeid_hash"), missing)
+
+    async def _signature_ids(self, failures: Dict[str, TestFailure]) -> Dict[str, int]:
+        """Id per signature, adding the signatures not stored yet."""
+        ids = await self._find_signatures(list(failures))
+        missing = [signature for signature in failures if signature not in ids]
+        if missing:
+            await self.db.execute(
+                self._insert_missing(FailureSignature, "signature"),
+                [
+                    {
+                        "signature": signature,
+                        "exception_type": failures[signature].type[:255],
+                        "message": failures[signature].message,
+                        "location": failures[signature].location[:1000],
+                    }
+                    for signature in missing
+                ],
+            )
+            ids.update(await self._find_signatures(missing))
+        return ids
+
+    async def _find_signatures(self, signatures: list) -> Dict[str, int]:
+        ids: Dict[str, int] = {}
+        for chunk in _chunks(signatures, LOOKUP_CHUNK):
+            rows = await self.db.execute(
+                select(FailureSignature.signature, FailureSignature.id).where(
+                    FailureSignature.signature.in_(chunk)
+                )
+            )
+            ids.update(rows.all())
+        return ids
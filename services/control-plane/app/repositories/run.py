@@ -1,11 +1,16 @@
 """Run repository."""
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import List, Optional
 
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.models.run import Run
-from app.schemas.run import RunCreate, RunUpdate
+from app.models.run import TERMINAL_RUN_STATUSES, Run, RunShardResult
+from app.schemas.run import RunCreate, RunUpdate, ShardReport
+
+SHARD_COUNT_COLUMNS = ("total_tests", "passed_tests", "failed_tests", "skipped_tests")
 
 
 class RunRepository:
@@ -68,20 +73,6 @@ class RunRepository:
         self.db.refresh(run)
         return run
 
-    def update_shard_results(self, run_id: int, shard_id: int, shard_result: dict) -> Optional[Run]:
-        """Update shard results in run_metadata."""
-        run = self.get_by_id(run_id)
-        if not run:
-            return None
-        if not run.run_metadata:
-            run.run_metadata = {}
-        if "shards" not in run.run_metadata:
-            run.run_metadata["shards"] = {}
-        run.run_metadata["shards"][str(shard_id)] = shard_result
-        self.db.commit()
-        self.db.refresh(run)
-        return run
-
     def update_coverage(self, run_id: int, coverage_data: dict) -> Optional[Run]:
         """Update coverage data in run_metadata."""
         run = self.get_by_id(run_id)
@@ -109,3 +100,191 @@ class RunRepository:
         self.db.commit()
         self.db.refresh(run)
         return run
+
+
+class AsyncRunRepository:
+    """Run operations on an AsyncSession (for endpoints that must not block the event loop)."""
+
+    def __init__(self, db: AsyncSession):
+        """Initialize repository with async database session."""
+        self.db = db
+
+    async def create(self, run_data: RunCreate) -> Run:
+        """Create a new run."""
+        run = Run(status="queued", **run_data.model_dump())
+        self.db.add(run)
+        await self.db.commit()
+        await self.db.refresh(run)
+        return run
+
+    async def get_by_id(self, run_id: int) -> Optional[Run]:
+        """Get run by ID."""
+        return await self.db.get(Run, run_id)
+
+    async def get_all(
+        self,
+        project_id: Optional[int] = None,
+        suite_id: Optional[int] = None,
+        environment_id: Optional[int] = None,
+        status: Optional[str] = None,
+        branch: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 100,
+    ) -> List[Run]:
+        """Get all runs with optional filtering."""
+        query = select(Run)
+        if project_id:
+            query = query.where(Run.project_id == project_id)
+        if suite_id:
+            query = query.where(Run.suite_id == suite_id)
+        if environment_id:
+            query = query.where(Run.environment_id == environment_id)
+        if status:
+            query = query.where(Run.status == status)
+        if branch:
+            query = query.where(Run.branch == branch)
+        query = query.order_by(Run.created_at.desc()).offset(skip).limit(limit)
+        return list((await self.db.scalars(query)).all())
+
+    async def update(self, run_id: int, run_data: RunUpdate) -> Optional[Run]:
+        """Update a run."""
+        run = await self.get_by_id(run_id)
+        if not run:
+            return None
+        update_data = run_data.model_dump(exclude_unset=True)
+        # Handle run_metadata separately (merge with existing; a new dict so the change is seen)
+        if "run_metadata" in update_data:
+            run.run_metadata = {**(run.run_metadata or {}), **update_data.pop("run_metadata")}
+        for field, value in update_data.items():
+            setattr(run, field, value)
+        await self.db.commit()
+        await self.db.refresh(run)
+        return run
+
+    async def update_status(
+        self,
+        run_id: int,
+        status: str,
+        started_at: Optional[datetime] = None,
+        completed_at: Optional[datetime] = None,
+    ) -> Optional[Run]:
+        """Update run status and timestamps."""
+        run = await self.get_by_id(run_id)
+        if not run:
+            return None
+        run.status = status
+        if started_at:
+            run.started_at = started_at
+        if completed_at:
+            run.completed_at = completed_at
+            if run.started_at:
+                run.duration_seconds = int((completed_at - run.started_at).total_seconds())
+        await self.db.commit()
+        await self.db.refresh(run)
+        return run
+
+    async def get_shard_results(self, run_id: int) -> List[RunShardResult]:
+        """Shard results reported for a run, by shard index."""
+        query = (
+            select(RunShardResult)
+            .where(RunShardResult.run_id == run_id)
+            .order_by(RunShardResult.shard_index)
+        )
+        return list((await self.db.scalars(query)).all())
+
+    async def mark_running(self, run_id: int) -> None:
+        """Move a run to running (first report only sets started_at; final runs stay final)."""
+        await self.db.execute(
+            update(Run)
+            .where(Run.id == run_id, Run.status.notin_(TERMINAL_RUN_STATUSES))
+            .values(status="running", started_at=func.coalesce(Run.started_at, func.now()))
+        )
+        await self.db.commit()
+
+    async def record_shard_result(self, run_id: int, report: ShardReport) -> None:
+        """Upsert the result of one shard; a resent report replaces the shard's row."""
+        durations = report.test_durations
+        values = {
+            "run_id": run_id,
+            "shard_index": report.shard_index,
+            "shard_total": report.shard_total,
+            "status": report.status,
+            "duration_seconds": round(sum(durations.values()), 3) if durations else None,
+            **{column: getattr(report, column) for column in SHARD_COUNT_COLUMNS},
+        }
+        dialect = postgresql if self.db.get_bind().dialect.name == "postgresql" else sqlite
+        statement = dialect.insert(RunShardResult).values(**values)
+        excluded = statement.excluded
+        statement = statement.on_conflict_do_update(
+            index_elements=["run_id", "shard_index"],
+            set_={
+                "shard_total": excluded.shard_total,
+                "status": excluded.status,
+                "reported_at": func.now(),
+                # A bare failure report (worker crash, timeout) keeps counts sent before it
+                **{
+                    column: func.coalesce(excluded[column], getattr(RunShardResult, column))
+                    for column in (*SHARD_COUNT_COLUMNS, "duration_seconds")
+                },
+            },
+        )
+        await self.db.execute(statement)
+        await self.db.commit()
+
+    async def finalize(self, run_id: int) -> Optional[str]:
+        """
+        Once every shard has reported, aggregate the shard rows into the run and set its
+        final status: completed, failed (every shard failed) or partial_failed.
+
+        The run is updated by one conditional UPDATE (not terminal yet, all shards reported),
+        so when shards finish concurrently exactly one caller finalizes it. Returns the final
+        status for that caller and None for every other.
+        """
+        run = await self.get_by_id(run_id)
+        shards = await self.get_shard_results(run_id)
+        expected = max((shard.shard_total for shard in shards), default=1)
+        if not run or not shards or len(shards) < expected:
+            return None
+
+        failed = sum(shard.status == "failed" for shard in shards)
+        if not failed:
+            final_status = "completed"
+        elif failed == len(shards):
+            final_status = "failed"
+        else:
+            final_status = "partial_failed"
+        completed_at = datetime.now(timezone.utc)
+        if run.started_at:
+            started_at = run.started_at
+            if started_at.tzinfo is None:
+                started_at = started_at.replace(tzinfo=timezone.utc)
+            duration = (completed_at - started_at).total_seconds()
+        else:
+            # No start time recorded: shards run in parallel, so the slowest one
+            duration = max(shard.duration_seconds or 0 for shard in shards)
+
+        reported = (
+            select(func.count(RunShardResult.id))
+            .where(RunShardResult.run_id == run_id)
+            .scalar_subquery()
+        )
+        result = await self.db.execute(
+            update(Run)
+            .where(
+                Run.id == run_id,
+                Run.status.notin_(TERMINAL_RUN_STATUSES),
+                reported >= expected,
+            )
+            .values(
+                status=final_status,
+                completed_at=completed_at,
+                duration_seconds=int(duration),
+                **{
+                    column: sum(getattr(shard, column) or 0 for shard in shards)
+                    for column in SHARD_COUNT_COLUMNS
+                },
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+        return final_status if result.rowcount == 1 else None
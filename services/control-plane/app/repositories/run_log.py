@@ -0,0 +1,61 @@
+"""Run log repository."""
+from typing import List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.run import RunLogChunk
+
+
+class RunLogRepository:
+    """Repository for streamed run log chunks."""
+
+    def __init__(self, db: Session):
+        """Initialize repository with database session."""
+        self.db = db
+
+    def append(self, run_id: int, shard_index: int, seq: int, lines: List[str]) -> bool:
+        """Store a batch of lines. Returns False if this (shard, seq) batch was already stored."""
+        dialect = self.db.get_bind().dialect.name
+        if dialect == "postgresql":
+            statement = postgresql.insert(RunLogChunk).on_conflict_do_nothing(
+                index_elements=["run_id", "shard_index", "seq"]
+            )
+        elif dialect == "sqlite":
+            statement = sqlite.insert(RunLogChunk).on_conflict_do_nothing(
+                index_elements=["run_id", "shard_index", "seq"]
+            )
+        else:
+            statement = insert(RunLogChunk)
+        values = {
+            "run_id": run_id,
+            "shard_index": shard_index,
+            "seq": seq,
+            "content": "\n".join(lines),
+            "line_count": len(lines),
+        }
+        try:
+            # A concurrent retry of the same batch loses the race on the unique key
+            result = self.db.execute(statement.values(**values))
+            self.db.commit()
+        except IntegrityError:
+            self.db.rollback()
+            return False
+        return result.rowcount == 1
+
+    def list_after(
+        self,
+        run_id: int,
+        after_id: int = 0,
+        shard_index: Optional[int] = None,
+        limit: int = 500,
+    ) -> List[RunLogChunk]:
+        """Chunks of a run with id > after_id, oldest first (id is the follow cursor)."""
+        query = self.db.query(RunLogChunk).filter(
+            RunLogChunk.run_id == run_id, RunLogChunk.id > after_id
+        )
+        if shard_index is not None:
+            query = query.filter(RunLogChunk.shard_index == shard_index)
+        return query.order_by(RunLogChunk.id).limit(limit).all()
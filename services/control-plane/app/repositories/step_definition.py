@@ -0,0 +1,203 @@
+"""Step definition repository: indexed pytest-bdd definitions and the steps they implement."""
+from itertools import groupby
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import bindparam, delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.feature import Feature, Scenario, Step, StepDefinition
+from app.repositories.feature import ID_CHUNK, _chunks
+from app.services.step_definitions import (
+    StepMatcher,
+    extract_step_definitions,
+    module_hash,
+    outline_values,
+    render_outline_step,
+    resolve_scenario_steps,
+)
+
+# Step rows updated per executemany
+RESOLVE_BATCH = 5000
+
+
+class StepDefinitionRepository:
+    """
+    Writes a project's step definitions, per module, and resolves its steps against them.
+
+    Modules whose content_hash matches the stored one are skipped; a changed module has all
+    its definitions replaced.
+    """
+
+    def __init__(self, db: Session):
+        """Initialize repository with database session."""
+        self.db = db
+
+    def store(
+        self,
+        project_id: int,
+        modules: Sequence[Tuple[str, str]],
+        deleted_paths: Iterable[str] = (),
+        complete: bool = False,
+    ) -> bool:
+        """
+        Index the definitions of (path, content) modules; returns whether any changed.
+
+        With complete, modules are all of the project's step modules: definitions from
+        other files are deleted.
+        """
+        stored = dict(
+            self.db.execute(
+                select(StepDefinition.file_path, StepDefinition.content_hash)
+                .where(StepDefinition.project_id == project_id)
+                .distinct()
+            ).all()
+        )
+        changed = []
+        for path, content in {path: content for path, content in modules}.items():
+            content_hash = module_hash(content)
+            if stored.get(path) != content_hash:
+                changed.append((path, content_hash, content))
+
+        stale = set(deleted_paths) | {path for path, _, _ in changed}
+        if complete:
+            stale |= set(stored) - {path for path, _ in modules}
+        stale &= set(stored)
+        rows = [
+            {
+                "project_id": project_id,
+                "file_path": path,
+                "content_hash": content_hash,
+                **definition,
+            }
+            for path, content_hash, content in changed
+            for definition in extract_step_definitions(content)
+        ]
+        if not stale and not rows:
+            return False
+        self._delete_paths(project_id, sorted(stale))
+        if rows:
+            self.db.execute(insert(StepDefinition), rows)
+        self.db.commit()
+        return True
+
+    def _delete_paths(self, project_id: int, paths: Sequence[str]) -> None:
+        for chunk in _chunks(list(paths), ID_CHUNK):
+            ids = select(StepDefinition.id).where(
+                StepDefinition.project_id == project_id, StepDefinition.file_path.in_(chunk)
+            )
+            self.db.execute(
+                update(Step).where(Step.step_definition_id.in_(ids)).values(step_definition_id=None)
+            )
+            self.db.execute(delete(StepDefinition).where(StepDefinition.id.in_(ids)))
+
+    def resolve_steps(self, project_id: int) -> int:
+        """
+        Point every step of the project at the definition implementing it (or NULL).
+
+        Scenario Outline steps are matched with their first example row substituted.
+        Only steps whose resolution changed are written; returns how many.
+        """
+        definitions = self.db.execute(
+            select(
+                StepDefinition.id,
+                StepDefinition.step_type,
+                StepDefinition.parser,
+                StepDefinition.pattern,
+            )
+            .where(StepDefinition.project_id == project_id)
+            .order_by(StepDefinition.file_path, StepDefinition.line_number, StepDefinition.id)
+        ).all()
+        matcher = StepMatcher(definitions)
+        in_project = select(Feature.id).where(Feature.project_id == project_id)
+        outlines = {
+            scenario_id: outline_values(examples)
+            for scenario_id, examples in self.db.execute(
+                select(Scenario.id, Scenario.examples).where(
+                    Scenario.feature_id.in_(in_project),
+                    Scenario.scenario_type == "scenario_outline",
+                )
+            )
+        }
+        rows = self.db.execute(
+            select(
+                Step.id, Step.scenario_id, Step.step_type, Step.text, Step.step_definition_id
+            )
+            .join(Scenario, Step.scenario_id == Scenario.id)
+            .where(Scenario.feature_id.in_(in_project))
+            .order_by(Step.scenario_id, Step.order)
+        ).all()
+
+        changes = []
+        for scenario_id, scenario_steps in groupby(rows, key=lambda row: row.scenario_id):
+            scenario_steps = list(scenario_steps)
+            values = outlines.get(scenario_id)
+            texts = [
+                (row.step_type, render_outline_step(row.text, values) if values else row.text)
+                for row in scenario_steps
+            ]
+            for row, definition_id in zip(scenario_steps, resolve_scenario_steps(matcher, texts)):
+                if definition_id != row.step_definition_id:
+                    changes.append({"step_id": row.id, "definition_id": definition_id})
+
+        statement = (
+            update(Step)
+            .where(Step.id == bindparam("step_id"))
+            .values(step_definition_id=bindparam("definition_id"))
+        )
+        for batch in _chunks(changes, RESOLVE_BATCH):
+            self.db.connection().execute(statement, list(batch))
+        self.db.commit()
+        return len(changes)
+
+
+class AsyncStepDefinitionRepository:
+    """Read access to step definitions and step resolution, paged by id (keyset cursor)."""
+
+    def __init__(self, db: AsyncSession):
+        """Initialize repository with async database session."""
+        self.db = db
+
+    async def usage(
+        self, project_id: int, after_id: int = 0, limit: int = 100, unused: bool = False
+    ) -> Tuple[List[Tuple[StepDefinition, int]], Optional[int]]:
+        """(definition, steps using it) rows; with unused, only definitions no step uses."""
+        usage = func.count(Step.id)
+        query = (
+            select(StepDefinition, usage)
+            .outerjoin(Step, Step.step_definition_id == StepDefinition.id)
+            .where(StepDefinition.project_id == project_id, StepDefinition.id > after_id)
+            .group_by(StepDefinition.id)
+            .order_by(StepDefinition.id)
+            .limit(limit + 1)
+        )
+        if unused:
+            query = query.having(usage == 0)
+        rows = [tuple(row) for row in (await self.db.execute(query)).all()]
+        return self._split(rows, limit, lambda row: row[0].id)
+
+    async def unimplemented(
+        self, project_id: int, after_id: int = 0, limit: int = 100
+    ) -> Tuple[List[tuple], Optional[int]]:
+        """(step, scenario, feature) of steps no definition matches, by step id."""
+        query = (
+            select(Step, Scenario, Feature)
+            .join(Scenario, Step.scenario_id == Scenario.id)
+            .join(Feature, Scenario.feature_id == Feature.id)
+            .where(
+                Feature.project_id == project_id,
+                Step.step_definition_id.is_(None),
+                Step.id > after_id,
+            )
+            .order_by(Step.id)
+            .limit(limit + 1)
+        )
+        rows = [tuple(row) for row in (await self.db.execute(query)).all()]
+        return self._split(rows, limit, lambda row: row[0].id)
+
+    @staticmethod
+    def _split(items: list, limit: int, key) -> Tuple[list, Optional[int]]:
+        if len(items) <= limit:
+            return items, None
+        items = items[:limit]
+        return items, key(items[-1])
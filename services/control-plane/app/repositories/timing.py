@@ -0,0 +1,63 @@
+"""Suite test timing repository."""
+from datetime import datetime
+from typing import Dict
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.suite import SuiteTestTiming
+
+# Weight of the newest sample; older runs fade out so the plan follows tests that slow down
+SMOOTHING = 0.3
+LOOKUP_CHUNK = 500
+
+
+class SuiteTestTimingRepository:
+    """Repository for per-test duration history used by the shard planner."""
+
+    def __init__(self, db: Session):
+        """Initialize repository with database session."""
+        self.db = db
+
+    def record(self, suite_id: int, durations: Dict[str, float]) -> int:
+        """
+        Fold one shard's measured durations into the suite history.
+
+        Returns the number of tests recorded. History is best effort: if a concurrent run
+        inserted one of the same new tests first, this batch is dropped (returns 0).
+        """
+        now = datetime.utcnow()
+        nodeids = list(durations)
+        existing: Dict[str, SuiteTestTiming] = {}
+        for start in range(0, len(nodeids), LOOKUP_CHUNK):
+            chunk = nodeids[start : start + LOOKUP_CHUNK]
+            rows = (
+                self.db.query(SuiteTestTiming)
+                .filter(SuiteTestTiming.suite_id == suite_id, SuiteTestTiming.nodeid.in_(chunk))
+                .all()
+            )
+            existing.update((row.nodeid, row) for row in rows)
+
+        for nodeid, duration in durations.items():
+            duration = max(0.0, float(duration))
+            row = existing.get(nodeid)
+            if row is None:
+                self.db.add(
+                    SuiteTestTiming(
+                        suite_id=suite_id,
+                        nodeid=nodeid,
+                        duration_seconds=duration,
+                        samples=1,
+                        last_seen_at=now,
+                    )
+                )
+            else:
+                row.duration_seconds = SMOOTHING * duration + (1 - SMOOTHING) * row.duration_seconds
+                row.samples += 1
+                row.last_seen_at = now
+        try:
+            self.db.commit()
+        except IntegrityError:
+            self.db.rollback()
+            return 0
+        return len(durations)
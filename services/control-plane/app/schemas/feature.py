@@ -0,0 +1,37 @@
+"""Feature ingestion schemas."""
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class GitIngestionCreate(BaseModel):
+    """Ingest the feature files of one commit of a repository."""
+
+    repo_url: Optional[str] = None  # Defaults to the project's repository
+    commit: str = "HEAD"
+    full_scan: bool = False  # Read every feature file even if an earlier commit was indexed
+
+
+class FeatureIngestionJobResponse(BaseModel):
+    """Feature ingestion job status and progress."""
+
+    id: int
+    project_id: int
+    status: str
+    source_type: str
+    commit: Optional[str] = None
+    base_commit: Optional[str] = None  # Set when only files changed since it were read
+    total_files: Optional[int] = None
+    processed_files: int
+    features_added: int
+    features_updated: int
+    features_unchanged: int
+    features_removed: int
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
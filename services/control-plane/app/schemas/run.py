@@ -1,8 +1,11 @@
 """Run schemas."""
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Literal, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+# Rows per POST of per-test results
+TEST_RESULT_BATCH_MAX_ROWS = 10000
 
 
 class RunBase(BaseModel):
@@ -15,6 +18,9 @@ class RunBase(BaseModel):
     commit: Optional[str] = None
     commit_message: Optional[str] = None
     triggered_by: Optional[str] = None
+    # "impacted": run only the tests whose covered files changed since base_commit
+    selection: Literal["all", "impacted"] = "all"
+    base_commit: Optional[str] = None
 
 
 class RunCreate(RunBase):
@@ -57,3 +63,67 @@ class RunResponse(RunBase):
 
     class Config:
         from_attributes = True
+
+
+class RunShardResultResponse(BaseModel):
+    """Reported result of one shard of a run."""
+
+    shard_index: int
+    shard_total: int
+    status: str
+    total_tests: Optional[int] = None
+    passed_tests: Optional[int] = None
+    failed_tests: Optional[int] = None
+    skipped_tests: Optional[int] = None
+    duration_seconds: Optional[float] = None
+    reported_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class RunLogBatch(BaseModel):
+    """Batch of job output lines posted by a worker."""
+
+    shard_index: int = 0
+    seq: int  # Per-shard batch number; resent batches are ignored
+    lines: List[str]
+
+
+class TestFailure(BaseModel):
+    """Failure details of a test, as recorded by the qatron pytest plugin."""
+
+    type: str = "Error"
+    message: str = ""
+    location: str = ""
+    signature: str  # Groups identical failures across tests and runs
+
+
+class TestResultRecord(BaseModel):
+    """One line of the plugin's result file (other fields are ignored)."""
+
+    nodeid: str
+    outcome: Literal["passed", "failed", "error", "skipped", "xfailed", "xpassed"]
+    duration: float = 0.0  # Seconds
+    failure: Optional[TestFailure] = None
+
+
+class TestResultBatch(BaseModel):
+    """Batch of per-test results posted by a worker."""
+
+    shard_index: int = 0
+    seq: int = Field(ge=0)  # Per-shard batch number; resent batches are ignored
+    results: List[TestResultRecord] = Field(max_length=TEST_RESULT_BATCH_MAX_ROWS)
+
+
+class ShardReport(BaseModel):
+    """Status and counts a worker reports for one shard of a run."""
+
+    status: Literal["running", "completed", "failed"]
+    shard_index: int = Field(0, ge=0)
+    shard_total: int = Field(1, ge=1)
+    total_tests: Optional[int] = None
+    passed_tests: Optional[int] = None
+    failed_tests: Optional[int] = None
+    skipped_tests: Optional[int] = None
+    test_durations: Dict[str, float] = {}  # node id -> seconds
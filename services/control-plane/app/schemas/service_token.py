@@ -21,6 +21,7 @@ class ServiceTokenResponse(BaseModel):
     id: int
     name: str
     description: Optional[str] = None
+    token_prefix: Optional[str] = None  # Identifies the token; None for legacy tokens
     organization_id: int
     project_id: Optional[int] = None
     created_by_user_id: int
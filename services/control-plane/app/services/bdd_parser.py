@@ -1,8 +1,133 @@
 """BDD feature parser for Gherkin files."""
+import hashlib
 import re
-from typing import List, Dict, Optional
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Tuple
 from pathlib import Path
 
+from app.core.config import settings
+
+# Part of every content hash: bump when parsing changes so stored features are re-parsed
+PARSER_VERSION = "2"
+
+# Keyword before the colon -> line kind (English Gherkin, including synonyms)
+_HEADERS = {
+    "Feature": "feature",
+    "Business Need": "feature",
+    "Ability": "feature",
+    "Rule": "rule",
+    "Background": "background",
+    "Scenario": "scenario",
+    "Example": "scenario",
+    "Scenario Outline": "scenario_outline",
+    "Scenario Template": "scenario_outline",
+    "Examples": "examples",
+    "Scenarios": "examples",
+}
+_STEP_TYPES = {
+    "Given": "given",
+    "When": "when",
+    "Then": "then",
+    "And": "and",
+    "But": "but",
+    "*": "*",
+}
+_STEP_INITIALS = frozenset(keyword[0] for keyword in _STEP_TYPES)
+_DOC_FENCES = ('"""', "```")
+_TAG = re.compile(r"@[^\s@]+")
+_CELL_ESCAPES = {"|": "|", "n": "\n", "\\": "\\"}
+
+
+def _escaped_cells(line: str) -> List[str]:
+    """Cells of a table row containing escapes (\\|, \\n and \\\\ inside a cell)."""
+    cells, cell, i = [], [], 1
+    while i < len(line):
+        char = line[i]
+        if char == "\\" and i + 1 < len(line):
+            i += 1
+            escaped = line[i]
+            cell.append(_CELL_ESCAPES.get(escaped, "\\" + escaped))
+        elif char == "|":
+            cells.append("".join(cell).strip())
+            cell = []
+        else:
+            cell.append(char)
+        i += 1
+    return cells
+
+
+def _doc_string(lines: Iterator[Tuple[int, str]], opening: str, fence_line: str) -> Dict:
+    """Consume a doc string's lines up to its closing fence (or the end of the file)."""
+    fence = fence_line[:3]
+    escaped = "\\" + "\\".join(fence)
+    indent = len(opening) - len(opening.lstrip(" \t"))
+    content = []
+    for _, raw in lines:
+        if raw.strip() == fence:
+            break
+        line = raw[min(indent, len(raw) - len(raw.lstrip(" \t"))) :]
+        content.append(line.replace(escaped, fence) if "\\" in line else line)
+    return {"content": "\n".join(content), "media_type": fence_line[3:].strip() or None}
+
+
+def feature_content_hash(content: str) -> str:
+    """Hash identifying a feature file's content (and the parser that read it)."""
+    return hashlib.sha256(f"{PARSER_VERSION}\0{content}".encode("utf-8")).hexdigest()
+
+
+class ParsedFeatureCache:
+    """
+    Thread-safe LRU of parse results by content hash.
+
+    Files without a feature are cached too (as None). Cached features are shared: callers
+    get a shallow copy with their own file_path and must not modify the nested parts.
+    """
+
+    MISSING = object()
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Optional[Dict]]" = OrderedDict()
+
+    def get(self, content_hash: str):
+        """The cached result, or MISSING."""
+        with self._lock:
+            feature = self._entries.get(content_hash, self.MISSING)
+            if feature is not self.MISSING:
+                self._entries.move_to_end(content_hash)
+            return feature
+
+    def set(self, content_hash: str, feature: Optional[Dict]) -> None:
+        with self._lock:
+            self._entries[content_hash] = feature
+            self._entries.move_to_end(content_hash)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+parse_cache = ParsedFeatureCache(settings.FEATURE_PARSE_CACHE_SIZE)
+
+
+def with_file_path(feature: Optional[Dict], file_path: str) -> Optional[Dict]:
+    """A cached parse result as read from file_path."""
+    return {**feature, "file_path": file_path} if feature else None
+
+
+def parse_feature_cached(content: str, file_path: str = "") -> Optional[Dict]:
+    """GherkinParser.parse_feature_content, memoized by content hash in parse_cache."""
+    content_hash = feature_content_hash(content)
+    feature = parse_cache.get(content_hash)
+    if feature is ParsedFeatureCache.MISSING:
+        feature = GherkinParser.parse_feature_content(content, content_hash=content_hash)
+        parse_cache.set(content_hash, feature)
+    return with_file_path(feature, file_path)
+
 
 class GherkinParser:
     """Parse Gherkin feature files into structured data."""
@@ -18,140 +143,165 @@ class GherkinParser:
             return None
 
     @staticmethod
-    def parse_feature_content(content: str, file_path: str = "") -> Optional[Dict]:
-        """Parse Gherkin content string."""
-        lines = content.split("\n")
-        feature = {
-            "file_path": file_path,
-            "name": None,
-            "description": [],
-            "tags": [],
-            "scenarios": [],
-        }
-
-        current_scenario = None
-        _current_step = None
-        in_background = False
-        in_examples = False
-        examples_table = []
-
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
-
-            # Feature line
-            if line.startswith("Feature:"):
-                feature["name"] = line.replace("Feature:", "").strip()
-                i += 1
-                # Collect description until Scenario/Background/Tag
-                while i < len(lines):
-                    desc_line = lines[i].strip()
-                    if desc_line.startswith(("@", "Scenario", "Background", "Feature")):
-                        break
-                    if desc_line and not desc_line.startswith("#"):
-                        feature["description"].append(desc_line)
-                    i += 1
-                feature["description"] = "\n".join(feature["description"]).strip()
-                continue
+    def parse_feature_content(
+        content: str, file_path: str = "", content_hash: Optional[str] = None
+    ) -> Optional[Dict]:
+        """
+        Parse Gherkin content in one pass over its lines.
 
-            # Tags
-            if line.startswith("@"):
-                tags = re.findall(r"@\w+", line)
-                if current_scenario:
-                    current_scenario["tags"].extend(tags)
-                else:
-                    feature["tags"].extend(tags)
-                i += 1
-                continue
+        Returns the feature with its tags, description, background, rules and scenarios
+        (document order, each with line numbers); scenarios carry their steps (with data
+        tables and doc strings), examples blocks and the name of their rule, if any.
+        Returns None if there is no Feature line. Keywords are the English ones.
+        """
+        feature = None
+        rule = None
+        container = None  # Background or scenario receiving steps
+        step = None  # Last step: data tables and doc strings attach to it
+        table = None  # Rows being collected (step data table or examples table)
+        tags = []  # Collected for the next Feature/Rule/Scenario/Examples
+        described = None  # Node whose description lines are being collected
+        description = []
 
-            # Background
-            if line.startswith("Background:"):
-                in_background = True
-                i += 1
+        lines = enumerate(content.splitlines(), 1)
+        for line_number, raw in lines:
+            line = raw.strip()
+            if not line:
+                if described is not None:
+                    description.append("")
                 continue
 
-            # Scenario/Scenario Outline
-            if line.startswith("Scenario:") or line.startswith("Scenario Outline:"):
-                if current_scenario:
-                    feature["scenarios"].append(current_scenario)
-                current_scenario = {
-                    "name": line.split(":", 1)[1].strip(),
-                    "type": "scenario_outline" if "Outline" in line else "scenario",
-                    "tags": [],
-                    "steps": [],
-                    "examples": [],
-                }
-                in_background = False  # noqa: F841 (state for step parsing)
-                in_examples = False
-                i += 1
+            # Table rows and steps are most lines, so they are recognized first
+            first = line[0]
+            if first == "|":
+                if table is None and step is not None and step["data_table"] is None:
+                    table = step["data_table"] = []
+                if table is not None:
+                    if "\\" in line:
+                        table.append(_escaped_cells(line))
+                    else:
+                        table.append(list(map(str.strip, line.split("|")[1:-1])))
                 continue
+            if first in _STEP_INITIALS and container is not None:
+                keyword, _, text = line.partition(" ")
+                step_type = _STEP_TYPES.get(keyword)
+                if step_type is not None:
+                    if described is not None:
+                        described["description"] = "\n".join(description).strip()
+                        described = None
+                        description = []
+                    step = {
+                        "type": step_type,
+                        "keyword": keyword,
+                        "text": text.lstrip() if text[:1] == " " else text,
+                        "line_number": line_number,
+                        "data_table": None,
+                        "doc_string": None,
+                    }
+                    container["steps"].append(step)
+                    table = None
+                    continue
 
-            # Examples table
-            if line.startswith("Examples:"):
-                in_examples = True
-                examples_table = []
-                i += 1
-                # Read header
-                if i < len(lines):
-                    header_line = lines[i].strip()
-                    if "|" in header_line:
-                        examples_table.append([cell.strip() for cell in header_line.split("|")[1:-1]])
-                        i += 1
+            if first == "#":
                 continue
 
-            # Examples table rows
-            if in_examples and "|" in line:
-                row = [cell.strip() for cell in line.split("|")[1:-1]]
-                if row and any(cell for cell in row):  # Non-empty row
-                    examples_table.append(row)
-                i += 1
+            keyword, colon, name = line.partition(":")
+            kind = _HEADERS.get(keyword) if colon else None
+            if kind is None and first != "@":
+                if described is not None:
+                    description.append(line)
+                elif line.startswith(_DOC_FENCES) and step is not None:
+                    step["doc_string"] = _doc_string(lines, raw, line)
+                    step = table = None
                 continue
 
-            # Step (Given/When/Then/And/But)
-            step_match = re.match(r"^(Given|When|Then|And|But)\s+(.+)$", line, re.IGNORECASE)
-            if step_match:
-                step_type = step_match.group(1).lower()
-                step_text = step_match.group(2).strip()
-
-                # Check for data table
-                step_data_table = None
-                if i + 1 < len(lines) and lines[i + 1].strip().startswith("|"):
-                    step_data_table = []
-                    j = i + 1
-                    while j < len(lines) and "|" in lines[j]:
-                        row = [cell.strip() for cell in lines[j].split("|")[1:-1]]
-                        if row:
-                            step_data_table.append(row)
-                        j += 1
-                    i = j - 1
-
-                step = {
-                    "type": step_type,
-                    "text": step_text,
-                    "data_table": step_data_table,
-                }
-
-                if current_scenario:
-                    current_scenario["steps"].append(step)
-                i += 1
+            if described is not None:
+                described["description"] = "\n".join(description).strip()
+                described = None
+                description = []
+            step = table = None
+            if kind is None:
+                tags.extend(_TAG.findall(line.split(" #", 1)[0]))
                 continue
 
-            i += 1
-
-        # Add last scenario
-        if current_scenario:
-            if examples_table and len(examples_table) > 1:
-                current_scenario["examples"] = examples_table
-            feature["scenarios"].append(current_scenario)
+            name = name.strip()
+            if kind == "feature":
+                if feature is not None:
+                    break
+                feature = {
+                    "file_path": file_path,
+                    "content_hash": content_hash or feature_content_hash(content),
+                    "name": name,
+                    "keyword": keyword,
+                    "line_number": line_number,
+                    "description": "",
+                    "tags": tags,
+                    "background": None,
+                    "rules": [],
+                    "scenarios": [],
+                }
+                described = feature
+            elif feature is None:
+                pass
+            elif kind == "rule":
+                rule = {
+                    "name": name,
+                    "keyword": keyword,
+                    "line_number": line_number,
+                    "description": "",
+                    "tags": tags,
+                    "background": None,
+                }
+                feature["rules"].append(rule)
+                container = None
+                described = rule
+            elif kind == "background":
+                container = {
+                    "name": name,
+                    "keyword": keyword,
+                    "line_number": line_number,
+                    "description": "",
+                    "steps": [],
+                }
+                (rule or feature)["background"] = container
+                described = container
+            elif kind == "examples":
+                if container is not None and "examples" in container:
+                    examples = {
+                        "name": name,
+                        "keyword": keyword,
+                        "line_number": line_number,
+                        "description": "",
+                        "tags": tags,
+                        "table": [],
+                    }
+                    container["examples"].append(examples)
+                    container["type"] = "scenario_outline"
+                    table = examples["table"]
+                    described = examples
+            else:
+                container = {
+                    "name": name,
+                    "type": kind,
+                    "keyword": keyword,
+                    "line_number": line_number,
+                    "description": "",
+                    "tags": tags,
+                    "rule": rule["name"] if rule else None,
+                    "steps": [],
+                    "examples": [],
+                }
+                feature["scenarios"].append(container)
+                described = container
+            tags = []
 
-        return feature if feature["name"] else None
+        if described is not None:
+            described["description"] = "\n".join(description).strip()
+        return feature if feature and feature["name"] else None
 
     @staticmethod
-    def scan_repository(repo_path: Path, pattern: str = "**/*.feature") -> List[Dict]:
-        """Scan repository for feature files and parse them."""
-        features = []
-        for feature_file in repo_path.glob(pattern):
-            parsed = GherkinParser.parse_feature_file(feature_file)
-            if parsed:
-                features.append(parsed)
-        return features
+    def scan_repository(repo_path: Path) -> List[Dict]:
+        """Parse the feature files of a directory tree (see feature_scanner.scan_repository)."""
+        from app.services.feature_scanner import scan_repository
+
+        return scan_repository(repo_path)
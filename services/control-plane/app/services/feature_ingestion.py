@@ -0,0 +1,217 @@
+"""Steps of a background feature ingestion job; the Celery tasks in app.tasks.ingestion
+
+run them. Progress and counts are kept on the FeatureIngestionJob row, so any API
+replica can report them.
+"""
+import tempfile
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.models.feature import FeatureIngestionJob
+from app.repositories.feature import FeatureRepository, IngestStats
+from app.repositories.step_definition import StepDefinitionRepository
+from app.services.bdd_parser import feature_content_hash, parse_feature_cached
+from app.services.feature_scanner import FEATURE_SUFFIX
+from app.services.feature_sources import ArchiveStore, read_archive_features, read_git_features
+
+SOURCE_ARCHIVE = "archive"
+SOURCE_GIT = "git"
+
+
+@dataclass
+class SourceFiles:
+    """What a job has to store: files to parse, and paths that were deleted."""
+
+    files: List[Tuple[str, str]]  # (relative path, content) of feature files
+    deleted: List[str] = field(default_factory=list)
+    complete: bool = True  # files is the whole source: anything else stored is stale
+    step_modules: List[Tuple[str, str]] = field(default_factory=list)  # Same, for steps
+    deleted_step_modules: List[str] = field(default_factory=list)
+
+    @classmethod
+    def split(
+        cls, files: List[Tuple[str, str]], deleted: Sequence[str] = (), complete: bool = True
+    ) -> "SourceFiles":
+        """Separate a source's feature files from its step modules."""
+        features = [(path, content) for path, content in files if path.endswith(FEATURE_SUFFIX)]
+        modules = [(path, content) for path, content in files if not path.endswith(FEATURE_SUFFIX)]
+        return cls(
+            features,
+            [path for path in deleted if path.endswith(FEATURE_SUFFIX)],
+            complete,
+            modules,
+            [path for path in deleted if not path.endswith(FEATURE_SUFFIX)],
+        )
+
+
+def last_indexed_commit(db: Session, project_id: int, repo_url: str) -> Optional[str]:
+    """
+    Commit the project's features were last indexed at from this repository.
+
+    None if the project's last completed ingestion came from another source, since the
+    stored features then no longer match any commit of the repository.
+    """
+    last = db.execute(
+        select(
+            FeatureIngestionJob.source_type,
+            FeatureIngestionJob.source,
+            FeatureIngestionJob.commit,
+        )
+        .where(
+            FeatureIngestionJob.project_id == project_id,
+            FeatureIngestionJob.status == "completed",
+        )
+        .order_by(FeatureIngestionJob.completed_at.desc(), FeatureIngestionJob.id.desc())
+        .limit(1)
+    ).first()
+    if last is None or last.source_type != SOURCE_GIT or last.source != repo_url:
+        return None
+    return last.commit
+
+
+def load_sources(db: Session, job_id: int) -> SourceFiles:
+    """
+    Mark the job running and read its feature files. A staged archive is deleted once
+    read, also when reading it fails.
+
+    A git job with a base_commit reads only the feature files changed since then; its
+    commit and base_commit are replaced by the resolved SHAs (base_commit is cleared if it
+    had to fall back to a full scan).
+    """
+    job = db.get(FeatureIngestionJob, job_id)
+    job.status = "running"
+    job.started_at = datetime.utcnow()
+    db.commit()
+
+    if job.source_type == SOURCE_ARCHIVE:
+        store = ArchiveStore()
+        try:
+            with tempfile.TemporaryDirectory(prefix="qatron-archive-") as tmp:
+                path = Path(tmp) / "archive"
+                store.download(job.source, path)
+                source = SourceFiles.split(read_archive_features(path, job.strip_components or 0))
+        finally:
+            # Jobs are not retried, so the staged upload is never needed again
+            _delete_archive(store, job.source)
+    else:
+        git = read_git_features(job.source, job.commit or "HEAD", base_commit=job.base_commit)
+        job.commit, job.base_commit = git.commit, git.base_commit
+        source = SourceFiles.split(git.files, git.deleted, complete=git.base_commit is None)
+
+    job.total_files = len(source.files)
+    db.commit()
+    return source
+
+
+def _delete_archive(store: ArchiveStore, key: str) -> None:
+    try:
+        store.delete(key)
+    except Exception as e:
+        # Never mask the job's own error; a leftover upload only costs storage
+        print(f"Could not delete staged archive {key}: {e}")
+
+
+def store_step_definitions(db: Session, job_id: int, source: SourceFiles) -> bool:
+    """Index the step definitions of the source's modules; returns whether any changed."""
+    job = db.get(FeatureIngestionJob, job_id)
+    return StepDefinitionRepository(db).store(
+        job.project_id, source.step_modules, source.deleted_step_modules, source.complete
+    )
+
+
+def split_unchanged(
+    repo: FeatureRepository, project_id: int, files: Sequence[Sequence[str]]
+) -> Tuple[List[Tuple[str, str]], List[str]]:
+    """
+    (path, content) files whose content differs from the stored feature's, and the paths
+    of those that match it. Only hashes content, so unchanged files are never parsed.
+    """
+    stored = repo.content_hashes(project_id, [path for path, _ in files])
+    changed, unchanged = [], []
+    for path, content in files:
+        if stored.get(path) and stored[path] == feature_content_hash(content):
+            unchanged.append(path)
+        else:
+            changed.append((path, content))
+    return changed, unchanged
+
+
+def ingest_files(db: Session, job_id: int, files: Sequence[Sequence[str]]) -> IngestStats:
+    """Parse and store the changed files of one chunk, then add its counts to the job."""
+    job = db.get(FeatureIngestionJob, job_id)
+    repo = FeatureRepository(db)
+    changed, unchanged = split_unchanged(repo, job.project_id, files)
+    parsed = [
+        feature
+        for path, content in changed
+        if (feature := parse_feature_cached(content, path))
+    ]
+    stats = repo.store(job.project_id, parsed)
+    stats.unchanged += len(unchanged)
+    _add_progress(db, job_id, processed_files=len(files), stats=stats)
+    return stats
+
+
+def finish(
+    db: Session,
+    job_id: int,
+    keep_paths: Optional[Sequence[str]] = None,
+    deleted_paths: Sequence[str] = (),
+) -> None:
+    """
+    Remove features whose file is gone, resolve steps to their definitions and complete
+    the job.
+
+    keep_paths (a complete source) prunes every other feature; otherwise only
+    deleted_paths are removed. Git jobs stamp the project's features with the commit.
+    """
+    job = db.get(FeatureIngestionJob, job_id)
+    if job.status == "failed":
+        return
+    repo = FeatureRepository(db)
+    if keep_paths is not None:
+        removed = repo.prune(job.project_id, keep_paths)
+    else:
+        removed = repo.delete_paths(job.project_id, deleted_paths)
+    if job.source_type == SOURCE_GIT:
+        repo.mark_seen(job.project_id, job.commit)
+    StepDefinitionRepository(db).resolve_steps(job.project_id)
+    _add_progress(db, job_id, stats=IngestStats(removed=removed))
+    db.refresh(job)
+    job.status = "completed"
+    job.completed_at = datetime.utcnow()
+    db.commit()
+
+
+def fail(db: Session, job_id: int, error: str) -> None:
+    db.rollback()
+    db.execute(
+        update(FeatureIngestionJob)
+        .where(FeatureIngestionJob.id == job_id)
+        .values(status="failed", error=error[:2000], completed_at=datetime.utcnow())
+    )
+    db.commit()
+
+
+def _add_progress(
+    db: Session, job_id: int, stats: IngestStats, processed_files: int = 0
+) -> None:
+    # Increments in SQL: chunks of the same job finish concurrently
+    job = FeatureIngestionJob
+    db.execute(
+        update(job)
+        .where(job.id == job_id)
+        .values(
+            processed_files=job.processed_files + processed_files,
+            features_added=job.features_added + stats.added,
+            features_updated=job.features_updated + stats.updated,
+            features_unchanged=job.features_unchanged + stats.unchanged,
+            features_removed=job.features_removed + stats.removed,
+        )
+    )
+    db.commit()
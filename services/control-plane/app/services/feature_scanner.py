@@ -0,0 +1,176 @@
+"""Finding and parsing the feature files of a directory tree.
+
+Directories that never hold a project's own features (VCS metadata, dependencies,
+virtualenvs) and whatever the tree's .gitignore files exclude are pruned before they are
+walked. Files whose content was parsed before are served from bdd_parser.parse_cache;
+the rest are parsed across a process pool when there are enough of them.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from pathspec import GitIgnoreSpec
+
+from app.core.config import settings
+from app.services.bdd_parser import (
+    GherkinParser,
+    ParsedFeatureCache,
+    feature_content_hash,
+    parse_cache,
+    with_file_path,
+)
+from app.services.step_definitions import STEP_MODULE_SUFFIX, is_step_module
+
+MAX_FEATURE_FILE_BYTES = 5 * 1024 * 1024
+FEATURE_SUFFIX = ".feature"
+ALWAYS_IGNORED_DIRS = frozenset(
+    {
+        ".git",
+        ".hg",
+        ".svn",
+        "node_modules",
+        "bower_components",
+        ".venv",
+        "venv",
+        ".tox",
+        ".nox",
+        "site-packages",
+        "__pycache__",
+        ".mypy_cache",
+        ".pytest_cache",
+    }
+)
+# Fewer uncached files than this are parsed in-process (a pool costs more to start)
+PARALLEL_MIN_FILES = 500
+PARSE_BATCH_FILES = 100
+
+
+def _gitignore(directory: str) -> Optional[GitIgnoreSpec]:
+    try:
+        with open(os.path.join(directory, ".gitignore"), encoding="utf-8", errors="replace") as f:
+            return GitIgnoreSpec.from_lines(f)
+    except OSError:
+        return None
+
+
+def _ignored(path: str, is_dir: bool, specs: Sequence[Tuple[str, GitIgnoreSpec]]) -> bool:
+    """Whether any .gitignore above path (relative to the root) excludes it."""
+    for base, spec in specs:
+        relative = path[len(base) + 1 :] if base else path
+        if spec.match_file(relative + "/" if is_dir else relative):
+            return True
+    return False
+
+
+def iter_feature_files(
+    root: Path, suffixes: Tuple[str, ...] = (FEATURE_SUFFIX,)
+) -> Iterator[Tuple[str, str]]:
+    """
+    (path relative to root, absolute path) of the tree's feature files (or other suffixes).
+
+    Each .gitignore applies below its directory. Patterns are matched independently per
+    file, so a negation cannot re-include what a parent directory's .gitignore excludes.
+    """
+    root = str(root)
+    specs_by_dir: Dict[str, List[Tuple[str, GitIgnoreSpec]]] = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        relative_dir = os.path.relpath(dirpath, root).replace(os.sep, "/")
+        relative_dir = "" if relative_dir == "." else relative_dir
+        specs = specs_by_dir.pop(dirpath, [])
+        if ".gitignore" in filenames:
+            spec = _gitignore(dirpath)
+            if spec is not None:
+                specs = [*specs, (relative_dir, spec)]
+
+        prefix = f"{relative_dir}/" if relative_dir else ""
+        kept = []
+        for name in dirnames:
+            if name in ALWAYS_IGNORED_DIRS or (specs and _ignored(prefix + name, True, specs)):
+                continue
+            kept.append(name)
+            specs_by_dir[os.path.join(dirpath, name)] = specs
+        dirnames[:] = kept
+
+        for name in filenames:
+            if name.endswith(suffixes) and not (
+                specs and _ignored(prefix + name, False, specs)
+            ):
+                yield prefix + name, os.path.join(dirpath, name)
+
+
+def read_feature_files(root: Path, step_modules: bool = False) -> List[Tuple[str, str]]:
+    """
+    (path relative to root, content) of the tree's feature files, and with step_modules
+    of its Python modules that may define pytest-bdd steps.
+    """
+    suffixes = (FEATURE_SUFFIX, STEP_MODULE_SUFFIX) if step_modules else (FEATURE_SUFFIX,)
+    files = []
+    for relative, path in iter_feature_files(root, suffixes):
+        try:
+            if os.path.getsize(path) > MAX_FEATURE_FILE_BYTES:
+                continue
+            with open(path, encoding="utf-8", errors="replace") as f:
+                content = f.read()
+        except OSError:
+            continue  # Removed while walking, or a dangling symlink
+        if relative.endswith(FEATURE_SUFFIX) or is_step_module(content):
+            files.append((relative, content))
+    return files
+
+
+def _parse_batch(batch: List[Tuple[str, str]]) -> List[Optional[Dict]]:
+    """Runs in pool processes: parse (content, content hash) pairs without a file path."""
+    return [
+        GherkinParser.parse_feature_content(content, content_hash=content_hash)
+        for content, content_hash in batch
+    ]
+
+
+def _scan_workers(workers: Optional[int]) -> int:
+    if multiprocessing.current_process().daemon:
+        return 1  # e.g. a Celery prefork child: it may not start processes of its own
+    return workers or settings.FEATURE_SCAN_WORKERS or os.cpu_count() or 1
+
+
+def parse_files(files: Sequence[Tuple[str, str]], workers: Optional[int] = None) -> List[Dict]:
+    """Parse (path, content) pairs; uncached ones across worker processes if there are many."""
+    hashes = [feature_content_hash(content) for _, content in files]
+    parsed: Dict[str, Optional[Dict]] = {}
+    pending = []  # (content, content hash) of each distinct uncached content
+    for (_, content), content_hash in zip(files, hashes):
+        if content_hash in parsed:
+            continue
+        feature = parse_cache.get(content_hash)
+        if feature is ParsedFeatureCache.MISSING:
+            pending.append((content, content_hash))
+            feature = None
+        parsed[content_hash] = feature
+
+    workers = _scan_workers(workers)
+    if workers > 1 and len(pending) >= PARALLEL_MIN_FILES:
+        batches = [
+            pending[start : start + PARSE_BATCH_FILES]
+            for start in range(0, len(pending), PARSE_BATCH_FILES)
+        ]
+        # spawn: the API process runs threads, which fork does not copy safely
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            results = [feature for batch in pool.map(_parse_batch, batches) for feature in batch]
+    else:
+        results = _parse_batch(pending)
+    for (_, content_hash), feature in zip(pending, results):
+        parse_cache.set(content_hash, feature)
+        parsed[content_hash] = feature
+
+    features = [
+        with_file_path(parsed[content_hash], path)
+        for (path, _), content_hash in zip(files, hashes)
+    ]
+    return [feature for feature in features if feature]
+
+
+def scan_repository(root: Path, workers: Optional[int] = None) -> List[Dict]:
+    """Parsed features of a directory tree (file paths relative to root)."""
+    return parse_files(read_feature_files(root), workers)
@@ -0,0 +1,262 @@
+"""Search over a project's scenarios: step text, scenario names and tags.
+
+PostgreSQL answers from GIN indexes on to_tsvector('english', ...) of steps.text and
+scenarios.name, and from scenario_tags. Other databases (SQLite in development and tests)
+use an in-process inverted index per project, rebuilt when the project's scenarios change;
+it matches whole words without stemming.
+"""
+import re
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import exists, func, literal_column, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.feature import Feature, Scenario, ScenarioTag, Step
+
+# Must match the configuration of the expression indexes for them to be used
+SEARCH_CONFIG = literal_column("'english'")
+_WORD = re.compile(r"\w+")
+
+
+def parse_tags(tags: str) -> List[str]:
+    """Tags from a comma/space separated parameter, with the leading @ added if missing."""
+    names = [tag for tag in re.split(r"[,\s]+", tags) if tag]
+    return list(dict.fromkeys(tag if tag.startswith("@") else f"@{tag}" for tag in names))
+
+
+@dataclass
+class SearchPage:
+    """Matching scenario ids (ascending) and, per scenario, the ids of its matching steps."""
+
+    scenario_ids: List[int]
+    matched_steps: Dict[int, List[int]]
+    next_cursor: Optional[int]
+
+
+def _split(ids: List[int], limit: int) -> Tuple[List[int], Optional[int]]:
+    if len(ids) <= limit:
+        return ids, None
+    return ids[:limit], ids[limit - 1]
+
+
+class PostgresFeatureSearch:
+    """Full-text search with to_tsvector/plainto_tsquery (all words, stemmed)."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def search(
+        self, project_id: int, q: str, tags: Sequence[str], after_id: int, limit: int
+    ) -> SearchPage:
+        tsquery = func.plainto_tsquery(SEARCH_CONFIG, q)
+        step_matches = func.to_tsvector(SEARCH_CONFIG, Step.text).op("@@")(tsquery)
+        query = (
+            select(Scenario.id)
+            .join(Feature, Scenario.feature_id == Feature.id)
+            .where(
+                Feature.project_id == project_id,
+                Scenario.scenario_type != "background",
+                Scenario.id > after_id,
+            )
+        )
+        for tag in tags:
+            query = query.where(
+                Scenario.id.in_(
+                    select(ScenarioTag.scenario_id).where(
+                        ScenarioTag.project_id == project_id, ScenarioTag.tag == tag
+                    )
+                )
+            )
+        if q:
+            query = query.where(
+                or_(
+                    func.to_tsvector(SEARCH_CONFIG, Scenario.name).op("@@")(tsquery),
+                    exists().where(Step.scenario_id == Scenario.id, step_matches),
+                )
+            )
+        ids = list((await self.db.scalars(query.order_by(Scenario.id).limit(limit + 1))).all())
+        ids, next_cursor = _split(ids, limit)
+
+        matched: Dict[int, List[int]] = defaultdict(list)
+        if q and ids:
+            rows = await self.db.execute(
+                select(Step.scenario_id, Step.id)
+                .where(Step.scenario_id.in_(ids), step_matches)
+                .order_by(Step.order)
+            )
+            for scenario_id, step_id in rows:
+                matched[scenario_id].append(step_id)
+        return SearchPage(ids, dict(matched), next_cursor)
+
+
+def _words(text: str) -> Set[str]:
+    return set(_WORD.findall(text.lower()))
+
+
+@dataclass
+class _ProjectIndex:
+    fingerprint: tuple
+    scenario_ids: List[int]  # Ascending, backgrounds excluded
+    step_words: Dict[str, Set[int]]  # word -> step ids
+    name_words: Dict[str, Set[int]]  # word -> scenario ids
+    tags: Dict[str, Set[int]]  # tag -> scenario ids
+    step_scenario: Dict[int, int]
+    step_order: Dict[int, Tuple[int, int]]  # step id -> (scenario id, order)
+
+    @staticmethod
+    def _all_of(postings: Dict[str, Set[int]], words: Iterable[str]) -> Set[int]:
+        sets = [postings.get(word, set()) for word in words]
+        return set.intersection(*sets) if sets else set()
+
+    def search(self, q: str, tags: Sequence[str], after_id: int, limit: int) -> SearchPage:
+        candidates: Optional[Set[int]] = None
+        for tag in tags:
+            tagged = self.tags.get(tag, set())
+            candidates = tagged if candidates is None else candidates & tagged
+        words = _words(q)
+        steps: Set[int] = set()
+        if words:
+            steps = self._all_of(self.step_words, words)
+            matching = {self.step_scenario[step_id] for step_id in steps}
+            matching |= self._all_of(self.name_words, words)
+            candidates = matching if candidates is None else candidates & matching
+        if candidates is None:
+            ids = [i for i in self.scenario_ids if i > after_id][: limit + 1]
+        else:
+            ids = sorted(i for i in candidates if i > after_id)[: limit + 1]
+        ids, next_cursor = _split(ids, limit)
+
+        page = set(ids)
+        matched: Dict[int, List[int]] = defaultdict(list)
+        for step_id in sorted(steps, key=self.step_order.__getitem__):
+            if self.step_scenario[step_id] in page:
+                matched[self.step_scenario[step_id]].append(step_id)
+        return SearchPage(ids, dict(matched), next_cursor)
+
+
+class InMemoryFeatureSearch:
+    """Inverted index per project, kept per process (for databases without full-text search)."""
+
+    _indexes: Dict[int, _ProjectIndex] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def _fingerprint(self, project_id: int) -> tuple:
+        # Scenarios are replaced (new ids) whenever a feature changes, so this moves on writes
+        row = await self.db.execute(
+            select(func.count(Scenario.id), func.max(Scenario.id))
+            .join(Feature, Scenario.feature_id == Feature.id)
+            .where(Feature.project_id == project_id)
+        )
+        return tuple(row.one())
+
+    async def _build(self, project_id: int, fingerprint: tuple) -> _ProjectIndex:
+        in_project = select(Feature.id).where(Feature.project_id == project_id)
+        scenarios = (
+            await self.db.execute(
+                select(Scenario.id, Scenario.name, Scenario.scenario_type)
+                .where(Scenario.feature_id.in_(in_project))
+                .order_by(Scenario.id)
+            )
+        ).all()
+        steps = await self.db.execute(
+            select(Step.id, Step.scenario_id, Step.order, Step.text)
+            .join(Scenario, Step.scenario_id == Scenario.id)
+            .where(Scenario.feature_id.in_(in_project))
+        )
+        tags = await self.db.execute(
+            select(ScenarioTag.tag, ScenarioTag.scenario_id).where(
+                ScenarioTag.project_id == project_id
+            )
+        )
+
+        index = _ProjectIndex(
+            fingerprint, [], defaultdict(set), defaultdict(set), defaultdict(set), {}, {}
+        )
+        for scenario_id, name, scenario_type in scenarios:
+            if scenario_type == "background":
+                continue
+            index.scenario_ids.append(scenario_id)
+            for word in _words(name):
+                index.name_words[word].add(scenario_id)
+        searchable = set(index.scenario_ids)
+        for step_id, scenario_id, order, text in steps:
+            if scenario_id not in searchable:
+                continue
+            index.step_scenario[step_id] = scenario_id
+            index.step_order[step_id] = (scenario_id, order)
+            for word in _words(text):
+                index.step_words[word].add(step_id)
+        for tag, scenario_id in tags:
+            index.tags[tag].add(scenario_id)
+        return index
+
+    async def search(
+        self, project_id: int, q: str, tags: Sequence[str], after_id: int, limit: int
+    ) -> SearchPage:
+        fingerprint = await self._fingerprint(project_id)
+        with self._lock:
+            index = self._indexes.get(project_id)
+        if index is None or index.fingerprint != fingerprint:
+            index = await self._build(project_id, fingerprint)
+            with self._lock:
+                self._indexes[project_id] = index
+        return index.search(q, tags, after_id, limit)
+
+
+def feature_search(db: AsyncSession):
+    """The search backend for the session's database."""
+    if db.get_bind().dialect.name == "postgresql":
+        return PostgresFeatureSearch(db)
+    return InMemoryFeatureSearch(db)
+
+
+async def load_results(db: AsyncSession, page: SearchPage) -> List[dict]:
+    """Scenarios of a search page with their feature, effective tags and matching steps."""
+    if not page.scenario_ids:
+        return []
+    rows = await db.execute(
+        select(Scenario, Feature.name, Feature.file_path)
+        .join(Feature, Scenario.feature_id == Feature.id)
+        .where(Scenario.id.in_(page.scenario_ids))
+        .order_by(Scenario.id)
+    )
+    tags: Dict[int, List[str]] = defaultdict(list)
+    for scenario_id, tag in await db.execute(
+        select(ScenarioTag.scenario_id, ScenarioTag.tag)
+        .where(ScenarioTag.scenario_id.in_(page.scenario_ids))
+        .order_by(ScenarioTag.id)
+    ):
+        tags[scenario_id].append(tag)
+    step_ids = [step_id for ids in page.matched_steps.values() for step_id in ids]
+    steps = {}
+    if step_ids:
+        found = await db.scalars(select(Step).where(Step.id.in_(step_ids)))
+        steps = {step.id: step for step in found}
+
+    return [
+        {
+            "scenario_id": scenario.id,
+            "name": scenario.name,
+            "type": scenario.scenario_type,
+            "rule": scenario.rule,
+            "line_number": scenario.line_number,
+            "tags": tags.get(scenario.id, []),
+            "feature": {"id": scenario.feature_id, "name": feature_name, "file_path": file_path},
+            "matched_steps": [
+                {
+                    "id": step.id,
+                    "keyword": step.keyword,
+                    "text": step.text,
+                    "line_number": step.line_number,
+                }
+                for step in (steps[step_id] for step_id in page.matched_steps.get(scenario.id, []))
+            ],
+        }
+        for scenario, feature_name, file_path in rows
+    ]
@@ -0,0 +1,245 @@
+"""Where ingestion jobs read feature files from: uploaded archives and git checkouts.
+
+Archives are streamed into S3 as they arrive (multipart, never held in memory) and read
+back by the job without being extracted: only .feature members and Python modules are
+opened. Python modules are kept if they may define pytest-bdd steps.
+"""
+import asyncio
+import os
+import subprocess
+import tarfile
+import tempfile
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import Path, PurePosixPath
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.s3 import get_client
+from app.services.feature_scanner import FEATURE_SUFFIX, MAX_FEATURE_FILE_BYTES, read_feature_files
+from app.services.step_definitions import STEP_MODULE_SUFFIX, is_step_module
+
+PART_SIZE = 8 * 1024 * 1024  # S3 minimum is 5 MiB for all but the last part
+GIT_TIMEOUT_SECONDS = 600
+SOURCE_SUFFIXES = (FEATURE_SUFFIX, STEP_MODULE_SUFFIX)
+
+
+class ArchiveTooLarge(Exception):
+    """The upload exceeded FEATURE_ARCHIVE_MAX_BYTES."""
+
+
+class SourceError(Exception):
+    """A job's source could not be read (bad archive, unreachable repository, ...)."""
+
+
+class ArchiveStore:
+    """Stages uploaded archives in the control plane's bucket."""
+
+    def __init__(self, client=None, bucket: Optional[str] = None):
+        self.client = client or get_client()
+        self.bucket = bucket or settings.S3_BUCKET_NAME
+
+    async def save(
+        self, key: str, chunks: AsyncIterator[bytes], max_bytes: Optional[int] = None
+    ) -> int:
+        """Stream chunks into one object as a multipart upload; returns its size."""
+        max_bytes = max_bytes or settings.FEATURE_ARCHIVE_MAX_BYTES
+        upload = await asyncio.to_thread(
+            self.client.create_multipart_upload, Bucket=self.bucket, Key=key
+        )
+        upload_id = upload["UploadId"]
+        parts: List[Dict] = []
+        buffer = bytearray()
+        size = 0
+
+        async def flush() -> None:
+            number = len(parts) + 1
+            response = await asyncio.to_thread(
+                self.client.upload_part,
+                Bucket=self.bucket,
+                Key=key,
+                UploadId=upload_id,
+                PartNumber=number,
+                Body=bytes(buffer),
+            )
+            parts.append({"PartNumber": number, "ETag": response["ETag"]})
+            buffer.clear()
+
+        try:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ArchiveTooLarge(f"Archive exceeds {max_bytes} bytes")
+                buffer.extend(chunk)
+                if len(buffer) >= PART_SIZE:
+                    await flush()
+            if buffer or not parts:
+                await flush()
+            await asyncio.to_thread(
+                self.client.complete_multipart_upload,
+                Bucket=self.bucket,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+        except BaseException:
+            await asyncio.to_thread(
+                self.client.abort_multipart_upload, Bucket=self.bucket, Key=key, UploadId=upload_id
+            )
+            raise
+        return size
+
+    def download(self, key: str, path: Path) -> None:
+        with open(path, "wb") as f:
+            self.client.download_fileobj(self.bucket, key, f)
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+
+def _feature_member(name: str, strip_components: int) -> Optional[str]:
+    path = PurePosixPath(name.replace("\\", "/"))
+    if path.suffix not in SOURCE_SUFFIXES or path.is_absolute() or ".." in path.parts:
+        return None
+    parts = [p for p in path.parts if p != "."][strip_components:]
+    return str(PurePosixPath(*parts)) if parts else None
+
+
+def read_archive_features(path: Path, strip_components: int = 0) -> List[Tuple[str, str]]:
+    """
+    (relative path, content) of every .feature file and step module in a zip or
+    (compressed) tar archive.
+
+    strip_components drops leading directories, as tar does (1 for the <repo>-<sha>/
+    directory of git host tarballs).
+    """
+    files: List[Tuple[str, str]] = []
+
+    def add(name: str, data: bytes) -> None:
+        content = data.decode("utf-8", "replace")
+        if name.endswith(FEATURE_SUFFIX) or is_step_module(content):
+            files.append((name, content))
+
+    try:
+        if zipfile.is_zipfile(path):
+            with zipfile.ZipFile(path) as archive:
+                for info in archive.infolist():
+                    name = _feature_member(info.filename, strip_components)
+                    if name and not info.is_dir() and info.file_size <= MAX_FEATURE_FILE_BYTES:
+                        add(name, archive.read(info))
+        else:
+            with tarfile.open(path, mode="r:*") as archive:
+                for member in archive:
+                    name = _feature_member(member.name, strip_components)
+                    if name and member.isfile() and member.size <= MAX_FEATURE_FILE_BYTES:
+                        add(name, archive.extractfile(member).read())
+    except (tarfile.TarError, zipfile.BadZipFile, OSError, EOFError) as e:
+        raise SourceError(f"Unreadable archive: {e}") from e
+    return files
+
+
+def _git(*args: str, cwd: Path, input: Optional[str] = None) -> str:
+    try:
+        result = subprocess.run(
+            ["git", *args],
+            cwd=cwd,
+            input=input,
+            capture_output=True,
+            text=True,
+            timeout=GIT_TIMEOUT_SECONDS,
+            env={**os.environ, "GIT_TERMINAL_PROMPT": "0"},
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        raise SourceError(f"git {args[0]} failed: {e}") from e
+    if result.returncode != 0:
+        raise SourceError(f"git {args[0]} failed: {result.stderr.strip()}")
+    return result.stdout
+
+
+@dataclass
+class GitFeatures:
+    """
+    Feature files and step modules of a commit: all of them, or only what changed since
+    base_commit.
+    """
+
+    commit: str  # Resolved SHA
+    files: List[Tuple[str, str]]  # (path, content): every file, or added/modified ones
+    deleted: List[str] = field(default_factory=list)  # Including modules no longer defining steps
+    base_commit: Optional[str] = None  # None: files is a full scan
+
+
+def _fetch(root: Path, ref: str, blobless: bool = False) -> str:
+    """Shallow-fetch one commit from origin; returns its SHA."""
+    args = ["fetch", "-q", "--depth", "1"]
+    if blobless:
+        # Trees only; the blobs of changed files are fetched on checkout
+        args.append("--filter=blob:none")
+    _git(*args, "origin", ref, cwd=root)
+    return _git("rev-parse", "FETCH_HEAD", cwd=root).strip()
+
+
+def _diff_features(root: Path, base: str, commit: str) -> Tuple[List[str], List[str]]:
+    """(added or modified, deleted) feature and Python paths between two fetched commits."""
+    patterns = [f"*{suffix}" for suffix in SOURCE_SUFFIXES]
+    out = _git(
+        "diff", "--no-renames", "--name-status", "-z", base, commit, "--", *patterns, cwd=root
+    )
+    fields = out.split("\0")
+    changed, deleted = [], []
+    for status, path in zip(fields[0::2], fields[1::2]):
+        (deleted if status == "D" else changed).append(path)
+    return changed, deleted
+
+
+def _clone_dir(repo_url: str):
+    tmp = tempfile.TemporaryDirectory(prefix="qatron-features-")
+    _git("init", "-q", cwd=Path(tmp.name))
+    _git("remote", "add", "origin", repo_url, cwd=Path(tmp.name))
+    return tmp
+
+
+def _read_changes(repo_url: str, commit: str, base_commit: str) -> GitFeatures:
+    with _clone_dir(repo_url) as tmp:
+        root = Path(tmp)
+        sha = _fetch(root, commit, blobless=True)
+        base_sha = _fetch(root, base_commit, blobless=True)
+        changed, deleted = _diff_features(root, base_sha, sha)
+        if changed:
+            pathspec = "\n".join(changed)
+            _git("checkout", "-q", sha, "--pathspec-from-file=-", input=pathspec, cwd=root)
+        files = []
+        for path in changed:
+            content = (root / path).read_text(encoding="utf-8", errors="replace")
+            if path.endswith(FEATURE_SUFFIX) or is_step_module(content):
+                files.append((path, content))
+            else:
+                deleted.append(path)  # May have defined steps at base_commit
+        return GitFeatures(sha, files, deleted, base_commit=base_sha)
+
+
+def read_git_features(
+    repo_url: str, commit: str, base_commit: Optional[str] = None
+) -> GitFeatures:
+    """
+    Feature files and step modules of one commit, fetched shallowly.
+
+    With base_commit (the last indexed commit), both commits are fetched without blobs and
+    diffed, and only added/modified feature files are checked out. If the base is gone
+    (e.g. after a force push) this falls back to a full scan of the commit.
+    """
+    if base_commit:
+        try:
+            return _read_changes(repo_url, commit, base_commit)
+        except SourceError as e:
+            print(f"Incremental indexing from {base_commit} not possible ({e}); full scan")
+    with _clone_dir(repo_url) as tmp:
+        root = Path(tmp)
+        sha = _fetch(root, commit)
+        _git("checkout", "-q", sha, cwd=root)
+        return GitFeatures(sha, read_feature_files(root, step_modules=True))
+
+
+def iter_chunks(files: List[Tuple[str, str]], size: int) -> Iterator[List[Tuple[str, str]]]:
+    for start in range(0, len(files), size):
+        yield files[start : start + size]
@@ -0,0 +1,72 @@
+"""Server-sent events stream that tails a run's log chunks."""
+import asyncio
+from typing import AsyncIterator, Callable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.run import TERMINAL_RUN_STATUSES, Run
+from app.repositories.run_log import RunLogRepository
+
+
+def format_sse(data: str, event: Optional[str] = None, event_id: Optional[int] = None) -> str:
+    """Encode one SSE event; multi-line data becomes one data: field per line."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    lines.extend(f"data: {line}" for line in data.split("\n"))
+    return "\n".join(lines) + "\n\n"
+
+
+def _poll(
+    session_factory: Callable[[], Session],
+    run_id: int,
+    after_id: int,
+    shard_index: Optional[int],
+) -> Tuple[List[str], int, Optional[str]]:
+    """Events for chunks after after_id, the new cursor, and the run status (None: no run)."""
+    db = session_factory()
+    try:
+        chunks = RunLogRepository(db).list_after(run_id, after_id, shard_index)
+        run = db.query(Run.status).filter(Run.id == run_id).first()
+        events = [format_sse(chunk.content, event="log", event_id=chunk.id) for chunk in chunks]
+        return events, chunks[-1].id if chunks else after_id, run.status if run else None
+    finally:
+        db.close()
+
+
+async def follow_run_logs(
+    session_factory: Callable[[], Session],
+    run_id: int,
+    after_id: int = 0,
+    shard_index: Optional[int] = None,
+    poll_interval: float = 1.0,
+    keepalive_interval: float = 15.0,
+) -> AsyncIterator[str]:
+    """
+    Yield SSE events for chunks with id > after_id until the run is finished.
+
+    Each poll uses a short-lived session so a long-running follower never pins a
+    pooled connection, and runs in a worker thread so its blocking queries never stall
+    the event loop. The event id is the chunk id, so clients resume with
+    Last-Event-ID. A final "end" event carries the run status.
+    """
+    idle = 0.0
+    while True:
+        events, after_id, run_status = await asyncio.to_thread(
+            _poll, session_factory, run_id, after_id, shard_index
+        )
+        for event in events:
+            yield event
+        if events:
+            idle = 0.0
+            continue  # Drain backlog before sleeping
+        if run_status is None or run_status in TERMINAL_RUN_STATUSES:
+            yield format_sse(run_status or "not_found", event="end")
+            return
+        await asyncio.sleep(poll_interval)
+        idle += poll_interval
+        if idle >= keepalive_interval:
+            idle = 0.0
+            yield ": keepalive\n\n"
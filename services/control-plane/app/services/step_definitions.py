@@ -0,0 +1,223 @@
+"""pytest-bdd step definitions: extracting them from Python modules and matching steps.
+
+Modules are read with ast, never imported. Definitions of one step type are compiled into
+a single regular expression (exact strings into a dict), so resolving a step is one
+lookup plus at most one match whatever the number of definitions.
+"""
+import ast
+import hashlib
+import json
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+STEP_MODULE_SUFFIX = ".py"
+STEP_DECORATORS = ("given", "when", "then", "step")  # step: any step type
+STEP_PARSERS = ("string", "parse", "cfparse", "re")
+# Keywords continuing the previous step's type
+_CONTINUATIONS = ("and", "but", "*")
+
+# parse format fields ({name:spec}) and escaped braces
+_PARSE_FIELD = re.compile(r"\{\{|\}\}|\{([^{}]*)\}")
+_NUMBER = r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?"
+_PARSE_TYPES = {
+    "d": r"[-+]?\d+",
+    "n": r"[-+]?\d[\d,]*",
+    "f": _NUMBER,
+    "F": _NUMBER,
+    "e": _NUMBER,
+    "g": _NUMBER,
+    "%": _NUMBER + "%",
+    "w": r"\w+",
+    "W": r"\W+",
+    "s": r"\s+",
+    "S": r"\S+",
+    "l": r"[a-zA-Z]+",
+}
+_NAMED_GROUP = re.compile(r"\(\?P<\w+>")
+# Patterns that cannot be embedded in a larger expression: backreferences shift with the
+# enclosing groups, and global flags must start the whole expression
+_NOT_EMBEDDABLE = re.compile(r"\(\?P=|\\[1-9]|^\(\?[aiLmsux]+\)")
+
+
+def is_step_module(content: str) -> bool:
+    """Whether a Python file may define pytest-bdd steps (worth parsing)."""
+    return "pytest_bdd" in content
+
+
+def module_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def _name(node: ast.AST) -> Optional[str]:
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    return None
+
+
+def _pattern(node: ast.AST) -> Optional[Tuple[str, str]]:
+    """(parser, pattern) of a decorator's step name argument, if it is a literal."""
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return "string", node.value
+    if isinstance(node, ast.Call) and _name(node.func) in STEP_PARSERS and node.args:
+        first = node.args[0]
+        if isinstance(first, ast.Constant) and isinstance(first.value, str):
+            return _name(node.func), first.value
+    return None
+
+
+def extract_step_definitions(content: str) -> List[Dict]:
+    """
+    Step definitions of a Python module: one per @given/@when/@then/@step decorator whose
+    name is a string or a parsers.string/parse/cfparse/re call on a string literal.
+    Names built at runtime cannot be read statically and are skipped.
+    """
+    try:
+        tree = ast.parse(content)
+    except (SyntaxError, ValueError):
+        return []
+    definitions = []
+    for node in ast.walk(tree):
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        for decorator in node.decorator_list:
+            if not isinstance(decorator, ast.Call) or _name(decorator.func) not in STEP_DECORATORS:
+                continue
+            argument = decorator.args[0] if decorator.args else None
+            for keyword in decorator.keywords:
+                if keyword.arg == "name":
+                    argument = keyword.value
+            pattern = _pattern(argument) if argument is not None else None
+            if pattern is None:
+                continue
+            definitions.append(
+                {
+                    "step_type": _name(decorator.func),
+                    "parser": pattern[0],
+                    "pattern": pattern[1],
+                    "function_name": node.name,
+                    "line_number": decorator.lineno,
+                }
+            )
+    return sorted(definitions, key=lambda definition: definition["line_number"])
+
+
+def _parse_regex(pattern: str) -> str:
+    """Regular expression equivalent of a parse/cfparse format (case-insensitive, as parse)."""
+    parts, position = [], 0
+    for field in _PARSE_FIELD.finditer(pattern):
+        parts.append(re.escape(pattern[position : field.start()]))
+        position = field.end()
+        token = field.group(0)
+        if token in ("{{", "}}"):
+            parts.append(re.escape(token[0]))
+            continue
+        spec = field.group(1).partition(":")[2]
+        if spec[-1:] in ("*", "?"):  # cfparse cardinality: zero or more/one
+            parts.append("(.*?)")
+        else:
+            parts.append(f"({_PARSE_TYPES.get(spec[-1:], '.+?')})")
+    parts.append(re.escape(pattern[position:]))
+    return "(?i:" + "".join(parts) + ")"
+
+
+def definition_regex(parser: str, pattern: str) -> str:
+    """Regular expression matching the step texts of a definition (with fullmatch)."""
+    if parser in ("parse", "cfparse"):
+        return _parse_regex(pattern)
+    if parser == "re":
+        return pattern
+    return re.escape(pattern)
+
+
+class StepMatcher:
+    """
+    Resolves step texts to definitions (given as (id, step_type, parser, pattern), in
+    priority order). A step type's exact strings are a dict lookup; its other
+    definitions form one alternation of named groups, tried with a single fullmatch.
+    When several definitions match, an exact string wins, then the first one.
+    """
+
+    def __init__(self, definitions: Iterable[Tuple[int, str, str, str]]):
+        self._exact: Dict[str, Dict[str, int]] = {kind: {} for kind in STEP_DECORATORS[:3]}
+        self._combined: Dict[str, Optional[re.Pattern]] = {}
+        self._group_ids: Dict[str, int] = {}
+        self._separate: Dict[str, List[Tuple[re.Pattern, int]]] = {}
+        self._resolved: Dict[Tuple[str, str], Optional[int]] = {}  # Step texts repeat a lot
+        embedded: Dict[str, List[str]] = {kind: [] for kind in self._exact}
+
+        for definition_id, step_type, parser, pattern in definitions:
+            kinds = list(self._exact) if step_type == "step" else [step_type]
+            if parser == "string":
+                for kind in kinds:
+                    self._exact.get(kind, {}).setdefault(pattern, definition_id)
+                continue
+            regex = definition_regex(parser, pattern)
+            try:
+                compiled = re.compile(regex)
+            except re.error:
+                continue  # pytest-bdd fails on it as well
+            for kind in kinds:
+                if kind not in embedded:
+                    continue
+                if _NOT_EMBEDDABLE.search(regex):
+                    self._separate.setdefault(kind, []).append((compiled, definition_id))
+                    continue
+                group = f"d{len(self._group_ids)}"
+                self._group_ids[group] = definition_id
+                embedded[kind].append(f"(?P<{group}>{_NAMED_GROUP.sub('(', regex)})")
+
+        for kind, alternatives in embedded.items():
+            self._combined[kind] = re.compile("|".join(alternatives)) if alternatives else None
+
+    def match(self, kind: str, text: str) -> Optional[int]:
+        """Id of the definition of step type kind (given/when/then) matching text."""
+        key = (kind, text)
+        if key not in self._resolved:
+            self._resolved[key] = self._match(kind, text)
+        return self._resolved[key]
+
+    def _match(self, kind: str, text: str) -> Optional[int]:
+        exact = self._exact.get(kind, {}).get(text)
+        if exact is not None:
+            return exact
+        combined = self._combined.get(kind)
+        if combined is not None:
+            found = combined.fullmatch(text)
+            if found is not None:
+                return self._group_ids[found.lastgroup]
+        for compiled, definition_id in self._separate.get(kind, ()):
+            if compiled.fullmatch(text):
+                return definition_id
+        return None
+
+
+def outline_values(examples_json: Optional[str]) -> Dict[str, str]:
+    """Placeholder values of an outline's first example row (steps are matched with them)."""
+    for block in json.loads(examples_json) if examples_json else []:
+        table = block.get("table") or []
+        if len(table) > 1:
+            return dict(zip(table[0], table[1]))
+    return {}
+
+
+def render_outline_step(text: str, values: Dict[str, str]) -> str:
+    for name, value in values.items():
+        text = text.replace(f"<{name}>", value)
+    return text
+
+
+def resolve_scenario_steps(
+    matcher: StepMatcher, steps: Sequence[Tuple[str, str]]
+) -> List[Optional[int]]:
+    """
+    Definition ids of a scenario's (step_type, text) steps, in order. And/But/* steps take
+    the type of the step before them; a scenario starting with one has no type to match.
+    """
+    resolved, kind = [], None
+    for step_type, text in steps:
+        if step_type not in _CONTINUATIONS:
+            kind = step_type
+        resolved.append(matcher.match(kind, text) if kind else None)
+    return resolved
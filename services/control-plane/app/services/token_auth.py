@@ -0,0 +1,196 @@
+"""Token checks kept off the database hot path.
+
+Service tokens are verified by keyed-hash lookup with an in-process cache and batched
+last_used_at writes; access-token revocation state is cached per user.
+"""
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, Generic, Hashable, Optional, TypeVar
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.security import (
+    hash_service_token,
+    is_legacy_service_token_hash,
+    service_token_prefix,
+    verify_password,
+)
+from app.models.service_token import ServiceToken
+from app.models.user import User
+
+V = TypeVar("V")
+
+
+class TTLCache(Generic[V]):
+    """Small thread-safe mapping whose entries expire ttl seconds after being set."""
+
+    def __init__(
+        self, ttl: float, max_size: int = 1024, clock: Callable[[], float] = time.monotonic
+    ):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._entries: Dict[Hashable, tuple] = {}
+
+    def get(self, key: Hashable) -> Optional[V]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= self.clock():
+                del self._entries[key]
+                return None
+            return entry[0]
+
+    def set(self, key: Hashable, value: V) -> None:
+        with self._lock:
+            if len(self._entries) >= self.max_size and key not in self._entries:
+                now = self.clock()
+                self._entries = {k: e for k, e in self._entries.items() if e[1] > now}
+                if len(self._entries) >= self.max_size:
+                    self._entries.pop(next(iter(self._entries)))
+            self._entries[key] = (value, self.clock() + self.ttl)
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def discard_where(self, predicate: Callable[[V], bool]) -> None:
+        with self._lock:
+            self._entries = {k: e for k, e in self._entries.items() if not predicate(e[0])}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class LastUsedRecorder:
+    """Collects token uses in memory and writes last_used_at for all of them in one UPDATE."""
+
+    def __init__(self, flush_interval: float, clock: Callable[[], float] = time.monotonic):
+        self.flush_interval = flush_interval
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._pending: Dict[int, datetime] = {}
+        self._last_flush = clock()
+
+    def touch(self, token_id: int, db: Session) -> None:
+        """Record a use; flushes through db when flush_interval has passed since the last flush."""
+        with self._lock:
+            self._pending[token_id] = datetime.utcnow()
+            if self.clock() - self._last_flush < self.flush_interval:
+                return
+            pending, self._pending = self._pending, {}
+            self._last_flush = self.clock()
+        self.flush(db, pending)
+
+    def flush(self, db: Session, pending: Optional[Dict[int, datetime]] = None) -> int:
+        """Write pending uses (or the given ones); returns the number of tokens updated."""
+        if pending is None:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._last_flush = self.clock()
+        if not pending:
+            return 0
+        stmt = (
+            update(ServiceToken)
+            .where(ServiceToken.id == bindparam("token_id"))
+            .values(last_used_at=bindparam("used_at"))
+        )
+        rows = [{"token_id": tid, "used_at": used_at} for tid, used_at in pending.items()]
+        db.connection().execute(stmt, rows)
+        db.commit()
+        return len(rows)
+
+
+@dataclass(frozen=True)
+class ResolvedToken:
+    """What a verified service token grants: who it acts as, and until when."""
+
+    token_id: int
+    user_id: int
+    expires_at: Optional[datetime]
+
+
+token_cache: TTLCache[ResolvedToken] = TTLCache(settings.SERVICE_TOKEN_CACHE_TTL_SECONDS)
+last_used = LastUsedRecorder(settings.SERVICE_TOKEN_LAST_USED_FLUSH_SECONDS)
+
+
+def _expired(expires_at: Optional[datetime]) -> bool:
+    if expires_at is None:
+        return False
+    now = datetime.now(expires_at.tzinfo) if expires_at.tzinfo else datetime.utcnow()
+    return expires_at < now
+
+
+def _lookup(db: Session, token: str, token_hash: str) -> Optional[ServiceToken]:
+    """One indexed query on token_hash; legacy bcrypt rows are scanned (and upgraded) once."""
+    row = (
+        db.query(ServiceToken)
+        .filter(ServiceToken.token_hash == token_hash, ServiceToken.is_active.is_(True))
+        .first()
+    )
+    if row or service_token_prefix(token):
+        return row
+    legacy = (
+        db.query(ServiceToken)
+        .filter(ServiceToken.is_active.is_(True), ServiceToken.token_hash.like("$2%"))
+        .all()
+    )
+    for candidate in legacy:
+        if is_legacy_service_token_hash(candidate.token_hash) and verify_password(
+            token, candidate.token_hash
+        ):
+            # From now on this token is found by the indexed lookup
+            candidate.token_hash = token_hash
+            db.commit()
+            return candidate
+    return None
+
+
+def authenticate_service_token(db: Session, token: str) -> Optional[int]:
+    """Return the id of the user a valid, active, unexpired service token acts as."""
+    token_hash = hash_service_token(token)
+    resolved = token_cache.get(token_hash)
+    if resolved is None:
+        row = _lookup(db, token, token_hash)
+        if row is None:
+            return None
+        resolved = ResolvedToken(row.id, row.created_by_user_id, row.expires_at)
+        token_cache.set(token_hash, resolved)
+    if _expired(resolved.expires_at):
+        return None
+    last_used.touch(resolved.token_id, db)
+    return resolved.user_id
+
+
+def forget_service_token(token_id: int) -> None:
+    """Drop a token from this process's cache (on revocation)."""
+    token_cache.discard_where(lambda resolved: resolved.token_id == token_id)
+
+
+# user id -> (is_active, token_version)
+user_token_state: TTLCache[tuple] = TTLCache(settings.ACCESS_TOKEN_REVOCATION_TTL_SECONDS, 10000)
+
+
+def user_token_is_current(db: Session, user_id: int, token_version: int) -> bool:
+    """
+    True if the user is active and the token's version is the user's current one.
+
+    Bumping users.token_version (or deactivating the user) revokes every access token
+    issued before, within ACCESS_TOKEN_REVOCATION_TTL_SECONDS in each process.
+    """
+    state = user_token_state.get(user_id)
+    if state is None:
+        row = db.query(User.is_active, User.token_version).filter(User.id == user_id).first()
+        if row is None:
+            return False
+        state = (bool(row.is_active), row.token_version or 0)
+        user_token_state.set(user_id, state)
+    is_active, current_version = state
+    return is_active and token_version == current_version
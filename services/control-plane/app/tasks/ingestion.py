@@ -0,0 +1,67 @@
+"""Celery tasks for background feature ingestion."""
+from typing import List, Optional
+
+from celery import chord
+
+from app.celery_app import celery_app
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.services import feature_ingestion
+from app.services.feature_sources import iter_chunks
+
+
+@celery_app.task(name="ingest_features")
+def ingest_features(job_id: int) -> dict:
+    """
+    Read a job's source, then parse and store its files in parallel chunks.
+
+    Step definitions are indexed first. Each chunk is its own task, so parsing spreads
+    over the worker pool; the last step removes features whose file is gone, resolves
+    steps to their definitions and completes the job.
+    """
+    with SessionLocal() as db:
+        try:
+            source = feature_ingestion.load_sources(db, job_id)
+            feature_ingestion.store_step_definitions(db, job_id, source)
+        except Exception as e:
+            feature_ingestion.fail(db, job_id, str(e))
+            return {"job_id": job_id, "status": "failed"}
+    keep_paths = [path for path, _ in source.files] if source.complete else None
+    finish = finish_feature_ingestion.s(job_id, keep_paths, source.deleted)
+    chunks = list(iter_chunks(source.files, settings.FEATURE_INGEST_CHUNK_FILES))
+    if not chunks:
+        finish.apply_async(args=[[]])
+    else:
+        chord(ingest_feature_chunk.s(job_id, chunk) for chunk in chunks)(finish)
+    return {"job_id": job_id, "files": len(source.files), "chunks": len(chunks)}
+
+
+@celery_app.task(name="ingest_feature_chunk")
+def ingest_feature_chunk(job_id: int, files: List[List[str]]) -> dict:
+    """Parse and store one chunk of (path, content) pairs."""
+    with SessionLocal() as db:
+        try:
+            return feature_ingestion.ingest_files(db, job_id, files).to_dict()
+        except Exception as e:
+            feature_ingestion.fail(db, job_id, f"{type(e).__name__}: {e}")
+            raise
+
+
+@celery_app.task(name="finish_feature_ingestion")
+def finish_feature_ingestion(
+    results: List[dict],
+    job_id: int,
+    keep_paths: Optional[List[str]] = None,
+    deleted_paths: Optional[List[str]] = None,
+) -> None:
+    """Remove features whose file is gone and mark the job completed."""
+    with SessionLocal() as db:
+        try:
+            feature_ingestion.finish(db, job_id, keep_paths, deleted_paths or ())
+        except Exception as e:
+            feature_ingestion.fail(db, job_id, f"{type(e).__name__}: {e}")
+            raise
+
+
+def enqueue_ingestion(job_id: int) -> None:
+    ingest_features.delay(job_id)
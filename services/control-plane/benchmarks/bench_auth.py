@@ -0,0 +1,138 @@
+"""Benchmark authenticated GET /api/v1/runs: role-claim tokens vs tokens without claims.
+
+A token without claims (as issued before role claims) costs a user + roles lookup on every
+request; a claims token is authorized from the token itself, with the user's revocation
+state served from the in-process cache. SQLite round trips are nearly free, so by default
+each query is charged --latency-ms to stand in for a network hop to Postgres; point
+--database-url at a real database (with the schema migrated) to measure that instead.
+
+    python benchmarks/bench_auth.py --requests 2000 --latency-ms 0.5
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import create_engine, event  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from sqlalchemy.pool import NullPool  # noqa: E402
+
+import app.models  # noqa: E402,F401 - registers every table on Base.metadata
+from app.core.database import Base, async_database_url, get_async_db, get_db  # noqa: E402
+from app.core.security import create_access_token  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.organization import Organization  # noqa: E402
+from app.models.role import Role  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services import token_auth  # noqa: E402
+
+
+def _engines(database_url: str):
+    if database_url.startswith("sqlite"):
+        engine = create_engine(database_url, connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        # Requests may run on different event loops, so async connections are not pooled
+        return engine, create_async_engine(async_database_url(database_url), poolclass=NullPool)
+    return create_engine(database_url), create_async_engine(async_database_url(database_url))
+
+
+def _seed(session) -> User:
+    org = Organization(name="bench-org")
+    role = Role(name="bench-admin")
+    session.add_all([org, role])
+    session.commit()
+    user = User(
+        email="bench@example.com",
+        username="bench",
+        hashed_password="x",
+        organization_id=org.id,
+        is_active=True,
+    )
+    user.roles.append(role)
+    session.add(user)
+    session.commit()
+    return user
+
+
+def _measure(client: TestClient, token: str, requests: int, queries: list) -> tuple:
+    headers = {"Authorization": f"Bearer {token}"}
+    for _ in range(20):  # warm up (fills the revocation cache)
+        assert client.get("/api/v1/runs", headers=headers).status_code == 200
+    queries.clear()
+    start = time.perf_counter()
+    for _ in range(requests):
+        client.get("/api/v1/runs", headers=headers)
+    elapsed = time.perf_counter() - start
+    return requests / elapsed, len(queries) / requests
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, default=0.5, help="charged per query")
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    args = parser.parse_args()
+
+    database_url = args.database_url
+    if database_url is None:
+        database_url = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+    engine, async_engine = _engines(database_url)
+    SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+    queries: list = []
+
+    def _charge(conn, cursor, statement, *rest):
+        queries.append(statement)
+        if args.latency_ms:
+            time.sleep(args.latency_ms / 1000)
+
+    event.listen(engine, "before_cursor_execute", _charge)
+    event.listen(async_engine.sync_engine, "before_cursor_execute", _charge)
+
+    def _get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def _get_async_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+
+    with SessionLocal() as session:
+        user = _seed(session)
+        claims = {
+            "sub": str(user.id),
+            "org": user.organization_id,
+            "roles": [role.name for role in user.roles],
+            "ver": user.token_version,
+        }
+        tokens = {
+            "no claims": create_access_token(data={"sub": str(user.id)}),
+            "role claims": create_access_token(data=claims),
+        }
+
+    app.dependency_overrides[get_db] = _get_db
+    app.dependency_overrides[get_async_db] = _get_async_db
+    token_auth.user_token_state.clear()
+    try:
+        client = TestClient(app)
+        results = {name: _measure(client, t, args.requests, queries) for name, t in tokens.items()}
+    finally:
+        app.dependency_overrides.clear()
+
+    print(f"GET /api/v1/runs x {args.requests}, {args.latency_ms} ms per query")
+    for name, (rate, per_request) in results.items():
+        print(f"  {name:<12} {rate:9.1f} req/s  {per_request:.2f} queries/request")
+    speedup = results["role claims"][0] / results["no claims"][0]
+    print(f"  speedup      {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
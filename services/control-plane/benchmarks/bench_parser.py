@@ -0,0 +1,250 @@
+"""Benchmark GherkinParser.parse_feature_content against the parser it replaced.
+
+The corpus is generated (features with backgrounds, rules, tagged scenarios, outlines with
+several Examples blocks, data tables, doc strings and comments) unless --corpus points at a
+directory of .feature files. Both parsers hash each file the same way, so the numbers
+compare parsing alone. Exits with status 1 if the speedup is below --target.
+
+    python benchmarks/bench_parser.py --features 2000
+    python benchmarks/bench_parser.py --corpus ../../examples
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.bdd_parser import GherkinParser, feature_content_hash  # noqa: E402
+
+WORDS = (
+    "user cart order payment invoice account search result page basket item price "
+    "discount code address shipping delivery receipt email password session"
+).split()
+
+
+def _words(rng: random.Random, count: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+
+def _table(rng: random.Random, indent: str, rows: int) -> List[str]:
+    return [
+        indent + "| " + " | ".join(_words(rng, 1) for _ in range(3)) + " |"
+        for _ in range(rows + 1)
+    ]
+
+
+def generate_feature(rng: random.Random, index: int) -> str:
+    """One feature file of roughly 40-120 lines."""
+    lines = [
+        "# Generated for the parser benchmark",
+        f"@area{index % 7} @team{index % 3}",
+        f"Feature: {_words(rng, 3)} {index}",
+        f"  As a {_words(rng, 1)} I want {_words(rng, 4)}",
+        f"  so that {_words(rng, 5)}.",
+        "",
+        "  Background:",
+        f"    Given a {_words(rng, 2)}",
+        f"    And the {_words(rng, 3)}",
+        "",
+    ]
+    indent = "  "
+    for number in range(rng.randint(4, 10)):
+        if number == 3:
+            lines += [f"  Rule: {_words(rng, 3)}", ""]
+            indent = "    "
+        lines.append(f"{indent}@{_words(rng, 1)}")
+        outline = rng.random() < 0.3
+        lines.append(f"{indent}{'Scenario Outline' if outline else 'Scenario'}: {_words(rng, 4)}")
+        for keyword in ("Given", "And", "When", "Then", "But")[: rng.randint(3, 5)]:
+            lines.append(f"{indent}  {keyword} the {_words(rng, 5)} is \"<value>\"")
+            if rng.random() < 0.15:
+                lines += _table(rng, indent + "    ", rng.randint(1, 4))
+            elif rng.random() < 0.05:
+                lines += [f'{indent}    """', f"{indent}    {_words(rng, 8)}", f'{indent}    """']
+        if outline:
+            for _ in range(rng.randint(1, 2)):
+                lines += ["", f"{indent}  Examples: {_words(rng, 1)}"]
+                lines += _table(rng, indent + "    ", rng.randint(2, 6))
+        lines.append("")
+    return "\n".join(lines)
+
+
+def legacy_parse(content: str, file_path: str = "") -> Optional[Dict]:
+    """The line-by-line parser this module replaced (baseline for the comparison)."""
+    lines = content.split("\n")
+    feature = {
+        "file_path": file_path,
+        "content_hash": feature_content_hash(content),
+        "name": None,
+        "description": [],
+        "tags": [],
+        "scenarios": [],
+    }
+
+    current_scenario = None
+    _current_step = None
+    in_background = False
+    in_examples = False
+    examples_table = []
+
+    i = 0
+    while i < len(lines):
+        line = lines[i].strip()
+
+        # Feature line
+        if line.startswith("Feature:"):
+            feature["name"] = line.replace("Feature:", "").strip()
+            i += 1
+            # Collect description until Scenario/Background/Tag
+            while i < len(lines):
+                desc_line = lines[i].strip()
+                if desc_line.startswith(("@", "Scenario", "Background", "Feature")):
+                    break
+                if desc_line and not desc_line.startswith("#"):
+                    feature["description"].append(desc_line)
+                i += 1
+            feature["description"] = "\n".join(feature["description"]).strip()
+            continue
+
+        # Tags
+        if line.startswith("@"):
+            tags = re.findall(r"@\w+", line)
+            if current_scenario:
+                current_scenario["tags"].extend(tags)
+            else:
+                feature["tags"].extend(tags)
+            i += 1
+            continue
+
+        # Background
+        if line.startswith("Background:"):
+            in_background = True
+            i += 1
+            continue
+
+        # Scenario/Scenario Outline
+        if line.startswith("Scenario:") or line.startswith("Scenario Outline:"):
+            if current_scenario:
+                feature["scenarios"].append(current_scenario)
+            current_scenario = {
+                "name": line.split(":", 1)[1].strip(),
+                "type": "scenario_outline" if "Outline" in line else "scenario",
+                "tags": [],
+                "steps": [],
+                "examples": [],
+            }
+            in_background = False  # noqa: F841 (state for step parsing)
+            in_examples = False
+            i += 1
+            continue
+
+        # Examples table
+        if line.startswith("Examples:"):
+            in_examples = True
+            examples_table = []
+            i += 1
+            # Read header
+            if i < len(lines):
+                header_line = lines[i].strip()
+                if "|" in header_line:
+                    examples_table.append([cell.strip() for cell in header_line.split("|")[1:-1]])
+                    i += 1
+            continue
+
+        # Examples table rows
+        if in_examples and "|" in line:
+            row = [cell.strip() for cell in line.split("|")[1:-1]]
+            if row and any(cell for cell in row):  # Non-empty row
+                examples_table.append(row)
+            i += 1
+            continue
+
+        # Step (Given/When/Then/And/But)
+        step_match = re.match(r"^(Given|When|Then|And|But)\s+(.+)$", line, re.IGNORECASE)
+        if step_match:
+            step_type = step_match.group(1).lower()
+            step_text = step_match.group(2).strip()
+
+            # Check for data table
+            step_data_table = None
+            if i + 1 < len(lines) and lines[i + 1].strip().startswith("|"):
+                step_data_table = []
+                j = i + 1
+                while j < len(lines) and "|" in lines[j]:
+                    row = [cell.strip() for cell in lines[j].split("|")[1:-1]]
+                    if row:
+                        step_data_table.append(row)
+                    j += 1
+                i = j - 1
+
+            step = {
+                "type": step_type,
+                "text": step_text,
+                "data_table": step_data_table,
+            }
+
+            if current_scenario:
+                current_scenario["steps"].append(step)
+            i += 1
+            continue
+
+        i += 1
+
+    # Add last scenario
+    if current_scenario:
+        if examples_table and len(examples_table) > 1:
+            current_scenario["examples"] = examples_table
+        feature["scenarios"].append(current_scenario)
+
+    return feature if feature["name"] else None
+
+
+def _load_corpus(args) -> List[str]:
+    if args.corpus:
+        paths = sorted(Path(args.corpus).rglob("*.feature"))
+        return [path.read_text(encoding="utf-8", errors="replace") for path in paths]
+    rng = random.Random(args.seed)
+    return [generate_feature(rng, index) for index in range(args.features)]
+
+
+def _measure(parse, corpus: List[str], rounds: int) -> float:
+    """Best files/second over rounds."""
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for content in corpus:
+            parse(content)
+        best = min(best, time.perf_counter() - start)
+    return len(corpus) / best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--features", type=int, default=2000, help="generated corpus size")
+    parser.add_argument("--corpus", help="directory of .feature files to parse instead")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--target", type=float, default=5.0, help="required speedup")
+    args = parser.parse_args()
+
+    corpus = _load_corpus(args)
+    lines = sum(content.count("\n") + 1 for content in corpus)
+    print(f"{len(corpus)} files, {lines} lines, {sum(map(len, corpus)) / 1e6:.1f} MB")
+    legacy = _measure(legacy_parse, corpus, args.rounds)
+    current = _measure(GherkinParser.parse_feature_content, corpus, args.rounds)
+    print(f"{'legacy':>8}: {legacy:10.0f} files/s  {legacy * lines / len(corpus):12.0f} lines/s")
+    print(f"{'current':>8}: {current:10.0f} files/s  {current * lines / len(corpus):12.0f} lines/s")
+    speedup = current / legacy
+    print(f"speedup: {speedup:.1f}x (target {args.target:.1f}x)")
+    if speedup < args.target:
+        print("below target")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
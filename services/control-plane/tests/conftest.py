@@ -9,3 +9,59 @@ from app.main import app
 def client() -> TestClient:
     """FastAPI test client (lifespan runs on enter)."""
     return TestClient(app)
+
+
+@pytest.fixture
+def database_url(tmp_path) -> str:
+    """A fresh SQLite database file, shared by the sync and async sessions of a test."""
+    return f"sqlite:///{tmp_path / 'control-plane.db'}"
+
+
+@pytest.fixture
+def db_session(database_url):
+    """Session on a fresh SQLite database with every table created."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+
+    import app.models  # noqa: F401 - registers every table on Base.metadata
+    from app.core.database import Base
+
+    engine = create_engine(
+        database_url, connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine, autocommit=False, autoflush=False)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+@pytest.fixture
+def api_client(db_session, database_url):
+    """Test client whose requests use db_session's database and run as an admin user."""
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from sqlalchemy.pool import NullPool
+
+    from app.core.database import async_database_url, get_async_db, get_db
+    from app.core.dependencies import CurrentUser, get_current_user
+
+    # NullPool: each request may run on its own event loop, so connections are not reused
+    async_engine = create_async_engine(async_database_url(database_url), poolclass=NullPool)
+    async_session_factory = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    async def get_test_async_db():
+        async with async_session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = lambda: db_session
+    app.dependency_overrides[get_async_db] = get_test_async_db
+    app.dependency_overrides[get_current_user] = lambda: CurrentUser(
+        id=1, organization_id=1, role_names=frozenset({"admin"})
+    )
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
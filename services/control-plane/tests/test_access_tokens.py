@@ -0,0 +1,112 @@
+"""Tests for stateless access tokens (role claims, cached revocation checks)."""
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import event
+
+from app.core.dependencies import CurrentUser, get_current_user, require_role
+from app.core.security import create_access_token, get_password_hash
+from app.models.organization import Organization
+from app.models.role import Role
+from app.models.user import User
+from app.services import token_auth
+
+
+@pytest.fixture(autouse=True)
+def fresh_token_state():
+    token_auth.user_token_state.clear()
+
+
+@pytest.fixture
+def user(db_session):
+    org = Organization(name="acme")
+    admin = Role(name="admin")
+    db_session.add_all([org, admin])
+    db_session.commit()
+    user = User(
+        email="dev@example.com",
+        username="dev",
+        hashed_password=get_password_hash("secret"),
+        organization_id=org.id,
+        is_active=True,
+    )
+    user.roles.append(admin)
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+
+def _auth(db_session, token):
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    return get_current_user(credentials, db_session)
+
+
+def _claims_token(user, **overrides):
+    claims = {"sub": str(user.id), "org": user.organization_id, "roles": ["admin"], "ver": 0}
+    claims.update(overrides)
+    return create_access_token(data=claims)
+
+
+def _record_queries(db_session):
+    statements = []
+    event.listen(
+        db_session.get_bind(),
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+    return statements
+
+
+def test_login_token_carries_roles_and_is_authorized_without_queries(
+    api_client, db_session, user
+):
+    """Login embeds org and roles; once the user's state is cached, no query is needed."""
+    response = api_client.post("/api/v1/auth/login", data={"username": "dev", "password": "secret"})
+    assert response.status_code == 200
+    token = response.json()["access_token"]
+
+    expected = CurrentUser(
+        id=user.id, organization_id=user.organization_id, role_names=frozenset({"admin"})
+    )
+    assert _auth(db_session, token) == expected
+
+    statements = _record_queries(db_session)
+    assert _auth(db_session, token) == expected
+    assert statements == []
+
+
+def test_legacy_token_without_claims_loads_user_and_roles(db_session, user):
+    """Tokens issued before role claims still authenticate, reading roles from the database."""
+    token = create_access_token(data={"sub": str(user.id)})
+    assert _auth(db_session, token).role_names == frozenset({"admin"})
+
+
+def test_version_bump_and_deactivation_revoke_tokens(db_session, user):
+    """A bumped token_version or deactivated user is rejected once the cached state expires."""
+    token = _claims_token(user)
+    assert _auth(db_session, token).id == user.id
+
+    user.token_version = 1
+    db_session.commit()
+    token_auth.user_token_state.clear()
+    with pytest.raises(HTTPException) as exc_info:
+        _auth(db_session, token)
+    assert exc_info.value.status_code == 401
+    assert _auth(db_session, _claims_token(user, ver=1)).id == user.id
+
+    user.is_active = False
+    db_session.commit()
+    token_auth.user_token_state.clear()
+    with pytest.raises(HTTPException):
+        _auth(db_session, _claims_token(user, ver=1))
+
+
+def test_require_role_checks_claimed_roles():
+    """require_role authorizes from the role names alone."""
+    checker = require_role("admin")
+    admin = CurrentUser(id=1, organization_id=1, role_names=frozenset({"admin"}))
+    assert checker(admin) is admin
+    with pytest.raises(HTTPException) as exc_info:
+        checker(CurrentUser(id=2, organization_id=1))
+    assert exc_info.value.status_code == 403
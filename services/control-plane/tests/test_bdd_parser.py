@@ -45,13 +45,76 @@ def test_parse_feature_content_extracts_one_scenario():
 
 
 def test_parse_feature_content_extracts_tags():
-    """Parser extracts tags (before Scenario they go to feature tags)."""
+    """Tags belong to the element that follows them (here the scenario)."""
     result = GherkinParser.parse_feature_content(FEATURE_WITH_TAGS)
     assert result is not None
-    assert "tags" in result
-    assert any("smoke" in t for t in result["tags"])
-    assert any("search" in t for t in result["tags"])
+    assert result["tags"] == []
     assert len(result["scenarios"]) == 1
+    assert result["scenarios"][0]["tags"] == ["@smoke", "@search"]
+
+
+FULL_FEATURE = """# language: en
+@checkout
+Feature: Checkout
+  Shoppers pay for their cart.
+
+  Background:
+    Given a signed-in shopper
+
+  @smoke
+  Scenario: Pay by card
+    Given a cart with:
+      | item | price |
+      | a\\|b | 2     |
+    Then the receipt says:
+      \"\"\"text
+      Paid 3.50
+        indented
+      \"\"\"
+
+  Rule: Discounts
+    Background:
+      Given a discount code
+
+    Scenario Outline: Apply <code>
+      When they enter <code>
+
+      @valid
+      Examples: Valid
+        | code |
+        | A10  |
+
+      Examples: Invalid
+        | code |
+        | ZZZ  |
+"""
+
+
+def test_parse_feature_content_reads_the_full_grammar_with_line_numbers():
+    """Backgrounds, rules, data tables, doc strings and every Examples block are kept."""
+    result = GherkinParser.parse_feature_content(FULL_FEATURE)
+    assert (result["name"], result["line_number"]) == ("Checkout", 3)
+    assert result["tags"] == ["@checkout"]
+    assert result["description"] == "Shoppers pay for their cart."
+    assert result["background"]["steps"][0]["line_number"] == 7
+    assert result["rules"][0]["background"]["steps"][0]["text"] == "a discount code"
+
+    card, outline = result["scenarios"]
+    assert (card["line_number"], card["tags"], card["rule"]) == (10, ["@smoke"], None)
+    given, then = card["steps"]
+    assert (given["keyword"], given["line_number"]) == ("Given", 11)
+    assert given["data_table"] == [["item", "price"], ["a|b", "2"]]
+    assert then["doc_string"] == {"content": "Paid 3.50\n  indented", "media_type": "text"}
+
+    assert (outline["type"], outline["rule"], outline["line_number"]) == (
+        "scenario_outline",
+        "Discounts",
+        24,
+    )
+    assert [(e["name"], e["tags"], e["line_number"], e["table"]) for e in outline["examples"]] == [
+        ("Valid", ["@valid"], 28, [["code"], ["A10"]]),
+        ("Invalid", [], 32, [["code"], ["ZZZ"]]),
+    ]
 
 
 def test_parse_feature_content_empty_returns_none():
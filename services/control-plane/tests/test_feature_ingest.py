@@ -0,0 +1,161 @@
+"""Tests for incremental, bulk feature ingestion."""
+import json
+
+from sqlalchemy import event
+
+from app.models.feature import Feature, FeatureIngestionJob, Scenario, Step
+from app.models.organization import Organization
+from app.models.project import Project
+from app.repositories.feature import FeatureRepository
+from app.services import feature_ingestion
+from app.services.bdd_parser import GherkinParser
+
+CHECKOUT = """
+Feature: Checkout
+
+  Scenario: Pay by card
+    Given a cart with 2 items
+    When I pay by card
+    Then the order is placed
+
+  Scenario: Empty cart
+    Given an empty cart
+    Then I cannot check out
+"""
+
+LOGIN = """
+Feature: Login
+
+  Scenario: Valid password
+    Given a registered user
+    When they log in
+    Then they see the dashboard
+"""
+
+
+def _parse(**files):
+    return [GherkinParser.parse_feature_content(content, path) for path, content in files.items()]
+
+
+def _project(db_session):
+    db_session.add(Organization(id=1, name="acme"))
+    project = Project(
+        name="shop", repo_url="https://git/shop", repo_auth_method="token", organization_id=1
+    )
+    db_session.add(project)
+    db_session.commit()
+    return project
+
+
+def test_unchanged_features_are_skipped_and_changed_ones_rewritten(db_session):
+    """Re-ingesting identical content writes nothing; an edited file replaces its tree."""
+    project = _project(db_session)
+    repo = FeatureRepository(db_session)
+
+    stats = repo.store(project.id, _parse(**{"checkout.feature": CHECKOUT, "login.feature": LOGIN}))
+    assert (stats.added, stats.updated, stats.unchanged) == (2, 0, 0)
+    checkout = db_session.query(Feature).filter(Feature.file_path == "checkout.feature").one()
+    steps = {
+        s.name: [step.text for step in sorted(s.steps, key=lambda step: step.order)]
+        for s in checkout.scenarios
+    }
+    assert steps == {
+        "Pay by card": ["a cart with 2 items", "I pay by card", "the order is placed"],
+        "Empty cart": ["an empty cart", "I cannot check out"],
+    }
+
+    writes = []
+    event.listen(
+        db_session.get_bind(),
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: writes.append(statement)
+        if not statement.lstrip().upper().startswith("SELECT")
+        else None,
+    )
+    stats = repo.store(project.id, _parse(**{"checkout.feature": CHECKOUT, "login.feature": LOGIN}))
+    assert (stats.added, stats.updated, stats.unchanged) == (0, 0, 2)
+    assert writes == []
+
+    edited = LOGIN.replace("they see the dashboard", "they see their orders")
+    stats = repo.store(project.id, _parse(**{"login.feature": edited}))
+    assert (stats.updated, stats.unchanged, stats.removed) == (1, 0, 0)
+    db_session.expire_all()
+    assert db_session.query(Feature).count() == 2
+    assert db_session.query(Scenario).count() == 3
+    texts = [step.text for step in db_session.query(Step).order_by(Step.id)]
+    assert "they see their orders" in texts and "they see the dashboard" not in texts
+
+
+def test_full_scan_prunes_features_whose_file_is_gone(db_session):
+    """With prune, stored features missing from the scan are deleted with their trees."""
+    project = _project(db_session)
+    repo = FeatureRepository(db_session)
+    repo.store(project.id, _parse(**{"checkout.feature": CHECKOUT, "login.feature": LOGIN}))
+
+    stats = repo.store(project.id, _parse(**{"login.feature": LOGIN}), prune=True)
+
+    assert (stats.unchanged, stats.removed) == (1, 1)
+    assert [f.file_path for f in db_session.query(Feature)] == ["login.feature"]
+    assert db_session.query(Scenario).count() == 1
+    assert db_session.query(Step).count() == 3
+
+
+def test_unchanged_files_of_a_chunk_are_not_parsed(db_session, monkeypatch):
+    """Content hashes are compared before parsing; only changed files reach the parser."""
+    project = _project(db_session)
+    FeatureRepository(db_session).store(
+        project.id, _parse(**{"checkout.feature": CHECKOUT, "login.feature": LOGIN})
+    )
+    job = FeatureIngestionJob(project_id=project.id, source_type="git", source="https://git/shop")
+    db_session.add(job)
+    db_session.commit()
+    parsed = []
+
+    def parse(content, path):
+        parsed.append(path)
+        return GherkinParser.parse_feature_content(content, path)
+
+    monkeypatch.setattr(feature_ingestion, "parse_feature_cached", parse)
+    edited = LOGIN.replace("they see the dashboard", "they see their orders")
+    files = [("checkout.feature", CHECKOUT), ("login.feature", edited)]
+    stats = feature_ingestion.ingest_files(db_session, job.id, files)
+
+    assert parsed == ["login.feature"]
+    assert (stats.updated, stats.unchanged) == (1, 1)
+
+
+def test_ingest_endpoint_reports_counts(api_client, db_session):
+    """The content ingestion endpoint returns what changed."""
+    project = _project(db_session)
+    url = f"/api/v1/features/projects/{project.id}/ingest-features-from-content"
+    body = {"features": [{"file_path": "login.feature", "content": LOGIN}]}
+
+    assert api_client.post(url, json=body).json()["added"] == 1
+    again = api_client.post(url, json=body).json()
+    assert (again["features_count"], again["unchanged"]) == (1, 1)
+
+
+def test_backgrounds_rules_and_line_numbers_are_stored(db_session):
+    """Backgrounds become "background" scenarios in file order; rules and lines are kept."""
+    project = _project(db_session)
+    content = """Feature: Checkout
+  Background:
+    Given a signed-in shopper
+
+  Rule: Discounts
+    Scenario: Apply a code
+      When they enter "A10"
+        \"\"\"
+        receipt
+        \"\"\"
+"""
+    FeatureRepository(db_session).store(project.id, _parse(**{"checkout.feature": content}))
+
+    scenarios = db_session.query(Scenario).order_by(Scenario.id).all()
+    assert [(s.scenario_type, s.rule, s.line_number) for s in scenarios] == [
+        ("background", None, 2),
+        ("scenario", "Discounts", 6),
+    ]
+    step = scenarios[1].steps[0]
+    assert (step.keyword, step.text, step.line_number) == ("When", 'they enter "A10"', 7)
+    assert json.loads(step.doc_string) == {"content": "receipt", "media_type": None}
@@ -0,0 +1,76 @@
+"""Tests for scanning directory trees for feature files."""
+from app.services import feature_scanner
+from app.services.bdd_parser import GherkinParser, parse_cache
+from app.services.feature_scanner import iter_feature_files, parse_files, scan_repository
+
+LOGIN = """Feature: Login
+  Scenario: Valid password
+    Given a registered user
+"""
+
+
+def _tree(root, files):
+    for name, content in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+
+
+def test_ignored_directories_and_gitignored_files_are_not_walked(tmp_path):
+    """Dependency/VCS directories are pruned and each .gitignore applies below its directory."""
+    _tree(
+        tmp_path,
+        {
+            ".gitignore": "build/\n*.draft.feature\n",
+            "features/login.feature": LOGIN,
+            "features/wip.draft.feature": LOGIN,
+            "build/login.feature": LOGIN,
+            "node_modules/pkg/login.feature": LOGIN,
+            ".git/login.feature": LOGIN,
+            "web/.gitignore": "generated/\n",
+            "web/features/cart.feature": LOGIN,
+            "web/generated/cart.feature": LOGIN,
+            "generated/kept.feature": LOGIN,
+        },
+    )
+
+    assert sorted(relative for relative, _ in iter_feature_files(tmp_path)) == [
+        "features/login.feature",
+        "generated/kept.feature",
+        "web/features/cart.feature",
+    ]
+
+
+def test_repeated_scans_are_served_from_the_parse_cache(tmp_path, monkeypatch):
+    """A second scan of the same content parses nothing; paths are each file's own."""
+    parse_cache.clear()
+    _tree(tmp_path, {"a/login.feature": LOGIN, "b/login.feature": LOGIN, "notes.feature": "x"})
+    parses = []
+    parse = GherkinParser.parse_feature_content
+    monkeypatch.setattr(
+        GherkinParser,
+        "parse_feature_content",
+        staticmethod(lambda *args, **kwargs: parses.append(1) or parse(*args, **kwargs)),
+    )
+
+    first = scan_repository(tmp_path, workers=1)
+    assert sorted(f["file_path"] for f in first) == ["a/login.feature", "b/login.feature"]
+    assert len(parses) == 2  # Identical files once, and notes.feature (no feature) once
+
+    second = scan_repository(tmp_path, workers=1)
+    assert len(parses) == 2
+    assert sorted(f["file_path"] for f in second) == ["a/login.feature", "b/login.feature"]
+
+
+def test_many_uncached_files_are_parsed_in_worker_processes(monkeypatch):
+    """Above PARALLEL_MIN_FILES the parse runs in a process pool with the same results."""
+    parse_cache.clear()
+    monkeypatch.setattr(feature_scanner, "PARALLEL_MIN_FILES", 2)
+    monkeypatch.setattr(feature_scanner, "PARSE_BATCH_FILES", 2)
+    files = [(f"f{i}.feature", LOGIN.replace("Login", f"Login {i}")) for i in range(5)]
+
+    features = parse_files(files, workers=2)
+
+    assert [(f["file_path"], f["name"]) for f in features] == [
+        (f"f{i}.feature", f"Login {i}") for i in range(5)
+    ]
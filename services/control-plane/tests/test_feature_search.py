@@ -0,0 +1,127 @@
+"""Tests for scenario search (in-memory index on SQLite; the Postgres query's shape)."""
+import asyncio
+
+from sqlalchemy.dialects import postgresql
+
+from app.models.feature import ScenarioTag
+from app.models.organization import Organization
+from app.models.project import Project
+from app.repositories.feature import FeatureRepository
+from app.services.bdd_parser import GherkinParser
+from app.services.feature_search import PostgresFeatureSearch, parse_tags
+
+PAYMENTS = """@payments
+Feature: Payments
+  Background:
+    Given I log in as "admin"
+
+  Scenario: Pay by card
+    Given I log in as "shopper"
+    When I pay by card
+
+  @slow
+  Scenario: Refund
+    When I refund the order
+
+  Rule: Vouchers
+    Scenario Outline: Redeem <code>
+      Given I log in as "<user>"
+      When I redeem "<code>"
+
+      @smoke
+      Examples:
+        | user | code |
+        | ann  | A10  |
+"""
+SEARCH = """Feature: Search
+  Scenario: By name
+    Given I log in as "shopper"
+    When I search for "pytest"
+"""
+
+
+def _ingest(db_session, files):
+    db_session.add(Organization(id=1, name="acme"))
+    project = Project(
+        name="shop", repo_url="https://git/shop", repo_auth_method="token", organization_id=1
+    )
+    db_session.add(project)
+    db_session.commit()
+    parsed = [GherkinParser.parse_feature_content(content, path) for path, content in files]
+    FeatureRepository(db_session).store(project.id, parsed)
+    return project
+
+
+def test_tags_are_normalized_with_inherited_ones(db_session):
+    """scenario_tags holds feature, rule, scenario and Examples tags (not for backgrounds)."""
+    _ingest(db_session, [("payments.feature", PAYMENTS)])
+    tags = {}
+    for row in db_session.query(ScenarioTag).order_by(ScenarioTag.id):
+        tags.setdefault(row.scenario_id, []).append(row.tag)
+    assert sorted(tags.values()) == [["@payments"], ["@payments", "@slow"], ["@payments", "@smoke"]]
+    assert parse_tags("payments, @slow payments") == ["@payments", "@slow"]
+
+
+def test_search_by_step_words_and_tags(api_client, db_session):
+    """Scenarios need every word in one step (or their name) and every tag; steps are listed."""
+    project = _ingest(db_session, [("payments.feature", PAYMENTS), ("search.feature", SEARCH)])
+    url = f"/api/v1/features/projects/{project.id}/features/search"
+
+    hits = api_client.get(url, params={"q": "I log in as", "tags": "@payments"}).json()
+    assert [(h["name"], h["feature"]["file_path"]) for h in hits] == [
+        ("Pay by card", "payments.feature"),
+        ("Redeem <code>", "payments.feature"),
+    ]
+    assert [(s["keyword"], s["text"], s["line_number"]) for s in hits[0]["matched_steps"]] == [
+        ("Given", 'I log in as "shopper"', 7)
+    ]
+    assert hits[1]["rule"] == "Vouchers" and hits[1]["tags"] == ["@payments", "@smoke"]
+
+    assert [h["name"] for h in api_client.get(url, params={"q": "log shopper"}).json()] == [
+        "Pay by card",
+        "By name",
+    ]
+    assert [h["name"] for h in api_client.get(url, params={"tags": "smoke"}).json()] == [
+        "Redeem <code>"
+    ]
+    assert [h["name"] for h in api_client.get(url, params={"q": "refund"}).json()] == ["Refund"]
+    assert api_client.get(url, params={"q": "admin"}).json() == []  # Background steps
+
+    first = api_client.get(url, params={"q": "log", "limit": 2})
+    rest = api_client.get(url, params={"q": "log", "cursor": first.headers["X-Next-Cursor"]})
+    assert [h["name"] for h in first.json() + rest.json()] == [
+        "Pay by card",
+        "Redeem <code>",
+        "By name",
+    ]
+    assert "X-Next-Cursor" not in rest.headers
+
+
+def test_search_index_follows_reingestion(api_client, db_session):
+    """After a feature is rewritten, searches see its new steps."""
+    project = _ingest(db_session, [("search.feature", SEARCH)])
+    url = f"/api/v1/features/projects/{project.id}/features/search"
+    assert len(api_client.get(url, params={"q": "pytest"}).json()) == 1
+
+    edited = GherkinParser.parse_feature_content(SEARCH.replace("pytest", "nox"), "search.feature")
+    FeatureRepository(db_session).store(project.id, [edited])
+
+    assert api_client.get(url, params={"q": "pytest"}).json() == []
+    assert len(api_client.get(url, params={"q": "nox"}).json()) == 1
+
+
+def test_postgres_search_uses_the_indexed_expressions():
+    """The Postgres query matches the expression indexes: to_tsvector('english', column)."""
+    statements = []
+
+    class RecordingSession:
+        async def scalars(self, query):
+            statements.append(query)
+            return type("Result", (), {"all": lambda self: []})()
+
+    asyncio.run(PostgresFeatureSearch(RecordingSession()).search(1, "log in", ["@a"], 0, 10))
+
+    sql = str(statements[0].compile(dialect=postgresql.dialect()))
+    assert "to_tsvector('english', steps.text) @@ plainto_tsquery('english'," in sql
+    assert "to_tsvector('english', scenarios.name)" in sql
+    assert "scenario_tags.tag" in sql
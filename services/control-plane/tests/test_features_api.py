@@ -0,0 +1,88 @@
+"""Tests for feature listing: eager-loaded pages, cursors and summaries."""
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.models.feature import Feature, Scenario, Step
+from app.models.organization import Organization
+from app.models.project import Project
+
+
+def _project(db_session, feature_count):
+    db_session.add(Organization(id=1, name="acme"))
+    project = Project(
+        name="shop", repo_url="https://git/shop", repo_auth_method="token", organization_id=1
+    )
+    db_session.add(project)
+    db_session.commit()
+    for f in range(feature_count):
+        feature = Feature(project_id=project.id, name=f"F{f}", file_path=f"f{f}.feature")
+        for s in range(2):
+            scenario = Scenario(name=f"S{s}")
+            # Stored out of order; responses list steps by their order
+            scenario.steps = [
+                Step(step_type="then", keyword="Then", text="third", order=3),
+                Step(step_type="given", keyword="Given", text="first", order=1),
+                Step(step_type="when", keyword="When", text="second", order=2),
+            ]
+            feature.scenarios.append(scenario)
+        db_session.add(feature)
+    db_session.commit()
+    return project
+
+
+@contextmanager
+def _queries():
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(Engine, "before_cursor_execute", record)
+
+
+def test_query_count_does_not_grow_with_features(api_client, db_session):
+    """A page costs the same handful of queries for 3 features as for 30."""
+    counts = []
+    for feature_count in (3, 30):
+        db_session.query(Step).delete()
+        db_session.query(Scenario).delete()
+        db_session.query(Feature).delete()
+        db_session.query(Project).delete()
+        db_session.query(Organization).delete()
+        db_session.commit()
+        project = _project(db_session, feature_count)
+        with _queries() as statements:
+            response = api_client.get(f"/api/v1/features/projects/{project.id}/features")
+        assert len(response.json()) == feature_count
+        counts.append(len(statements))
+    assert counts[0] == counts[1]
+
+    scenario = response.json()[0]["scenarios"][0]
+    assert [step["text"] for step in scenario["steps"]] == ["first", "second", "third"]
+
+
+def test_cursor_pagination_and_summaries(api_client, db_session):
+    """X-Next-Cursor walks all pages; summaries carry counts and the tree is fetched per feature."""
+    project = _project(db_session, 5)
+    url = f"/api/v1/features/projects/{project.id}/features"
+
+    names, cursor = [], 0
+    while cursor is not None:
+        response = api_client.get(url, params={"cursor": cursor, "limit": 2, "view": "summary"})
+        names += [feature["name"] for feature in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+    assert names == ["F0", "F1", "F2", "F3", "F4"]
+
+    summary = api_client.get(url, params={"view": "summary"}).json()[0]
+    assert (summary["scenario_count"], summary["step_count"]) == (2, 6)
+    assert "scenarios" not in summary
+
+    tree = api_client.get(f"{url}/{summary['id']}").json()
+    assert [s["name"] for s in tree["scenarios"]] == ["S0", "S1"]
+    assert api_client.get(f"{url}/9999").status_code == 404
@@ -0,0 +1,227 @@
+"""Tests for background feature ingestion jobs (archive upload -> Celery chunks -> counts)."""
+import io
+import subprocess
+import tarfile
+import zipfile
+
+import boto3
+import pytest
+from moto import mock_aws
+from sqlalchemy.orm import sessionmaker
+
+from app.celery_app import celery_app
+from app.core.config import settings
+from app.models.feature import Feature, FeatureIngestionJob
+from app.models.organization import Organization
+from app.models.project import Project
+from app.services.feature_sources import read_archive_features
+from app.tasks import ingestion
+
+LOGIN = """Feature: Login
+  Scenario: Valid password
+    Given a registered user
+    Then they see the dashboard
+"""
+SEARCH = """Feature: Search
+  Scenario: By name
+    When I search for "pytest"
+    Then I see results
+"""
+
+
+def _tar_gz(files):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for name, content in files.items():
+            data = content.encode()
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+def test_archives_yield_feature_files_relative_to_their_root(tmp_path):
+    """Only .feature members are read; strip_components drops the archive's top directory."""
+    tar_path = tmp_path / "repo.tgz"
+    tar_path.write_bytes(
+        _tar_gz(
+            {
+                "shop-1a2b/features/login.feature": LOGIN,
+                "shop-1a2b/README.md": "# shop",
+                "shop-1a2b/../escape.feature": SEARCH,
+            }
+        )
+    )
+    assert read_archive_features(tar_path, strip_components=1) == [
+        ("features/login.feature", LOGIN)
+    ]
+
+    zip_path = tmp_path / "repo.zip"
+    with zipfile.ZipFile(zip_path, "w") as archive:
+        archive.writestr("features/login.feature", LOGIN)
+        archive.writestr("features/search/search.feature", SEARCH)
+    assert dict(read_archive_features(zip_path)) == {
+        "features/login.feature": LOGIN,
+        "features/search/search.feature": SEARCH,
+    }
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    monkeypatch.setattr(settings, "S3_ENDPOINT_URL", None)
+    with mock_aws():
+        client = boto3.client("s3", region_name=settings.S3_REGION)
+        client.create_bucket(Bucket=settings.S3_BUCKET_NAME)
+        yield client
+
+
+@pytest.fixture
+def eager_tasks(monkeypatch, db_session):
+    """Run ingestion tasks in-process against the test database."""
+    monkeypatch.setattr(
+        ingestion, "SessionLocal", sessionmaker(bind=db_session.get_bind(), autoflush=False)
+    )
+    monkeypatch.setattr(settings, "FEATURE_INGEST_CHUNK_FILES", 1)
+    monkeypatch.setitem(celery_app.conf, "task_always_eager", True)
+    enqueued = []
+    monkeypatch.setattr("app.api.v1.features.enqueue_ingestion", enqueued.append)
+    return enqueued
+
+
+def test_archive_job_ingests_in_chunks_and_reports_progress(
+    api_client, db_session, s3, eager_tasks
+):
+    """An uploaded archive becomes a queued job; running it stores features and counts."""
+    db_session.add(Organization(id=1, name="acme"))
+    project = Project(
+        name="shop", repo_url="https://git/shop", repo_auth_method="token", organization_id=1
+    )
+    db_session.add(project)
+    db_session.commit()
+    db_session.add(Feature(project_id=project.id, name="Old", file_path="features/old.feature"))
+    db_session.commit()
+
+    archive = _tar_gz({"features/login.feature": LOGIN, "features/search.feature": SEARCH})
+    response = api_client.post(
+        f"/api/v1/features/projects/{project.id}/ingestion-jobs/archive",
+        content=archive,
+        headers={"Content-Type": "application/octet-stream"},
+    )
+    assert response.status_code == 202
+    job = response.json()
+    assert job["status"] == "queued" and eager_tasks == [job["id"]]
+
+    ingestion.ingest_features.apply(args=[job["id"]])
+
+    status = api_client.get(f"/api/v1/features/ingestion-jobs/{job['id']}").json()
+    assert status["status"] == "completed"
+    assert (status["total_files"], status["processed_files"]) == (2, 2)
+    assert (status["features_added"], status["features_removed"]) == (2, 1)
+    db_session.expire_all()
+    assert sorted(f.file_path for f in db_session.query(Feature)) == [
+        "features/login.feature",
+        "features/search.feature",
+    ]
+    assert s3.list_objects_v2(Bucket=settings.S3_BUCKET_NAME).get("KeyCount") == 0
+
+
+def test_unreadable_source_fails_the_job(db_session, s3, eager_tasks):
+    """A job whose source cannot be read ends failed with the reason; the upload is deleted."""
+    db_session.add(Organization(id=1, name="acme"))
+    project = Project(
+        name="shop", repo_url="https://git/shop", repo_auth_method="token", organization_id=1
+    )
+    db_session.add(project)
+    db_session.commit()
+    s3.put_object(Bucket=settings.S3_BUCKET_NAME, Key="x", Body=b"not an archive")
+    job = FeatureIngestionJob(project_id=project.id, source_type="archive", source="x")
+    db_session.add(job)
+    db_session.commit()
+
+    ingestion.ingest_features.apply(args=[job.id])
+
+    db_session.expire_all()
+    job = db_session.get(FeatureIngestionJob, job.id)
+    assert job.status == "failed" and "Unreadable archive" in job.error
+    assert s3.list_objects_v2(Bucket=settings.S3_BUCKET_NAME).get("KeyCount") == 0
+
+
+def _git(repo, *args):
+    return subprocess.run(
+        ["git", "-C", str(repo), "-c", "user.name=t", "-c", "user.email=t@t", *args],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.strip()
+
+
+def _commit(repo, files, message):
+    """Write (or with None, delete) files in a local repository and commit them; returns the SHA."""
+    for name, content in files.items():
+        path = repo / name
+        if content is None:
+            path.unlink()
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(content)
+    _git(repo, "add", "-A")
+    _git(repo, "commit", "-q", "-m", message)
+    return _git(repo, "rev-parse", "HEAD")
+
+
+def test_git_jobs_read_only_files_changed_since_the_last_indexed_commit(
+    api_client, db_session, eager_tasks, tmp_path
+):
+    """The second job diffs against the first one's commit; a lost base falls back to a scan."""
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    _git(repo, "init", "-q")
+    _git(repo, "config", "uploadpack.allowFilter", "true")
+    _git(repo, "config", "uploadpack.allowAnySHA1InWant", "true")
+    first = _commit(
+        repo, {"features/login.feature": LOGIN, "features/search.feature": SEARCH}, "first"
+    )
+    db_session.add(Organization(id=1, name="acme"))
+    project = Project(
+        name="shop", repo_url=f"file://{repo}", repo_auth_method="token", organization_id=1
+    )
+    db_session.add(project)
+    db_session.commit()
+    jobs_url = f"/api/v1/features/projects/{project.id}/ingestion-jobs/git"
+    job_url = "/api/v1/features/ingestion-jobs/{}".format
+
+    job = api_client.post(jobs_url, json={}).json()
+    assert job["base_commit"] is None
+    ingestion.ingest_features.apply(args=[job["id"]])
+    status = api_client.get(job_url(job["id"])).json()
+    assert (status["status"], status["commit"], status["features_added"]) == ("completed", first, 2)
+
+    changes = {
+        "features/login.feature": LOGIN.replace("Valid", "Correct"),
+        "features/search.feature": None,
+    }
+    second = _commit(repo, changes, "second")
+    job = api_client.post(jobs_url, json={}).json()
+    assert job["base_commit"] == first
+    ingestion.ingest_features.apply(args=[job["id"]])
+    status = api_client.get(job_url(job["id"])).json()
+    assert status["status"] == "completed" and status["commit"] == second
+    assert status["total_files"] == 1
+    assert (status["features_updated"], status["features_removed"]) == (1, 1)
+    db_session.expire_all()
+    features = db_session.query(Feature).all()
+    assert [(f.file_path, f.last_seen_commit) for f in features] == [
+        ("features/login.feature", second)
+    ]
+
+    # The indexed commit disappears (history rewritten): full scan of the new commit
+    _git(repo, "reset", "-q", "--hard", first)
+    _git(repo, "reflog", "expire", "--expire=now", "--all")
+    _git(repo, "gc", "-q", "--prune=now")
+    job = api_client.post(jobs_url, json={}).json()
+    assert job["base_commit"] == second
+    ingestion.ingest_features.apply(args=[job["id"]])
+    status = api_client.get(job_url(job["id"])).json()
+    assert status["status"] == "completed", status["error"]
+    assert (status["commit"], status["base_commit"], status["total_files"]) == (first, None, 2)
+    assert (status["features_added"], status["features_updated"]) == (1, 1)
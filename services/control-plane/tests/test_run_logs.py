@@ -0,0 +1,88 @@
+"""Tests for streamed run logs (worker ingestion, plain-text read and SSE follow)."""
+import asyncio
+import threading
+
+from sqlalchemy.orm import sessionmaker
+
+from app.models.run import Run
+from app.repositories.run_log import RunLogRepository
+from app.services.log_follow import follow_run_logs
+
+
+def _run(db_session, status="running"):
+    run = Run(status=status, project_id=1, suite_id=1, environment_id=1)
+    db_session.add(run)
+    db_session.commit()
+    return run
+
+
+def test_log_batches_are_idempotent_and_read_back_in_order(api_client, db_session):
+    """Resent batches are ignored; the log reads back in arrival order with a cursor."""
+    run = _run(db_session)
+    url = f"/api/v1/internal/runs/{run.id}/logs"
+    assert (
+        api_client.post(url, json={"seq": 0, "lines": ["collecting", "test_a PASSED"]}).json()[
+            "duplicate"
+        ]
+        is False
+    )
+    assert api_client.post(url, json={"seq": 0, "lines": ["collecting"]}).json()["duplicate"]
+    api_client.post(url, json={"seq": 1, "lines": ["test_b FAILED"]})
+
+    response = api_client.get(f"/api/v1/runs/{run.id}/logs")
+    assert response.text == "collecting\ntest_a PASSED\ntest_b FAILED\n"
+
+    cursor = int(response.headers["X-Log-Cursor"])
+    api_client.post(url, json={"seq": 2, "lines": ["1 failed, 1 passed"]})
+    assert api_client.get(f"/api/v1/runs/{run.id}/logs?after={cursor}").text == (
+        "1 failed, 1 passed\n"
+    )
+
+
+def test_follow_streams_events_and_ends_with_run_status(api_client, db_session):
+    """follow=true returns SSE log events resumable by id, then an end event."""
+    run = _run(db_session, status="completed")
+    url = f"/api/v1/internal/runs/{run.id}/logs"
+    api_client.post(url, json={"seq": 0, "lines": ["line 1", "line 2"]})
+    api_client.post(url, json={"seq": 1, "lines": ["line 3"]})
+
+    response = api_client.get(f"/api/v1/runs/{run.id}/logs?follow=true")
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = response.text.strip().split("\n\n")
+    assert events[0].endswith("event: log\ndata: line 1\ndata: line 2")
+    assert events[-1] == "event: end\ndata: completed"
+
+    first_id = events[0].split("\n")[0].split(": ")[1]
+    resumed = api_client.get(
+        f"/api/v1/runs/{run.id}/logs?follow=true", headers={"Last-Event-ID": first_id}
+    )
+    assert "line 1" not in resumed.text
+    assert "data: line 3" in resumed.text
+
+
+def test_logs_of_unknown_run(api_client):
+    """Posting or reading logs of a missing run returns 404."""
+    assert (
+        api_client.post("/api/v1/internal/runs/999/logs", json={"seq": 0, "lines": []}).status_code
+        == 404
+    )
+    assert api_client.get("/api/v1/runs/999/logs").status_code == 404
+
+
+def test_follow_polls_off_the_event_loop(db_session):
+    """Blocking log queries run in worker threads, not on the event loop's thread."""
+    run = _run(db_session, status="completed")
+    RunLogRepository(db_session).append(run.id, 0, 0, ["line 1"])
+    session_factory = sessionmaker(bind=db_session.get_bind())
+    threads = []
+
+    def tracking_factory():
+        threads.append(threading.get_ident())
+        return session_factory()
+
+    async def follow():
+        return [event async for event in follow_run_logs(tracking_factory, run.id)]
+
+    events = asyncio.run(follow())
+    assert events[-1] == "event: end\ndata: completed\n\n"
+    assert threads and threading.get_ident() not in threads
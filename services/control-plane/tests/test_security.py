@@ -7,6 +7,7 @@ from app.core.security import (
     get_password_hash,
     generate_service_token,
     hash_service_token,
+    service_token_prefix,
 )
 
 
@@ -38,16 +39,19 @@ def test_decode_invalid_token_returns_none():
 
 
 def test_generate_service_token_format():
-    """Service token is a non-empty URL-safe string."""
+    """Service token is a URL-safe qat_<prefix>_<secret> string."""
     token = generate_service_token()
     assert isinstance(token, str)
     assert len(token) >= 32
     assert all(c in "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_" for c in token)
+    assert token.startswith(f"qat_{service_token_prefix(token)}_")
+    assert service_token_prefix("legacy-token") is None
 
 
 def test_hash_service_token():
-    """Hashing a service token returns a bcrypt-style hash."""
+    """Hashing a service token returns a deterministic keyed hash (HMAC-SHA256 hex)."""
     plain = "my-service-token"
     hashed = hash_service_token(plain)
     assert hashed != plain
-    assert hashed.startswith("$2")  # bcrypt prefix
+    assert hashed == hash_service_token(plain)
+    assert len(hashed) == 64 and hashed != hash_service_token("other-token")
@@ -0,0 +1,125 @@
+"""Tests for service token authentication (HMAC index lookup, cache, batched last_used_at)."""
+
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import event
+
+from app.core.dependencies import get_current_user
+from app.core.security import generate_service_token, get_password_hash, hash_service_token
+from app.models.organization import Organization
+from app.models.service_token import ServiceToken
+from app.models.user import User
+from app.services import token_auth
+
+
+@pytest.fixture(autouse=True)
+def fresh_token_state(monkeypatch):
+    token_auth.token_cache.clear()
+    monkeypatch.setattr(token_auth, "last_used", token_auth.LastUsedRecorder(flush_interval=3600))
+
+
+@pytest.fixture
+def user(db_session):
+    org = Organization(name="acme")
+    db_session.add(org)
+    db_session.commit()
+    user = User(
+        email="ci@example.com",
+        username="ci",
+        hashed_password="x",
+        organization_id=org.id,
+        is_active=True,
+    )
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+
+def _token(db_session, user, token, token_hash=None, **fields):
+    row = ServiceToken(
+        name="ci",
+        token_hash=token_hash or hash_service_token(token),
+        organization_id=user.organization_id,
+        created_by_user_id=user.id,
+        is_active=True,
+        **fields,
+    )
+    db_session.add(row)
+    db_session.commit()
+    return row
+
+
+def _auth(db_session, token):
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    return get_current_user(credentials, db_session)
+
+
+def _count_queries(db_session):
+    statements = []
+    event.listen(
+        db_session.get_bind(),
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+    return statements
+
+
+def test_token_is_verified_by_one_indexed_query_then_cached(db_session, user):
+    """Many tokens cost no more than one: a single token_hash lookup, then cache hits."""
+    for _ in range(20):
+        _token(db_session, user, generate_service_token())
+    token = generate_service_token()
+    _token(db_session, user, token)
+    statements = _count_queries(db_session)
+
+    assert _auth(db_session, token).id == user.id
+    assert sum("FROM service_tokens" in s for s in statements) == 1
+
+    statements.clear()
+    assert _auth(db_session, token).id == user.id
+    assert not any("FROM service_tokens" in s for s in statements)
+
+
+def test_legacy_bcrypt_token_is_upgraded_on_first_use(db_session, user):
+    """Tokens issued before HMAC hashing still work and are rewritten for indexed lookup."""
+    row = _token(db_session, user, "legacy", token_hash=get_password_hash("legacy-token"))
+
+    assert _auth(db_session, "legacy-token").id == user.id
+    db_session.refresh(row)
+    assert row.token_hash == hash_service_token("legacy-token")
+
+
+def test_revoked_expired_and_unknown_tokens_are_rejected(db_session, user):
+    """Inactive, expired or unknown tokens give 401; revocation clears the local cache."""
+    token = generate_service_token()
+    row = _token(db_session, user, token)
+    expired = generate_service_token()
+    _token(db_session, user, expired, expires_at=datetime.utcnow() - timedelta(minutes=1))
+    assert _auth(db_session, token).id == user.id
+
+    row.is_active = False
+    db_session.commit()
+    token_auth.forget_service_token(row.id)
+    for bad in (token, expired, generate_service_token()):
+        with pytest.raises(HTTPException) as exc_info:
+            _auth(db_session, bad)
+        assert exc_info.value.status_code == 401
+
+
+def test_last_used_at_is_written_in_batches(db_session, user):
+    """Uses are buffered; one flush updates every used token."""
+    first, second = generate_service_token(), generate_service_token()
+    rows = [_token(db_session, user, first), _token(db_session, user, second)]
+    for token in (first, second, first):
+        _auth(db_session, token)
+    for row in rows:
+        db_session.refresh(row)
+        assert row.last_used_at is None
+
+    assert token_auth.last_used.flush(db_session) == 2
+    for row in rows:
+        db_session.refresh(row)
+        assert row.last_used_at is not None
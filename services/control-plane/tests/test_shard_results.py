@@ -0,0 +1,85 @@
+"""Tests for per-shard results and run finalization."""
+import asyncio
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core.database import async_database_url
+from app.models.run import Run, RunShardResult
+from app.repositories.run import AsyncRunRepository
+from app.schemas.run import ShardReport
+
+
+def _run(db_session):
+    run = Run(status="queued", project_id=1, suite_id=1, environment_id=1)
+    db_session.add(run)
+    db_session.commit()
+    return run
+
+
+def _report(shard_index, status, **counts):
+    return {"status": status, "shard_index": shard_index, "shard_total": 3, **counts}
+
+
+def test_run_is_finalized_once_every_shard_reports(api_client, db_session):
+    """Counts are summed over shards; a run with some failed shards is partial_failed."""
+    run = _run(db_session)
+    url = f"/api/v1/internal/runs/{run.id}/results"
+    counts = {"total_tests": 4, "passed_tests": 3, "failed_tests": 0, "skipped_tests": 1}
+
+    api_client.put(url, json=_report(0, "running"))
+    assert api_client.put(url, json=_report(0, "completed", **counts)).json()["finalized"] is None
+    api_client.put(url, json=_report(0, "completed", **counts))  # resent: same row
+    failed = {**counts, "passed_tests": 1, "failed_tests": 2}
+    assert api_client.put(url, json=_report(1, "failed", **failed)).json()["finalized"] is None
+    db_session.expire_all()
+    assert db_session.get(Run, run.id).status == "running"
+
+    # The crashed shard reports no counts
+    assert api_client.put(url, json=_report(2, "failed")).json()["finalized"] == "partial_failed"
+    db_session.expire_all()
+    finished = db_session.get(Run, run.id)
+    assert (finished.total_tests, finished.passed_tests, finished.failed_tests) == (8, 4, 2)
+    assert finished.skipped_tests == 2
+    assert finished.completed_at is not None and finished.duration_seconds is not None
+    assert db_session.query(RunShardResult).filter_by(run_id=run.id).count() == 3
+    shards = api_client.get(f"/api/v1/runs/{run.id}/shards").json()
+    assert [(s["shard_index"], s["status"], s["total_tests"]) for s in shards] == [
+        (0, "completed", 4),
+        (1, "failed", 4),
+        (2, "failed", None),
+    ]
+
+    # Late reports change neither the status nor the totals
+    assert api_client.put(url, json=_report(2, "completed", **counts)).json()["finalized"] is None
+    api_client.put(url, json=_report(2, "running"))
+    db_session.expire_all()
+    assert db_session.get(Run, run.id).status == "partial_failed"
+    assert db_session.get(Run, run.id).total_tests == 8
+
+
+def test_concurrent_last_reports_finalize_once(db_session, database_url):
+    """Shards finishing at the same time: exactly one finalizer call wins."""
+    run = _run(db_session)
+    engine = create_async_engine(async_database_url(database_url), poolclass=NullPool)
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def report(shard_index):
+        async with sessions() as session:
+            runs = AsyncRunRepository(session)
+            await runs.record_shard_result(
+                run.id, ShardReport(status="failed", shard_index=shard_index, shard_total=3)
+            )
+            return await runs.finalize(run.id)
+
+    async def main():
+        try:
+            await report(0)
+            return await asyncio.gather(report(1), report(2))
+        finally:
+            await engine.dispose()
+
+    results = asyncio.run(main())
+    assert sorted(results, key=str) == [None, "failed"]
+    db_session.expire_all()
+    assert db_session.get(Run, run.id).status == "failed"
@@ -0,0 +1,163 @@
+"""Tests for indexing pytest-bdd step definitions and resolving steps to them."""
+from app.models.feature import Step, StepDefinition
+from app.models.organization import Organization
+from app.models.project import Project
+from app.services.step_definitions import (
+    StepMatcher,
+    extract_step_definitions,
+    resolve_scenario_steps,
+)
+
+STEPS = '''"""Step definitions."""
+import re
+
+from pytest_bdd import given, parsers, step, then, when
+
+
+@given("I am on the home page")
+def home(driver):
+    pass
+
+
+@when(parsers.parse("I navigate to {page_name}"))
+def navigate(driver, page_name):
+    pass
+
+
+@then(parsers.parse("I see {count:d} results"))
+def results(count):
+    pass
+
+
+@then(parsers.re(r"the title is \\"(?P<title>[^\\"]+)\\""))
+def title(title):
+    pass
+
+
+@step(name="I wait")
+@when(PATTERN)
+def wait():
+    pass
+
+
+@given("I am logged in")
+def logged_in():
+    pass
+'''
+CHECKOUT = """Feature: Checkout
+  Background:
+    Given I am on the home page
+
+  Scenario: Browse
+    When I navigate to products
+    Then I see 3 results
+    And the title is "Products"
+    But I see many results
+
+  Scenario Outline: Visit <page>
+    When I navigate to <page>
+    And I wait
+    Then I see <n> results
+
+    Examples:
+      | page   | n |
+      | orders | 2 |
+"""
+
+
+def test_definitions_are_read_from_decorators_without_importing():
+    """String, parse and re patterns are indexed; names built at runtime are skipped."""
+    definitions = extract_step_definitions(STEPS)
+    found = [(d["step_type"], d["parser"], d["pattern"], d["function_name"]) for d in definitions]
+    assert found == [
+        ("given", "string", "I am on the home page", "home"),
+        ("when", "parse", "I navigate to {page_name}", "navigate"),
+        ("then", "parse", "I see {count:d} results", "results"),
+        ("then", "re", r'the title is \"(?P<title>[^\"]+)\"', "title"),
+        ("step", "string", "I wait", "wait"),
+        ("given", "string", "I am logged in", "logged_in"),
+    ]
+    assert definitions[0]["line_number"] == 7
+    assert extract_step_definitions("def broken(:") == []
+
+
+def test_matcher_resolves_by_step_type_with_and_but_continuing():
+    """And/But take the previous step's type; @step definitions match every type."""
+    matcher = StepMatcher(
+        [
+            (1, "given", "string", "I am on the home page"),
+            (2, "when", "parse", "I navigate to {page_name}"),
+            (3, "then", "parse", "I see {count:d} results"),
+            (4, "then", "re", r"the title is \"(?P<title>[^\"]+)\""),
+            (5, "step", "string", "I wait"),
+            (6, "then", "re", r"(?P<word>\w+) twice (?P=word)"),
+        ]
+    )
+    steps = [
+        ("given", "I am on the home page"),
+        ("when", "I NAVIGATE to products"),  # parse is case-insensitive
+        ("and", "I wait"),
+        ("then", "I see 3 results"),
+        ("and", 'the title is "Products"'),
+        ("but", "I see many results"),
+        ("then", "echo twice echo"),
+        ("given", "I navigate to products"),
+        ("and", "I am on the home page"),
+    ]
+    assert resolve_scenario_steps(matcher, steps) == [1, 2, 5, 3, 4, None, 6, None, 1]
+    assert resolve_scenario_steps(matcher, [("and", "I wait")]) == [None]
+
+
+def _project(db_session):
+    db_session.add(Organization(id=1, name="acme"))
+    project = Project(
+        name="shop", repo_url="https://git/shop", repo_auth_method="token", organization_id=1
+    )
+    db_session.add(project)
+    db_session.commit()
+    return project
+
+
+def test_ingestion_resolves_steps_and_reports_usage(api_client, db_session, tmp_path):
+    """Ingesting a tree indexes its step modules; the API lists gaps and usage counts."""
+    (tmp_path / "features").mkdir()
+    (tmp_path / "features" / "checkout.feature").write_text(CHECKOUT)
+    (tmp_path / "steps").mkdir()
+    (tmp_path / "steps" / "steps.py").write_text(STEPS)
+    (tmp_path / "steps" / "helpers.py").write_text("def helper():\n    pass\n")
+    project = _project(db_session)
+    base = f"/api/v1/features/projects/{project.id}"
+
+    response = api_client.post(f"{base}/ingest-features", json={"repo_path": str(tmp_path)})
+    assert response.status_code == 200
+
+    missing = api_client.get(f"{base}/steps/unimplemented").json()
+    assert [(s["keyword"], s["text"], s["line_number"]) for s in missing] == [
+        ("But", "I see many results", 9)
+    ]
+    assert missing[0]["feature"]["file_path"] == "features/checkout.feature"
+
+    usage = api_client.get(f"{base}/step-definitions").json()
+    assert [(d["function_name"], d["usage_count"]) for d in usage] == [
+        ("home", 1),
+        ("navigate", 2),
+        ("results", 2),
+        ("title", 1),
+        ("wait", 1),
+        ("logged_in", 0),
+    ]
+    assert usage[0]["file_path"] == "steps/steps.py"
+    unused = api_client.get(f"{base}/step-definitions", params={"unused": "true"}).json()
+    assert [d["function_name"] for d in unused] == ["logged_in"]
+
+    # Defining the missing step and removing a module re-resolve the stored steps
+    (tmp_path / "steps" / "more.py").write_text(
+        'from pytest_bdd import then, parsers\n\n\n@then("I see many results")\ndef many():\n'
+        "    pass\n"
+    )
+    (tmp_path / "steps" / "steps.py").unlink()
+    api_client.post(f"{base}/ingest-features", json={"repo_path": str(tmp_path)})
+    db_session.expire_all()
+    assert [d.function_name for d in db_session.query(StepDefinition)] == ["many"]
+    resolved = db_session.query(Step).filter(Step.step_definition_id.isnot(None)).all()
+    assert [step.text for step in resolved] == ["I see many results"]
@@ -0,0 +1,25 @@
+"""Tests for per-test duration history recorded from worker results."""
+from app.models.run import Run
+from app.models.suite import SuiteTestTiming
+from app.repositories.timing import SMOOTHING
+
+
+def test_results_record_smoothed_test_durations(api_client, db_session):
+    """Durations posted with shard results are kept per suite and smoothed across runs."""
+    run = Run(status="running", project_id=1, suite_id=3, environment_id=1)
+    db_session.add(run)
+    db_session.commit()
+    url = f"/api/v1/internal/runs/{run.id}/results"
+
+    api_client.put(url, json={"status": "running", "test_durations": {"t::a": 10.0, "t::b": 1.0}})
+    api_client.put(url, json={"status": "completed", "test_durations": {"t::a": 20.0}})
+    db_session.expire_all()  # the endpoint wrote through its own session
+
+    timings = {
+        row.nodeid: row
+        for row in db_session.query(SuiteTestTiming).filter(SuiteTestTiming.suite_id == 3)
+    }
+    assert timings["t::a"].duration_seconds == SMOOTHING * 20.0 + (1 - SMOOTHING) * 10.0
+    assert timings["t::a"].samples == 2
+    assert timings["t::b"].duration_seconds == 1.0
+    assert db_session.get(Run, run.id).status == "completed"
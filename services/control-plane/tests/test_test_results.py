@@ -0,0 +1,91 @@
+"""Tests for bulk ingestion of per-test results."""
+from app.models import run as run_models
+from app.models.run import Run
+from app.repositories.results import nodeid_hash
+
+
+def _run(db_session):
+    run = Run(status="running", project_id=1, suite_id=1, environment_id=1)
+    db_session.add(run)
+    db_session.commit()
+    return run
+
+
+def _failure(signature, message="assert 1 == 2"):
+    return {
+        "type": "AssertionError",
+        "message": message,
+        "location": "tests/test_a.py:3",
+        "signature": signature,
+    }
+
+
+def test_batches_store_narrow_rows_with_shared_node_ids_and_signatures(api_client, db_session):
+    """Rows hold hashes and codes; node ids and failure signatures are stored once."""
+    run = _run(db_session)
+    url = f"/api/v1/internal/runs/{run.id}/test-results"
+    first = [
+        {"nodeid": "tests/test_a.py::test_ok", "outcome": "passed", "duration": 0.25},
+        {
+            "nodeid": "tests/test_a.py::test_bad",
+            "outcome": "failed",
+            "duration": 1.5,
+            "failure": _failure("aa11"),
+            "phases": {"call": 1.5},
+            "markers": ["e2e"],
+        },
+    ]
+    response = api_client.post(url, json={"shard_index": 1, "seq": 0, "results": first})
+    assert response.status_code == 202 and response.json()["stored"] == 2
+
+    second = [
+        {"nodeid": "tests/test_a.py::test_ok", "outcome": "passed", "duration": 0.3},
+        {
+            "nodeid": "tests/test_b.py::test_also_bad",
+            "outcome": "error",
+            "failure": _failure("aa11", "assert 3 == 4"),
+        },
+    ]
+    body = {"shard_index": 2, "seq": 0, "results": second}
+    assert api_client.post(url, json=body).json()["stored"] == 2
+
+    db_session.expire_all()
+    rows = db_session.query(run_models.TestResult).order_by(run_models.TestResult.id).all()
+    assert [(r.shard, r.outcome, r.duration_ms) for r in rows] == [
+        (1, 0, 250),
+        (1, 1, 1500),
+        (2, 0, 300),
+        (2, 2, 0),
+    ]
+    assert rows[0].nodeid_hash == rows[2].nodeid_hash == nodeid_hash("tests/test_a.py::test_ok")
+    assert rows[1].failure_signature_id == rows[3].failure_signature_id is not None
+    assert db_session.query(run_models.TestNodeId).count() == 3
+    signatures = db_session.query(run_models.FailureSignature).all()
+    assert [(s.signature, s.message) for s in signatures] == [("aa11", "assert 1 == 2")]
+
+
+def test_invalid_batches_are_rejected(api_client, db_session):
+    """Unknown runs are 404; unknown outcomes fail validation."""
+    run = _run(db_session)
+    record = {"nodeid": "t.py::a", "outcome": "passed"}
+    body = {"seq": 0, "results": [record]}
+    assert api_client.post("/api/v1/internal/runs/999/test-results", json=body).status_code == 404
+    response = api_client.post(
+        f"/api/v1/internal/runs/{run.id}/test-results",
+        json={"seq": 0, "results": [{**record, "outcome": "exploded"}]},
+    )
+    assert response.status_code == 422
+
+
+def test_resent_batches_are_not_stored_twice(api_client, db_session):
+    """A retried (shard, seq) batch is acknowledged as a duplicate and adds no rows."""
+    run = _run(db_session)
+    url = f"/api/v1/internal/runs/{run.id}/test-results"
+    batch = {"shard_index": 0, "seq": 0, "results": [{"nodeid": "t.py::a", "outcome": "passed"}]}
+    assert api_client.post(url, json=batch).json() == {"ok": True, "stored": 1, "duplicate": False}
+    assert api_client.post(url, json=batch).json() == {"ok": True, "stored": 0, "duplicate": True}
+    assert api_client.post(url, json={**batch, "seq": 1}).json()["stored"] == 1
+    assert api_client.post(url, json={**batch, "shard_index": 1}).json()["stored"] == 1
+
+    db_session.expire_all()
+    assert db_session.query(run_models.TestResult).count() == 3
@@ -1,11 +1,20 @@
 """Run orchestration endpoints."""
 from fastapi import APIRouter, HTTPException, status
+from pydantic import BaseModel
 
+from app.core.config import settings
+from app.core.work_queue import get_work_queue
 from app.tasks.run_tasks import enqueue_run
 
 router = APIRouter()
 
 
+class WorkerRef(BaseModel):
+    """Identifies the worker job pulling from a run's work queue."""
+
+    worker_id: str
+
+
 @router.post("/{run_id}/enqueue")
 async def trigger_run(run_id: int):
     """Trigger a run to be enqueued for execution."""
@@ -17,3 +26,36 @@ async def trigger_run(run_id: int):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to enqueue run: {str(e)}",
         )
+
+
+@router.post("/{run_id}/work/claim")
+def claim_work(run_id: int, worker: WorkerRef):
+    """
+    Lease the next batch of tests of a queue-sharded run.
+
+    "batch" is null when nothing is pending; the worker should keep polling while
+    "leased" is non-zero, since a batch whose lease expires is handed out again.
+    """
+    queue = get_work_queue()
+    lease_seconds = settings.WORK_QUEUE_LEASE_SECONDS
+    batch = queue.claim(run_id, worker.worker_id, lease_seconds)
+    return {
+        "batch": batch.to_dict() if batch else None,
+        "lease_seconds": lease_seconds,
+        **queue.counts(run_id),
+    }
+
+
+@router.post("/{run_id}/work/{batch_id}/heartbeat")
+def heartbeat_work(run_id: int, batch_id: str, worker: WorkerRef):
+    """Extend a batch lease; "held" is false if the lease expired and was reclaimed."""
+    held = get_work_queue().heartbeat(
+        run_id, batch_id, worker.worker_id, settings.WORK_QUEUE_LEASE_SECONDS
+    )
+    return {"held": held}
+
+
+@router.post("/{run_id}/work/{batch_id}/complete")
+def complete_work(run_id: int, batch_id: str, worker: WorkerRef):
+    """Mark a batch done; "held" is false if another worker owns it now."""
+    return {"held": get_work_queue().complete(run_id, batch_id, worker.worker_id)}
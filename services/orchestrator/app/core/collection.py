@@ -0,0 +1,81 @@
+"""Collection manifests stored by workers (the worker's app.collection writes them).
+
+A manifest lists every test pytest collected at a commit, with its markers. With one, the
+shard planner plans the suite's actual tests rather than only those with timing history,
+so every shard gets an explicit node id list and none has to collect the whole suite.
+For runs with selection "impacted", the plan only covers the tests the change affects.
+"""
+import gzip
+import json
+import re
+from typing import Dict, List, Optional, Tuple
+
+import boto3
+from botocore.exceptions import ClientError
+
+from app.core.config import settings
+
+MANIFEST_VERSION = 1
+# Workers index manifests by resolved commit SHA; branch names and HEAD move
+_COMMIT_SHA = re.compile(r"^[0-9a-f]{40}$")
+
+
+def suite_marker(suite_name: str) -> str:
+    """Marker that puts a test in a suite (suite_default, suite_smoke, ...)."""
+    return f"suite_{suite_name.replace('-', '_')}"
+
+
+def suite_tests(manifest: Dict, suite_name: str) -> List[str]:
+    """Node ids of the manifest's tests in a suite (the selection the worker applies)."""
+    marker = suite_marker(suite_name)
+    return [test["nodeid"] for test in manifest["tests"] if marker in test["markers"]]
+
+
+def _s3_client():
+    return boto3.client(
+        "s3",
+        endpoint_url=settings.S3_ENDPOINT_URL,
+        aws_access_key_id=settings.S3_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+        region_name=settings.S3_REGION,
+        use_ssl=settings.S3_USE_SSL,
+    )
+
+
+def _get(client, key: str) -> Optional[bytes]:
+    try:
+        response = client.get_object(Bucket=settings.S3_BUCKET_NAME, Key=key)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return None
+        raise
+    return response["Body"].read()
+
+
+def load_commit_manifest(
+    project_id: int, commit: Optional[str], client=None
+) -> Optional[Tuple[str, Dict]]:
+    """Collection key and manifest stored for a commit of a project, or None."""
+    if not commit or not _COMMIT_SHA.match(commit):
+        return None
+    client = client or _s3_client()
+    index = _get(client, f"collections/commits/{project_id}/{commit}.json")
+    if index is None:
+        return None
+    key = json.loads(index)["key"]
+    body = _get(client, f"collections/{key}.json.gz")
+    if body is None:
+        return None
+    manifest = json.loads(gzip.decompress(body))
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return key, manifest
+
+
+def load_impacted_tests(run_id: int, client=None) -> Optional[List[str]]:
+    """
+    Tests an impacted run's prepare job selected (see the worker's app.impact), or None
+    when it selected the full suite or stored nothing.
+    """
+    body = _get(client or _s3_client(), f"runs/{run_id}/impacted-tests.json")
+    return json.loads(body)["tests"] if body is not None else None
@@ -31,6 +31,29 @@ class Settings(BaseSettings):
     # Worker (executes test jobs; must be set for Trigger Run to run tests)
     WORKER_URL: str = "http://worker:8004"
 
+    # Sharding: per-test durations older than this are ignored (the test was likely removed)
+    SHARD_HISTORY_DAYS: int = 30
+    # "static": each shard gets a planned test list; "queue": shards pull batches from a
+    # shared work queue (work stealing). Both fall back to a hash split without history.
+    SHARDING_MODE: str = "static"
+    # Work queue (empty Redis URL = in-process queue, only for single-process setups)
+    WORK_QUEUE_REDIS_URL: str = "redis://redis:6379/3"
+    WORK_QUEUE_BATCH_SECONDS: float = 30.0
+    WORK_QUEUE_BATCH_MAX_TESTS: int = 50
+    WORK_QUEUE_LEASE_SECONDS: int = 120
+    # Base URL workers use to reach this service's API (work queue endpoints)
+    ORCHESTRATOR_API_URL: str = "http://orchestrator:8001/api/v1"
+
+    # Sharded runs: one worker prepares the workspace (checkout, installed environment) and
+    # uploads it as a snapshot that every shard unpacks, instead of each shard setting up.
+    # Shards fall back to their own setup if the prepare job fails or exceeds the timeout.
+    WORKSPACE_SNAPSHOTS: bool = True
+    PREPARE_TIMEOUT_SECONDS: int = 1800
+    PREPARE_POLL_SECONDS: int = 5
+    # Plan shards over the tests of the commit's collection manifest (stored by workers in
+    # the S3 bucket) when there is one: explicit node id lists instead of a catch-all shard
+    COLLECTION_MANIFESTS: bool = True
+
     # Optional: secret for control-plane internal API
     INTERNAL_API_SECRET: str = ""
 
@@ -1,24 +1,118 @@
-"""Job sharding logic."""
-from typing import List
+"""Job sharding logic.
 
+Tests are spread over shards by historical duration (longest-processing-time first), so
+shards finish at about the same time instead of the run waiting on one slow shard.
+"""
 
-def create_shard_jobs(run_id: int, shard_count: int) -> List[dict]:
+import heapq
+from dataclasses import dataclass, field
+from statistics import median
+from typing import Dict, Iterable, List, Optional
+
+# Estimate for a test without history when there is no history at all to take a median of
+DEFAULT_TEST_DURATION = 1.0
+
+
+@dataclass
+class ShardPlan:
+    """Tests assigned to one shard and their estimated total duration in seconds."""
+
+    shard_index: int
+    tests: List[str] = field(default_factory=list)
+    estimated_seconds: float = 0.0
+
+
+def plan_shards(
+    test_ids: Iterable[str],
+    durations: Dict[str, float],
+    shard_count: int,
+    default_duration: Optional[float] = None,
+) -> List[ShardPlan]:
+    """
+    Bin-pack tests into shard_count balanced shards (LPT: longest test to the emptiest shard).
+
+    Args:
+        test_ids: Test node ids to distribute
+        durations: Historical duration per node id; tests missing here get default_duration
+        shard_count: Number of shards
+        default_duration: Estimate for unknown tests (median known duration if not given)
+
+    Returns:
+        One ShardPlan per shard, indexed 0..shard_count-1. The result is deterministic for
+        the same inputs (ties are broken by node id and shard index).
+    """
+    shard_count = max(1, shard_count)
+    if default_duration is None:
+        known = [d for d in durations.values() if d is not None and d >= 0]
+        default_duration = median(known) if known else DEFAULT_TEST_DURATION
+
+    def estimate(test_id: str) -> float:
+        duration = durations.get(test_id)
+        return default_duration if duration is None or duration < 0 else duration
+
+    plans = [ShardPlan(shard_index=i) for i in range(shard_count)]
+    heap = [(0.0, i) for i in range(shard_count)]
+    for test_id in sorted(set(test_ids), key=lambda t: (-estimate(t), t)):
+        load, index = heapq.heappop(heap)
+        plans[index].tests.append(test_id)
+        plans[index].estimated_seconds = load + estimate(test_id)
+        heapq.heappush(heap, (plans[index].estimated_seconds, index))
+    for plan in plans:
+        plan.tests.sort()
+    return plans
+
+
+def create_shard_jobs(
+    run_id: int,
+    shard_count: int,
+    durations: Optional[Dict[str, float]] = None,
+    tests: Optional[List[str]] = None,
+    manifest: Optional[str] = None,
+) -> List[dict]:
     """
     Create shard job payloads for parallel execution.
 
+    With timing history, each job carries an explicit "tests" list from plan_shards. The
+    least loaded shard instead gets "exclude" (every test planned for the other shards),
+    so it also runs tests added since the history was recorded. Without history, jobs only
+    carry shard_index/shard_total and the worker splits the collected tests by hash.
+
+    With the suite's tests from the commit's collection manifest, every test is planned
+    (unknown ones at the median duration) and every job gets an explicit "tests" list
+    and the manifest's key, so no shard collects more than its own tests.
+
     Args:
         run_id: The run ID
         shard_count: Number of shards to create
+        durations: Historical per-test durations for the suite (node id -> seconds)
+        tests: Every test of the suite, from the collection manifest
+        manifest: Collection key of that manifest
 
     Returns:
         List of job payloads, one per shard
     """
-    jobs = []
-    for shard_index in range(shard_count):
-        job = {
-            "run_id": run_id,
-            "shard_index": shard_index,
-            "shard_total": shard_count,
-        }
-        jobs.append(job)
+    shard_count = max(1, shard_count)
+    jobs = [
+        {"run_id": run_id, "shard_index": shard_index, "shard_total": shard_count}
+        for shard_index in range(shard_count)
+    ]
+    if tests is not None:
+        for job, plan in zip(jobs, plan_shards(tests, durations or {}, shard_count)):
+            job.update(
+                tests=plan.tests,
+                estimated_seconds=round(plan.estimated_seconds, 3),
+                manifest=manifest,
+            )
+        return jobs
+    if shard_count == 1 or not durations:
+        return jobs
+
+    plans = plan_shards(durations.keys(), durations, shard_count)
+    catch_all = min(plans, key=lambda p: (p.estimated_seconds, p.shard_index)).shard_index
+    for job, plan in zip(jobs, plans):
+        job["estimated_seconds"] = round(plan.estimated_seconds, 3)
+        if plan.shard_index == catch_all:
+            job["exclude"] = sorted(t for p in plans if p is not plan for t in p.tests)
+        else:
+            job["tests"] = plan.tests
     return jobs
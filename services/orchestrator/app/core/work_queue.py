@@ -0,0 +1,337 @@
+"""Shared test queue for dynamic (work-stealing) sharding.
+
+Instead of fixing each shard's tests up front, a run's tests are cut into small batches
+and pushed to a queue; every worker of the run claims a batch, runs it, and claims the
+next until the queue is drained, so fast workers simply take more batches. A claimed
+batch is leased: the worker heartbeats while it runs, and a batch whose lease expires
+(dead or hung worker) goes back to the front of the queue for another worker.
+
+RedisTestWorkQueue is used in deployments; InMemoryTestWorkQueue is a single-process
+stand-in with the same semantics, for tests and local development.
+"""
+
+import json
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from statistics import median
+from typing import Callable, Deque, Dict, List, Optional
+
+import redis
+
+from app.core.config import settings
+from app.core.sharding import DEFAULT_TEST_DURATION
+
+# Queues of abandoned runs disappear on their own
+QUEUE_TTL_SECONDS = 24 * 3600
+
+
+@dataclass
+class WorkBatch:
+    """A unit of work: run exactly "tests", or (remainder batch) everything but "exclude"."""
+
+    id: str
+    tests: List[str] = field(default_factory=list)
+    exclude: Optional[List[str]] = None
+
+    def to_dict(self) -> Dict:
+        data = {"batch_id": self.id, "tests": self.tests}
+        if self.exclude is not None:
+            data["exclude"] = self.exclude
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "WorkBatch":
+        return cls(id=data["batch_id"], tests=data.get("tests", []), exclude=data.get("exclude"))
+
+
+def build_batches(
+    durations: Dict[str, float],
+    target_seconds: float = 30.0,
+    max_tests: int = 50,
+) -> List[WorkBatch]:
+    """
+    Cut a suite's tests into batches of about target_seconds, longest tests first.
+
+    Long tests go out first so they do not end up as the tail of the run; batches shrink
+    towards the end, which is what lets idle workers even out the finish. The first
+    batch is a remainder batch that runs every collected test not listed in any other
+    batch (tests added since the durations were recorded).
+    """
+    known = [d for d in durations.values() if d is not None and d >= 0]
+    default = median(known) if known else DEFAULT_TEST_DURATION
+
+    def estimate(test_id: str) -> float:
+        duration = durations.get(test_id)
+        return default if duration is None or duration < 0 else duration
+
+    ordered = sorted(durations, key=lambda t: (-estimate(t), t))
+    batches = [WorkBatch(id="remainder", exclude=ordered)]
+    current: List[str] = []
+    current_seconds = 0.0
+    for test_id in ordered:
+        if current and (
+            current_seconds + estimate(test_id) > target_seconds or len(current) >= max_tests
+        ):
+            batches.append(WorkBatch(id=f"b{len(batches)}", tests=current))
+            current, current_seconds = [], 0.0
+        current.append(test_id)
+        current_seconds += estimate(test_id)
+    if current:
+        batches.append(WorkBatch(id=f"b{len(batches)}", tests=current))
+    return batches
+
+
+class TestWorkQueue:
+    """Interface of a run's shared test queue (at-least-once delivery of each batch)."""
+
+    __test__ = False  # not a pytest test class
+
+    def enqueue(self, run_id: int, batches: List[WorkBatch]) -> None:
+        """Queue batches for a run, in order."""
+        raise NotImplementedError
+
+    def claim(self, run_id: int, worker_id: str, lease_seconds: float) -> Optional[WorkBatch]:
+        """Lease the next batch to worker_id (expired leases are requeued first)."""
+        raise NotImplementedError
+
+    def heartbeat(self, run_id: int, batch_id: str, worker_id: str, lease_seconds: float) -> bool:
+        """Extend a lease; False if worker_id no longer holds it (it was reclaimed)."""
+        raise NotImplementedError
+
+    def complete(self, run_id: int, batch_id: str, worker_id: str) -> bool:
+        """Mark a leased batch done; False if worker_id no longer holds it."""
+        raise NotImplementedError
+
+    def counts(self, run_id: int) -> Dict[str, int]:
+        """Batches pending, leased and done."""
+        raise NotImplementedError
+
+
+class InMemoryTestWorkQueue(TestWorkQueue):
+    """Thread-safe, single-process TestWorkQueue."""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._batches: Dict[int, Dict[str, WorkBatch]] = {}
+        self._pending: Dict[int, Deque[str]] = {}
+        self._leases: Dict[int, Dict[str, tuple]] = {}  # batch id -> (worker id, expiry)
+        self._done: Dict[int, set] = {}
+
+    def enqueue(self, run_id: int, batches: List[WorkBatch]) -> None:
+        with self._lock:
+            self._batches.setdefault(run_id, {}).update((b.id, b) for b in batches)
+            self._pending.setdefault(run_id, deque()).extend(b.id for b in batches)
+            self._leases.setdefault(run_id, {})
+            self._done.setdefault(run_id, set())
+
+    def claim(self, run_id: int, worker_id: str, lease_seconds: float) -> Optional[WorkBatch]:
+        with self._lock:
+            if run_id not in self._pending:
+                return None
+            now = self.clock()
+            leases, pending = self._leases[run_id], self._pending[run_id]
+            # Latest expiry first, so the longest-abandoned batch ends up at the front
+            for batch_id, (_, expiry) in sorted(leases.items(), key=lambda kv: -kv[1][1]):
+                if expiry <= now:
+                    del leases[batch_id]
+                    pending.appendleft(batch_id)
+            if not pending:
+                return None
+            batch_id = pending.popleft()
+            leases[batch_id] = (worker_id, now + lease_seconds)
+            return self._batches[run_id][batch_id]
+
+    def heartbeat(self, run_id: int, batch_id: str, worker_id: str, lease_seconds: float) -> bool:
+        with self._lock:
+            lease = self._leases.get(run_id, {}).get(batch_id)
+            if not lease or lease[0] != worker_id:
+                return False
+            self._leases[run_id][batch_id] = (worker_id, self.clock() + lease_seconds)
+            return True
+
+    def complete(self, run_id: int, batch_id: str, worker_id: str) -> bool:
+        with self._lock:
+            lease = self._leases.get(run_id, {}).get(batch_id)
+            if not lease or lease[0] != worker_id:
+                return False
+            del self._leases[run_id][batch_id]
+            self._done[run_id].add(batch_id)
+            return True
+
+    def counts(self, run_id: int) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "pending": len(self._pending.get(run_id, ())),
+                "leased": len(self._leases.get(run_id, {})),
+                "done": len(self._done.get(run_id, ())),
+            }
+
+
+# Every script re-applies the queue TTL to the keys it writes: leases, owners and done
+# only come into existence here, after enqueue set the TTL on the others.
+
+# KEYS: pending list, leases zset (score = expiry), owners hash, batches hash
+# ARGV: now, lease expiry, worker id, ttl seconds
+_CLAIM_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+for i = #expired, 1, -1 do
+    redis.call('ZREM', KEYS[2], expired[i])
+    redis.call('HDEL', KEYS[3], expired[i])
+    redis.call('LPUSH', KEYS[1], expired[i])
+end
+local batch_id = redis.call('LPOP', KEYS[1])
+if not batch_id then
+    return false
+end
+redis.call('ZADD', KEYS[2], ARGV[2], batch_id)
+redis.call('HSET', KEYS[3], batch_id, ARGV[3])
+for i = 1, 3 do
+    redis.call('EXPIRE', KEYS[i], ARGV[4])
+end
+return redis.call('HGET', KEYS[4], batch_id)
+"""
+
+# KEYS: leases zset, owners hash; ARGV: batch id, worker id, new expiry, ttl seconds
+_HEARTBEAT_SCRIPT = """
+if redis.call('HGET', KEYS[2], ARGV[1]) ~= ARGV[2] then
+    return 0
+end
+redis.call('ZADD', KEYS[1], ARGV[3], ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+redis.call('EXPIRE', KEYS[2], ARGV[4])
+return 1
+"""
+
+# KEYS: leases zset, owners hash, done set; ARGV: batch id, worker id, ttl seconds
+_COMPLETE_SCRIPT = """
+if redis.call('HGET', KEYS[2], ARGV[1]) ~= ARGV[2] then
+    return 0
+end
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('HDEL', KEYS[2], ARGV[1])
+redis.call('SADD', KEYS[3], ARGV[1])
+redis.call('EXPIRE', KEYS[3], ARGV[3])
+return 1
+"""
+
+
+class RedisTestWorkQueue(TestWorkQueue):
+    """TestWorkQueue shared by all orchestrator processes; each operation is one Lua script."""
+
+    def __init__(self, client, prefix: str = "qatron:work", clock: Callable[[], float] = time.time):
+        """
+        Args:
+            client: redis.Redis instance
+            prefix: Key prefix; a run's keys are <prefix>:<run_id>:{pending,leases,owners,...}
+            clock: Wall clock shared by all processes (lease expiries are absolute times)
+        """
+        self.client = client
+        self.prefix = prefix
+        self.clock = clock
+        self._claim = client.register_script(_CLAIM_SCRIPT)
+        self._heartbeat = client.register_script(_HEARTBEAT_SCRIPT)
+        self._complete = client.register_script(_COMPLETE_SCRIPT)
+
+    def _keys(self, run_id: int) -> Dict[str, str]:
+        base = f"{self.prefix}:{run_id}"
+        return {
+            name: f"{base}:{name}" for name in ("pending", "leases", "owners", "batches", "done")
+        }
+
+    def enqueue(self, run_id: int, batches: List[WorkBatch]) -> None:
+        keys = self._keys(run_id)
+        pipe = self.client.pipeline()
+        pipe.hset(keys["batches"], mapping={b.id: json.dumps(b.to_dict()) for b in batches})
+        pipe.rpush(keys["pending"], *[b.id for b in batches])
+        pipe.expire(keys["batches"], QUEUE_TTL_SECONDS)
+        pipe.expire(keys["pending"], QUEUE_TTL_SECONDS)
+        pipe.execute()
+
+    def claim(self, run_id: int, worker_id: str, lease_seconds: float) -> Optional[WorkBatch]:
+        keys = self._keys(run_id)
+        now = self.clock()
+        raw = self._claim(
+            keys=[keys["pending"], keys["leases"], keys["owners"], keys["batches"]],
+            args=[now, now + lease_seconds, worker_id, QUEUE_TTL_SECONDS],
+        )
+        return WorkBatch.from_dict(json.loads(raw)) if raw else None
+
+    def heartbeat(self, run_id: int, batch_id: str, worker_id: str, lease_seconds: float) -> bool:
+        keys = self._keys(run_id)
+        return bool(
+            self._heartbeat(
+                keys=[keys["leases"], keys["owners"]],
+                args=[batch_id, worker_id, self.clock() + lease_seconds, QUEUE_TTL_SECONDS],
+            )
+        )
+
+    def complete(self, run_id: int, batch_id: str, worker_id: str) -> bool:
+        keys = self._keys(run_id)
+        return bool(
+            self._complete(
+                keys=[keys["leases"], keys["owners"], keys["done"]],
+                args=[batch_id, worker_id, QUEUE_TTL_SECONDS],
+            )
+        )
+
+    def counts(self, run_id: int) -> Dict[str, int]:
+        keys = self._keys(run_id)
+        pipe = self.client.pipeline()
+        pipe.llen(keys["pending"])
+        pipe.zcard(keys["leases"])
+        pipe.scard(keys["done"])
+        pending, leased, done = pipe.execute()
+        return {"pending": pending, "leased": leased, "done": done}
+
+
+def create_queue_jobs(
+    run_id: int,
+    worker_count: int,
+    durations: Dict[str, float],
+    queue: TestWorkQueue,
+) -> List[dict]:
+    """
+    Alternative to create_shard_jobs: queue the suite's tests in batches and create
+    worker_count jobs that pull from the queue until it is drained.
+    """
+    queue.enqueue(
+        run_id,
+        build_batches(
+            durations,
+            target_seconds=settings.WORK_QUEUE_BATCH_SECONDS,
+            max_tests=settings.WORK_QUEUE_BATCH_MAX_TESTS,
+        ),
+    )
+    work_queue = {
+        "url": f"{settings.ORCHESTRATOR_API_URL.rstrip('/')}/runs/{run_id}/work",
+        "lease_seconds": settings.WORK_QUEUE_LEASE_SECONDS,
+    }
+    return [
+        {
+            "run_id": run_id,
+            "shard_index": shard_index,
+            "shard_total": worker_count,
+            "work_queue": work_queue,
+        }
+        for shard_index in range(worker_count)
+    ]
+
+
+_work_queue: Optional[TestWorkQueue] = None
+_work_queue_lock = threading.Lock()
+
+
+def get_work_queue() -> TestWorkQueue:
+    """Process-wide queue: Redis at settings.WORK_QUEUE_REDIS_URL, in-memory if it is empty."""
+    global _work_queue
+    with _work_queue_lock:
+        if _work_queue is None:
+            if settings.WORK_QUEUE_REDIS_URL:
+                client = redis.Redis.from_url(settings.WORK_QUEUE_REDIS_URL)
+                _work_queue = RedisTestWorkQueue(client)
+            else:
+                _work_queue = InMemoryTestWorkQueue()
+        return _work_queue
@@ -1,18 +1,21 @@
 """Run orchestration tasks."""
-from datetime import datetime
-from typing import Optional
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
 
 import httpx
 from sqlalchemy.orm import Session
 
 from app.core.celery_app import celery_app
 from app.core.config import settings
+from app.core.collection import load_commit_manifest, load_impacted_tests, suite_tests
 from app.core.database import SessionLocal
 from app.core.sharding import create_shard_jobs
+from app.core.work_queue import create_queue_jobs, get_work_queue
 
 # Import Run model - in production, this would come from shared models
 # For now, we'll use SQLAlchemy directly
-from sqlalchemy import Column, DateTime, Integer, String
+from sqlalchemy import Column, DateTime, Float, Integer, String
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
@@ -28,6 +31,8 @@ class Run(Base):
     project_id = Column(Integer)
     suite_id = Column(Integer)
     environment_id = Column(Integer)
+    commit = Column(String(40))
+    selection = Column(String(20))  # "all" or "impacted"
     started_at = Column(DateTime(timezone=True))
     completed_at = Column(DateTime(timezone=True))
     duration_seconds = Column(Integer)
@@ -37,6 +42,73 @@ class Run(Base):
     skipped_tests = Column(Integer, default=0)
 
 
+class Suite(Base):
+    """Suite model (simplified for orchestrator): only what sharding needs."""
+
+    __tablename__ = "suites"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(255))
+    shards = Column(Integer, default=1)
+
+
+class SuiteTestTiming(Base):
+    """Per-test duration history recorded by the control plane (simplified for orchestrator)."""
+
+    __tablename__ = "suite_test_timings"
+
+    id = Column(Integer, primary_key=True)
+    suite_id = Column(Integer)
+    nodeid = Column(String(1000))
+    duration_seconds = Column(Float)
+    last_seen_at = Column(DateTime(timezone=True))
+
+
+def load_test_durations(db: Session, suite_id: int) -> Dict[str, float]:
+    """Historical duration per test of a suite, ignoring tests not seen recently (deleted)."""
+    since = datetime.utcnow() - timedelta(days=settings.SHARD_HISTORY_DAYS)
+    rows = (
+        db.query(SuiteTestTiming.nodeid, SuiteTestTiming.duration_seconds)
+        .filter(SuiteTestTiming.suite_id == suite_id, SuiteTestTiming.last_seen_at >= since)
+        .all()
+    )
+    return {nodeid: duration for nodeid, duration in rows}
+
+
+def load_suite_manifest(run: Run, suite: Optional[Suite]) -> Optional[Tuple[str, List[str]]]:
+    """
+    Collection key and the suite's tests from the manifest a worker stored for the run's
+    commit, or None (none stored yet, disabled or unreadable: plan from history instead).
+    """
+    if not settings.COLLECTION_MANIFESTS:
+        return None
+    try:
+        stored = load_commit_manifest(run.project_id, run.commit)
+    except Exception:
+        return None
+    if stored is None:
+        return None
+    key, manifest = stored
+    # Same default as the control plane's job context
+    return key, suite_tests(manifest, (suite.name if suite else None) or "default")
+
+
+def plan_shard_jobs(db: Session, run: Run, suite: Optional[Suite], shard_count: int) -> List[dict]:
+    """
+    Shard jobs of a run: balanced by historical test durations (over the tests of the
+    commit's collection manifest when one is stored), or pulling batches from a shared
+    queue so faster workers take more of the suite.
+    """
+    durations = load_test_durations(db, run.suite_id) if shard_count > 1 else {}
+    if settings.SHARDING_MODE == "queue" and durations:
+        return create_queue_jobs(run.id, shard_count, durations, get_work_queue())
+    collected = load_suite_manifest(run, suite) if shard_count > 1 else None
+    if collected:
+        key, tests = collected
+        return create_shard_jobs(run.id, shard_count, durations, tests=tests, manifest=key)
+    return create_shard_jobs(run.id, shard_count, durations)
+
+
 @celery_app.task(bind=True, max_retries=3)
 def enqueue_run(self, run_id: int):
     """
@@ -61,16 +133,15 @@ def enqueue_run(self, run_id: int):
         db.commit()
 
         # Get suite configuration for sharding
-        # TODO: Query suite from database to get shard count
-        # For now, default to 1 shard
-        shard_count = 1
+        suite = db.query(Suite).filter(Suite.id == run.suite_id).first()
+        shard_count = max(1, (suite.shards if suite else None) or 1)
+        shard_jobs = plan_shard_jobs(db, run, suite, shard_count)
 
-        # Create shard jobs
-        shard_jobs = create_shard_jobs(run_id, shard_count)
-
-        # Enqueue worker jobs
-        for job in shard_jobs:
-            execute_worker_job.delay(job)
+        # Enqueue worker jobs (after a prepare stage when shards can share its workspace)
+        if shard_count > 1 and settings.WORKSPACE_SNAPSHOTS and settings.WORKER_URL:
+            prepare_workspace.delay(run_id, shard_jobs)
+        else:
+            dispatch_shard_jobs(shard_jobs)
 
         # Update run status
         run.status = "queued"  # Will be updated by worker when it starts
@@ -90,45 +161,147 @@ def enqueue_run(self, run_id: int):
         db.close()
 
 
-@celery_app.task(bind=True, max_retries=3)
-def execute_worker_job(self, job_payload: dict):
+def dispatch_shard_jobs(shard_jobs: List[dict], prepared: bool = False) -> None:
+    """Enqueue one worker job per shard; prepared shards unpack the run's workspace snapshot."""
+    for job in shard_jobs:
+        execute_worker_job.delay({**job, "workspace_snapshot": True} if prepared else job)
+
+
+def _worker_url() -> str:
+    return (getattr(settings, "WORKER_URL", None) or "").rstrip("/")
+
+
+def submit_worker_job(job_payload: dict) -> Optional[dict]:
     """
-    Execute a worker job: fetch run context from control-plane, then POST to worker.
-    The worker clones the repo, runs pytest (with Selenium Grid if E2E), and posts results.
+    Fetch the run's context from the control plane and POST the job to the worker.
+    Returns the worker's accepted job, or None when no worker is configured.
     """
-    run_id = job_payload.get("run_id")
-    if not run_id:
-        raise ValueError("job_payload must contain run_id")
-
+    run_id = job_payload["run_id"]
     control_plane_url = settings.CONTROL_PLANE_API_URL.rstrip("/")
     job_context_url = f"{control_plane_url}/internal/runs/{run_id}/job-context"
     headers = {}
     if getattr(settings, "INTERNAL_API_SECRET", None):
         headers["X-Internal-Secret"] = settings.INTERNAL_API_SECRET
 
-    try:
-        with httpx.Client(timeout=30.0) as client:
-            resp = client.get(job_context_url, headers=headers)
-            resp.raise_for_status()
-            context = resp.json()
-    except httpx.HTTPError as e:
-        raise self.retry(exc=e, countdown=30)
-
-    worker_url = (getattr(settings, "WORKER_URL", None) or "").rstrip("/")
+    with httpx.Client(timeout=30.0) as client:
+        resp = client.get(job_context_url, headers=headers)
+        resp.raise_for_status()
+        context = resp.json()
+
+    worker_url = _worker_url()
     if not worker_url:
-        return  # Worker not configured; skip without failing
+        return None  # Worker not configured; skip without failing
 
-    execute_url = f"{worker_url}/execute"
     body = {
         "job": job_payload,
         "context": context,
     }
+    # The worker only enqueues the job (202 + job id) and dedupes resubmitted shards, so a
+    # retry after a lost response cannot start a second execution of the same shard.
+    with httpx.Client(timeout=5.0) as client:
+        resp = client.post(f"{worker_url}/execute", json=body)
+        resp.raise_for_status()
+        return resp.json()
+
+
+@celery_app.task(bind=True, max_retries=3)
+def execute_worker_job(self, job_payload: dict):
+    """
+    Execute a worker job: fetch run context from control-plane, then POST to worker.
+    The worker clones the repo, runs pytest (with Selenium Grid if E2E), and posts results.
+    """
+    if not job_payload.get("run_id"):
+        raise ValueError("job_payload must contain run_id")
     try:
-        with httpx.Client(timeout=5.0) as client:
-            resp = client.post(execute_url, json=body)
-            resp.raise_for_status()
+        accepted = submit_worker_job(job_payload)
     except Exception as exc:
         raise self.retry(exc=exc, countdown=30)
+    if accepted is None:
+        return None
+    return {"worker_job_id": accepted.get("job_id"), "status": accepted.get("status")}
+
+
+@celery_app.task(bind=True, max_retries=3)
+def prepare_workspace(self, run_id: int, shard_jobs: List[dict]):
+    """
+    Prepare stage of a sharded run: one worker checks out the repository, installs its
+    dependencies and uploads the workspace snapshot; the shards are enqueued once it is done.
+    """
+    try:
+        accepted = submit_worker_job({"run_id": run_id, "mode": "prepare"})
+    except Exception as exc:
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=exc, countdown=30)
+        accepted = None
+    if not accepted:
+        dispatch_shard_jobs(shard_jobs)
+        return {"prepared": False}
+    deadline = time.time() + settings.PREPARE_TIMEOUT_SECONDS
+    dispatch_prepared_shards.apply_async(
+        (run_id, accepted["job_id"], shard_jobs, deadline),
+        countdown=settings.PREPARE_POLL_SECONDS,
+    )
+    return {"worker_job_id": accepted["job_id"]}
+
+
+@celery_app.task(bind=True, max_retries=None)
+def dispatch_prepared_shards(
+    self, run_id: int, worker_job_id: str, shard_jobs: List[dict], deadline: float
+):
+    """
+    Wait (by re-scheduling itself) for the prepare job, then enqueue the run's shards.
+
+    If the prepare job failed, is unknown to the worker or outlives PREPARE_TIMEOUT_SECONDS,
+    the shards are enqueued without the snapshot and set up their own workspace.
+    """
+    try:
+        with httpx.Client(timeout=5.0) as client:
+            resp = client.get(f"{_worker_url()}/jobs/{worker_job_id}")
+            status = resp.json().get("status") if resp.status_code == 200 else None
+    except httpx.HTTPError:
+        status = "unreachable"
+    if status in ("queued", "running", "unreachable") and time.time() < deadline:
+        raise self.retry(countdown=settings.PREPARE_POLL_SECONDS)
+
+    prepared = status == "completed"
+    if prepared:
+        shard_jobs = replan_from_manifest(run_id, shard_jobs)
+    dispatch_shard_jobs(shard_jobs, prepared=prepared)
+    return {"prepared": prepared, "prepare_status": status}
+
+
+def replan_from_manifest(run_id: int, shard_jobs: List[dict]) -> List[dict]:
+    """
+    Plan a run's shards again once its prepare job has stored the commit's collection
+    manifest (the first run of a commit is planned before any manifest exists) and, for an
+    impacted run, selected the tests its changes affect, so shards stay balanced.
+    Queue-mode jobs and other runs already planned from a manifest are kept as they are.
+    """
+    if not settings.COLLECTION_MANIFESTS or any("work_queue" in job for job in shard_jobs):
+        return shard_jobs
+    db: Session = SessionLocal()
+    try:
+        run = db.query(Run).filter(Run.id == run_id).first()
+        if not run:
+            return shard_jobs
+        impacted = run.selection == "impacted"
+        if not impacted and any("manifest" in job for job in shard_jobs):
+            return shard_jobs
+        suite = db.query(Suite).filter(Suite.id == run.suite_id).first()
+        collected = load_suite_manifest(run, suite)
+        if not collected:
+            return shard_jobs
+        key, tests = collected
+        selected = load_impacted_tests(run_id) if impacted else None
+        if selected is not None:
+            selected = set(selected)
+            tests = [test for test in tests if test in selected]
+        durations = load_test_durations(db, run.suite_id)
+        return create_shard_jobs(run_id, len(shard_jobs), durations, tests=tests, manifest=key)
+    except Exception:
+        return shard_jobs
+    finally:
+        db.close()
 
 
 @celery_app.task
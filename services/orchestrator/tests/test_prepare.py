@@ -0,0 +1,51 @@
+"""Tests for the prepare stage that fans a sharded run out after its workspace snapshot."""
+import time
+
+import httpx
+import pytest
+
+from app.tasks import run_tasks
+
+JOBS = [{"run_id": 3, "shard_index": i, "shard_total": 2} for i in range(2)]
+
+
+@pytest.fixture
+def dispatched(monkeypatch):
+    # No stored collection manifest to replan from (that needs the database)
+    monkeypatch.setattr(run_tasks.settings, "COLLECTION_MANIFESTS", False)
+    jobs = []
+    monkeypatch.setattr(run_tasks.execute_worker_job, "delay", jobs.append)
+    return jobs
+
+
+def _worker_reports(monkeypatch, status):
+    def handler(request):
+        assert request.url.path == "/jobs/job-1"
+        return httpx.Response(200, json={"job_id": "job-1", "status": status})
+
+    client = httpx.Client
+    monkeypatch.setattr(
+        httpx, "Client", lambda **kwargs: client(transport=httpx.MockTransport(handler), **kwargs)
+    )
+
+
+def test_shards_use_the_snapshot_once_prepared(monkeypatch, dispatched) -> None:
+    """A completed prepare job sends every shard to the run's workspace snapshot."""
+    _worker_reports(monkeypatch, "completed")
+    result = run_tasks.dispatch_prepared_shards(3, "job-1", JOBS, time.time() + 60)
+    assert result["prepared"]
+    assert [(job["shard_index"], job.get("workspace_snapshot")) for job in dispatched] == [
+        (0, True),
+        (1, True),
+    ]
+
+
+@pytest.mark.parametrize("status,deadline", [("failed", 60), ("running", -1)])
+def test_shards_set_up_alone_when_prepare_fails_or_times_out(
+    monkeypatch, dispatched, status, deadline
+) -> None:
+    """A failed or overdue prepare job does not hold the run: shards clone and install."""
+    _worker_reports(monkeypatch, status)
+    result = run_tasks.dispatch_prepared_shards(3, "job-1", JOBS, time.time() + deadline)
+    assert not result["prepared"]
+    assert dispatched == JOBS
@@ -0,0 +1,97 @@
+"""Tests for the duration-aware shard planner."""
+import gzip
+import json
+
+import boto3
+from moto import mock_aws
+
+from app.core.collection import load_commit_manifest, load_impacted_tests, suite_tests
+from app.core.config import settings
+from app.core.sharding import DEFAULT_TEST_DURATION, create_shard_jobs, plan_shards
+
+
+def test_plan_shards_balances_by_duration() -> None:
+    """LPT packing keeps the slowest shard close to the ideal (total / shards)."""
+    durations = {
+        f"tests/test_{i}.py::test": float(d) for i, d in enumerate([9, 8, 7, 6, 5, 4, 3, 2, 1, 1])
+    }
+    plans = plan_shards(durations.keys(), durations, 3)
+    loads = [plan.estimated_seconds for plan in plans]
+    assert sorted(t for plan in plans for t in plan.tests) == sorted(durations)
+    assert max(loads) - min(loads) <= 1.0
+    assert plans == plan_shards(reversed(list(durations)), durations, 3)
+
+
+def test_plan_shards_estimates_unknown_tests_with_median() -> None:
+    """Tests without history are estimated with the median known duration."""
+    plans = plan_shards(["a", "b", "c", "new"], {"a": 1.0, "b": 3.0, "c": 10.0}, 1)
+    assert plans[0].estimated_seconds == 1.0 + 3.0 + 10.0 + 3.0
+    assert plan_shards(["x"], {}, 2)[0].estimated_seconds == DEFAULT_TEST_DURATION
+
+
+def test_create_shard_jobs_ships_explicit_lists() -> None:
+    """Every planned test is on exactly one shard; the lightest shard catches new tests."""
+    durations = {"t1": 10.0, "t2": 6.0, "t3": 5.0, "t4": 1.0}
+    jobs = create_shard_jobs(7, 2, durations)
+
+    assert [(job["shard_index"], job["shard_total"]) for job in jobs] == [(0, 2), (1, 2)]
+    listed = [job for job in jobs if "tests" in job]
+    catch_all = [job for job in jobs if "exclude" in job]
+    assert len(listed) == 1 and len(catch_all) == 1
+    assert catch_all[0]["estimated_seconds"] <= listed[0]["estimated_seconds"]
+    assert sorted(catch_all[0]["exclude"]) == sorted(listed[0]["tests"])
+
+
+def test_create_shard_jobs_without_history_falls_back_to_worker_split() -> None:
+    """Without durations (first run) or with one shard, jobs carry no test lists."""
+    assert create_shard_jobs(1, 3) == [
+        {"run_id": 1, "shard_index": i, "shard_total": 3} for i in range(3)
+    ]
+    assert create_shard_jobs(1, 1, {"t": 1.0}) == [
+        {"run_id": 1, "shard_index": 0, "shard_total": 1}
+    ]
+
+
+def test_create_shard_jobs_plans_every_manifest_test() -> None:
+    """With the suite's collected tests, every shard gets an explicit list, none a catch-all."""
+    tests = ["t1", "t2", "t3", "new"]
+    jobs = create_shard_jobs(7, 2, {"t1": 10.0, "t2": 6.0, "t3": 5.0}, tests=tests, manifest="k")
+
+    assert all("exclude" not in job and job["manifest"] == "k" for job in jobs)
+    assert sorted(t for job in jobs for t in job["tests"]) == sorted(tests)
+
+
+def test_manifest_is_loaded_by_commit_and_filtered_by_suite() -> None:
+    """The worker's commit index leads to the manifest; branch names are never looked up."""
+    sha = "b" * 40
+    manifest = {
+        "version": 1,
+        "tests": [
+            {"nodeid": "a.py::test_smoke", "markers": ["e2e", "suite_smoke"]},
+            {"nodeid": "a.py::test_other", "markers": ["e2e"]},
+        ],
+    }
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=settings.S3_BUCKET_NAME)
+        client.put_object(
+            Bucket=settings.S3_BUCKET_NAME,
+            Key=f"collections/commits/3/{sha}.json",
+            Body=json.dumps({"key": "abc"}),
+        )
+        client.put_object(
+            Bucket=settings.S3_BUCKET_NAME,
+            Key="collections/abc.json.gz",
+            Body=gzip.compress(json.dumps(manifest).encode()),
+        )
+        assert load_commit_manifest(3, sha, client) == ("abc", manifest)
+        assert load_commit_manifest(4, sha, client) is None
+        assert load_commit_manifest(3, "main", client) is None
+        client.put_object(
+            Bucket=settings.S3_BUCKET_NAME,
+            Key="runs/5/impacted-tests.json",
+            Body=json.dumps({"tests": ["a.py::test_smoke"], "reason": "1 file changed"}),
+        )
+        assert load_impacted_tests(5, client) == ["a.py::test_smoke"]
+        assert load_impacted_tests(6, client) is None
+    assert suite_tests(manifest, "smoke") == ["a.py::test_smoke"]
@@ -0,0 +1,90 @@
+"""Tests for the work-stealing test queue (in-process implementation and API)."""
+
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import work_queue
+from app.core.work_queue import InMemoryTestWorkQueue, WorkBatch, build_batches, create_queue_jobs
+from app.main import app
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_build_batches_longest_first_with_remainder() -> None:
+    """Batches respect the time budget, go out longest first, and a remainder batch leads."""
+    durations = {"slow": 40.0, "mid": 20.0, "a": 5.0, "b": 5.0, "c": 5.0, "new": None}
+    batches = build_batches(durations, target_seconds=30.0, max_tests=2)
+
+    assert batches[0].id == "remainder" and sorted(batches[0].exclude) == sorted(durations)
+    assert [b.tests for b in batches[1:]] == [["slow"], ["mid", "a"], ["b", "c"], ["new"]]
+
+
+def test_expired_lease_is_reclaimed_by_another_worker() -> None:
+    """A dead worker's batch goes back to the front of the queue once its lease expires."""
+    clock = FakeClock()
+    queue = InMemoryTestWorkQueue(clock=clock)
+    queue.enqueue(1, [WorkBatch("b1", ["t1"]), WorkBatch("b2", ["t2"])])
+
+    assert queue.claim(1, "dead", lease_seconds=10).id == "b1"
+    clock.now = 5
+    assert queue.claim(1, "alive", lease_seconds=10).id == "b2"
+    assert queue.heartbeat(1, "b2", "alive", lease_seconds=10)
+    assert queue.claim(1, "alive", lease_seconds=10) is None
+
+    clock.now = 12
+    assert queue.claim(1, "alive", lease_seconds=10).id == "b1"
+    assert not queue.heartbeat(1, "b1", "dead", lease_seconds=10)
+    assert not queue.complete(1, "b1", "dead")
+    assert queue.complete(1, "b1", "alive") and queue.complete(1, "b2", "alive")
+    assert queue.counts(1) == {"pending": 0, "leased": 0, "done": 2}
+
+
+def test_concurrent_workers_drain_each_batch_once() -> None:
+    """Without expiries every batch is claimed by exactly one of many competing workers."""
+    queue = InMemoryTestWorkQueue()
+    queue.enqueue(1, [WorkBatch(f"b{i}", [f"t{i}"]) for i in range(200)])
+    claimed = []
+
+    def worker(name: str) -> None:
+        while (batch := queue.claim(1, name, lease_seconds=60)) is not None:
+            claimed.append(batch.id)
+            queue.complete(1, batch.id, name)
+
+    threads = [threading.Thread(target=worker, args=(f"w{i}",)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(claimed) == sorted(f"b{i}" for i in range(200))
+
+
+@pytest.fixture
+def in_memory_queue(monkeypatch):
+    queue = InMemoryTestWorkQueue()
+    monkeypatch.setattr(work_queue, "_work_queue", queue)
+    return queue
+
+
+def test_work_endpoints_claim_heartbeat_complete(in_memory_queue) -> None:
+    """Workers pull batches over HTTP until the queue is empty and nothing is leased."""
+    jobs = create_queue_jobs(5, 2, {"t1": 3.0, "t2": 1.0}, in_memory_queue)
+    assert [job["work_queue"]["url"].endswith("/runs/5/work") for job in jobs] == [True, True]
+    client = TestClient(app)
+    worker = {"worker_id": "w1"}
+
+    seen = []
+    while (body := client.post("/api/v1/runs/5/work/claim", json=worker).json())["batch"]:
+        batch_id = body["batch"]["batch_id"]
+        seen.append(batch_id)
+        assert client.post(f"/api/v1/runs/5/work/{batch_id}/heartbeat", json=worker).json()["held"]
+        assert client.post(f"/api/v1/runs/5/work/{batch_id}/complete", json=worker).json()["held"]
+    assert seen[0] == "remainder" and len(seen) == 2
+    assert body["leased"] == 0 and body["pending"] == 0
@@ -1,9 +1,10 @@
 """Allure report generation service."""
+import json
 import os
 import subprocess
 import zipfile
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 
 import boto3
 
@@ -35,26 +36,46 @@ class AllureService:
         if shard_index is not None:
             s3_prefix = f"{s3_prefix}/shard-{shard_index}"
 
-        s3_prefix = f"{s3_prefix}/allure/"
+        # Workers store artifacts as content-addressed blobs and list them per shard in
+        # manifest.json; runs uploaded before that keep zips under <shard>/allure/
+        allure_keys = self._manifest_artifact_keys(s3_prefix, "allure")
+        if not allure_keys:
+            allure_keys = self._legacy_allure_keys(f"{s3_prefix}/allure/")
 
-        # List and download files
-        paginator = self.s3_client.get_paginator("list_objects_v2")
-        for page in paginator.paginate(Bucket=settings.S3_BUCKET_NAME, Prefix=s3_prefix):
-            if "Contents" in page:
-                for obj in page["Contents"]:
-                    key = obj["Key"]
-                    if key.endswith(".zip"):
-                        # Download and extract zip
-                        local_zip = results_dir / Path(key).name
-                        self.s3_client.download_file(
-                            settings.S3_BUCKET_NAME, key, str(local_zip)
-                        )
-                        with zipfile.ZipFile(local_zip, "r") as zip_ref:
-                            zip_ref.extractall(results_dir)
-                        local_zip.unlink()
+        for index, key in enumerate(allure_keys):
+            # Download and extract zip
+            local_zip = results_dir / f"allure-{index}.zip"
+            self.s3_client.download_file(settings.S3_BUCKET_NAME, key, str(local_zip))
+            with zipfile.ZipFile(local_zip, "r") as zip_ref:
+                zip_ref.extractall(results_dir)
+            local_zip.unlink()
 
         return results_dir
 
+    def _manifest_artifact_keys(self, s3_prefix: str, artifact_type: str) -> List[str]:
+        """Blob keys of artifact_type from every shard manifest under s3_prefix."""
+        keys = []
+        paginator = self.s3_client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=settings.S3_BUCKET_NAME, Prefix=f"{s3_prefix}/"):
+            for obj in page.get("Contents", []):
+                if not obj["Key"].endswith("/manifest.json"):
+                    continue
+                body = self.s3_client.get_object(Bucket=settings.S3_BUCKET_NAME, Key=obj["Key"])
+                manifest = json.loads(body["Body"].read())
+                artifact = manifest.get("artifacts", {}).get(artifact_type)
+                if artifact:
+                    keys.append(artifact["key"])
+        return keys
+
+    def _legacy_allure_keys(self, s3_prefix: str) -> List[str]:
+        keys = []
+        paginator = self.s3_client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=settings.S3_BUCKET_NAME, Prefix=s3_prefix):
+            for obj in page.get("Contents", []):
+                if obj["Key"].endswith(".zip"):
+                    keys.append(obj["Key"])
+        return keys
+
     def generate_report(self, results_dir: Path, report_id: str) -> Path:
         """Generate Allure report from results."""
         report_dir = Path(settings.ALLURE_REPORTS_PATH) / report_id
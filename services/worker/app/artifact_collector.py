@@ -1,6 +1,58 @@
 """Artifact collection utilities."""
+import shutil
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Tuple
+
+from app.s3_upload import ArtifactUploader, MultipartUploadSink, UploadedBlob
+
+# Already-compressed formats: deflating them again costs CPU and saves nothing
+STORED_SUFFIXES = {
+    ".png",
+    ".jpg",
+    ".jpeg",
+    ".gif",
+    ".webp",
+    ".mp4",
+    ".webm",
+    ".avi",
+    ".zip",
+    ".gz",
+    ".tgz",
+    ".bz2",
+    ".xz",
+    ".woff",
+    ".woff2",
+}
+# Fixed member timestamp so identical content yields identical archives (and blobs)
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+COPY_BUFFER_SIZE = 1024**2
+
+
+@dataclass
+class ArchiveSpec:
+    """Files to package into one zip artifact, as (source path, name in archive) pairs."""
+
+    name: str
+    members: List[Tuple[Path, str]] = field(default_factory=list)
+
+
+def compression_for(path: Path) -> int:
+    return zipfile.ZIP_STORED if path.suffix.lower() in STORED_SUFFIXES else zipfile.ZIP_DEFLATED
+
+
+def write_archive(spec: ArchiveSpec, fileobj) -> None:
+    """Stream spec's members into a zip written to fileobj (which may be non-seekable)."""
+    with zipfile.ZipFile(fileobj, "w") as zipf:
+        for source, arcname in sorted(spec.members, key=lambda m: m[1]):
+            info = zipfile.ZipInfo(arcname, date_time=ZIP_DATE_TIME)
+            info.compress_type = compression_for(source)
+            info.external_attr = 0o644 << 16
+            info.file_size = source.stat().st_size
+            with open(source, "rb") as src, zipf.open(info, "w") as dst:
+                shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
 
 
 class ArtifactCollector:
@@ -10,53 +62,29 @@ class ArtifactCollector:
         """Initialize artifact collector."""
         self.config = config
 
-    def collect(self, workspace: Path, run_id: int, shard_index: int) -> Dict[str, Optional[str]]:
+    def collect(self, workspace: Path) -> Dict[str, object]:
         """
-        Collect all artifacts from test execution.
+        Find the artifacts of a finished job without packaging them.
 
         Returns:
-            Dictionary mapping artifact types to file paths
+            Dictionary mapping artifact types to an ArchiveSpec (directories to zip)
+            or a Path (single files uploaded as they are)
         """
-        artifacts = {
-            "allure": None,
-            "coverage_xml": None,
-            "coverage_html": None,
-            "screenshots": None,
-            "logs": None,
-            "videos": None,
-        }
+        artifacts: Dict[str, object] = {}
 
         # Collect Allure results
         allure_results = workspace / "allure-results"
         if allure_results.exists() and any(allure_results.iterdir()):
-            # Create zip of allure results
-            import zipfile
-            import tempfile
-
-            with tempfile.NamedTemporaryFile(suffix=".zip", delete=False) as tmp:
-                with zipfile.ZipFile(tmp.name, "w", zipfile.ZIP_DEFLATED) as zipf:
-                    for file in allure_results.rglob("*"):
-                        if file.is_file():
-                            zipf.write(file, file.relative_to(allure_results))
-                artifacts["allure"] = tmp.name
+            artifacts["allure"] = self._directory_spec("allure-results.zip", allure_results)
 
         # Collect coverage reports
         coverage_xml = workspace / "coverage.xml"
         if coverage_xml.exists():
-            artifacts["coverage_xml"] = str(coverage_xml)
+            artifacts["coverage_xml"] = coverage_xml
 
         coverage_html = workspace / "htmlcov"
         if coverage_html.exists() and coverage_html.is_dir():
-            # Create zip of HTML coverage
-            import zipfile
-            import tempfile
-
-            with tempfile.NamedTemporaryFile(suffix=".zip", delete=False) as tmp:
-                with zipfile.ZipFile(tmp.name, "w", zipfile.ZIP_DEFLATED) as zipf:
-                    for file in coverage_html.rglob("*"):
-                        if file.is_file():
-                            zipf.write(file, file.relative_to(coverage_html))
-                artifacts["coverage_html"] = tmp.name
+            artifacts["coverage_html"] = self._directory_spec("htmlcov.zip", coverage_html)
 
         # Collect screenshots (common locations)
         screenshot_dirs = [
@@ -64,27 +92,70 @@ class ArtifactCollector:
             workspace / "test-results" / "screenshots",
         ]
         for screenshot_dir in screenshot_dirs:
-            if screenshot_dir.exists() and any(screenshot_dir.rglob("*.png")):
-                import zipfile
-                import tempfile
-
-                with tempfile.NamedTemporaryFile(suffix=".zip", delete=False) as tmp:
-                    with zipfile.ZipFile(tmp.name, "w", zipfile.ZIP_DEFLATED) as zipf:
-                        for file in screenshot_dir.rglob("*.png"):
-                            zipf.write(file, file.name)
-                    artifacts["screenshots"] = tmp.name
+            screenshots = sorted(screenshot_dir.rglob("*.png")) if screenshot_dir.exists() else []
+            if screenshots:
+                artifacts["screenshots"] = ArchiveSpec(
+                    "screenshots.zip", [(file, file.name) for file in screenshots]
+                )
                 break
 
         # Collect logs
-        log_files = list(workspace.rglob("*.log"))
+        log_files = sorted(workspace.rglob("*.log"))
         if log_files:
-            import zipfile
-            import tempfile
-
-            with tempfile.NamedTemporaryFile(suffix=".zip", delete=False) as tmp:
-                with zipfile.ZipFile(tmp.name, "w", zipfile.ZIP_DEFLATED) as zipf:
-                    for log_file in log_files:
-                        zipf.write(log_file, log_file.name)
-                artifacts["logs"] = tmp.name
+            artifacts["logs"] = ArchiveSpec("logs.zip", [(file, file.name) for file in log_files])
 
         return artifacts
+
+    @staticmethod
+    def _directory_spec(name: str, directory: Path) -> ArchiveSpec:
+        return ArchiveSpec(
+            name,
+            [
+                (file, str(file.relative_to(directory)))
+                for file in directory.rglob("*")
+                if file.is_file()
+            ],
+        )
+
+    def upload(
+        self, artifacts: Dict[str, object], uploader: ArtifactUploader
+    ) -> Dict[str, UploadedBlob]:
+        """
+        Package and upload collected artifacts; returns artifact type -> stored blob.
+
+        Each archive is compressed on its own thread straight into a MultipartUploadSink,
+        so categories compress in parallel (zlib releases the GIL) and no temporary
+        archive is ever written to disk. Plain files go through uploader.upload_files.
+        """
+        archives = {k: v for k, v in artifacts.items() if isinstance(v, ArchiveSpec)}
+        files = {k: v for k, v in artifacts.items() if isinstance(v, Path)}
+        results: Dict[str, UploadedBlob] = {}
+        with ThreadPoolExecutor(
+            max_workers=uploader.max_workers, thread_name_prefix="s3-part"
+        ) as part_pool, ThreadPoolExecutor(
+            max_workers=max(1, len(archives) + 1), thread_name_prefix="package"
+        ) as package_pool:
+            futures = {
+                artifact_type: package_pool.submit(self._package, spec, uploader, part_pool)
+                for artifact_type, spec in archives.items()
+            }
+            if files:
+                futures["_files"] = package_pool.submit(uploader.upload_files, files)
+            for artifact_type, future in futures.items():
+                if artifact_type == "_files":
+                    results.update(future.result())
+                else:
+                    results[artifact_type] = future.result()
+        return results
+
+    @staticmethod
+    def _package(
+        spec: ArchiveSpec, uploader: ArtifactUploader, part_pool: ThreadPoolExecutor
+    ) -> UploadedBlob:
+        sink = MultipartUploadSink(uploader, part_pool)
+        try:
+            write_archive(spec, sink)
+            return sink.finish()
+        except BaseException:
+            sink.abort()
+            raise
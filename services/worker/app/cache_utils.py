@@ -0,0 +1,42 @@
+"""Filesystem helpers shared by the worker-local caches."""
+import fcntl
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+
+@contextmanager
+def file_lock(path: Path, shared: bool = False, blocking: bool = True) -> Iterator[bool]:
+    """
+    Hold an flock on path for the duration of the block.
+
+    Yields True when the lock was acquired; with blocking=False yields False instead of
+    waiting when another process holds a conflicting lock.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+") as fh:
+        flags = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+        if not blocking:
+            flags |= fcntl.LOCK_NB
+        try:
+            fcntl.flock(fh.fileno(), flags)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+
+def dir_size(path: Path) -> int:
+    """Total size in bytes of regular files under path."""
+    total = 0
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
@@ -0,0 +1,150 @@
+"""Collection manifests: what pytest collected at a commit, kept so later runs skip collection.
+
+The qatron manifest plugin (qatron-python 0.4.0) writes every collected test with its
+markers, file and pytest-bdd scenario. The worker stores that manifest gzipped in the
+artifact bucket, keyed by a hash of every file that can change collection (test modules,
+conftest files, feature files, pytest configuration, requirements) and the framework pin,
+plus a small per-commit index the orchestrator's shard planner reads.
+
+With a stored manifest, suite and shard selection happen on the manifest, and pytest is
+given the selected node ids (and only their files to collect) instead of the whole test
+directory filtered with ``-m``.
+"""
+import gzip
+import hashlib
+import json
+import os
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from botocore.exceptions import ClientError
+
+from app.s3_upload import ArtifactUploader, _is_not_found
+from app.workspace_snapshot import WORKSPACE_EXCLUDES
+
+MANIFEST_ENV_VAR = "QATRON_MANIFEST_FILE"
+MANIFEST_VERSION = 1
+# Files whose content can change what pytest collects, besides Python and feature files
+COLLECTION_FILES = frozenset(
+    ("pytest.ini", "pyproject.toml", "setup.cfg", "tox.ini", "qatron.yml", "requirements.txt")
+)
+COLLECTION_SUFFIXES = (".py", ".feature")
+
+
+def manifest_key(key: str) -> str:
+    return f"collections/{key}.json.gz"
+
+
+def commit_index_key(project_id, commit: str) -> str:
+    """Object key naming the manifest collected at a commit of a project."""
+    return f"collections/commits/{project_id}/{commit}.json"
+
+
+def suite_marker(suite_name: str) -> str:
+    """Marker that puts a test in a suite (suite_default, suite_smoke, ...)."""
+    return f"suite_{suite_name.replace('-', '_')}"
+
+
+def collection_key(workspace: Path, extra: Iterable[str] = ()) -> str:
+    """
+    Hash of every file in workspace that can change collection, and of extra strings
+    (framework requirement, interpreter version). Equal keys collect the same tests.
+    """
+    digest = hashlib.sha256()
+    for value in extra:
+        digest.update(f"{value}\0".encode("utf-8"))
+    for root, dirs, files in os.walk(workspace):
+        dirs[:] = sorted(name for name in dirs if name not in WORKSPACE_EXCLUDES)
+        for name in sorted(files):
+            if name not in COLLECTION_FILES and not name.endswith(COLLECTION_SUFFIXES):
+                continue
+            path = Path(root) / name
+            digest.update(f"{path.relative_to(workspace).as_posix()}\0".encode("utf-8"))
+            digest.update(hashlib.sha256(path.read_bytes()).digest())
+    return digest.hexdigest()
+
+
+def _in_hash_shard(nodeid: str, shard_index: int, shard_total: int) -> bool:
+    # Same split as the qatron shard plugin's QATRON_SHARD
+    return zlib.crc32(nodeid.encode("utf-8")) % shard_total == shard_index
+
+
+def select_tests(
+    manifest: Dict,
+    marker: Optional[str],
+    selection: Dict,
+    shard_index: int = 0,
+    shard_total: int = 1,
+) -> List[str]:
+    """
+    Node ids of the manifest a shard runs: tests with marker (all when None), narrowed
+    like the shard plugin would by the job's "tests" or "exclude" list, or by hash.
+    """
+    nodeids = [
+        test["nodeid"] for test in manifest["tests"] if marker is None or marker in test["markers"]
+    ]
+    if selection.get("tests") is not None:
+        planned = set(selection["tests"])
+        return [nodeid for nodeid in nodeids if nodeid in planned]
+    if selection.get("exclude") is not None:
+        excluded = set(selection["exclude"])
+        return [nodeid for nodeid in nodeids if nodeid not in excluded]
+    if shard_total > 1:
+        return [n for n in nodeids if _in_hash_shard(n, shard_index, shard_total)]
+    return nodeids
+
+
+def collection_paths(manifest: Dict, nodeids: Iterable[str]) -> List[str]:
+    """Files (relative to the invocation directory) pytest must collect to run nodeids."""
+    rootdir = manifest.get("rootdir", ".")
+    files = {nodeid.split("::", 1)[0] for nodeid in nodeids}
+    return sorted(os.path.normpath(os.path.join(rootdir, path)) for path in files)
+
+
+class ManifestStore:
+    """Reads and writes collection manifests in the artifact bucket."""
+
+    def __init__(self, uploader: ArtifactUploader):
+        self.uploader = uploader
+
+    def _get(self, key: str) -> Optional[bytes]:
+        try:
+            response = self.uploader.with_retries(
+                self.uploader.s3.get_object, Bucket=self.uploader.bucket, Key=key
+            )
+        except ClientError as e:
+            if _is_not_found(e):
+                return None
+            raise
+        return response["Body"].read()
+
+    def _put(self, key: str, body: bytes, content_type: str) -> None:
+        self.uploader.with_retries(
+            self.uploader.s3.put_object,
+            Bucket=self.uploader.bucket,
+            Key=key,
+            Body=body,
+            ContentType=content_type,
+        )
+
+    def get(self, key: str) -> Optional[Dict]:
+        """The manifest stored under a collection key, or None (missing or outdated)."""
+        body = self._get(manifest_key(key))
+        if body is None:
+            return None
+        manifest = json.loads(gzip.decompress(body))
+        return manifest if manifest.get("version") == MANIFEST_VERSION else None
+
+    def put(self, key: str, manifest: Dict) -> None:
+        body = gzip.compress(json.dumps(manifest, separators=(",", ":")).encode("utf-8"), mtime=0)
+        self._put(manifest_key(key), body, "application/gzip")
+
+    def get_commit(self, project_id, commit: str) -> Optional[str]:
+        """Collection key of the manifest last stored for a commit, or None."""
+        body = self._get(commit_index_key(project_id, commit))
+        return json.loads(body)["key"] if body is not None else None
+
+    def put_commit(self, project_id, commit: str, key: str) -> None:
+        body = json.dumps({"key": key}).encode("utf-8")
+        self._put(commit_index_key(project_id, commit), body, "application/json")
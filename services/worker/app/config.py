@@ -12,6 +12,31 @@ class Config:
     s3_secret_access_key: str
     s3_bucket_name: str
     s3_region: str = "us-east-1"
+    git_cache_enabled: bool = True
+    git_cache_dir: str = "/cache/git"
+    git_cache_max_bytes: int = 20 * 1024**3
+    venv_cache_enabled: bool = True
+    venv_cache_dir: str = "/cache/venvs"
+    venv_cache_max_bytes: int = 10 * 1024**3
+    framework_requirement: str = "qatron-python==0.4.0"
+    max_concurrent_jobs: int = 0  # 0 = derive from CPU and memory
+    job_cpus: float = 2.0
+    job_memory_bytes: int = 2 * 1024**3
+    max_queued_jobs: int = 100
+    job_timeout_seconds: int = 3600
+    log_dir: str = "/workspace/logs"
+    log_max_bytes: int = 50 * 1024**2
+    log_backup_count: int = 2
+    log_batch_lines: int = 200
+    log_flush_interval: float = 1.0
+    s3_upload_concurrency: int = 8
+    s3_multipart_threshold: int = 16 * 1024**2
+    s3_multipart_part_size: int = 16 * 1024**2
+    s3_upload_max_attempts: int = 4
+    result_batch_rows: int = 5000  # Per-test results per POST to the control plane
+    collection_manifests_enabled: bool = True
+    impact_maps_enabled: bool = True  # Record per-test coverage maps for impacted runs
+    impact_min_mapped_fraction: float = 0.8  # Below this share of mapped tests, run all
 
 
 def get_config() -> Config:
@@ -22,4 +47,31 @@ def get_config() -> Config:
         s3_secret_access_key=os.getenv("S3_SECRET_ACCESS_KEY", "minioadmin"),
         s3_bucket_name=os.getenv("S3_BUCKET_NAME", "qatron-artifacts"),
         s3_region=os.getenv("S3_REGION", "us-east-1"),
+        git_cache_enabled=os.getenv("GIT_CACHE_ENABLED", "true").lower() == "true",
+        git_cache_dir=os.getenv("GIT_CACHE_DIR", "/cache/git"),
+        git_cache_max_bytes=int(os.getenv("GIT_CACHE_MAX_BYTES", str(20 * 1024**3))),
+        venv_cache_enabled=os.getenv("VENV_CACHE_ENABLED", "true").lower() == "true",
+        venv_cache_dir=os.getenv("VENV_CACHE_DIR", "/cache/venvs"),
+        venv_cache_max_bytes=int(os.getenv("VENV_CACHE_MAX_BYTES", str(10 * 1024**3))),
+        framework_requirement=os.getenv("QATRON_FRAMEWORK_REQUIREMENT", "qatron-python==0.4.0"),
+        max_concurrent_jobs=int(os.getenv("WORKER_MAX_CONCURRENT_JOBS", "0")),
+        job_cpus=float(os.getenv("WORKER_JOB_CPUS", "2")),
+        job_memory_bytes=int(os.getenv("WORKER_JOB_MEMORY_BYTES", str(2 * 1024**3))),
+        max_queued_jobs=int(os.getenv("WORKER_MAX_QUEUED_JOBS", "100")),
+        job_timeout_seconds=int(os.getenv("WORKER_JOB_TIMEOUT_SECONDS", "3600")),
+        log_dir=os.getenv("WORKER_LOG_DIR", "/workspace/logs"),
+        log_max_bytes=int(os.getenv("WORKER_LOG_MAX_BYTES", str(50 * 1024**2))),
+        log_backup_count=int(os.getenv("WORKER_LOG_BACKUP_COUNT", "2")),
+        log_batch_lines=int(os.getenv("WORKER_LOG_BATCH_LINES", "200")),
+        log_flush_interval=float(os.getenv("WORKER_LOG_FLUSH_INTERVAL", "1.0")),
+        s3_upload_concurrency=int(os.getenv("S3_UPLOAD_CONCURRENCY", "8")),
+        s3_multipart_threshold=int(os.getenv("S3_MULTIPART_THRESHOLD", str(16 * 1024**2))),
+        s3_multipart_part_size=int(os.getenv("S3_MULTIPART_PART_SIZE", str(16 * 1024**2))),
+        s3_upload_max_attempts=int(os.getenv("S3_UPLOAD_MAX_ATTEMPTS", "4")),
+        result_batch_rows=int(os.getenv("WORKER_RESULT_BATCH_ROWS", "5000")),
+        collection_manifests_enabled=(
+            os.getenv("COLLECTION_MANIFESTS_ENABLED", "true").lower() == "true"
+        ),
+        impact_maps_enabled=os.getenv("IMPACT_MAPS_ENABLED", "true").lower() == "true",
+        impact_min_mapped_fraction=float(os.getenv("IMPACT_MIN_MAPPED_FRACTION", "0.8")),
     )
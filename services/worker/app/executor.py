@@ -1,19 +1,53 @@
 """Worker job executor."""
 import json
 import os
+import platform
 import shutil
 import subprocess
 import sys
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Optional, Set, Tuple
 
-import boto3
 import httpx
 import yaml
 from git import Repo
 
 from app.config import get_config
 from app.artifact_collector import ArtifactCollector
+from app.collection import (
+    MANIFEST_ENV_VAR,
+    ManifestStore,
+    collection_key,
+    collection_paths,
+    select_tests,
+    suite_marker,
+)
+from app.git_cache import GitMirrorCache
+from app.impact import (
+    COVERAGE_CONTEXT_ARG,
+    IMPACTED,
+    CoverageMap,
+    ImpactStore,
+    changed_files,
+    impacted_tests,
+    read_test_coverage,
+)
+from app.job_queue import PREPARE_MODE
+from app.results import (
+    RESULTS_ENV_VAR,
+    iter_result_batches,
+    summarize_results,
+    test_durations,
+)
+from app.s3_upload import ArtifactUploader, build_s3_client
+from app.venv_cache import LAST_USED_MARKER, VenvCache
+from app.work_queue_client import LeaseKeeper, WorkQueueClient
+from app.workspace_snapshot import (
+    WORKSPACE_EXCLUDES,
+    SnapshotStore,
+    environment_pointer_key,
+    snapshot_key,
+)
 
 
 def main():
@@ -22,9 +56,17 @@ def main():
         print("Usage: executor.py <job_payload_json>")
         sys.exit(1)
 
-    job_payload = json.loads(sys.argv[1])
+    # "@path" reads the payload from a file (explicit test lists can exceed argv limits)
+    if sys.argv[1].startswith("@"):
+        with open(sys.argv[1][1:]) as f:
+            job_payload = json.load(f)
+    else:
+        job_payload = json.loads(sys.argv[1])
     executor = JobExecutor(job_payload)
-    executor.execute()
+    if job_payload.get("mode") == PREPARE_MODE:
+        executor.prepare()
+    else:
+        executor.execute()
 
 
 class JobExecutor:
@@ -39,12 +81,36 @@ class JobExecutor:
         self.workspace = Path(os.getenv("WORKSPACE_DIR", "/workspace"))
         self.config = get_config()
         self.artifact_collector = ArtifactCollector(self.config)
+        self.git_cache = (
+            GitMirrorCache(Path(self.config.git_cache_dir), self.config.git_cache_max_bytes)
+            if self.config.git_cache_enabled
+            else None
+        )
+        self.venv_cache = (
+            VenvCache(
+                Path(self.config.venv_cache_dir),
+                self.config.venv_cache_max_bytes,
+                self.config.framework_requirement,
+            )
+            if self.config.venv_cache_enabled
+            else None
+        )
+        self.venv_lease = None
+        # Environment blob of the workspace snapshot this shard was restored from
+        self.snapshot_environment: Optional[Dict] = None
+        # Resolved commit SHA of the checkout (indexes its collection manifest)
+        self.commit_sha: Optional[str] = None
+        self._collection_key: Optional[str] = None
+        self.results_file = self.workspace / ".qatron" / "results.jsonl"
+        self.shard_file = self.workspace / ".qatron" / "shard-tests.txt"
+        self.manifest_file = self.workspace / ".qatron" / "collection.json"
 
     def execute(self):
         """Execute the test job."""
         try:
-            # Step 1: Clone repository
-            self.clone_repository()
+            # Step 1: Unpack the run's prepared workspace, or clone the repository
+            if not self.restore_snapshot():
+                self.clone_repository()
 
             # Step 2: Load qatron.yml
             qatron_config = self.load_qatron_config()
@@ -56,17 +122,15 @@ class JobExecutor:
             test_results = self.run_tests(qatron_config)
 
             # Step 5: Collect artifacts
-            artifacts = self.artifact_collector.collect(self.workspace, self.run_id, self.shard_index)
+            artifacts = self.artifact_collector.collect(self.workspace)
 
-            # Step 6: Upload artifacts to S3
+            # Step 6: Package and upload artifacts to S3 (streamed, no temp archives)
             self.upload_artifacts(artifacts)
 
-            # Step 7: Post results to Control Plane
+            # Step 7: Post per-test results, then the run's status, to Control Plane
+            self.post_test_results()
             self.post_results(test_results, artifacts)
 
-            # Step 8: Cleanup
-            self.cleanup()
-
             sys.exit(0)
 
         except Exception as e:
@@ -74,8 +138,114 @@ class JobExecutor:
             self.post_error(str(e))
             sys.exit(1)
 
+        finally:
+            # Step 8: Cleanup (also on failure, so the workspace and its worktree are released)
+            try:
+                self.cleanup()
+            except Exception as e:
+                print(f"Cleanup failed: {e}", file=sys.stderr)
+
+    def prepare(self):
+        """
+        Prepare stage of a sharded run: check out and install once, store the commit's
+        collection manifest, then upload the workspace snapshot its shards unpack. Reports
+        nothing to the control plane; if it fails, the shards set up their own workspace.
+        """
+        try:
+            self.clone_repository()
+            qatron_config = self.load_qatron_config()
+            self.install_dependencies()
+            self.collect_manifest(qatron_config)
+            if os.getenv("SELECTION") == IMPACTED:
+                self.store_impacted_selection()
+            self.upload_snapshot()
+            sys.exit(0)
+        except Exception as e:
+            print(f"Error preparing workspace: {e}", file=sys.stderr)
+            sys.exit(1)
+        finally:
+            try:
+                self.cleanup()
+            except Exception as e:
+                print(f"Cleanup failed: {e}", file=sys.stderr)
+
+    def artifact_uploader(self) -> ArtifactUploader:
+        return ArtifactUploader(
+            build_s3_client(self.config),
+            self.config.s3_bucket_name,
+            max_workers=self.config.s3_upload_concurrency,
+            multipart_threshold=self.config.s3_multipart_threshold,
+            part_size=self.config.s3_multipart_part_size,
+            max_attempts=self.config.s3_upload_max_attempts,
+        )
+
+    def snapshot_store(self) -> SnapshotStore:
+        return SnapshotStore(self.artifact_uploader())
+
+    def manifest_store(self) -> ManifestStore:
+        return ManifestStore(self.artifact_uploader())
+
+    def impact_store(self) -> ImpactStore:
+        return ImpactStore(self.artifact_uploader())
+
+    def upload_snapshot(self) -> Dict:
+        """Upload the prepared workspace (and its cached environment) and the run's pointer."""
+        store = self.snapshot_store()
+        workspace = store.upload_directory(self.workspace, WORKSPACE_EXCLUDES, normalize=True)
+        pointer = {
+            "workspace": workspace.to_dict(),
+            "environment": None,
+            "commit": self.commit_sha,
+        }
+        print(f"Workspace snapshot: {workspace.key} ({workspace.size} bytes)")
+        if self.venv_lease:
+            # Environments are shared by runs with the same dependencies: archive each once
+            key = self.venv_lease.key
+            environment = store.get_pointer(environment_pointer_key(key))
+            if environment is None:
+                blob = store.upload_directory(self.venv_lease.venv_dir, [LAST_USED_MARKER])
+                environment = {"venv_key": key, "blob": blob.to_dict()}
+                store.put_pointer(environment_pointer_key(key), environment)
+            pointer["environment"] = environment
+            print(f"Environment snapshot: {environment['blob']['key']}")
+        store.put_pointer(snapshot_key(self.run_id), pointer)
+        return pointer
+
+    def restore_snapshot(self) -> bool:
+        """
+        Unpack the workspace prepared for this run, if the job names one. Returns False
+        (leaving an empty workspace) when there is none or it cannot be read.
+        """
+        if not self.job_payload.get("workspace_snapshot"):
+            return False
+        store = self.snapshot_store()
+        try:
+            pointer = store.get_pointer(snapshot_key(self.run_id))
+            if not pointer:
+                print("No workspace snapshot for this run; setting up the workspace")
+                return False
+            store.download_directory(pointer["workspace"]["key"], self.workspace)
+        except Exception as e:
+            print(f"Restoring workspace snapshot failed ({e}); cloning instead", file=sys.stderr)
+            if self.workspace.exists():
+                shutil.rmtree(self.workspace)
+            self.workspace.mkdir(parents=True)
+            return False
+        self.snapshot_environment = pointer.get("environment")
+        self.commit_sha = pointer.get("commit")
+        print(f"Restored workspace snapshot {pointer['workspace']['key']}")
+        return True
+
+    def fetch_environment(self, key: str, venv_dir: Path) -> bool:
+        """Unpack the snapshot's environment into the venv cache (VenvCache.acquire fetch)."""
+        environment = self.snapshot_environment
+        if not environment or environment["venv_key"] != key:
+            return False
+        self.snapshot_store().download_directory(environment["blob"]["key"], venv_dir)
+        return True
+
     def clone_repository(self):
-        """Clone the repository at the specified commit."""
+        """Check out the repository at the specified commit (via the local mirror cache)."""
         repo_url = os.getenv("REPO_URL")
         commit = os.getenv("COMMIT", "HEAD")
         repo_auth_method = os.getenv("REPO_AUTH_METHOD", "token")
@@ -84,25 +254,35 @@ class JobExecutor:
             raise ValueError("REPO_URL environment variable not set")
 
         # Prepare repo URL with authentication
+        fetch_url = repo_url
         if repo_auth_method == "token":
             token = os.getenv("REPO_TOKEN")
             if token:
                 # Insert token into URL
                 if repo_url.startswith("https://"):
-                    repo_url = repo_url.replace("https://", f"https://{token}@")
+                    fetch_url = repo_url.replace("https://", f"https://{token}@")
         elif repo_auth_method == "ssh":
             # SSH keys should be mounted in container
             pass
 
+        if self.git_cache:
+            print(f"Checking out {repo_url}@{commit} from mirror cache")
+            sha = self.git_cache.checkout(repo_url, commit, self.workspace, fetch_url=fetch_url)
+            print(f"Checked out commit: {sha}")
+            self.commit_sha = sha
+            return
+
         # Clone repository
         print(f"Cloning repository: {repo_url}")
-        Repo.clone_from(repo_url, self.workspace, depth=1)
-
-        # Checkout specific commit if provided
         if commit and commit != "HEAD":
-            repo = Repo(self.workspace)
-            repo.git.checkout(commit)
+            # A shallow clone only has the tip; fetch the requested commit explicitly
+            repo = Repo.init(self.workspace)
+            repo.git.fetch("--depth", "1", fetch_url, commit)
+            repo.git.checkout("FETCH_HEAD")
             print(f"Checked out commit: {commit}")
+        else:
+            repo = Repo.clone_from(fetch_url, self.workspace, depth=1)
+        self.commit_sha = repo.head.commit.hexsha
 
     def load_qatron_config(self) -> Dict:
         """Load qatron.yml configuration."""
@@ -115,7 +295,13 @@ class JobExecutor:
         return config
 
     def install_dependencies(self):
-        """Install project dependencies."""
+        """Install project dependencies (reusing a cached environment when possible)."""
+        if self.venv_cache:
+            fetch = self.fetch_environment if self.snapshot_environment else None
+            self.venv_lease = self.venv_cache.acquire(self.workspace, fetch=fetch)
+            if self.venv_lease:
+                return
+
         requirements_file = self.workspace / "requirements.txt"
         if requirements_file.exists():
             print("Installing Python dependencies...")
@@ -127,32 +313,238 @@ class JobExecutor:
 
         # Install qatron framework if needed
         subprocess.run(
-            ["pip", "install", "qatron-python"],
+            ["pip", "install", self.config.framework_requirement],
             check=True,
         )
 
+    def build_test_env(self, qatron_config: Dict, environment: str) -> Dict[str, str]:
+        """Environment for pytest: qatron.yml env vars, with the cached virtualenv first on PATH."""
+        env = os.environ.copy()
+        env.update(qatron_config.get("environments", {}).get(environment, {}))
+        if self.venv_lease:
+            env["VIRTUAL_ENV"] = str(self.venv_lease.venv_dir)
+            env["PATH"] = f"{self.venv_lease.bin_dir}{os.pathsep}{env.get('PATH', '')}"
+        # Picked up by the qatron pytest plugin (installed with the framework)
+        env[RESULTS_ENV_VAR] = str(self.results_file)
+        return env
+
+    def shard_selection_env(self, selection: Optional[Dict] = None) -> Dict[str, str]:
+        """
+        Environment telling the qatron shard plugin which collected tests belong to this shard.
+
+        The orchestrator sends (in the job payload, or per work-queue batch) either an
+        "exclude" list (run everything not planned elsewhere) or an explicit "tests" list.
+        Without a plan, tests are split by hash.
+        """
+        selection = self.job_payload if selection is None else selection
+        for key, env_var in (("exclude", "QATRON_DESELECT_FILE"), ("tests", "QATRON_SELECT_FILE")):
+            nodeids = selection.get(key)
+            if nodeids is not None:
+                self.shard_file.parent.mkdir(parents=True, exist_ok=True)
+                self.shard_file.write_text("".join(f"{nodeid}\n" for nodeid in nodeids))
+                print(f"Shard {self.shard_index}: {len(nodeids)} node ids in its {key} list")
+                return {env_var: str(self.shard_file)}
+        if self.shard_total > 1:
+            return {"QATRON_SHARD": f"{self.shard_index}/{self.shard_total}"}
+        return {}
+
+    def collection_key(self) -> str:
+        """Collection key of the workspace (see app.collection), computed once."""
+        if self._collection_key is None:
+            self._collection_key = collection_key(
+                self.workspace, [self.config.framework_requirement, platform.python_version()]
+            )
+        return self._collection_key
+
+    def load_manifest(self) -> Optional[Dict]:
+        """
+        Stored collection manifest of this checkout: the one the orchestrator planned the
+        run from, else the one under the workspace's collection key. None if there is none.
+        """
+        if not self.config.collection_manifests_enabled:
+            return None
+        key = self.job_payload.get("manifest")
+        try:
+            key = key or self.collection_key()
+            manifest = self.manifest_store().get(key)
+        except Exception as e:
+            print(f"Reading collection manifest failed ({e}); collecting", file=sys.stderr)
+            return None
+        if manifest is not None:
+            print(f"Using collection manifest {key} ({len(manifest['tests'])} tests)")
+        return manifest
+
+    def index_manifest(self, store: Optional[ManifestStore] = None) -> None:
+        """Record the workspace's manifest under the project and commit (for the planner)."""
+        project_id = os.getenv("PROJECT_ID")
+        if not project_id or not self.commit_sha:
+            return
+        store = store or self.manifest_store()
+        store.put_commit(project_id, self.commit_sha, self.collection_key())
+
+    def store_manifest(self) -> bool:
+        """Upload the manifest pytest wrote for this workspace; False if there is none."""
+        if not self.manifest_file.exists():
+            return False
+        try:
+            manifest = json.loads(self.manifest_file.read_text())
+            store = self.manifest_store()
+            store.put(self.collection_key(), manifest)
+            self.index_manifest(store)
+            print(f"Stored collection manifest {self.collection_key()}")
+            return True
+        except Exception as e:
+            print(f"Storing collection manifest failed: {e}", file=sys.stderr)
+            return False
+        finally:
+            self.manifest_file.unlink(missing_ok=True)
+
+    def collect_manifest(self, qatron_config: Dict) -> None:
+        """
+        Prepare stage: make sure the checkout's collection manifest is stored, collecting
+        once (pytest --collect-only) if needed. Best effort; shards collect themselves.
+        """
+        if not self.config.collection_manifests_enabled:
+            return
+        try:
+            if self.load_manifest() is not None:
+                self.index_manifest()
+                return
+        except Exception as e:
+            print(f"Indexing collection manifest failed: {e}", file=sys.stderr)
+            return
+        env = self.build_test_env(qatron_config, os.getenv("ENVIRONMENT", "default"))
+        env.pop(RESULTS_ENV_VAR, None)
+        env[MANIFEST_ENV_VAR] = str(self.manifest_file)
+        test_dir = qatron_config.get("test_dir", "tests")
+        cmd = ["pytest", "--collect-only", "-q", str(self.workspace / test_dir)]
+        print(f"Collecting tests: {' '.join(cmd)}")
+        # The node id listing is in the manifest; only errors go to the log
+        subprocess.run(cmd, cwd=self.workspace, env=env, stdout=subprocess.DEVNULL)
+        if not self.store_manifest():
+            print("No collection manifest written (collection errors?)", file=sys.stderr)
+
+    def selection_marker(self) -> Optional[str]:
+        """Marker selecting the suite's tests (pytest applies only the last -m: the suite's)."""
+        suite_name = os.getenv("SUITE_NAME", "default")
+        return suite_marker(suite_name) if suite_name else os.getenv("LAYER", "e2e") or None
+
+    def compute_impacted(
+        self, manifest: Dict, store: ImpactStore
+    ) -> Tuple[Optional[List[str]], str]:
+        """Suite tests affected by changes since the suite's coverage map (None: all)."""
+        coverage_map = store.load_suite_map(
+            os.getenv("PROJECT_ID"), os.getenv("SUITE_ID"), os.getenv("BASE_COMMIT") or None
+        )
+        if coverage_map is None:
+            return None, "no complete coverage map of the suite yet"
+        changed = changed_files(self.workspace, coverage_map.commit)
+        if changed is None:
+            return None, f"commit {coverage_map.commit[:12]} is not in the checkout"
+        candidates = select_tests(manifest, self.selection_marker(), {})
+        return impacted_tests(
+            coverage_map, manifest, candidates, changed, self.config.impact_min_mapped_fraction
+        )
+
+    def store_impacted_selection(self) -> None:
+        """Prepare stage of an impacted run: select its tests once for every shard."""
+        try:
+            manifest = self.load_manifest()
+            if manifest is None:
+                return
+            store = self.impact_store()
+            tests, reason = self.compute_impacted(manifest, store)
+            store.put_run_selection(self.run_id, tests, reason)
+        except Exception as e:
+            print(f"Impact analysis failed: {e}", file=sys.stderr)
+
+    def impacted_selection(self, manifest: Dict) -> Optional[Set[str]]:
+        """
+        Tests an impacted run may run: as selected by its prepare job, else from this
+        checkout. None (run the full suite) when the coverage map cannot be trusted.
+        """
+        try:
+            store = self.impact_store()
+            stored = store.get_run_selection(self.run_id)
+            if stored is None:
+                tests, reason = self.compute_impacted(manifest, store)
+            else:
+                tests, reason = stored["tests"], stored["reason"]
+        except Exception as e:
+            tests, reason = None, f"impact analysis failed: {e}"
+        if tests is None:
+            print(f"Impacted selection: running the full suite ({reason})")
+            return None
+        print(f"Impacted selection: {len(tests)} tests ({reason})")
+        return set(tests)
+
+    def record_coverage_map(self) -> None:
+        """Store this shard's per-test coverage map for later impacted runs (best effort)."""
+        coverage_file = self.workspace / ".coverage"
+        project_id, suite_id = os.getenv("PROJECT_ID"), os.getenv("SUITE_ID")
+        if not coverage_file.exists() or not project_id or not suite_id or not self.commit_sha:
+            return
+        try:
+            tests, imported = read_test_coverage(coverage_file, self.workspace)
+            if not tests:
+                return
+            coverage_map = CoverageMap.build(self.commit_sha, tests, imported)
+            complete = self.impact_store().put_shard_map(
+                project_id, suite_id, coverage_map, self.shard_index, self.shard_total
+            )
+            state = "suite map complete" if complete else "waiting for other shards"
+            print(f"Stored coverage map of {len(tests)} tests ({state})")
+        except Exception as e:
+            print(f"Storing coverage map failed: {e}", file=sys.stderr)
+
+    def manifest_selection(
+        self, manifest: Dict, marker: Optional[str], impacted: Optional[Set[str]] = None
+    ) -> Tuple[List[str], Dict[str, str]]:
+        """
+        Select this shard's tests on the manifest (only impacted ones, if given). Returns
+        the files pytest has to collect and the environment giving the shard plugin the
+        explicit node id list.
+        """
+        nodeids = select_tests(
+            manifest, marker, self.job_payload, self.shard_index, self.shard_total
+        )
+        if impacted is not None:
+            nodeids = [nodeid for nodeid in nodeids if nodeid in impacted]
+        self.shard_file.parent.mkdir(parents=True, exist_ok=True)
+        self.shard_file.write_text("".join(f"{nodeid}\n" for nodeid in nodeids))
+        total = len(manifest["tests"])
+        print(f"Shard {self.shard_index}: {len(nodeids)} of {total} manifest tests selected")
+        paths = [str(self.workspace / path) for path in collection_paths(manifest, nodeids)]
+        return paths, {"QATRON_SELECT_FILE": str(self.shard_file)}
+
     def run_tests(self, qatron_config: Dict) -> Dict:
         """Run tests using pytest."""
         suite_name = os.getenv("SUITE_NAME", "default")
         environment = os.getenv("ENVIRONMENT", "default")
         layer = os.getenv("LAYER", "e2e")
+        test_dir = qatron_config.get("test_dir", "tests")
+
+        # Set environment variables
+        env = self.build_test_env(qatron_config, environment)
+
+        # Work-queue batches carry their own lists and collect as before
+        work_queue = self.job_payload.get("work_queue")
+        manifest = None if work_queue else self.load_manifest()
+        impacted_run = os.getenv("SELECTION") == IMPACTED
+        # Per-test coverage of full runs maps tests to files for impacted runs
+        record_impact = self.config.impact_maps_enabled and not impacted_run
 
         # Build pytest command
         cmd = ["pytest"]
 
-        # Add markers based on layer and suite (suite_default, suite_smoke, etc.)
-        if layer:
-            cmd.extend(["-m", layer])
-        if suite_name:
-            suite_marker = f"suite_{suite_name.replace('-', '_')}"
-            cmd.extend(["-m", suite_marker])
-
-        # Add sharding if configured
-        if self.shard_total > 1:
-            cmd.extend(["--dist", "loadgroup", "-n", str(self.shard_total)])
-            cmd.extend(["--dist", "loadfile"])
-            # pytest-xdist sharding
-            cmd.extend(["-n", str(self.shard_total)])
+        if manifest is None:
+            # Add markers based on layer and suite (suite_default, suite_smoke, etc.)
+            if layer:
+                cmd.extend(["-m", layer])
+            if suite_name:
+                cmd.extend(["-m", suite_marker(suite_name)])
+            if self.config.collection_manifests_enabled:
+                env[MANIFEST_ENV_VAR] = str(self.manifest_file)
 
         # Add Allure reporting
         allure_results_dir = self.workspace / "allure-results"
@@ -161,61 +553,124 @@ class JobExecutor:
 
         # Add coverage
         cmd.extend(["--cov", ".", "--cov-report", "xml", "--cov-report", "html"])
-
-        # Add test directory
-        test_dir = qatron_config.get("test_dir", "tests")
-        cmd.append(str(self.workspace / test_dir))
-
-        # Set environment variables
-        env = os.environ.copy()
-        env.update(qatron_config.get("environments", {}).get(environment, {}))
-
-        print(f"Running tests: {' '.join(cmd)}")
-        result = subprocess.run(cmd, cwd=self.workspace, env=env, capture_output=True, text=True)
-
-        # Parse test results
-        test_results = {
-            "total": 0,
-            "passed": 0,
-            "failed": 0,
-            "skipped": 0,
-            "exit_code": result.returncode,
-        }
-
-        # Parse pytest output (simplified)
-        if result.stdout:
-            for line in result.stdout.split("\n"):
-                if "passed" in line.lower():
-                    test_results["passed"] += 1
-                    test_results["total"] += 1
-                elif "failed" in line.lower():
-                    test_results["failed"] += 1
-                    test_results["total"] += 1
-                elif "skipped" in line.lower():
-                    test_results["skipped"] += 1
-                    test_results["total"] += 1
+        if record_impact:
+            cmd.append(COVERAGE_CONTEXT_ARG)
+
+        if impacted_run and manifest is None:
+            print("Impacted selection needs a collection manifest; running the full suite")
+        if work_queue:
+            cmd.append(str(self.workspace / test_dir))
+            returncode = self.run_queued_batches(cmd, env)
+        elif manifest is not None:
+            impacted = self.impacted_selection(manifest) if impacted_run else None
+            paths, selection_env = self.manifest_selection(
+                manifest, self.selection_marker(), impacted
+            )
+            if impacted is not None and not paths:
+                print("No impacted tests in this shard")
+                self.results_file.parent.mkdir(parents=True, exist_ok=True)
+                self.results_file.touch()
+                returncode = 0
+            else:
+                env.update(selection_env)
+                # No files when nothing is selected: pytest then reports no tests, as with -m
+                cmd.extend(paths or [str(self.workspace / test_dir)])
+                print(f"Running tests: {' '.join(cmd)}")
+                returncode = subprocess.run(cmd, cwd=self.workspace, env=env).returncode
+        else:
+            cmd.append(str(self.workspace / test_dir))
+            env.update(self.shard_selection_env())
+            print(f"Running tests: {' '.join(cmd)}")
+            # Output goes straight to the worker log; results come from the plugin's file
+            returncode = subprocess.run(cmd, cwd=self.workspace, env=env).returncode
+            self.store_manifest()
+        if record_impact:
+            self.record_coverage_map()
+
+        test_results = summarize_results(self.results_file)
+        test_results["exit_code"] = returncode
+        test_results["durations"] = test_durations(self.results_file)
+        if not self.results_file.exists():
+            print(
+                f"No result file at {self.results_file}; is qatron-python installed?",
+                file=sys.stderr,
+            )
 
         return test_results
 
-    def upload_artifacts(self, artifacts: Dict):
-        """Upload artifacts to S3."""
-        s3_client = boto3.client(
-            "s3",
-            endpoint_url=self.config.s3_endpoint_url,
-            aws_access_key_id=self.config.s3_access_key_id,
-            aws_secret_access_key=self.config.s3_secret_access_key,
-            region_name=self.config.s3_region,
+    def run_queued_batches(self, cmd: List[str], env: Dict[str, str]) -> int:
+        """
+        Run batches claimed from the orchestrator's work queue until it is drained.
+
+        Each batch is one pytest session writing its own result file. Files of batches
+        whose lease was lost are dropped, since another worker reruns those tests.
+        Returns the first non-zero pytest exit code, or 0.
+        """
+        queue = self.job_payload["work_queue"]
+        client = WorkQueueClient(queue["url"], queue.get("lease_seconds", 120))
+        cmd = cmd[:-1] + ["--cov-append", cmd[-1]]  # coverage accumulates over batches
+        batch_dir = self.results_file.parent / "batches"
+        batch_dir.mkdir(parents=True, exist_ok=True)
+        kept: List[Path] = []
+        returncode = 0
+        try:
+            for number, batch in enumerate(client.batches()):
+                batch_id = batch["batch_id"]
+                batch_results = batch_dir / f"{number}.jsonl"
+                batch_env = {**env, **self.shard_selection_env(batch)}
+                batch_env[RESULTS_ENV_VAR] = str(batch_results)
+                print(f"Running batch {batch_id}: {' '.join(cmd)}")
+                with LeaseKeeper(client, batch_id) as lease:
+                    result = subprocess.run(cmd, cwd=self.workspace, env=batch_env)
+                if lease.lost or not client.complete(batch_id):
+                    print(f"Lost lease on batch {batch_id}; another worker reruns it")
+                    continue
+                kept.append(batch_results)
+                # 5 = no tests collected (e.g. a remainder batch with no new tests)
+                if result.returncode not in (0, 5) and not returncode:
+                    returncode = result.returncode
+        finally:
+            client.close()
+
+        with open(self.results_file, "wb") as merged:
+            for path in kept:
+                if path.exists():
+                    merged.write(path.read_bytes())
+        return returncode
+
+    def upload_artifacts(self, artifacts: Dict) -> Dict:
+        """
+        Upload artifacts to S3 as content-addressed blobs and write the shard manifest.
+
+        Directories are zipped on the fly into the upload stream. Identical blobs (e.g.
+        unchanged coverage HTML across shards and runs) are stored once;
+        runs/<run>/shard-<n>/manifest.json maps each artifact to its blob.
+        """
+        if not artifacts:
+            return {}
+
+        uploader = self.artifact_uploader()
+        print(f"Uploading {len(artifacts)} artifacts to S3")
+        blobs = self.artifact_collector.upload(artifacts, uploader)
+
+        manifest = {"run_id": self.run_id, "shard_index": self.shard_index, "artifacts": {}}
+        for artifact_type, blob in blobs.items():
+            source = artifacts[artifact_type]
+            state = "uploaded" if blob.uploaded else "already stored"
+            print(f"  {artifact_type}: {blob.key} ({blob.size} bytes, {state})")
+            manifest["artifacts"][artifact_type] = {
+                "name": source.name,
+                **blob.to_dict(),
+            }
+        manifest_key = f"runs/{self.run_id}/shard-{self.shard_index}/manifest.json"
+        uploader.with_retries(
+            uploader.s3.put_object,
+            Bucket=self.config.s3_bucket_name,
+            Key=manifest_key,
+            Body=json.dumps(manifest).encode("utf-8"),
+            ContentType="application/json",
         )
-
-        for artifact_type, artifact_path in artifacts.items():
-            if artifact_path and Path(artifact_path).exists():
-                s3_key = f"runs/{self.run_id}/shard-{self.shard_index}/{artifact_type}/{Path(artifact_path).name}"
-                print(f"Uploading {artifact_type} to S3: {s3_key}")
-                s3_client.upload_file(
-                    artifact_path,
-                    self.config.s3_bucket_name,
-                    s3_key,
-                )
+        return manifest
 
     def post_results(self, test_results: Dict, artifacts: Dict):
         """Post results to Control Plane API (internal endpoint or PUT /runs with token)."""
@@ -226,10 +681,15 @@ class JobExecutor:
         status = "completed" if test_results["exit_code"] == 0 else "failed"
         payload = {
             "status": status,
+            # The control plane finalizes the run once all shard_total shards have reported
+            "shard_index": self.shard_index,
+            "shard_total": self.shard_total,
             "total_tests": test_results["total"],
             "passed_tests": test_results["passed"],
             "failed_tests": test_results["failed"],
             "skipped_tests": test_results["skipped"],
+            # Recorded per suite by the control plane; the orchestrator plans shards from it
+            "test_durations": test_results.get("durations", {}),
         }
 
         headers = {}
@@ -248,13 +708,43 @@ class JobExecutor:
         except Exception as e:
             print(f"Failed to post results: {e}", file=sys.stderr)
 
+    def post_test_results(self) -> int:
+        """
+        Send the result file's per-test records to the control plane's internal endpoint in
+        batches (streamed from the file). Best effort; returns the records sent.
+        """
+        control_plane_url = os.getenv("CONTROL_PLANE_API_URL", "http://control-plane:8000/api/v1").rstrip("/")
+        internal_secret = os.getenv("INTERNAL_API_SECRET")
+        headers = {"X-Internal-Secret": internal_secret} if internal_secret else {}
+        url = f"{control_plane_url}/internal/runs/{self.run_id}/test-results"
+
+        sent = 0
+        try:
+            with httpx.Client(headers=headers, timeout=60.0) as client:
+                batches = iter_result_batches(self.results_file, self.config.result_batch_rows)
+                for seq, batch in enumerate(batches):
+                    # seq makes a resent batch a no-op on the control plane
+                    response = client.post(
+                        url, json={"shard_index": self.shard_index, "seq": seq, "results": batch}
+                    )
+                    response.raise_for_status()
+                    sent += len(batch)
+            print(f"Posted {sent} test results to Control Plane")
+        except Exception as e:
+            print(f"Failed to post test results after {sent}: {e}", file=sys.stderr)
+        return sent
+
     def post_error(self, error_message: str):
         """Post error to Control Plane API."""
         control_plane_url = os.getenv("CONTROL_PLANE_API_URL", "http://control-plane:8000/api/v1").rstrip("/")
         api_token = os.getenv("API_TOKEN")
         internal_secret = os.getenv("INTERNAL_API_SECRET")
 
-        payload = {"status": "failed"}
+        payload = {
+            "status": "failed",
+            "shard_index": self.shard_index,
+            "shard_total": self.shard_total,
+        }
         headers = {}
         if internal_secret:
             headers["X-Internal-Secret"] = internal_secret
@@ -271,9 +761,15 @@ class JobExecutor:
 
     def cleanup(self):
         """Clean up workspace."""
+        if self.venv_lease:
+            self.venv_lease.release()
+            self.venv_lease = None
         if self.workspace.exists():
             shutil.rmtree(self.workspace)
             print("Cleaned up workspace")
+        repo_url = os.getenv("REPO_URL")
+        if self.git_cache and repo_url:
+            self.git_cache.release(repo_url)
 
 
 if __name__ == "__main__":
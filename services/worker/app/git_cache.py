@@ -0,0 +1,204 @@
+"""Worker-local git mirror cache.
+
+One bare mirror is kept per repository URL. Jobs fetch only what they are missing
+(ideally the exact commit) into the mirror and check out through a detached worktree,
+so the working tree is populated from local objects instead of a fresh network clone.
+"""
+import hashlib
+import shutil
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlsplit, urlunsplit
+
+from git import GitCommandError, Repo
+
+from app.cache_utils import dir_size, file_lock
+
+LAST_USED_MARKER = "qatron-last-used"
+
+
+def normalize_repo_url(repo_url: str) -> str:
+    """Strip credentials and trailing noise so the same repo always maps to one mirror."""
+    url = repo_url.strip()
+    parts = urlsplit(url)
+    if parts.scheme and parts.hostname:
+        netloc = parts.hostname
+        if parts.port:
+            netloc = f"{netloc}:{parts.port}"
+        url = urlunsplit((parts.scheme.lower(), netloc.lower(), parts.path, "", ""))
+    url = url.rstrip("/")
+    if url.endswith(".git"):
+        url = url[: -len(".git")]
+    return url
+
+
+def cache_key(repo_url: str) -> str:
+    """Stable directory key for a repository URL."""
+    return hashlib.sha256(normalize_repo_url(repo_url).encode("utf-8")).hexdigest()[:24]
+
+
+class GitMirrorCache:
+    """Bare-mirror cache keyed by repository URL with size-bounded LRU eviction."""
+
+    def __init__(self, root: Path, max_bytes: int):
+        """Initialize cache rooted at root; mirrors beyond max_bytes are evicted LRU-first."""
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.mirrors_dir = self.root / "mirrors"
+        self.locks_dir = self.root / "locks"
+
+    def mirror_path(self, repo_url: str) -> Path:
+        """Path of the bare mirror for repo_url."""
+        return self.mirrors_dir / f"{cache_key(repo_url)}.git"
+
+    def _lock_path(self, key: str) -> Path:
+        return self.locks_dir / f"{key}.lock"
+
+    def checkout(
+        self, repo_url: str, commit: str, dest: Path, fetch_url: Optional[str] = None
+    ) -> str:
+        """
+        Materialize commit of repo_url at dest as a detached worktree of the mirror.
+
+        fetch_url is the URL used for network access (it may carry credentials); the
+        mirror itself is keyed and stored under the credential-free repo_url.
+        Returns the checked-out commit SHA.
+        """
+        fetch_url = fetch_url or repo_url
+        commit = commit or "HEAD"
+        key = cache_key(repo_url)
+        mirror = self.mirror_path(repo_url)
+
+        with file_lock(self._lock_path(key)):
+            repo = self._ensure_mirror(mirror, repo_url)
+            sha = self._resolve_or_fetch(repo, fetch_url, commit)
+            dest = Path(dest)
+            dest.mkdir(parents=True, exist_ok=True)
+            repo.git.worktree("prune")
+            repo.git.worktree("add", "--detach", str(dest), sha)
+            (mirror / LAST_USED_MARKER).touch()
+
+        self.evict(keep=key)
+        return sha
+
+    def release(self, repo_url: str) -> None:
+        """Forget worktrees whose directories have been removed (call after workspace cleanup)."""
+        mirror = self.mirror_path(repo_url)
+        if not mirror.exists():
+            return
+        with file_lock(self._lock_path(cache_key(repo_url))):
+            Repo(mirror).git.worktree("prune")
+
+    def _ensure_mirror(self, mirror: Path, repo_url: str) -> Repo:
+        """Open the mirror, creating an empty bare repository on first use."""
+        if (mirror / "HEAD").exists():
+            return Repo(mirror)
+        if mirror.exists():
+            # Leftover from an interrupted init
+            shutil.rmtree(mirror)
+        mirror.parent.mkdir(parents=True, exist_ok=True)
+        print(f"Creating git mirror for {repo_url}")
+        # Not `clone --mirror`: that fetches refs/* including every refs/pull/* on GitHub.
+        # Objects arrive through the targeted fetches in _resolve_or_fetch instead.
+        repo = Repo.init(mirror, bare=True)
+        # Never persist credentials; fetches pass fetch_url explicitly
+        repo.git.remote("add", "origin", repo_url)
+        repo.git.config("--replace-all", "remote.origin.fetch", "+refs/heads/*:refs/heads/*")
+        repo.git.config("--add", "remote.origin.fetch", "+refs/tags/*:refs/tags/*")
+        return repo
+
+    @staticmethod
+    def _resolve(repo: Repo, commit: str) -> Optional[str]:
+        try:
+            return repo.git.rev_parse("--verify", "--quiet", f"{commit}^{{commit}}")
+        except GitCommandError:
+            return None
+
+    @staticmethod
+    def _is_sha(commit: str) -> bool:
+        return 4 <= len(commit) <= 40 and all(c in "0123456789abcdef" for c in commit.lower())
+
+    @staticmethod
+    def _fetched_ref(commit: str) -> str:
+        """Local ref a targeted fetch of commit (a SHA, branch, tag or HEAD) is stored under."""
+        return f"refs/qatron/{commit}"
+
+    def _resolve_or_fetch(self, repo: Repo, fetch_url: str, commit: str) -> str:
+        """
+        Resolve commit in the mirror, fetching only the requested SHA or ref.
+
+        A known SHA needs no network at all. Otherwise the exact SHA/ref is fetched into
+        a ref under refs/qatron/, so its objects stay reachable (gc keeps them) and later
+        fetches negotiate against them instead of downloading the history again. The full
+        heads/tags fetch is only a fallback for servers that refuse to serve a SHA.
+        """
+        if self._is_sha(commit):
+            sha = self._resolve(repo, commit)
+            if sha:
+                return sha
+        ref = self._fetched_ref(commit)
+        try:
+            repo.git.fetch(fetch_url, f"+{commit}:{ref}")
+            sha = self._resolve(repo, ref)
+            if sha and (not self._is_sha(commit) or sha.startswith(commit.lower())):
+                return sha
+        except GitCommandError:
+            pass
+
+        self._fetch_all(repo, fetch_url)
+        sha = self._resolve(repo, commit) or self._resolve(repo, f"refs/tags/{commit}")
+        if not sha:
+            raise ValueError(f"Commit {commit} not found in {repo.git_dir}")
+        return sha
+
+    @staticmethod
+    def _fetch_all(repo: Repo, fetch_url: str) -> None:
+        repo.git.fetch(
+            "--prune", fetch_url, "+refs/heads/*:refs/heads/*", "+refs/tags/*:refs/tags/*"
+        )
+
+    def _has_live_worktrees(self, mirror: Path) -> bool:
+        worktrees = mirror / "worktrees"
+        if not worktrees.is_dir():
+            return False
+        Repo(mirror).git.worktree("prune")
+        return worktrees.is_dir() and any(worktrees.iterdir())
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        """
+        Remove least recently used mirrors until the cache fits in max_bytes.
+
+        Mirrors that are locked by another job or still back a live worktree are
+        skipped. Returns the number of bytes freed.
+        """
+        if not self.mirrors_dir.exists():
+            return 0
+        with file_lock(self.root / "evict.lock", blocking=False) as acquired:
+            if not acquired:
+                return 0
+            entries = []
+            total = 0
+            for mirror in self.mirrors_dir.iterdir():
+                if not mirror.is_dir():
+                    continue
+                size = dir_size(mirror)
+                marker = mirror / LAST_USED_MARKER
+                last_used = marker.stat().st_mtime if marker.exists() else 0.0
+                entries.append((last_used, mirror, size))
+                total += size
+
+            freed = 0
+            for _last_used, mirror, size in sorted(entries, key=lambda e: e[0]):
+                if total <= self.max_bytes:
+                    break
+                key = mirror.name[: -len(".git")]
+                if key == keep:
+                    continue
+                with file_lock(self._lock_path(key), blocking=False) as locked:
+                    if not locked or self._has_live_worktrees(mirror):
+                        continue
+                    print(f"Evicting git mirror {mirror.name} ({size} bytes)")
+                    shutil.rmtree(mirror, ignore_errors=True)
+                total -= size
+                freed += size
+            return freed
@@ -0,0 +1,295 @@
+"""Test impact analysis: the tests a change can affect, from per-test coverage.
+
+Runs measure coverage per test (pytest-cov's ``--cov-context=test``). After a run, each
+shard turns its .coverage data into a coverage map: the workspace files each test
+executed, as interned file ids (``{"files": [path, ...], "tests": {nodeid: [id, ...]}}``),
+gzipped under impact/<project>/<suite>/<commit>/. The suite's map at a commit is the merge
+of the maps of every shard of one run.
+
+A run with selection "impacted" diffs the map's commit against its checkout and keeps the
+tests that executed a changed file, the tests of changed test modules and feature files,
+and the tests the map does not know (added since). It runs the full suite when the map
+cannot be trusted: there is none, its commit is not in the repository, it misses too much
+of the suite, or a change is one coverage cannot attribute (conftest or pytest
+configuration, a module that only ran at import time, a non-Python file).
+"""
+import gzip
+import json
+import os
+import sqlite3
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from botocore.exceptions import ClientError
+from git import Repo
+from git.exc import GitError
+
+from app.collection import COLLECTION_FILES
+from app.s3_upload import ArtifactUploader, _is_not_found
+
+COVERAGE_CONTEXT_ARG = "--cov-context=test"
+COVERAGE_MAP_VERSION = 1
+IMPACTED = "impacted"
+# Changes to these can affect any test without showing up in its coverage
+FULL_RUN_FILES = COLLECTION_FILES | {"conftest.py"}
+# Changed files that cannot affect a test
+IGNORED_SUFFIXES = (".md", ".rst")
+_TEST_PHASES = ("setup", "run", "teardown")
+
+
+def map_prefix(project_id, suite_id, commit: str) -> str:
+    return f"impact/{project_id}/{suite_id}/{commit}/"
+
+
+def latest_map_key(project_id, suite_id) -> str:
+    """Object key naming the commit of the suite's most recent complete coverage map."""
+    return f"impact/{project_id}/{suite_id}/latest.json"
+
+
+def run_selection_key(run_id: int) -> str:
+    """Object key of an impacted run's selection (written by its prepare job)."""
+    return f"runs/{run_id}/impacted-tests.json"
+
+
+def _nodeid(context: str) -> str:
+    # pytest-cov labels contexts "<nodeid>|setup", "<nodeid>|run" and "<nodeid>|teardown"
+    nodeid, _, phase = context.rpartition("|")
+    return nodeid if nodeid and phase in _TEST_PHASES else context
+
+
+def read_test_coverage(
+    coverage_file: Path, workspace: Path
+) -> Tuple[Dict[str, Set[str]], Set[str]]:
+    """
+    Workspace files each test executed, from a coverage data file with test contexts,
+    and the files executed outside any test (at import or collection time).
+    """
+    tests: Dict[str, Set[str]] = {}
+    imported: Set[str] = set()
+    root = os.path.realpath(workspace)
+    query = """
+        SELECT context.context, file.path FROM line_bits
+        JOIN context ON context.id = line_bits.context_id JOIN file ON file.id = line_bits.file_id
+        UNION
+        SELECT context.context, file.path FROM arc
+        JOIN context ON context.id = arc.context_id JOIN file ON file.id = arc.file_id
+    """
+    connection = sqlite3.connect(f"file:{coverage_file}?mode=ro", uri=True)
+    try:
+        for context, path in connection.execute(query):
+            path = os.path.relpath(os.path.realpath(path), root)
+            if path.startswith(".."):
+                continue
+            if context:
+                tests.setdefault(_nodeid(context), set()).add(path)
+            else:
+                imported.add(path)
+    finally:
+        connection.close()
+    return tests, imported
+
+
+@dataclass
+class CoverageMap:
+    """Files each test of a suite executed at a commit, as ids into files."""
+
+    commit: str
+    files: List[str] = field(default_factory=list)
+    tests: Dict[str, List[int]] = field(default_factory=dict)
+    imported: List[int] = field(default_factory=list)  # Files executed outside tests
+
+    @classmethod
+    def build(cls, commit: str, tests: Dict[str, Set[str]], imported: Set[str]) -> "CoverageMap":
+        files = sorted(set(imported).union(*tests.values()))
+        ids = {path: i for i, path in enumerate(files)}
+        return cls(
+            commit=commit,
+            files=files,
+            tests={nodeid: sorted(ids[p] for p in paths) for nodeid, paths in tests.items()},
+            imported=sorted(ids[p] for p in imported),
+        )
+
+    @classmethod
+    def merge(cls, maps: Iterable["CoverageMap"]) -> "CoverageMap":
+        tests: Dict[str, Set[str]] = {}
+        imported: Set[str] = set()
+        commit = ""
+        for part in maps:
+            commit = part.commit
+            for nodeid, ids in part.tests.items():
+                tests.setdefault(nodeid, set()).update(part.files[i] for i in ids)
+            imported.update(part.files[i] for i in part.imported)
+        return cls.build(commit, tests, imported)
+
+    def to_dict(self) -> Dict:
+        return {
+            "version": COVERAGE_MAP_VERSION,
+            "commit": self.commit,
+            "files": self.files,
+            "tests": self.tests,
+            "imported": self.imported,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "CoverageMap":
+        return cls(data["commit"], data["files"], data["tests"], data["imported"])
+
+    def tests_by_file(self) -> Dict[str, Set[str]]:
+        """Inverse map: the tests that executed each file."""
+        by_file: Dict[str, Set[str]] = {}
+        for nodeid, ids in self.tests.items():
+            for i in ids:
+                by_file.setdefault(self.files[i], set()).add(nodeid)
+        return by_file
+
+
+def changed_files(repo_dir: Path, base: str, head: str = "HEAD") -> Optional[List[str]]:
+    """Paths that differ between two commits (both sides of renames); None if unknown."""
+    try:
+        output = Repo(repo_dir).git.diff("--name-only", "--no-renames", base, head)
+    except (GitError, ValueError):
+        return None
+    return [line for line in output.splitlines() if line]
+
+
+def impacted_tests(
+    coverage_map: CoverageMap,
+    manifest: Dict,
+    candidates: List[str],
+    changed: List[str],
+    min_mapped_fraction: float = 0.8,
+) -> Tuple[Optional[List[str]], str]:
+    """
+    The candidates (node ids of the suite, from the collection manifest) that the changed
+    files can affect, and why; None instead of a list means run every candidate.
+    """
+    mapped = sum(1 for nodeid in candidates if nodeid in coverage_map.tests)
+    if candidates and mapped < min_mapped_fraction * len(candidates):
+        commit = coverage_map.commit[:12]
+        return None, f"coverage map at {commit} has {mapped} of {len(candidates)} tests"
+
+    rootdir = manifest.get("rootdir", ".")
+    by_module: Dict[str, Set[str]] = {}
+    by_feature: Dict[str, Set[str]] = {}
+    for test in manifest["tests"]:
+        module = os.path.normpath(os.path.join(rootdir, test["file"]))
+        by_module.setdefault(module, set()).add(test["nodeid"])
+        scenario = test.get("scenario")
+        if scenario:
+            feature = os.path.normpath(os.path.join(rootdir, scenario["feature"]))
+            by_feature.setdefault(feature, set()).add(test["nodeid"])
+    by_file = coverage_map.tests_by_file()
+    known_files = set(coverage_map.files)
+
+    selected: Set[str] = set()
+    for path in changed:
+        if os.path.basename(path) in FULL_RUN_FILES:
+            return None, f"{path} changed"
+        affected = set().union(*(tests.get(path, ()) for tests in (by_module, by_feature, by_file)))
+        if affected:
+            selected |= affected
+        elif path in known_files:
+            return None, f"{path} changed and only ran at import time"
+        elif not path.endswith((".py", ".feature") + IGNORED_SUFFIXES):
+            return None, f"{path} changed and is not measured by coverage"
+        # Otherwise a module or feature file no recorded test used: nothing to rerun
+
+    # Tests added since the map was recorded
+    selected |= {nodeid for nodeid in candidates if nodeid not in coverage_map.tests}
+    tests = [nodeid for nodeid in candidates if nodeid in selected]
+    reason = f"{len(changed)} files changed since {coverage_map.commit[:12]}"
+    return tests, reason
+
+
+class ImpactStore:
+    """Reads and writes coverage maps and run selections in the artifact bucket."""
+
+    def __init__(self, uploader: ArtifactUploader):
+        self.uploader = uploader
+
+    def _get(self, key: str) -> Optional[bytes]:
+        try:
+            response = self.uploader.with_retries(
+                self.uploader.s3.get_object, Bucket=self.uploader.bucket, Key=key
+            )
+        except ClientError as e:
+            if _is_not_found(e):
+                return None
+            raise
+        return response["Body"].read()
+
+    def _put(self, key: str, body: bytes, content_type: str) -> None:
+        self.uploader.with_retries(
+            self.uploader.s3.put_object,
+            Bucket=self.uploader.bucket,
+            Key=key,
+            Body=body,
+            ContentType=content_type,
+        )
+
+    def _shard_keys(self, prefix: str) -> List[str]:
+        keys: List[str] = []
+        paginator = self.uploader.s3.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.uploader.bucket, Prefix=prefix):
+            keys.extend(item["Key"] for item in page.get("Contents", []))
+        return keys
+
+    def put_shard_map(
+        self, project_id, suite_id, coverage_map: CoverageMap, shard_index: int, shard_total: int
+    ) -> bool:
+        """
+        Store one shard's map. Returns True once every shard of the run has stored its
+        map; that shard then records the commit as the suite's latest map.
+        """
+        prefix = map_prefix(project_id, suite_id, coverage_map.commit)
+        body = gzip.compress(json.dumps(coverage_map.to_dict(), separators=(",", ":")).encode())
+        self._put(f"{prefix}shard-{shard_index}-of-{shard_total}.json.gz", body, "application/gzip")
+        if len(self._complete_keys(prefix, shard_total)) < shard_total:
+            return False
+        latest = json.dumps({"commit": coverage_map.commit}).encode("utf-8")
+        self._put(latest_map_key(project_id, suite_id), latest, "application/json")
+        return True
+
+    def _complete_keys(self, prefix: str, shard_total: int) -> List[str]:
+        suffix = f"-of-{shard_total}.json.gz"
+        return [key for key in self._shard_keys(prefix) if key.endswith(suffix)]
+
+    def load_map(self, project_id, suite_id, commit: str) -> Optional[CoverageMap]:
+        """The suite's merged map at commit, or None unless every shard of a run stored one."""
+        prefix = map_prefix(project_id, suite_id, commit)
+        totals: Dict[int, List[str]] = {}
+        for key in self._shard_keys(prefix):
+            total = int(key.rsplit("-of-", 1)[1].split(".", 1)[0])
+            totals.setdefault(total, []).append(key)
+        complete = [keys for total, keys in sorted(totals.items()) if len(keys) == total]
+        if not complete:
+            return None
+        parts = []
+        for key in complete[-1]:
+            data = json.loads(gzip.decompress(self._get(key)))
+            if data.get("version") != COVERAGE_MAP_VERSION:
+                return None
+            parts.append(CoverageMap.from_dict(data))
+        return CoverageMap.merge(parts)
+
+    def load_suite_map(
+        self, project_id, suite_id, base_commit: Optional[str] = None
+    ) -> Optional[CoverageMap]:
+        """The map at base_commit if there is one, else the suite's latest complete map."""
+        if base_commit:
+            coverage_map = self.load_map(project_id, suite_id, base_commit)
+            if coverage_map is not None:
+                return coverage_map
+        latest = self._get(latest_map_key(project_id, suite_id))
+        if latest is None:
+            return None
+        return self.load_map(project_id, suite_id, json.loads(latest)["commit"])
+
+    def put_run_selection(self, run_id: int, tests: Optional[List[str]], reason: str) -> None:
+        body = json.dumps({"tests": tests, "reason": reason}).encode("utf-8")
+        self._put(run_selection_key(run_id), body, "application/json")
+
+    def get_run_selection(self, run_id: int) -> Optional[Dict]:
+        body = self._get(run_selection_key(run_id))
+        return json.loads(body) if body is not None else None
@@ -0,0 +1,206 @@
+"""In-process job queue for the worker server.
+
+/execute only validates and enqueues; a fixed pool of runner threads executes jobs
+(one executor subprocess each) so a worker box can run several shards in parallel
+without oversubscribing CPU or memory. Jobs are keyed by (run_id, mode, shard_index):
+resubmitting a shard that is already known returns the existing job instead of
+starting a duplicate execution.
+"""
+
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional, Tuple
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+FINISHED_STATES = (COMPLETED, FAILED)
+# Job mode of a sharded run's prepare stage (shard jobs have no mode)
+PREPARE_MODE = "prepare"
+
+CGROUP_MEMORY_LIMITS = ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes")
+
+
+class QueueFullError(Exception):
+    """Raised when the worker already holds max_queued jobs waiting to run."""
+
+
+@dataclass
+class Job:
+    """A job accepted by this worker."""
+
+    id: str
+    run_id: int
+    shard_index: int
+    payload: Dict
+    context: Dict = field(default_factory=dict)
+    mode: str = ""  # PREPARE_MODE or empty (a shard)
+    status: str = QUEUED
+    error: Optional[str] = None
+    exit_code: Optional[int] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.id,
+            "run_id": self.run_id,
+            "shard_index": self.shard_index,
+            "mode": self.mode,
+            "status": self.status,
+            "error": self.error,
+            "exit_code": self.exit_code,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on (respects affinity / cpusets)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def available_memory() -> Optional[int]:
+    """Memory limit in bytes: the container's cgroup limit if set, else physical memory."""
+    for path in CGROUP_MEMORY_LIMITS:
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        if value.isdigit() and int(value) < 2**60:
+            return int(value)
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def compute_max_concurrent_jobs(
+    job_cpus: float,
+    job_memory_bytes: int,
+    cpus: Optional[int] = None,
+    memory_bytes: Optional[int] = None,
+) -> int:
+    """Number of jobs that fit in this box given a per-job CPU and memory budget (at least 1)."""
+    cpus = cpus if cpus is not None else available_cpus()
+    memory_bytes = memory_bytes if memory_bytes is not None else available_memory()
+    limit = int(cpus // job_cpus) if job_cpus > 0 else cpus
+    if memory_bytes and job_memory_bytes > 0:
+        limit = min(limit, int(memory_bytes // job_memory_bytes))
+    return max(1, limit)
+
+
+class JobQueue:
+    """Bounded queue of jobs executed by max_concurrent runner threads."""
+
+    def __init__(
+        self,
+        runner: Callable[[Job], int],
+        max_concurrent: int,
+        max_queued: int = 100,
+        history_size: int = 1000,
+    ):
+        """
+        Args:
+            runner: Executes a job and returns its exit code (0 = completed)
+            max_concurrent: Jobs running at the same time
+            max_queued: Jobs allowed to wait for a free slot before submit() is refused
+            history_size: Finished jobs kept for /jobs/{id} lookups
+        """
+        self.runner = runner
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.history_size = history_size
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._by_shard: Dict[Tuple[int, str, int], str] = {}
+
+    def submit(self, payload: Dict, context: Optional[Dict] = None) -> Tuple[Job, bool]:
+        """
+        Accept a job (orchestrator job payload plus run context) for execution.
+
+        Returns:
+            (job, created) where created is False if the shard was already known
+        """
+        run_id = payload["run_id"]
+        shard_index = payload.get("shard_index", 0)
+        mode = payload.get("mode", "")
+        with self._lock:
+            existing = self._by_shard.get((run_id, mode, shard_index))
+            if existing and existing in self._jobs:
+                return self._jobs[existing], False
+            if self._count(QUEUED) >= self.max_queued:
+                raise QueueFullError(f"{self.max_queued} jobs already queued")
+            job = Job(
+                id=uuid.uuid4().hex,
+                run_id=run_id,
+                shard_index=shard_index,
+                payload=payload,
+                context=context or {},
+                mode=mode,
+            )
+            self._jobs[job.id] = job
+            self._by_shard[(run_id, mode, shard_index)] = job.id
+            self._trim_history()
+        self._pool.submit(self._run, job)
+        return job, True
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def capacity(self) -> Dict[str, int]:
+        """Slots in use and free, for schedulers deciding where to send the next shard."""
+        with self._lock:
+            running = self._count(RUNNING)
+            queued = self._count(QUEUED)
+        return {
+            "max_concurrent": self.max_concurrent,
+            "running": running,
+            "queued": queued,
+            "available": max(0, self.max_concurrent - running - queued),
+            "max_queued": self.max_queued,
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
+
+    def _run(self, job: Job) -> None:
+        with self._lock:
+            job.status = RUNNING
+            job.started_at = time.time()
+        try:
+            exit_code = self.runner(job)
+            error = None if exit_code == 0 else f"Executor exited with {exit_code}"
+        except Exception as e:
+            exit_code, error = None, str(e)
+        with self._lock:
+            job.exit_code = exit_code
+            job.error = error
+            job.status = COMPLETED if error is None else FAILED
+            job.finished_at = time.time()
+
+    def _count(self, status: str) -> int:
+        return sum(1 for job in self._jobs.values() if job.status == status)
+
+    def _trim_history(self) -> None:
+        """Drop the oldest finished jobs beyond history_size (active jobs are never dropped)."""
+        finished = [j for j in self._jobs.values() if j.status in FINISHED_STATES]
+        for job in finished[: max(0, len(finished) - self.history_size)]:
+            del self._jobs[job.id]
+            key = (job.run_id, job.mode, job.shard_index)
+            if self._by_shard.get(key) == job.id:
+                del self._by_shard[key]
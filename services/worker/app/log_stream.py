@@ -0,0 +1,185 @@
+"""Line-by-line streaming of executor output.
+
+Each line read from the executor's pipe goes to a size-rotated file on disk and into a
+bounded in-memory queue. A shipper thread posts the queue in batches to the control
+plane. The pipe is never blocked by a slow control plane: when the queue is full, lines
+are dropped from the live stream (the on-disk log keeps everything).
+"""
+
+import os
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import IO, Callable, Dict, List, Optional
+
+import httpx
+
+MAX_LINE_BYTES = 64 * 1024
+
+
+class RotatingLogFile:
+    """Append-only text file rotated to path.1 .. path.N once it exceeds max_bytes."""
+
+    def __init__(self, path: Path, max_bytes: int, backup_count: int):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "ab")
+
+    def write(self, data: bytes) -> None:
+        if self.max_bytes and self._file.tell() + len(data) > self.max_bytes:
+            self._rotate()
+        self._file.write(data)
+
+    def _rotate(self) -> None:
+        self._file.close()
+        for index in range(self.backup_count - 1, 0, -1):
+            src = self.path.with_name(f"{self.path.name}.{index}")
+            if src.exists():
+                os.replace(src, self.path.with_name(f"{self.path.name}.{index + 1}"))
+        if self.backup_count > 0:
+            os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+        self._file = open(self.path, "ab")
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class LogShipper:
+    """Batches lines from a bounded queue and hands each batch to post() on a background thread."""
+
+    def __init__(
+        self,
+        post: Callable[[Dict], None],
+        shard_index: int = 0,
+        batch_lines: int = 200,
+        flush_interval: float = 1.0,
+        max_pending_lines: int = 10000,
+    ):
+        """
+        Args:
+            post: Sends one batch {"shard_index", "seq", "lines"}; failures are logged, not retried
+            batch_lines: Lines per batch at most
+            flush_interval: Seconds a partial batch waits before being sent
+            max_pending_lines: Queue bound; lines beyond it are dropped from the live stream
+        """
+        self.post = post
+        self.shard_index = shard_index
+        self.batch_lines = batch_lines
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._seq = 0
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue(maxsize=max_pending_lines)
+        self._thread = threading.Thread(target=self._run, name="log-shipper", daemon=True)
+        self._thread.start()
+
+    def write(self, line: str) -> None:
+        """Queue a line without ever blocking the caller."""
+        try:
+            self._queue.put_nowait(line)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self, timeout: float = 30.0) -> None:
+        """Send what is still queued, then stop the shipper thread."""
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        batch: List[str] = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                line = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                self._send(batch)
+                batch, deadline = [], None
+                continue
+            if line is None:
+                self._send(batch)
+                return
+            batch.append(line)
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_interval
+            if len(batch) >= self.batch_lines:
+                self._send(batch)
+                batch, deadline = [], None
+
+    def _send(self, lines: List[str]) -> None:
+        if self.dropped:
+            lines = lines + [f"[qatron] {self.dropped} log lines dropped from the live stream"]
+            self.dropped = 0
+        if not lines:
+            return
+        batch = {"shard_index": self.shard_index, "seq": self._seq, "lines": lines}
+        self._seq += 1
+        try:
+            self.post(batch)
+        except Exception as e:
+            print(f"Failed to ship log batch {batch['seq']}: {e}", file=sys.stderr)
+
+
+class ControlPlaneLogPoster:
+    """post() for LogShipper: sends batches to the control-plane internal logs endpoint."""
+
+    def __init__(self, run_id: int, retries: int = 3):
+        control_plane_url = os.getenv(
+            "CONTROL_PLANE_API_URL", "http://control-plane:8000/api/v1"
+        ).rstrip("/")
+        self.url = f"{control_plane_url}/internal/runs/{run_id}/logs"
+        self.retries = retries
+        headers = {}
+        internal_secret = os.getenv("INTERNAL_API_SECRET")
+        if internal_secret:
+            headers["X-Internal-Secret"] = internal_secret
+        self._client = httpx.Client(timeout=10.0, headers=headers)
+
+    def __call__(self, batch: Dict) -> None:
+        # The endpoint ignores resent (shard_index, seq) batches, so retrying is safe
+        for attempt in range(self.retries):
+            try:
+                self._client.post(self.url, json=batch).raise_for_status()
+                return
+            except httpx.HTTPError:
+                if attempt == self.retries - 1:
+                    raise
+                time.sleep(2**attempt)
+
+    def close(self) -> None:
+        self._client.close()
+
+
+def stream_output(
+    pipe: IO[bytes],
+    log_file: RotatingLogFile,
+    shipper: Optional[LogShipper] = None,
+    echo: Optional[IO[str]] = None,
+) -> int:
+    """
+    Copy pipe to the log file (and shipper / echo stream) line by line until EOF.
+
+    Lines longer than MAX_LINE_BYTES are split so memory stays bounded. Returns the
+    number of lines read.
+    """
+    count = 0
+    for raw in iter(lambda: pipe.readline(MAX_LINE_BYTES), b""):
+        log_file.write(raw)
+        line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+        if shipper:
+            shipper.write(line)
+        if echo:
+            echo.write(line + "\n")
+        count += 1
+        if count % 100 == 0:
+            log_file.flush()
+    log_file.flush()
+    return count
@@ -0,0 +1,78 @@
+"""Reader for the per-test result file written by the qatron pytest plugin."""
+import json
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+RESULTS_ENV_VAR = "QATRON_RESULTS_FILE"
+
+# Plugin outcome -> run counter reported to the control plane
+OUTCOME_COUNTERS = {
+    "passed": "passed",
+    "xpassed": "passed",
+    "failed": "failed",
+    "error": "failed",
+    "skipped": "skipped",
+    "xfailed": "skipped",
+}
+
+
+def iter_results(path: Path) -> Iterator[Dict]:
+    """Yield one record per test, streaming the file; malformed (truncated) lines are skipped."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def summarize_results(path: Path) -> Dict[str, int]:
+    """
+    Aggregate a result file into run counters.
+
+    Returns:
+        Dictionary with total, passed, failed, skipped and errors (errors are also failed)
+    """
+    summary = {"total": 0, "passed": 0, "failed": 0, "skipped": 0, "errors": 0}
+    if not Path(path).exists():
+        return summary
+    for record in iter_results(path):
+        counter = OUTCOME_COUNTERS.get(record.get("outcome"))
+        if counter is None:
+            continue
+        summary["total"] += 1
+        summary[counter] += 1
+        if record["outcome"] == "error":
+            summary["errors"] += 1
+    return summary
+
+
+def test_durations(path: Path) -> Dict[str, float]:
+    """Duration per executed test (collection errors excluded), for the shard planner's history."""
+    durations: Dict[str, float] = {}
+    if not Path(path).exists():
+        return durations
+    for record in iter_results(path):
+        if "collect" in record.get("phases", {}) or "duration" not in record:
+            continue
+        durations[record["nodeid"]] = record["duration"]
+    return durations
+
+
+def iter_result_batches(path: Path, size: int) -> Iterator[List[Dict]]:
+    """The result file's records in lists of up to size, read lazily."""
+    if not Path(path).exists():
+        return
+    batch: List[Dict] = []
+    for record in iter_results(path):
+        if "nodeid" not in record or record.get("outcome") not in OUTCOME_COUNTERS:
+            continue
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,377 @@
+"""Pooled, content-addressed artifact upload to S3.
+
+Every artifact is stored once under its SHA-256 (``blobs/sha256/<ab>/<digest>``); a
+blob that already exists (same bytes from another shard or run) is not uploaded
+again. Large files go up as multipart uploads whose parts, like small files, are
+leaf tasks on one bounded thread pool, so concurrency and memory (pool size x part
+size) stay bounded no matter how many or how large the artifacts are. Each S3 call
+is retried with exponential backoff. MultipartUploadSink does the same for data that
+is produced on the fly (archives), without writing it to disk first.
+"""
+
+import hashlib
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, TypeVar
+
+import boto3
+from botocore.config import Config as BotoConfig
+from botocore.exceptions import BotoCoreError, ClientError
+
+BLOB_PREFIX = "blobs/sha256"
+STAGING_PREFIX = "staging"
+MIN_PART_SIZE = 5 * 1024**2  # S3 minimum for every part but the last
+HASH_CHUNK_SIZE = 1024**2
+# Client errors worth retrying; anything else (e.g. AccessDenied) fails immediately
+RETRYABLE_ERROR_CODES = {
+    "InternalError",
+    "RequestTimeout",
+    "RequestTimeTooSkewed",
+    "ServiceUnavailable",
+    "SlowDown",
+    "Throttling",
+    "ThrottlingException",
+}
+
+T = TypeVar("T")
+
+
+@dataclass
+class UploadedBlob:
+    """Where an artifact's bytes live in the bucket."""
+
+    key: str
+    sha256: str
+    size: int
+    uploaded: bool  # False when an identical blob was already stored
+
+    def to_dict(self) -> Dict:
+        return {"key": self.key, "sha256": self.sha256, "size": self.size}
+
+
+def blob_key(digest: str) -> str:
+    """Content-addressed object key for a SHA-256 hex digest."""
+    return f"{BLOB_PREFIX}/{digest[:2]}/{digest}"
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, ClientError):
+        code = error.response.get("Error", {}).get("Code", "")
+        status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode", 0)
+        return code in RETRYABLE_ERROR_CODES or status >= 500
+    return isinstance(error, BotoCoreError)
+
+
+def _is_not_found(error: ClientError) -> bool:
+    code = error.response.get("Error", {}).get("Code", "")
+    return code in ("404", "NoSuchKey", "NotFound")
+
+
+class ArtifactUploader:
+    """Uploads files to a bucket as deduplicated blobs using a bounded pool of S3 calls."""
+
+    def __init__(
+        self,
+        s3_client,
+        bucket: str,
+        max_workers: int = 8,
+        multipart_threshold: int = 16 * 1024**2,
+        part_size: int = 16 * 1024**2,
+        max_attempts: int = 4,
+        backoff_seconds: float = 0.5,
+    ):
+        """
+        Args:
+            s3_client: boto3 S3 client (thread-safe; shared by every pool thread)
+            max_workers: S3 requests in flight at once
+            multipart_threshold: Files at least this large use multipart upload
+            part_size: Multipart part size (raised to the S3 minimum of 5 MiB)
+            max_attempts: Tries per S3 call before giving up
+            backoff_seconds: First retry delay; doubles on each attempt (with jitter)
+        """
+        self.s3 = s3_client
+        self.bucket = bucket
+        self.max_workers = max_workers
+        self.multipart_threshold = multipart_threshold
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+
+    def with_retries(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        """Call fn, retrying transient S3 errors with exponential backoff."""
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                return fn(*args, **kwargs)
+            except (BotoCoreError, ClientError) as e:
+                if attempt == self.max_attempts or not _is_retryable(e):
+                    raise
+                delay = self.backoff_seconds * 2 ** (attempt - 1)
+                time.sleep(delay * random.uniform(0.5, 1.5))
+        raise AssertionError("unreachable")
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.with_retries(self.s3.head_object, Bucket=self.bucket, Key=key)
+            return True
+        except ClientError as e:
+            if _is_not_found(e):
+                return False
+            raise
+
+    def upload_files(self, files: Dict[str, Path]) -> Dict[str, UploadedBlob]:
+        """
+        Upload files (name -> path) concurrently as content-addressed blobs.
+
+        Returns name -> UploadedBlob. Raises the first upload error after aborting any
+        multipart uploads that were left incomplete.
+        """
+        results: Dict[str, UploadedBlob] = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="s3") as pool:
+            pending = []
+            queued = set()
+            for name, path in files.items():
+                path = Path(path)
+                digest = file_sha256(path)
+                size = path.stat().st_size
+                key = blob_key(digest)
+                if key in queued:
+                    pending.append((name, UploadedBlob(key, digest, size, uploaded=False), None))
+                    continue
+                if self.exists(key):
+                    results[name] = UploadedBlob(key, digest, size, uploaded=False)
+                    continue
+                if size >= self.multipart_threshold:
+                    finish = self._start_multipart(pool, path, key, size)
+                else:
+                    future = pool.submit(self._put_file, path, key)
+                    finish = future.result
+                queued.add(key)
+                pending.append((name, UploadedBlob(key, digest, size, uploaded=True), finish))
+
+            # Finish everything (multipart uploads abort themselves on failure) before
+            # surfacing the first error, so nothing is left half-uploaded
+            error: Optional[BaseException] = None
+            for name, blob, finish in pending:
+                try:
+                    if finish:
+                        finish()
+                    results[name] = blob
+                except BaseException as e:
+                    error = error or e
+            if error:
+                raise error
+        return results
+
+    def _put_file(self, path: Path, key: str) -> None:
+        def put():
+            with open(path, "rb") as body:
+                self.s3.put_object(Bucket=self.bucket, Key=key, Body=body)
+
+        self.with_retries(put)
+
+    def _start_multipart(
+        self, pool: ThreadPoolExecutor, path: Path, key: str, size: int
+    ) -> Callable[[], None]:
+        """Queue every part of path on the pool; returns a callable that completes the upload."""
+        upload_id = self.with_retries(self.s3.create_multipart_upload, Bucket=self.bucket, Key=key)[
+            "UploadId"
+        ]
+        futures: List[Future] = []
+        for number, offset in enumerate(range(0, size, self.part_size), start=1):
+            length = min(self.part_size, size - offset)
+            futures.append(
+                pool.submit(self._upload_part, path, key, upload_id, number, offset, length)
+            )
+
+        def finish() -> None:
+            try:
+                parts = [future.result() for future in futures]
+                self.with_retries(
+                    self.s3.complete_multipart_upload,
+                    Bucket=self.bucket,
+                    Key=key,
+                    UploadId=upload_id,
+                    MultipartUpload={"Parts": parts},
+                )
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                self.abort_multipart(key, upload_id)
+                raise
+
+        return finish
+
+    def _upload_part(
+        self, path: Path, key: str, upload_id: str, number: int, offset: int, length: int
+    ) -> Dict:
+        def put_part():
+            # Read inside the retry so each attempt sends the same bytes
+            with open(path, "rb") as f:
+                f.seek(offset)
+                body = f.read(length)
+            return self.s3.upload_part(
+                Bucket=self.bucket, Key=key, UploadId=upload_id, PartNumber=number, Body=body
+            )
+
+        response = self.with_retries(put_part)
+        return {"PartNumber": number, "ETag": response["ETag"]}
+
+    def abort_multipart(self, key: str, upload_id: str) -> None:
+        """Best-effort abort so incomplete parts do not accumulate in the bucket."""
+        try:
+            self.s3.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+        except (BotoCoreError, ClientError) as e:
+            print(f"Failed to abort multipart upload {upload_id}: {e}")
+
+
+class MultipartUploadSink:
+    """
+    Write-only, non-seekable stream that uploads its bytes as a content-addressed blob.
+
+    Data is hashed as it is written and cut into parts that are uploaded on part_pool
+    while writing continues; at most max_in_flight parts are buffered or in flight, so
+    memory is bounded by (max_in_flight + 1) x part_size and nothing touches disk. The
+    digest is only known at the end, so multipart streams go to a staging key and are
+    copied server-side to their blob key (or dropped if that blob already exists).
+    Streams smaller than one part are put directly under their blob key.
+    """
+
+    def __init__(
+        self, uploader: ArtifactUploader, part_pool: ThreadPoolExecutor, max_in_flight: int = 2
+    ):
+        self.uploader = uploader
+        self.part_pool = part_pool
+        self._buffer = bytearray()
+        self._hash = hashlib.sha256()
+        self._size = 0
+        self._upload_id: Optional[str] = None
+        self._staging_key = f"{STAGING_PREFIX}/{uuid.uuid4().hex}"
+        self._futures: List[Future] = []
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._hash.update(data)
+        self._size += len(data)
+        self._buffer += data
+        part_size = self.uploader.part_size
+        while len(self._buffer) >= part_size:
+            self._submit_part(bytes(self._buffer[:part_size]))
+            del self._buffer[:part_size]
+        return len(data)
+
+    def tell(self) -> int:
+        return self._size
+
+    def flush(self) -> None:
+        pass
+
+    def _submit_part(self, data: bytes) -> None:
+        uploader = self.uploader
+        if self._upload_id is None:
+            self._upload_id = uploader.with_retries(
+                uploader.s3.create_multipart_upload, Bucket=uploader.bucket, Key=self._staging_key
+            )["UploadId"]
+        for future in self._futures:
+            if future.done() and future.exception():
+                raise future.exception()
+        # Blocks the writer while max_in_flight parts are pending: backpressure, not buffering
+        self._slots.acquire()
+        number = len(self._futures) + 1
+        future = self.part_pool.submit(self._upload_part, number, data)
+        future.add_done_callback(lambda _: self._slots.release())
+        self._futures.append(future)
+
+    def _upload_part(self, number: int, data: bytes) -> Dict:
+        uploader = self.uploader
+        response = uploader.with_retries(
+            uploader.s3.upload_part,
+            Bucket=uploader.bucket,
+            Key=self._staging_key,
+            UploadId=self._upload_id,
+            PartNumber=number,
+            Body=data,
+        )
+        return {"PartNumber": number, "ETag": response["ETag"]}
+
+    def finish(self) -> UploadedBlob:
+        """Upload what is left and publish the blob under its content address."""
+        uploader = self.uploader
+        digest = self._hash.hexdigest()
+        key = blob_key(digest)
+        if self._upload_id is None:
+            if uploader.exists(key):
+                return UploadedBlob(key, digest, self._size, uploaded=False)
+            uploader.with_retries(
+                uploader.s3.put_object, Bucket=uploader.bucket, Key=key, Body=bytes(self._buffer)
+            )
+            return UploadedBlob(key, digest, self._size, uploaded=True)
+
+        try:
+            if self._buffer:
+                self._submit_part(bytes(self._buffer))
+                self._buffer = bytearray()
+            parts = [future.result() for future in self._futures]
+            uploader.with_retries(
+                uploader.s3.complete_multipart_upload,
+                Bucket=uploader.bucket,
+                Key=self._staging_key,
+                UploadId=self._upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+        except BaseException:
+            self.abort()
+            raise
+        self._upload_id = None
+        try:
+            if uploader.exists(key):
+                return UploadedBlob(key, digest, self._size, uploaded=False)
+            # Managed copy: switches to multipart copy for objects over 5 GB
+            uploader.with_retries(
+                uploader.s3.copy,
+                {"Bucket": uploader.bucket, "Key": self._staging_key},
+                uploader.bucket,
+                key,
+            )
+            return UploadedBlob(key, digest, self._size, uploaded=True)
+        finally:
+            uploader.with_retries(
+                uploader.s3.delete_object, Bucket=uploader.bucket, Key=self._staging_key
+            )
+
+    def abort(self) -> None:
+        """Discard a stream that will not be finished (e.g. packaging failed)."""
+        for future in self._futures:
+            future.cancel()
+        if self._upload_id is not None:
+            self.uploader.abort_multipart(self._staging_key, self._upload_id)
+            self._upload_id = None
+        self._buffer = bytearray()
+
+
+def build_s3_client(config, max_pool_connections: Optional[int] = None):
+    """S3 client for the worker's bucket, with a connection pool sized for the upload pool."""
+    return boto3.client(
+        "s3",
+        endpoint_url=config.s3_endpoint_url,
+        aws_access_key_id=config.s3_access_key_id,
+        aws_secret_access_key=config.s3_secret_access_key,
+        region_name=config.s3_region,
+        config=BotoConfig(
+            max_pool_connections=max_pool_connections or config.s3_upload_concurrency,
+            retries={"max_attempts": 1, "mode": "standard"},  # ArtifactUploader retries
+        ),
+    )
@@ -3,18 +3,32 @@ import json
 import logging
 import os
 import subprocess
+import sys
+import threading
 from pathlib import Path
+from typing import Optional
 
 import httpx
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
+
+from app.config import get_config
+from app.log_stream import ControlPlaneLogPoster, LogShipper, RotatingLogFile, stream_output
+from app.job_queue import (
+    PREPARE_MODE,
+    Job,
+    JobQueue,
+    QueueFullError,
+    compute_max_concurrent_jobs,
+)
+from app.venv_cache import VenvCache
 
 logger = logging.getLogger(__name__)
 
 app = FastAPI(title="QAtron Worker", version="0.1.0")
 
 
-def _post_run_status(run_id: int, status: str) -> None:
-    """Post run status to control-plane internal API (best effort)."""
+def _post_run_status(run_id: int, status: str, job: Optional[dict] = None) -> None:
+    """Post the status of a job's shard to control-plane internal API (best effort)."""
     control_plane_url = os.getenv("CONTROL_PLANE_API_URL", "http://control-plane:8000/api/v1").rstrip("/")
     internal_secret = os.getenv("INTERNAL_API_SECRET")
     url = f"{control_plane_url}/internal/runs/{run_id}/results"
@@ -22,7 +36,8 @@ def _post_run_status(run_id: int, status: str) -> None:
     if internal_secret:
         headers["X-Internal-Secret"] = internal_secret
     try:
-        httpx.put(url, json={"status": status}, headers=headers, timeout=10.0)
+        shard = {key: job[key] for key in ("shard_index", "shard_total") if key in (job or {})}
+        httpx.put(url, json={"status": status, **shard}, headers=headers, timeout=10.0)
     except Exception:
         pass
 
@@ -32,66 +47,166 @@ def health():
     return {"status": "healthy"}
 
 
-@app.post("/execute")
-def execute(body: dict):
+@app.get("/stats")
+def stats():
+    """Worker-local cache counters (dependency environment hits/misses/evictions)."""
+    config = get_config()
+    venv_cache = VenvCache(
+        Path(config.venv_cache_dir), config.venv_cache_max_bytes, config.framework_requirement
+    )
+    return {"venv_cache": {"enabled": config.venv_cache_enabled, **venv_cache.stats()}}
+
+
+def run_executor_job(job: Job) -> int:
+    """Run one job in an executor subprocess (called on a job-queue runner thread)."""
+    config = get_config()
+    context = job.context
+    run_id, shard_index = job.run_id, job.shard_index
+    # A prepare job is not a shard: it reports no status and its log stays on the worker
+    prepare = job.mode == PREPARE_MODE
+    label = "prepare" if prepare else f"shard_{shard_index}"
+
+    # So the UI shows "Running" once the job leaves the queue
+    if not prepare:
+        _post_run_status(run_id, "running")
+
+    workspace_dir = f"/workspace/run_{run_id}_{label}"
+    Path(workspace_dir).mkdir(parents=True, exist_ok=True)
+
+    env = os.environ.copy()
+    env["REPO_URL"] = context["repo_url"]
+    env["COMMIT"] = context.get("commit", "HEAD")
+    env["SUITE_NAME"] = context.get("suite_name", "default")
+    env["ENVIRONMENT"] = context.get("environment_name", "default")
+    env["LAYER"] = context.get("layer", "e2e")
+    env["WORKSPACE_DIR"] = workspace_dir
+    # Indexes the commit's collection manifest for the orchestrator's shard planner
+    env["PROJECT_ID"] = str(context.get("project_id") or "")
+    env["SUITE_ID"] = str(context.get("suite_id") or "")
+    # "impacted": run only the tests affected by changes since BASE_COMMIT (app.impact)
+    env["SELECTION"] = context.get("selection") or "all"
+    env["BASE_COMMIT"] = context.get("base_commit") or ""
+    env.setdefault("CONTROL_PLANE_API_URL", "http://control-plane:8000/api/v1")
+    # SELENIUM_GRID_URL should be set in container (e.g. http://selenium-hub:4444/wd/hub)
+
+    # Output is streamed line by line to a rotating file and to the control plane,
+    # instead of being buffered in memory until the job ends
+    log_file = RotatingLogFile(
+        Path(config.log_dir) / f"run_{run_id}_{label}.log",
+        config.log_max_bytes,
+        config.log_backup_count,
+    )
+    poster = None if prepare else ControlPlaneLogPoster(run_id)
+    shipper = None
+    if poster:
+        shipper = LogShipper(
+            poster,
+            shard_index=shard_index,
+            batch_lines=config.log_batch_lines,
+            flush_interval=config.log_flush_interval,
+        )
+    # Passed as a file: explicit shard test lists can exceed the per-argument size limit
+    payload_file = Path(config.log_dir) / f"run_{run_id}_{label}.job.json"
+    payload_file.write_text(json.dumps(job.payload))
+    proc = subprocess.Popen(
+        ["python", "-m", "app.executor", f"@{payload_file}"],
+        env=env,
+        cwd="/app",
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+    )
+    timed_out = threading.Event()
+
+    def kill_on_timeout():
+        timed_out.set()
+        proc.kill()
+
+    timer = threading.Timer(config.job_timeout_seconds, kill_on_timeout)
+    timer.start()
+    try:
+        stream_output(proc.stdout, log_file, shipper, echo=sys.stdout)
+        returncode = proc.wait()
+    finally:
+        timer.cancel()
+        proc.stdout.close()
+        if shipper:
+            shipper.close()
+            poster.close()
+        log_file.close()
+        payload_file.unlink(missing_ok=True)
+
+    if timed_out.is_set():
+        if not prepare:
+            _post_run_status(run_id, "failed", job.payload)
+        raise TimeoutError(f"Job timed out after {config.job_timeout_seconds}s")
+    if returncode != 0:
+        logger.error("Executor failed run_id=%s %s: exit %s", run_id, label, returncode)
+        if not prepare:
+            _post_run_status(run_id, "failed", job.payload)
+    return returncode
+
+
+_job_queue: Optional[JobQueue] = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Process-wide job queue, sized from config (or from CPU and memory when not set)."""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            config = get_config()
+            max_concurrent = config.max_concurrent_jobs or compute_max_concurrent_jobs(
+                config.job_cpus, config.job_memory_bytes
+            )
+            logger.info("Worker runs up to %s concurrent jobs", max_concurrent)
+            _job_queue = JobQueue(run_executor_job, max_concurrent, config.max_queued_jobs)
+        return _job_queue
+
+
+@app.post("/execute", status_code=202)
+def execute(body: dict, response: Response):
     """
-    Run a test job. Body: { "job": { run_id, shard_index, shard_total }, "context": { ... } }.
-    Spawns the executor with env from context and container env (SELENIUM_GRID_URL, S3_*, etc.).
+    Accept a test job and return its job id without waiting for it to run.
+    Body: { "job": { run_id, shard_index, shard_total }, "context": { ... } }; a job with
+    "mode": "prepare" builds the run's workspace snapshot instead of running a shard.
+    Resubmitting a shard that this worker already has returns the existing job (200).
     """
     job = body.get("job") or {}
     context = body.get("context") or {}
     run_id = job.get("run_id")
-    shard_index = job.get("shard_index", 0)
-    _shard_total = job.get("shard_total", 1)  # reserved for future sharding
     if not run_id:
         raise HTTPException(status_code=400, detail="job.run_id required")
 
     repo_url = (context.get("repo_url") or "").strip()
     if not repo_url:
-        _post_run_status(run_id, "failed")
+        if job.get("mode") != PREPARE_MODE:
+            _post_run_status(run_id, "failed", job)
         raise HTTPException(
             status_code=400,
             detail="Project has no repo_url. Set a cloneable Git URL in the project settings.",
         )
+    context = {**context, "repo_url": repo_url}
 
-    # So the UI shows "Running" while the job executes
-    _post_run_status(run_id, "running")
+    try:
+        accepted, created = get_job_queue().submit(job, context)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    if not created:
+        response.status_code = 200
+    return {**accepted.to_dict(), "duplicate": not created}
 
-    workspace_dir = f"/workspace/run_{run_id}_shard_{shard_index}"
-    Path(workspace_dir).mkdir(parents=True, exist_ok=True)
 
-    env = os.environ.copy()
-    env["REPO_URL"] = repo_url
-    env["COMMIT"] = context.get("commit", "HEAD")
-    env["SUITE_NAME"] = context.get("suite_name", "default")
-    env["ENVIRONMENT"] = context.get("environment_name", "default")
-    env["LAYER"] = context.get("layer", "e2e")
-    env["WORKSPACE_DIR"] = workspace_dir
-    env.setdefault("CONTROL_PLANE_API_URL", "http://control-plane:8000/api/v1")
-    # SELENIUM_GRID_URL should be set in container (e.g. http://selenium-hub:4444/wd/hub)
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """Status of a job accepted by this worker."""
+    job = get_job_queue().get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
 
-    job_json = json.dumps(job)
-    try:
-        proc = subprocess.run(
-            ["python", "-m", "app.executor", job_json],
-            env=env,
-            capture_output=True,
-            text=True,
-            timeout=3600,
-            cwd="/app",
-        )
-    except subprocess.TimeoutExpired:
-        raise HTTPException(status_code=504, detail="Job timed out")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-    if proc.returncode != 0:
-        err = proc.stderr or proc.stdout or f"Executor exited with {proc.returncode}"
-        logger.error("Executor failed run_id=%s: %s", run_id, err)
-        if proc.stdout:
-            logger.error("Executor stdout: %s", proc.stdout[-2000:])  # last 2k chars
-        if proc.stderr:
-            logger.error("Executor stderr: %s", proc.stderr[-2000:])
-        _post_run_status(run_id, "failed")
-        raise HTTPException(status_code=502, detail=err)
-    return {"status": "completed", "run_id": run_id, "shard_index": shard_index}
+
+@app.get("/capacity")
+def capacity():
+    """Concurrent job slots: configured maximum, running, queued and available."""
+    return get_job_queue().capacity()
@@ -0,0 +1,316 @@
+"""Content-hashed virtualenv cache for job dependencies.
+
+Environments are keyed by the dependency inputs of a workspace (requirements.txt and
+every file it includes, lock files, the pinned framework requirement and the
+interpreter version). A job whose key is already built symlinks the prebuilt
+environment into its workspace instead of running pip; a miss builds the environment
+once and later jobs with the same key hit.
+"""
+import fcntl
+import hashlib
+import json
+import shlex
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.cache_utils import dir_size, file_lock
+
+LAST_USED_MARKER = ".qatron-last-used"
+DEPENDENCY_FILES = (
+    "requirements.txt",
+    "requirements.lock",
+    "constraints.txt",
+    "poetry.lock",
+    "Pipfile.lock",
+)
+LOCAL_PREFIXES = (".", "/", "~", "file:")
+
+
+def _is_local_requirement(line: str) -> bool:
+    """True if a requirement line installs from the workspace (editable or path/file URL)."""
+    if line.startswith(("-e", "--editable")):
+        return True
+    if line.startswith(LOCAL_PREFIXES):
+        return True
+    return " @ file:" in line or "@file:" in line
+
+
+def _include_target(tokens: List[str]) -> Optional[str]:
+    """File named by a -r/-c style include line, or None for ordinary requirement lines."""
+    option = tokens[0]
+    for long_option in ("--requirement", "--constraint"):
+        if option == long_option:
+            return tokens[1] if len(tokens) > 1 else None
+        if option.startswith(long_option + "="):
+            return option.split("=", 1)[1]
+    for short_option in ("-r", "-c"):
+        if option == short_option:
+            return tokens[1] if len(tokens) > 1 else None
+        if option.startswith(short_option):
+            return option[len(short_option) :].lstrip("=")
+    return None
+
+
+def collect_requirement_files(requirements_file: Path) -> Tuple[List[Path], bool]:
+    """
+    Follow -r/-c includes from requirements_file.
+
+    Returns every requirements/constraints file reached (in a stable order) and whether
+    any line refers to a local path, which makes the environment workspace-specific.
+    """
+    seen: List[Path] = []
+    has_local = False
+    pending = [requirements_file]
+    while pending:
+        path = pending.pop(0).resolve()
+        if path in seen or not path.is_file():
+            continue
+        seen.append(path)
+        for raw in path.read_text(encoding="utf-8").splitlines():
+            line = raw.split(" #", 1)[0].strip()
+            if not line or line.startswith("#"):
+                continue
+            target = _include_target(shlex.split(line))
+            if target:
+                pending.append(path.parent / target)
+            elif _is_local_requirement(line):
+                has_local = True
+    return seen, has_local
+
+
+def environment_key(
+    workspace: Path, framework_requirement: str, python_version: Optional[str] = None
+) -> Optional[str]:
+    """
+    Hash of everything that determines the installed environment for a workspace.
+
+    Returns None when the requirements install anything from the workspace itself;
+    such environments cannot outlive the job and must not be cached.
+    """
+    digest = hashlib.sha256()
+    digest.update((python_version or sys.version).encode("utf-8"))
+    digest.update(framework_requirement.encode("utf-8"))
+    files = [workspace / name for name in DEPENDENCY_FILES if (workspace / name).is_file()]
+    requirements_file = workspace / "requirements.txt"
+    if requirements_file.is_file():
+        included, has_local = collect_requirement_files(requirements_file)
+        if has_local:
+            return None
+        files.extend(p for p in included if p not in files)
+    root = workspace.resolve()
+    for path in files:
+        resolved = path.resolve()
+        try:
+            name = str(resolved.relative_to(root))
+        except ValueError:
+            name = str(resolved)
+        digest.update(name.encode("utf-8"))
+        digest.update(hashlib.sha256(resolved.read_bytes()).digest())
+    return digest.hexdigest()[:32]
+
+
+class VenvLease:
+    """A shared lock on a cached environment, held while a job uses it."""
+
+    def __init__(self, key: str, venv_dir: Path, lock_file):
+        self.key = key
+        self.venv_dir = venv_dir
+        self._lock_file = lock_file
+
+    @property
+    def bin_dir(self) -> Path:
+        return self.venv_dir / "bin"
+
+    def release(self) -> None:
+        """Drop the lock so the environment becomes eligible for eviction again."""
+        if self._lock_file is not None:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+            self._lock_file.close()
+            self._lock_file = None
+
+
+class VenvCache:
+    """Prebuilt virtualenvs keyed by dependency hash, with LRU eviction under a disk budget."""
+
+    def __init__(self, root: Path, max_bytes: int, framework_requirement: str):
+        """Initialize cache rooted at root; environments beyond max_bytes are evicted LRU-first."""
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.framework_requirement = framework_requirement
+        self.envs_dir = self.root / "envs"
+        self.locks_dir = self.root / "locks"
+        self.stats_path = self.root / "stats.json"
+
+    def env_path(self, key: str) -> Path:
+        """Path of the published environment for key."""
+        return self.envs_dir / key
+
+    def _build_lock_path(self, key: str) -> Path:
+        return self.locks_dir / f"{key}.build.lock"
+
+    def _lease_lock_path(self, key: str) -> Path:
+        return self.locks_dir / f"{key}.lease.lock"
+
+    def acquire(
+        self,
+        workspace: Path,
+        link_name: str = ".venv",
+        fetch: Optional[Callable[[str, Path], bool]] = None,
+    ) -> Optional[VenvLease]:
+        """
+        Return a ready environment for workspace, building it on a cache miss.
+
+        On a miss, fetch(key, venv_dir) may first unpack a prebuilt environment (e.g. from
+        a run's workspace snapshot) and return True; otherwise it is built here.
+
+        The environment is symlinked to workspace/link_name and its lease lock is held
+        (shared) until the returned lease is released. Returns None when the workspace's
+        requirements cannot be cached; the caller should install per job instead.
+        """
+        key = environment_key(workspace, self.framework_requirement)
+        if key is None:
+            print("Requirements install from the workspace; skipping dependency cache")
+            return None
+        venv_dir = self.env_path(key)
+        self.locks_dir.mkdir(parents=True, exist_ok=True)
+        # The shared lease is taken before anything else and held for the whole job,
+        # so eviction (which needs it exclusively) can never remove an environment
+        # between building it and using it.
+        lease_file = open(self._lease_lock_path(key), "a+")
+        try:
+            fcntl.flock(lease_file.fileno(), fcntl.LOCK_SH)
+            if (venv_dir / LAST_USED_MARKER).exists():
+                self._record("hits")
+                print(f"Dependency cache hit: {key}")
+            else:
+                # Build lock keeps concurrent misses from building the same key twice
+                with file_lock(self._build_lock_path(key)):
+                    if (venv_dir / LAST_USED_MARKER).exists():
+                        self._record("hits")
+                        print(f"Dependency cache hit: {key}")
+                    else:
+                        self._record("misses")
+                        if not (fetch and self._fetch(key, venv_dir, fetch)):
+                            print(f"Dependency cache miss: {key}; building environment")
+                            self._build(workspace, venv_dir)
+            (venv_dir / LAST_USED_MARKER).touch()
+        except BaseException:
+            lease_file.close()
+            raise
+
+        link = workspace / link_name
+        if link.is_symlink() or link.exists():
+            link.unlink()
+        link.symlink_to(venv_dir, target_is_directory=True)
+
+        self.evict(keep=key)
+        print(f"Dependency cache stats: {self.stats()}")
+        return VenvLease(key, venv_dir, lease_file)
+
+    def _fetch(self, key: str, venv_dir: Path, fetch: Callable[[str, Path], bool]) -> bool:
+        """Publish an environment unpacked by fetch; False (nothing left behind) to build."""
+        if venv_dir.exists():
+            shutil.rmtree(venv_dir)
+        try:
+            if not fetch(key, venv_dir):
+                shutil.rmtree(venv_dir, ignore_errors=True)
+                return False
+        except Exception as e:
+            print(f"Fetching environment {key} failed ({e}); building it instead")
+            shutil.rmtree(venv_dir, ignore_errors=True)
+            return False
+        (venv_dir / LAST_USED_MARKER).write_text(str(dir_size(venv_dir)))
+        print(f"Dependency cache miss: {key}; fetched prebuilt environment")
+        return True
+
+    def _build(self, workspace: Path, venv_dir: Path) -> None:
+        """
+        Create the environment in place and publish it by writing its last-used marker.
+
+        Virtualenvs embed their absolute path in scripts, so they are built at the final
+        location (under the build lock) rather than staged and renamed. A failed build
+        is removed so the next job starts from scratch.
+        """
+        if venv_dir.exists():
+            # Left over from an interrupted build
+            shutil.rmtree(venv_dir)
+        venv_dir.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            subprocess.run([sys.executable, "-m", "venv", str(venv_dir)], check=True)
+            pip = [
+                str(venv_dir / "bin" / "python"),
+                "-m",
+                "pip",
+                "install",
+                "--disable-pip-version-check",
+            ]
+            requirements_file = workspace / "requirements.txt"
+            if requirements_file.exists():
+                print("Installing Python dependencies...")
+                subprocess.run([*pip, "-r", str(requirements_file)], cwd=workspace, check=True)
+            subprocess.run([*pip, self.framework_requirement], check=True)
+            # Record the size once so eviction does not have to walk every environment
+            (venv_dir / LAST_USED_MARKER).write_text(str(dir_size(venv_dir)))
+        except BaseException:
+            shutil.rmtree(venv_dir, ignore_errors=True)
+            raise
+
+    def _record(self, counter: str, amount: int = 1) -> None:
+        """Increment a persistent counter (shared by every executor process on the host)."""
+        with file_lock(self.root / "stats.lock"):
+            stats = self.stats()
+            stats[counter] = stats.get(counter, 0) + amount
+            self.stats_path.write_text(json.dumps(stats))
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss/eviction counters."""
+        try:
+            return json.loads(self.stats_path.read_text())
+        except (FileNotFoundError, ValueError):
+            return {"hits": 0, "misses": 0, "evictions": 0}
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        """
+        Remove least recently used environments until the cache fits in max_bytes.
+
+        Environments leased by a running job are skipped. Returns the number of bytes freed.
+        """
+        if not self.envs_dir.exists():
+            return 0
+        evicted = 0
+        with file_lock(self.root / "evict.lock", blocking=False) as acquired:
+            if not acquired:
+                return 0
+            entries = []
+            total = 0
+            for env in self.envs_dir.iterdir():
+                marker = env / LAST_USED_MARKER
+                if not env.is_dir() or not marker.exists():
+                    continue
+                try:
+                    size = int(marker.read_text())
+                except ValueError:
+                    size = dir_size(env)
+                entries.append((marker.stat().st_mtime, env, size))
+                total += size
+
+            freed = 0
+            for _last_used, env, size in sorted(entries, key=lambda e: e[0]):
+                if total <= self.max_bytes:
+                    break
+                if env.name == keep:
+                    continue
+                with file_lock(self._lease_lock_path(env.name), blocking=False) as locked:
+                    if not locked:
+                        continue
+                    print(f"Evicting cached environment {env.name} ({size} bytes)")
+                    shutil.rmtree(env, ignore_errors=True)
+                total -= size
+                freed += size
+                evicted += 1
+        if evicted:
+            self._record("evictions", evicted)
+        return freed
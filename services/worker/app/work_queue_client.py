@@ -0,0 +1,90 @@
+"""Client for the orchestrator's work queue (dynamic sharding).
+
+A queue-mode job claims batches of tests until the run's queue is drained. While a batch
+runs, a background thread renews its lease so the orchestrator does not hand it to
+another worker; if this worker dies, the lease expires and the batch is reclaimed.
+"""
+
+import sys
+import threading
+import time
+import uuid
+from typing import Dict, Iterator, Optional
+
+import httpx
+
+
+class WorkQueueClient:
+    """Claims, heartbeats and completes batches at <url>/claim, <url>/<batch>/..."""
+
+    def __init__(self, url: str, lease_seconds: float = 120, poll_interval: float = 5.0):
+        self.url = url.rstrip("/")
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.worker_id = uuid.uuid4().hex
+        self._client = httpx.Client(timeout=30.0)
+
+    def _post(self, path: str) -> Dict:
+        response = self._client.post(f"{self.url}/{path}", json={"worker_id": self.worker_id})
+        response.raise_for_status()
+        return response.json()
+
+    def claim(self) -> Dict:
+        return self._post("claim")
+
+    def heartbeat(self, batch_id: str) -> bool:
+        return self._post(f"{batch_id}/heartbeat")["held"]
+
+    def complete(self, batch_id: str) -> bool:
+        return self._post(f"{batch_id}/complete")["held"]
+
+    def batches(self) -> Iterator[Dict]:
+        """
+        Yield claimed batches until nothing is pending or leased.
+
+        When the queue is empty but other workers still hold leases, keep polling: one
+        of them may die, and its batch must be picked up by someone still alive.
+        """
+        while True:
+            body = self.claim()
+            batch = body.get("batch")
+            if batch:
+                yield batch
+            elif body.get("leased"):
+                time.sleep(self.poll_interval)
+            else:
+                return
+
+    def close(self) -> None:
+        self._client.close()
+
+
+class LeaseKeeper:
+    """Context manager that heartbeats a batch lease every lease_seconds / 3."""
+
+    def __init__(self, client: WorkQueueClient, batch_id: str):
+        self.client = client
+        self.batch_id = batch_id
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "LeaseKeeper":
+        self._thread = threading.Thread(target=self._run, name="lease-keeper", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        interval = max(1.0, self.client.lease_seconds / 3)
+        while not self._stop.wait(interval):
+            try:
+                if not self.client.heartbeat(self.batch_id):
+                    self.lost = True
+                    return
+            except httpx.HTTPError as e:
+                # Transient; the next beat may still land before the lease expires
+                print(f"Heartbeat for batch {self.batch_id} failed: {e}", file=sys.stderr)
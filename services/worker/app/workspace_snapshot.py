@@ -0,0 +1,131 @@
+"""Workspace snapshots: prepare a sharded run's workspace once, unpack it in every shard.
+
+The prepare job checks out the repository and installs its environment, then streams two
+gzipped tarballs into content-addressed blobs (see s3_upload): the checkout and the
+virtualenv (archived once per venv cache key). A small JSON pointer per run names them.
+Shards stream the blobs back and unpack them instead of cloning and installing.
+
+The checkout is archived without .git (a worktree's .git points into the preparing
+host's mirror cache) and with normalized metadata, so an unchanged commit yields the
+same blob. Virtualenvs embed their absolute path, so the environment is unpacked at the
+same place in the venv cache; its key already covers the interpreter and requirements.
+"""
+import gzip
+import json
+import os
+import tarfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from botocore.exceptions import ClientError
+
+from app.s3_upload import ArtifactUploader, MultipartUploadSink, UploadedBlob, _is_not_found
+
+# Never archived, at any depth: VCS metadata, the venv symlink, caches rebuilt on demand
+WORKSPACE_EXCLUDES = (".git", ".venv", "__pycache__", ".pytest_cache")
+COMPRESS_LEVEL = 6
+
+
+def snapshot_key(run_id: int) -> str:
+    """Object key of a run's snapshot pointer (written by its prepare job)."""
+    return f"runs/{run_id}/workspace-snapshot.json"
+
+
+def environment_pointer_key(venv_key: str) -> str:
+    """Object key of the pointer to the archived environment with this venv cache key."""
+    return f"environments/{venv_key}.json"
+
+
+def _normalized(info: tarfile.TarInfo) -> tarfile.TarInfo:
+    info.mtime = 0
+    info.uid = info.gid = 0
+    info.uname = info.gname = ""
+    return info
+
+
+def write_tarball(
+    directory: Path, fileobj, exclude: Iterable[str] = (), normalize: bool = False
+) -> None:
+    """
+    Stream directory as a gzipped tar into fileobj (which may be non-seekable).
+
+    Entries are added in sorted order; with normalize, timestamps and owners are zeroed
+    so the same tree always produces the same bytes.
+    """
+    exclude = set(exclude)
+    directory = Path(directory)
+    compressed = gzip.GzipFile(fileobj=fileobj, mode="wb", compresslevel=COMPRESS_LEVEL, mtime=0)
+    with compressed, tarfile.open(fileobj=compressed, mode="w|", format=tarfile.PAX_FORMAT) as tar:
+        for root, dirs, files in os.walk(directory):
+            dirs[:] = sorted(name for name in dirs if name not in exclude)
+            for name in dirs + sorted(files):
+                if name in exclude:
+                    continue
+                path = Path(root) / name
+                arcname = str(path.relative_to(directory))
+                tar.add(
+                    path, arcname, recursive=False, filter=_normalized if normalize else None
+                )
+
+
+def extract_tarball(fileobj, directory: Path) -> None:
+    """Unpack a gzipped tar stream (as written by write_tarball) into directory."""
+    directory.mkdir(parents=True, exist_ok=True)
+    with tarfile.open(fileobj=fileobj, mode="r|gz") as tar:
+        # "tar" rather than "data": virtualenvs link bin/python to the absolute interpreter
+        tar.extractall(directory, filter="tar")
+
+
+class SnapshotStore:
+    """Uploads and unpacks directory snapshots through the artifact bucket."""
+
+    def __init__(self, uploader: ArtifactUploader):
+        self.uploader = uploader
+
+    def upload_directory(
+        self, directory: Path, exclude: Iterable[str] = (), normalize: bool = False
+    ) -> UploadedBlob:
+        """Archive directory straight into a blob (no temporary file); returns the blob."""
+        with ThreadPoolExecutor(
+            max_workers=self.uploader.max_workers, thread_name_prefix="s3-part"
+        ) as part_pool:
+            sink = MultipartUploadSink(self.uploader, part_pool)
+            try:
+                write_tarball(directory, sink, exclude, normalize)
+                return sink.finish()
+            except BaseException:
+                sink.abort()
+                raise
+
+    def download_directory(self, key: str, directory: Path) -> None:
+        """Stream a blob written by upload_directory and unpack it into directory."""
+        response = self.uploader.with_retries(
+            self.uploader.s3.get_object, Bucket=self.uploader.bucket, Key=key
+        )
+        body = response["Body"]
+        try:
+            extract_tarball(body, directory)
+        finally:
+            body.close()
+
+    def put_pointer(self, key: str, pointer: Dict) -> None:
+        self.uploader.with_retries(
+            self.uploader.s3.put_object,
+            Bucket=self.uploader.bucket,
+            Key=key,
+            Body=json.dumps(pointer).encode("utf-8"),
+            ContentType="application/json",
+        )
+
+    def get_pointer(self, key: str) -> Optional[Dict]:
+        """The JSON pointer at key, or None if none was written."""
+        try:
+            response = self.uploader.with_retries(
+                self.uploader.s3.get_object, Bucket=self.uploader.bucket, Key=key
+            )
+        except ClientError as e:
+            if _is_not_found(e):
+                return None
+            raise
+        return json.loads(response["Body"].read())
@@ -0,0 +1,12 @@
+"""Pytest fixtures for worker tests."""
+import pytest
+
+
+@pytest.fixture
+def worker_env(tmp_path, monkeypatch):
+    """Point every worker-local cache and the workspace at tmp_path (no shared S3 state)."""
+    monkeypatch.setenv("WORKSPACE_DIR", str(tmp_path / "workspace"))
+    monkeypatch.setenv("GIT_CACHE_DIR", str(tmp_path / "cache" / "git"))
+    monkeypatch.setenv("VENV_CACHE_DIR", str(tmp_path / "cache" / "venvs"))
+    monkeypatch.setenv("COLLECTION_MANIFESTS_ENABLED", "false")
+    return tmp_path
@@ -0,0 +1,90 @@
+"""Tests for app.artifact_collector (streaming packaging into S3, via moto)."""
+import io
+import os
+import tempfile
+import zipfile
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from app.artifact_collector import ArchiveSpec, ArtifactCollector
+from app.s3_upload import MIN_PART_SIZE, STAGING_PREFIX, ArtifactUploader
+
+BUCKET = "qatron-artifacts"
+
+
+@pytest.fixture
+def s3():
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+def _workspace(tmp_path):
+    ws = tmp_path / "ws"
+    (ws / "allure-results").mkdir(parents=True)
+    (ws / "allure-results" / "result.json").write_text('{"status": "passed"}' * 100)
+    (ws / "allure-results" / "attachment.png").write_bytes(os.urandom(2048))
+    (ws / "screenshots").mkdir()
+    (ws / "screenshots" / "login.png").write_bytes(os.urandom(1024))
+    (ws / "coverage.xml").write_text("<coverage/>")
+    return ws
+
+
+def _zip(s3, key):
+    return zipfile.ZipFile(io.BytesIO(s3.get_object(Bucket=BUCKET, Key=key)["Body"].read()))
+
+
+def test_collect_packages_into_s3_without_temp_files(s3, tmp_path, monkeypatch):
+    """Archives are streamed to S3; media is stored as-is and text is deflated."""
+    scratch = tmp_path / "tmp"
+    scratch.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(scratch))
+    collector = ArtifactCollector(config=None)
+    artifacts = collector.collect(_workspace(tmp_path))
+    assert set(artifacts) == {"allure", "coverage_xml", "screenshots"}
+
+    blobs = collector.upload(artifacts, ArtifactUploader(s3, BUCKET))
+
+    assert list(scratch.iterdir()) == []
+    allure = _zip(s3, blobs["allure"].key)
+    assert allure.getinfo("attachment.png").compress_type == zipfile.ZIP_STORED
+    assert allure.getinfo("result.json").compress_type == zipfile.ZIP_DEFLATED
+    assert allure.read("result.json") == b'{"status": "passed"}' * 100
+    assert _zip(s3, blobs["screenshots"].key).namelist() == ["login.png"]
+    assert s3.get_object(Bucket=BUCKET, Key=blobs["coverage_xml"].key)["Body"].read() == (
+        b"<coverage/>"
+    )
+
+
+def test_identical_artifacts_across_shards_share_a_blob(s3, tmp_path):
+    """Archives are deterministic, so unchanged content from another shard is not re-uploaded."""
+    collector = ArtifactCollector(config=None)
+    uploader = ArtifactUploader(s3, BUCKET)
+    ws = _workspace(tmp_path)
+    first = collector.upload(collector.collect(ws), uploader)
+    os.utime(ws / "screenshots" / "login.png", (0, 0))
+    second = collector.upload(collector.collect(ws), uploader)
+
+    assert second["screenshots"].key == first["screenshots"].key
+    assert not second["screenshots"].uploaded
+
+
+def test_large_archive_streams_as_multipart_and_cleans_staging(s3, tmp_path):
+    """Archives bigger than a part go through multipart staging; only the blob remains."""
+    big = tmp_path / "video.webm"
+    big.write_bytes(os.urandom(MIN_PART_SIZE * 2 + 100))
+    spec = ArchiveSpec("videos.zip", [(big, "video.webm")])
+
+    blob = ArtifactCollector(config=None).upload(
+        {"videos": spec}, ArtifactUploader(s3, BUCKET, part_size=MIN_PART_SIZE)
+    )["videos"]
+
+    assert blob.size > MIN_PART_SIZE * 2
+    assert _zip(s3, blob.key).read("video.webm") == big.read_bytes()
+    keys = [obj["Key"] for obj in s3.list_objects_v2(Bucket=BUCKET)["Contents"]]
+    assert keys == [blob.key]
+    assert not any(key.startswith(STAGING_PREFIX) for key in keys)
+    assert not s3.list_multipart_uploads(Bucket=BUCKET).get("Uploads")
@@ -0,0 +1,125 @@
+"""Tests for app.collection and the executor's use of stored collection manifests (moto S3)."""
+import json
+import os
+import subprocess
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from app.collection import collection_key, select_tests
+from app.executor import JobExecutor
+
+BUCKET = "qatron-artifacts"
+
+MANIFEST = {
+    "version": 1,
+    "rootdir": ".",
+    "tests": [
+        {
+            "nodeid": "tests/test_a.py::test_one",
+            "file": "tests/test_a.py",
+            "markers": ["e2e", "suite_smoke"],
+            "scenario": None,
+        },
+        {
+            "nodeid": "tests/test_a.py::test_two",
+            "file": "tests/test_a.py",
+            "markers": ["e2e"],
+            "scenario": None,
+        },
+        {
+            "nodeid": "tests/test_b.py::test_login",
+            "file": "tests/test_b.py",
+            "markers": ["e2e", "suite_smoke"],
+            "scenario": {"feature": "features/login.feature", "name": "Login"},
+        },
+    ],
+    "files": {},
+}
+
+
+@pytest.fixture
+def s3(worker_env, monkeypatch):
+    monkeypatch.setenv("COLLECTION_MANIFESTS_ENABLED", "true")
+    monkeypatch.setenv("SUITE_NAME", "smoke")
+    monkeypatch.setenv("PROJECT_ID", "7")
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        monkeypatch.setattr("app.executor.build_s3_client", lambda config: client)
+        yield client
+
+
+def _checkout(executor):
+    (executor.workspace / "tests").mkdir(parents=True)
+    (executor.workspace / "tests" / "test_a.py").write_text("def test_one():\n    pass\n")
+    (executor.workspace / "README.md").write_text("docs\n")
+    executor.commit_sha = "a" * 40
+
+
+def test_collection_key_covers_only_collection_inputs(tmp_path):
+    """Docs and caches do not change the key; test code and extra inputs do."""
+    (tmp_path / "tests").mkdir()
+    (tmp_path / "tests" / "test_a.py").write_text("def test_a():\n    pass\n")
+    key = collection_key(tmp_path, ["qatron-python==0.4.0"])
+
+    (tmp_path / "README.md").write_text("docs\n")
+    (tmp_path / "tests" / "__pycache__").mkdir()
+    (tmp_path / "tests" / "__pycache__" / "cached.py").write_text("x = 1\n")
+    assert collection_key(tmp_path, ["qatron-python==0.4.0"]) == key
+    assert collection_key(tmp_path, ["qatron-python==0.5.0"]) != key
+
+    (tmp_path / "tests" / "test_a.py").write_text("def test_b():\n    pass\n")
+    assert collection_key(tmp_path, ["qatron-python==0.4.0"]) != key
+
+
+def test_select_tests_applies_marker_then_shard_selection():
+    """The suite marker filters first; a plan, an exclude list or the hash split narrow it."""
+    smoke = ["tests/test_a.py::test_one", "tests/test_b.py::test_login"]
+    assert select_tests(MANIFEST, "suite_smoke", {}) == smoke
+    assert select_tests(MANIFEST, None, {"tests": ["tests/test_a.py::test_two"]}) == [
+        "tests/test_a.py::test_two"
+    ]
+    assert select_tests(MANIFEST, "suite_smoke", {"tests": ["tests/test_a.py::test_two"]}) == []
+    assert select_tests(MANIFEST, "suite_smoke", {"exclude": smoke[:1]}) == smoke[1:]
+    halves = [select_tests(MANIFEST, "suite_smoke", {}, i, 2) for i in range(2)]
+    assert sorted(halves[0] + halves[1]) == smoke
+
+
+def test_manifest_is_stored_then_reused_with_explicit_node_ids(s3, monkeypatch):
+    """A first run collects and stores the manifest; the next one runs node ids, without -m."""
+    calls = []
+
+    def fake_pytest(cmd, cwd, env):
+        calls.append((cmd, dict(env)))
+        if "QATRON_MANIFEST_FILE" in env:
+            os.makedirs(os.path.dirname(env["QATRON_MANIFEST_FILE"]), exist_ok=True)
+            with open(env["QATRON_MANIFEST_FILE"], "w") as f:
+                json.dump(MANIFEST, f)
+        return subprocess.CompletedProcess(cmd, 0)
+
+    monkeypatch.setattr(subprocess, "run", fake_pytest)
+    first = JobExecutor({"run_id": 1})
+    _checkout(first)
+    first.run_tests({})
+    key = first.collection_key()
+    index = s3.get_object(Bucket=BUCKET, Key=f"collections/commits/7/{'a' * 40}.json")
+    assert json.loads(index["Body"].read()) == {"key": key}
+    assert not first.manifest_file.exists()
+    cmd, _ = calls[-1]
+    assert "-m" in cmd and cmd[-1].endswith("tests")
+
+    second = JobExecutor({"run_id": 2, "shard_index": 0, "shard_total": 1})
+    second.run_tests({})
+    cmd, env = calls[-1]
+    assert "-m" not in cmd and "QATRON_MANIFEST_FILE" not in env
+    assert cmd[-2:] == [
+        str(second.workspace / "tests/test_a.py"),
+        str(second.workspace / "tests/test_b.py"),
+    ]
+    with open(env["QATRON_SELECT_FILE"]) as f:
+        assert f.read().splitlines() == [
+            "tests/test_a.py::test_one",
+            "tests/test_b.py::test_login",
+        ]
@@ -0,0 +1,201 @@
+"""Unit tests for app.executor.JobExecutor wiring."""
+
+import json
+import os
+import subprocess
+
+import httpx
+import pytest
+
+from app.executor import JobExecutor
+from app.venv_cache import LAST_USED_MARKER, VenvCache
+
+
+def _fake_build(self, workspace, venv_dir):
+    (venv_dir / "bin").mkdir(parents=True)
+    (venv_dir / LAST_USED_MARKER).write_text("0")
+
+
+def test_cached_env_is_first_on_path_and_released_on_cleanup(worker_env, monkeypatch):
+    """Tests run inside the cached virtualenv, and cleanup releases its lease."""
+    monkeypatch.setattr(VenvCache, "_build", _fake_build)
+    executor = JobExecutor({"run_id": 1})
+    executor.workspace.mkdir()
+    (executor.workspace / "requirements.txt").write_text("requests\n")
+
+    executor.install_dependencies()
+    lease = executor.venv_lease
+    assert lease is not None
+
+    qatron_config = {"environments": {"staging": {"BASE_URL": "https://staging.example.com"}}}
+    env = executor.build_test_env(qatron_config, "staging")
+    assert env["VIRTUAL_ENV"] == str(lease.venv_dir)
+    assert env["PATH"].split(os.pathsep)[0] == str(lease.bin_dir)
+    assert env["BASE_URL"] == "https://staging.example.com"
+
+    executor.cleanup()
+    assert executor.venv_lease is None
+    assert lease._lock_file is None
+    assert not executor.workspace.exists()
+
+
+def test_failed_job_still_cleans_up(worker_env, monkeypatch):
+    """A failing step still removes the workspace and releases the git worktree."""
+    executor = JobExecutor({"run_id": 1})
+    executor.workspace.mkdir()
+    released = []
+    monkeypatch.setenv("REPO_URL", "https://example.com/org/repo.git")
+    monkeypatch.setattr(executor, "clone_repository", lambda: None)
+    monkeypatch.setattr(executor, "post_error", lambda message: None)
+    monkeypatch.setattr(executor.git_cache, "release", released.append)
+
+    with pytest.raises(SystemExit) as exc_info:
+        executor.execute()
+
+    assert exc_info.value.code == 1
+    assert not executor.workspace.exists()
+    assert released == ["https://example.com/org/repo.git"]
+
+
+def test_run_tests_counts_from_result_file(worker_env, monkeypatch):
+    """Totals come from the plugin's result file named in the test environment."""
+    executor = JobExecutor({"run_id": 1})
+    executor.workspace.mkdir()
+
+    def fake_pytest(cmd, cwd, env):
+        path = env["QATRON_RESULTS_FILE"]
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write('{"nodeid": "tests/test_a.py::test_ok", "outcome": "passed", "duration": 1}\n')
+            f.write('{"nodeid": "tests/test_a.py::test_bad", "outcome": "failed", "duration": 2}\n')
+        return subprocess.CompletedProcess(cmd, 1)
+
+    monkeypatch.setattr(subprocess, "run", fake_pytest)
+    results = executor.run_tests({})
+
+    assert results["total"] == 2
+    assert results["passed"] == 1
+    assert results["failed"] == 1
+    assert results["exit_code"] == 1
+    assert results["durations"] == {"tests/test_a.py::test_ok": 1, "tests/test_a.py::test_bad": 2}
+
+
+def test_test_results_are_posted_in_batches(worker_env, monkeypatch):
+    """The result file goes to the internal endpoint in numbered batches, tagged with the shard."""
+    monkeypatch.setenv("CONTROL_PLANE_API_URL", "http://cp/api/v1")
+    monkeypatch.setenv("INTERNAL_API_SECRET", "s3cret")
+    monkeypatch.setenv("WORKER_RESULT_BATCH_ROWS", "2")
+    executor = JobExecutor({"run_id": 7, "shard_index": 3})
+    executor.results_file.parent.mkdir(parents=True)
+    executor.results_file.write_text(
+        "".join(json.dumps({"nodeid": f"t.py::{i}", "outcome": "passed"}) + "\n" for i in range(3))
+    )
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(202, json={"ok": True})
+
+    client = httpx.Client
+    monkeypatch.setattr(
+        httpx, "Client", lambda **kwargs: client(transport=httpx.MockTransport(handler), **kwargs)
+    )
+
+    assert executor.post_test_results() == 3
+    assert [str(r.url) for r in requests] == ["http://cp/api/v1/internal/runs/7/test-results"] * 2
+    assert requests[0].headers["X-Internal-Secret"] == "s3cret"
+    bodies = [json.loads(r.content) for r in requests]
+    assert [(b["shard_index"], b["seq"], len(b["results"])) for b in bodies] == [
+        (3, 0, 2),
+        (3, 1, 1),
+    ]
+
+
+def test_results_and_errors_name_the_shard(worker_env, monkeypatch):
+    """Shard reports carry shard_index/shard_total so the control plane can finalize the run."""
+    monkeypatch.setenv("INTERNAL_API_SECRET", "s3cret")
+    executor = JobExecutor({"run_id": 7, "shard_index": 1, "shard_total": 2})
+    payloads = []
+    monkeypatch.setattr(
+        httpx, "put", lambda url, json, **kwargs: payloads.append(json) or httpx.Response(200)
+    )
+    counts = {"total": 3, "passed": 2, "failed": 1, "skipped": 0}
+
+    executor.post_results({**counts, "exit_code": 1}, {})
+    executor.post_error("clone failed")
+
+    assert [(p["status"], p["shard_index"], p["shard_total"]) for p in payloads] == [
+        ("failed", 1, 2),
+        ("failed", 1, 2),
+    ]
+    assert payloads[0]["failed_tests"] == 1 and "total_tests" not in payloads[1]
+
+
+def test_shard_selection_from_plan_or_hash(worker_env):
+    """Planned shards get a node id file for the qatron plugin; unplanned ones a hash split."""
+    executor = JobExecutor({"run_id": 1, "shard_index": 1, "shard_total": 3, "tests": ["a", "b"]})
+    env = executor.shard_selection_env()
+    assert env == {"QATRON_SELECT_FILE": str(executor.shard_file)}
+    assert executor.shard_file.read_text() == "a\nb\n"
+
+    executor = JobExecutor({"run_id": 1, "shard_index": 0, "shard_total": 3, "exclude": ["a"]})
+    assert executor.shard_selection_env() == {"QATRON_DESELECT_FILE": str(executor.shard_file)}
+
+    assert JobExecutor({"run_id": 1, "shard_index": 2, "shard_total": 3}).shard_selection_env() == {
+        "QATRON_SHARD": "2/3"
+    }
+    assert JobExecutor({"run_id": 1}).shard_selection_env() == {}
+
+
+class FakeWorkQueueClient:
+    """Hands out fixed batches; completing "b2" fails as if its lease had been reclaimed."""
+
+    def __init__(self, url, lease_seconds=120):
+        self.lease_seconds = lease_seconds
+        self.completed = []
+
+    def batches(self):
+        yield {"batch_id": "remainder", "tests": [], "exclude": ["t::a", "t::b"]}
+        yield {"batch_id": "b1", "tests": ["t::a"]}
+        yield {"batch_id": "b2", "tests": ["t::b"]}
+
+    def heartbeat(self, batch_id):
+        return True
+
+    def complete(self, batch_id):
+        self.completed.append(batch_id)
+        return batch_id != "b2"
+
+    def close(self):
+        pass
+
+
+def test_queue_mode_runs_claimed_batches(worker_env, monkeypatch):
+    """Each claimed batch is one pytest session; batches with a lost lease are not counted."""
+    executor = JobExecutor({"run_id": 1, "work_queue": {"url": "http://o/runs/1/work"}})
+    executor.workspace.mkdir()
+    monkeypatch.setattr("app.executor.WorkQueueClient", FakeWorkQueueClient)
+    selections = []
+
+    def fake_pytest(cmd, cwd, env):
+        assert "--cov-append" in cmd
+        selection = env.get("QATRON_SELECT_FILE") or env.get("QATRON_DESELECT_FILE")
+        nodeids = open(selection).read().split()
+        selections.append(("select" if "QATRON_SELECT_FILE" in env else "deselect", nodeids))
+        if "QATRON_DESELECT_FILE" in env:
+            return subprocess.CompletedProcess(cmd, 5)  # no new tests collected
+        with open(env["QATRON_RESULTS_FILE"], "w") as f:
+            f.write(f'{{"nodeid": "{nodeids[0]}", "outcome": "failed", "duration": 1}}\n')
+        return subprocess.CompletedProcess(cmd, 1)
+
+    monkeypatch.setattr(subprocess, "run", fake_pytest)
+    results = executor.run_tests({})
+
+    assert selections == [
+        ("deselect", ["t::a", "t::b"]),
+        ("select", ["t::a"]),
+        ("select", ["t::b"]),
+    ]
+    assert results["total"] == 1 and results["failed"] == 1
+    assert results["durations"] == {"t::a": 1}
+    assert results["exit_code"] == 1
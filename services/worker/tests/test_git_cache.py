@@ -0,0 +1,136 @@
+"""Unit tests for app.git_cache (bare-mirror checkout cache)."""
+import os
+import shutil
+import subprocess
+
+from app.git_cache import GitMirrorCache, cache_key, normalize_repo_url
+
+
+def _git(cwd, *args):
+    return subprocess.run(
+        ["git", *args], cwd=cwd, check=True, capture_output=True, text=True
+    ).stdout.strip()
+
+
+def _make_origin(tmp_path):
+    """Create a local repository with two commits; returns (url, first_sha, second_sha)."""
+    origin = tmp_path / "origin"
+    origin.mkdir()
+    _git(origin, "init", "-q", "-b", "main")
+    _git(origin, "config", "user.email", "ci@example.com")
+    _git(origin, "config", "user.name", "CI")
+    (origin / "qatron.yml").write_text("test_dir: tests\n")
+    _git(origin, "add", ".")
+    _git(origin, "commit", "-q", "-m", "first")
+    first = _git(origin, "rev-parse", "HEAD")
+    (origin / "qatron.yml").write_text("test_dir: features\n")
+    _git(origin, "commit", "-q", "-am", "second")
+    second = _git(origin, "rev-parse", "HEAD")
+    return origin.as_uri(), first, second
+
+
+def test_normalize_repo_url_strips_credentials_and_suffix():
+    """Token-bearing and plain URLs for the same repo share one cache key."""
+    assert (
+        normalize_repo_url("https://tok@GitHub.com/org/repo.git/") == "https://github.com/org/repo"
+    )
+    assert cache_key("https://tok@github.com/org/repo.git") == cache_key(
+        "https://github.com/org/repo"
+    )
+
+
+def test_checkout_non_tip_commit(tmp_path):
+    """A commit behind the branch tip can be checked out (no shallow-clone failure)."""
+    url, first, _second = _make_origin(tmp_path)
+    cache = GitMirrorCache(tmp_path / "cache", max_bytes=10**9)
+    dest = tmp_path / "ws"
+    assert cache.checkout(url, first, dest) == first
+    assert (dest / "qatron.yml").read_text() == "test_dir: tests\n"
+
+
+def test_checkout_reuses_mirror_and_fetches_new_commits(tmp_path):
+    """Second checkout reuses the mirror and picks up commits pushed since."""
+    url, _first, second = _make_origin(tmp_path)
+    cache = GitMirrorCache(tmp_path / "cache", max_bytes=10**9)
+    assert cache.checkout(url, "HEAD", tmp_path / "ws1") == second
+    mirror = cache.mirror_path(url)
+    assert mirror.exists()
+
+    origin = tmp_path / "origin"
+    (origin / "new.txt").write_text("x")
+    _git(origin, "add", ".")
+    _git(origin, "commit", "-q", "-m", "third")
+    third = _git(origin, "rev-parse", "HEAD")
+
+    assert cache.checkout(url, third, tmp_path / "ws2") == third
+    assert (tmp_path / "ws2" / "new.txt").exists()
+    assert cache.mirror_path(url) == mirror
+
+
+def test_evict_skips_mirrors_with_live_worktrees(tmp_path):
+    """LRU eviction removes idle mirrors but never one backing a live workspace."""
+    url, _first, second = _make_origin(tmp_path)
+    cache = GitMirrorCache(tmp_path / "cache", max_bytes=10**9)
+    dest = tmp_path / "ws"
+    cache.checkout(url, second, dest)
+
+    cache.max_bytes = 0
+    cache.evict()
+    assert cache.mirror_path(url).exists()
+
+    shutil.rmtree(dest)
+    cache.release(url)
+    os.utime(cache.mirror_path(url) / "qatron-last-used", (0, 0))
+    assert cache.evict() > 0
+    assert not cache.mirror_path(url).exists()
+
+
+def test_checkout_fetches_only_requested_ref(tmp_path):
+    """Checking out a branch fetches that ref only, never refs/pull/* or other branches."""
+    url, _first, second = _make_origin(tmp_path)
+    origin = tmp_path / "origin"
+    _git(origin, "checkout", "-q", "-b", "pr")
+    (origin / "pr.txt").write_text("pr")
+    _git(origin, "add", ".")
+    _git(origin, "commit", "-q", "-m", "pr")
+    pr_sha = _git(origin, "rev-parse", "HEAD")
+    _git(origin, "update-ref", "refs/pull/1/head", pr_sha)
+    _git(origin, "checkout", "-q", "main")
+
+    cache = GitMirrorCache(tmp_path / "cache", max_bytes=10**9)
+    assert cache.checkout(url, "main", tmp_path / "ws") == second
+
+    mirror = cache.mirror_path(url)
+    refs = _git(mirror, "for-each-ref", "--format=%(refname)")
+    assert "refs/pull/1/head" not in refs
+    assert "refs/heads/pr" not in refs
+    result = subprocess.run(["git", "cat-file", "-e", pr_sha], cwd=mirror)
+    assert result.returncode != 0
+
+
+def _in_pack(mirror):
+    stats = dict(line.split(": ") for line in _git(mirror, "count-objects", "-v").splitlines())
+    return int(stats["in-pack"])
+
+
+def test_fetches_are_kept_under_refs_and_negotiate(tmp_path, monkeypatch):
+    """Fetched commits stay referenced, so the next fetch only transfers new objects."""
+    # Keep every fetched pack instead of exploding small ones into loose objects
+    monkeypatch.setenv("GIT_CONFIG_COUNT", "1")
+    monkeypatch.setenv("GIT_CONFIG_KEY_0", "fetch.unpackLimit")
+    monkeypatch.setenv("GIT_CONFIG_VALUE_0", "1")
+    url, _first, second = _make_origin(tmp_path)
+    cache = GitMirrorCache(tmp_path / "cache", max_bytes=10**9)
+    assert cache.checkout(url, second, tmp_path / "ws1") == second
+    mirror = cache.mirror_path(url)
+    assert _git(mirror, "rev-parse", f"refs/qatron/{second}") == second
+    before = _in_pack(mirror)
+
+    origin = tmp_path / "origin"
+    (origin / "new.txt").write_text("x")
+    _git(origin, "add", ".")
+    _git(origin, "commit", "-q", "-m", "third")
+    assert cache.checkout(url, "main", tmp_path / "ws2") == _git(origin, "rev-parse", "HEAD")
+    assert _git(mirror, "rev-parse", "refs/qatron/main") == _git(origin, "rev-parse", "HEAD")
+    # A commit, a tree and a blob; not the whole history again
+    assert _in_pack(mirror) - before < before
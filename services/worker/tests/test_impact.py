@@ -0,0 +1,166 @@
+"""Tests for app.impact: per-test coverage maps and impacted test selection (moto S3)."""
+import sqlite3
+import subprocess
+
+import boto3
+import pytest
+from git import Repo
+from moto import mock_aws
+
+from app.collection import ManifestStore
+from app.executor import JobExecutor
+from app.impact import CoverageMap, ImpactStore, impacted_tests, read_test_coverage
+
+BUCKET = "qatron-artifacts"
+
+MANIFEST = {
+    "version": 1,
+    "rootdir": ".",
+    "tests": [
+        {
+            "nodeid": "tests/test_cart.py::test_add",
+            "file": "tests/test_cart.py",
+            "markers": ["suite_default"],
+            "scenario": None,
+        },
+        {
+            "nodeid": "tests/test_cart.py::test_total",
+            "file": "tests/test_cart.py",
+            "markers": ["suite_default"],
+            "scenario": None,
+        },
+        {
+            "nodeid": "tests/test_login.py::test_login",
+            "file": "tests/test_login.py",
+            "markers": ["suite_default"],
+            "scenario": {"feature": "features/login.feature", "name": "Login"},
+        },
+    ],
+    "files": {},
+}
+NODEIDS = [test["nodeid"] for test in MANIFEST["tests"]]
+COVERAGE = {
+    "tests/test_cart.py::test_add": {"tests/test_cart.py", "app/cart.py"},
+    "tests/test_cart.py::test_total": {"tests/test_cart.py", "app/cart.py", "app/prices.py"},
+    "tests/test_login.py::test_login": {"tests/test_login.py", "app/auth.py"},
+}
+
+
+def _coverage_db(path, workspace, contexts):
+    """A coverage data file with the tables read_test_coverage queries."""
+    db = sqlite3.connect(path)
+    db.executescript(
+        "CREATE TABLE file (id integer primary key, path text);"
+        "CREATE TABLE context (id integer primary key, context text);"
+        "CREATE TABLE line_bits (file_id integer, context_id integer, numbits blob);"
+        "CREATE TABLE arc (file_id integer, context_id integer, fromno integer, tono integer);"
+    )
+    files, context_ids = {}, {}
+    for context, paths in contexts.items():
+        context_ids[context] = len(context_ids) + 1
+        db.execute("INSERT INTO context VALUES (?, ?)", (context_ids[context], context))
+        for path in paths:
+            if path not in files:
+                files[path] = len(files) + 1
+                db.execute("INSERT INTO file VALUES (?, ?)", (files[path], str(workspace / path)))
+            db.execute(
+                "INSERT INTO line_bits VALUES (?, ?, ?)", (files[path], context_ids[context], b"")
+            )
+    db.commit()
+    db.close()
+
+
+def test_coverage_is_read_per_test_and_interned(tmp_path):
+    """Test phases fold into one node id; code run outside tests is kept apart."""
+    _coverage_db(
+        tmp_path / ".coverage",
+        tmp_path,
+        {
+            "": ["app/settings.py", "app/cart.py"],
+            "tests/test_cart.py::test_add[a|b]|setup": ["tests/conftest.py"],
+            "tests/test_cart.py::test_add[a|b]|run": ["app/cart.py"],
+        },
+    )
+    tests, imported = read_test_coverage(tmp_path / ".coverage", tmp_path)
+    assert tests == {"tests/test_cart.py::test_add[a|b]": {"tests/conftest.py", "app/cart.py"}}
+    assert imported == {"app/settings.py", "app/cart.py"}
+
+    coverage_map = CoverageMap.build("c1", tests, imported)
+    assert coverage_map.files == ["app/cart.py", "app/settings.py", "tests/conftest.py"]
+    assert coverage_map.tests == {"tests/test_cart.py::test_add[a|b]": [0, 2]}
+    assert CoverageMap.from_dict(coverage_map.to_dict()) == coverage_map
+
+
+@pytest.mark.parametrize(
+    "changed,expected",
+    [
+        (["app/prices.py"], ["tests/test_cart.py::test_total"]),
+        (["features/login.feature", "README.md"], ["tests/test_login.py::test_login"]),
+        (["tests/test_cart.py", "app/unused.py"], NODEIDS[:2]),
+        (["tests/conftest.py"], None),
+        (["app/settings.py"], None),  # only ran at import time
+        (["app/templates/cart.html"], None),
+    ],
+)
+def test_impacted_tests_or_full_suite(changed, expected):
+    """Tests that ran a changed file are selected; unattributable changes run everything."""
+    coverage_map = CoverageMap.build("c1", COVERAGE, {"app/settings.py"})
+    assert impacted_tests(coverage_map, MANIFEST, NODEIDS, changed)[0] == expected
+
+
+def test_stale_map_runs_the_full_suite_and_new_tests_are_selected():
+    """Tests missing from the map always run; a map missing most of the suite is not used."""
+    partial = CoverageMap.build("c1", {k: COVERAGE[k] for k in NODEIDS[:2]}, set())
+    assert impacted_tests(partial, MANIFEST, NODEIDS, ["app/prices.py"], 0.5)[0] == [
+        "tests/test_cart.py::test_total",
+        "tests/test_login.py::test_login",
+    ]
+    assert impacted_tests(partial, MANIFEST, NODEIDS, ["app/prices.py"], 0.9)[0] is None
+
+
+@pytest.fixture
+def s3(worker_env, monkeypatch):
+    monkeypatch.setenv("COLLECTION_MANIFESTS_ENABLED", "true")
+    monkeypatch.setenv("PROJECT_ID", "7")
+    monkeypatch.setenv("SUITE_ID", "3")
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        monkeypatch.setattr("app.executor.build_s3_client", lambda config: client)
+        yield client
+
+
+def test_impacted_run_executes_only_tests_of_changed_files(s3, monkeypatch):
+    """The suite map (merged over shards) and a git diff narrow the run to affected tests."""
+    executor = JobExecutor({"run_id": 9, "manifest": "m1"})
+    repo = Repo.init(executor.workspace)
+    for path in ("app/cart.py", "app/prices.py", "app/auth.py"):
+        (executor.workspace / path).parent.mkdir(parents=True, exist_ok=True)
+        (executor.workspace / path).write_text("x = 1\n")
+    repo.index.add(["app"])
+    base = repo.index.commit("base").hexsha
+    (executor.workspace / "app/prices.py").write_text("x = 2\n")
+    repo.index.add(["app/prices.py"])
+    repo.index.commit("change prices")
+
+    store = ImpactStore(executor.artifact_uploader())
+    ManifestStore(executor.artifact_uploader()).put("m1", MANIFEST)
+    halves = [{k: COVERAGE[k] for k in NODEIDS[:2]}, {k: COVERAGE[k] for k in NODEIDS[2:]}]
+    assert not store.put_shard_map(7, 3, CoverageMap.build(base, halves[0], set()), 0, 2)
+    assert store.load_suite_map(7, 3) is None
+    assert store.put_shard_map(7, 3, CoverageMap.build(base, halves[1], set()), 1, 2)
+
+    calls = []
+
+    def fake_pytest(cmd, cwd, env):
+        calls.append((cmd, env))
+        return subprocess.CompletedProcess(cmd, 0)
+
+    monkeypatch.setenv("SELECTION", "impacted")
+    monkeypatch.setattr(subprocess, "run", fake_pytest)
+    executor.run_tests({})
+    cmd, env = calls[0]
+    with open(env["QATRON_SELECT_FILE"]) as f:
+        assert f.read().splitlines() == ["tests/test_cart.py::test_total"]
+    # Partial runs do not record coverage maps
+    assert "--cov-context=test" not in cmd
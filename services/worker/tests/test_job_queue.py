@@ -0,0 +1,93 @@
+"""Unit tests for app.job_queue (bounded concurrent job execution)."""
+import threading
+
+import pytest
+
+from app.job_queue import (
+    COMPLETED,
+    FAILED,
+    JobQueue,
+    QueueFullError,
+    compute_max_concurrent_jobs,
+)
+
+
+class BlockingRunner:
+    """Runner whose jobs stay running until released; tracks peak concurrency."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        self.started = threading.Semaphore(0)
+
+    def __call__(self, job):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        self.started.release()
+        self.release.wait(5)
+        with self.lock:
+            self.active -= 1
+        return job.payload.get("exit_code", 0)
+
+
+def test_compute_max_concurrent_jobs_uses_tighter_resource():
+    """The limit is set by whichever of CPU or memory runs out first, never below one."""
+    gib = 1024**3
+    assert compute_max_concurrent_jobs(2, 2 * gib, cpus=8, memory_bytes=64 * gib) == 4
+    assert compute_max_concurrent_jobs(2, 2 * gib, cpus=32, memory_bytes=5 * gib) == 2
+    assert compute_max_concurrent_jobs(2, 2 * gib, cpus=1, memory_bytes=1 * gib) == 1
+
+
+def test_jobs_run_concurrently_up_to_limit():
+    """No more than max_concurrent jobs run at once; the rest wait queued."""
+    runner = BlockingRunner()
+    queue = JobQueue(runner, max_concurrent=2)
+    jobs = [queue.submit({"run_id": 1, "shard_index": i})[0] for i in range(4)]
+    runner.started.acquire(timeout=5)
+    runner.started.acquire(timeout=5)
+
+    capacity = queue.capacity()
+    assert capacity["running"] == 2
+    assert capacity["queued"] == 2
+    assert capacity["available"] == 0
+
+    runner.release.set()
+    queue.shutdown()
+    assert runner.peak == 2
+    assert all(queue.get(job.id).status == COMPLETED for job in jobs)
+
+
+def test_resubmitted_shard_returns_existing_job():
+    """A retried submit for the same run and shard does not start a second execution."""
+    runner = BlockingRunner()
+    queue = JobQueue(runner, max_concurrent=1)
+    first, created = queue.submit({"run_id": 7, "shard_index": 0})
+    again, created_again = queue.submit({"run_id": 7, "shard_index": 0})
+    # The run's prepare job is not shard 0
+    prepare, created_prepare = queue.submit({"run_id": 7, "shard_index": 0, "mode": "prepare"})
+    runner.release.set()
+    queue.shutdown()
+
+    assert created and not created_again
+    assert again.id == first.id
+    assert created_prepare and prepare.id != first.id
+    assert runner.peak == 1
+
+
+def test_failed_job_and_full_queue():
+    """Non-zero exits mark the job failed; submits beyond max_queued are refused."""
+    runner = BlockingRunner()
+    queue = JobQueue(runner, max_concurrent=1, max_queued=1)
+    failing, _ = queue.submit({"run_id": 1, "exit_code": 1})
+    runner.started.acquire(timeout=5)
+    queue.submit({"run_id": 2})
+    with pytest.raises(QueueFullError):
+        queue.submit({"run_id": 3})
+
+    runner.release.set()
+    queue.shutdown()
+    assert queue.get(failing.id).status == FAILED
+    assert queue.get(failing.id).exit_code == 1
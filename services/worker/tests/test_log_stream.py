@@ -0,0 +1,71 @@
+"""Unit tests for app.log_stream (rotating job log and batched shipping)."""
+import io
+import threading
+
+from app.log_stream import LogShipper, RotatingLogFile, stream_output
+
+
+def test_stream_output_writes_file_and_ships_batches(tmp_path):
+    """Every line reaches the log file and the shipper, in order and in bounded batches."""
+    batches = []
+    shipper = LogShipper(batches.append, shard_index=2, batch_lines=2, flush_interval=60)
+    log_file = RotatingLogFile(tmp_path / "job.log", max_bytes=0, backup_count=0)
+    pipe = io.BytesIO(b"collecting\ntest_a PASSED\ntest_b FAILED\n")
+
+    assert stream_output(pipe, log_file, shipper) == 3
+    shipper.close()
+    log_file.close()
+
+    assert (tmp_path / "job.log").read_text() == "collecting\ntest_a PASSED\ntest_b FAILED\n"
+    assert [b["lines"] for b in batches] == [["collecting", "test_a PASSED"], ["test_b FAILED"]]
+    assert [b["seq"] for b in batches] == [0, 1]
+    assert all(b["shard_index"] == 2 for b in batches)
+
+
+def test_partial_batch_is_sent_after_flush_interval():
+    """A quiet job still shows its last lines without waiting for a full batch."""
+    sent = threading.Event()
+    batches = []
+
+    def post(batch):
+        batches.append(batch)
+        sent.set()
+
+    shipper = LogShipper(post, batch_lines=100, flush_interval=0.05)
+    shipper.write("waiting for selenium grid")
+    assert sent.wait(5)
+    assert batches[0]["lines"] == ["waiting for selenium grid"]
+    shipper.close()
+
+
+def test_full_queue_drops_lines_instead_of_blocking():
+    """A stalled control plane never blocks the pipe; drops are reported in the stream."""
+    release = threading.Event()
+    batches = []
+
+    def slow_post(batch):
+        release.wait(5)
+        batches.append(batch)
+
+    shipper = LogShipper(slow_post, batch_lines=1, flush_interval=60, max_pending_lines=2)
+    for i in range(50):
+        shipper.write(f"line {i}")
+    release.set()
+    shipper.close()
+
+    lines = [line for batch in batches for line in batch["lines"]]
+    assert len(lines) < 50
+    assert any("dropped from the live stream" in line for line in lines)
+
+
+def test_rotating_log_file_keeps_bounded_backups(tmp_path):
+    """Past max_bytes the log rotates to .1/.2 and older content is discarded."""
+    log_file = RotatingLogFile(tmp_path / "job.log", max_bytes=10, backup_count=2)
+    for chunk in (b"aaaaaaaa\n", b"bbbbbbbb\n", b"cccccccc\n", b"dddddddd\n"):
+        log_file.write(chunk)
+    log_file.close()
+
+    assert (tmp_path / "job.log").read_bytes() == b"dddddddd\n"
+    assert (tmp_path / "job.log.1").read_bytes() == b"cccccccc\n"
+    assert (tmp_path / "job.log.2").read_bytes() == b"bbbbbbbb\n"
+    assert not (tmp_path / "job.log.3").exists()
@@ -0,0 +1,52 @@
+"""Unit tests for app.results (qatron plugin result file reader)."""
+import json
+
+from app.results import iter_result_batches, iter_results, summarize_results
+
+
+def _write(path, records, trailer=""):
+    path.write_text("".join(json.dumps(r) + "\n" for r in records) + trailer)
+
+
+def test_summarize_maps_every_outcome(tmp_path):
+    """Errors count as failures, xfail as skipped and xpass as passed."""
+    path = tmp_path / "results.jsonl"
+    outcomes = ["passed", "failed", "error", "skipped", "xfailed", "xpassed"]
+    _write(path, [{"nodeid": f"t.py::{o}", "outcome": o} for o in outcomes])
+
+    assert summarize_results(path) == {
+        "total": 6,
+        "passed": 2,
+        "failed": 2,
+        "skipped": 2,
+        "errors": 1,
+    }
+
+
+def test_truncated_last_line_is_ignored(tmp_path):
+    """A run killed mid-write still yields the complete records."""
+    path = tmp_path / "results.jsonl"
+    _write(path, [{"nodeid": "t.py::a", "outcome": "passed"}], trailer='{"nodeid": "t.py::b", "out')
+
+    assert [r["nodeid"] for r in iter_results(path)] == ["t.py::a"]
+    assert summarize_results(path)["total"] == 1
+
+
+def test_missing_file_gives_zero_counts(tmp_path):
+    """No result file (pytest never started) reports nothing rather than failing."""
+    assert summarize_results(tmp_path / "missing.jsonl")["total"] == 0
+
+
+def test_result_batches_skip_records_without_a_known_outcome(tmp_path):
+    """Records are sent in fixed-size batches; incomplete records are left out."""
+    path = tmp_path / "results.jsonl"
+    records = [{"nodeid": f"t.py::{i}", "outcome": "passed"} for i in range(5)]
+    _write(path, records + [{"nodeid": "t.py::odd", "outcome": "unknown"}, {"outcome": "passed"}])
+
+    batches = list(iter_result_batches(path, 2))
+    assert [[r["nodeid"] for r in batch] for batch in batches] == [
+        ["t.py::0", "t.py::1"],
+        ["t.py::2", "t.py::3"],
+        ["t.py::4"],
+    ]
+    assert list(iter_result_batches(tmp_path / "missing.jsonl", 2)) == []
@@ -0,0 +1,100 @@
+"""Tests for app.s3_upload against an in-process S3 (moto)."""
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+from moto import mock_aws
+
+from app.s3_upload import MIN_PART_SIZE, ArtifactUploader, blob_key, file_sha256
+
+BUCKET = "qatron-artifacts"
+
+
+@pytest.fixture
+def s3():
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+def _file(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return path
+
+
+def test_identical_content_is_stored_once(s3, tmp_path):
+    """Same bytes from different shards map to one blob; the second upload is skipped."""
+    uploader = ArtifactUploader(s3, BUCKET, max_workers=4)
+    first = uploader.upload_files({"coverage_xml": _file(tmp_path, "a.xml", b"<coverage/>")})
+    second = uploader.upload_files(
+        {
+            "coverage_xml": _file(tmp_path, "b.xml", b"<coverage/>"),
+            "logs": _file(tmp_path, "c.zip", b"other"),
+        }
+    )
+
+    key = first["coverage_xml"].key
+    assert key == blob_key(file_sha256(tmp_path / "a.xml"))
+    assert first["coverage_xml"].uploaded
+    assert second["coverage_xml"].key == key and not second["coverage_xml"].uploaded
+    assert second["logs"].uploaded
+    keys = [obj["Key"] for obj in s3.list_objects_v2(Bucket=BUCKET)["Contents"]]
+    assert sorted(keys) == sorted([key, second["logs"].key])
+
+
+def test_large_file_uses_multipart_upload(s3, tmp_path, monkeypatch):
+    """Files over the threshold are uploaded in parts and reassembled byte-for-byte."""
+    data = b"".join(bytes([i]) * MIN_PART_SIZE for i in range(2)) + b"tail"
+    calls = []
+    real_upload_part = s3.upload_part
+    monkeypatch.setattr(s3, "upload_part", lambda **kw: calls.append(kw) or real_upload_part(**kw))
+    uploader = ArtifactUploader(s3, BUCKET, multipart_threshold=MIN_PART_SIZE, part_size=1)
+
+    blob = uploader.upload_files({"coverage_html": _file(tmp_path, "html.zip", data)})[
+        "coverage_html"
+    ]
+
+    assert sorted(call["PartNumber"] for call in calls) == [1, 2, 3]
+    assert s3.get_object(Bucket=BUCKET, Key=blob.key)["Body"].read() == data
+
+
+def test_transient_errors_are_retried(s3, tmp_path, monkeypatch):
+    """A throttled request is retried with backoff; a permanent error is not."""
+    attempts = []
+    real_put = s3.put_object
+
+    def flaky_put(**kwargs):
+        attempts.append(kwargs["Key"])
+        if len(attempts) < 3:
+            raise ClientError({"Error": {"Code": "SlowDown"}}, "PutObject")
+        return real_put(**kwargs)
+
+    monkeypatch.setattr(s3, "put_object", flaky_put)
+    uploader = ArtifactUploader(s3, BUCKET, backoff_seconds=0)
+    blob = uploader.upload_files({"logs": _file(tmp_path, "logs.zip", b"log")})["logs"]
+    assert len(attempts) == 3
+    assert s3.get_object(Bucket=BUCKET, Key=blob.key)["Body"].read() == b"log"
+
+    def denied(**kwargs):
+        attempts.append(kwargs["Key"])
+        raise ClientError({"Error": {"Code": "AccessDenied"}}, "PutObject")
+
+    monkeypatch.setattr(s3, "put_object", denied)
+    attempts.clear()
+    with pytest.raises(ClientError):
+        uploader.upload_files({"logs": _file(tmp_path, "other.zip", b"new")})
+    assert len(attempts) == 1
+
+
+def test_failed_part_aborts_multipart_upload(s3, tmp_path, monkeypatch):
+    """If a part cannot be uploaded the multipart upload is aborted, not left dangling."""
+
+    def broken_part(**kwargs):
+        raise ClientError({"Error": {"Code": "AccessDenied"}}, "UploadPart")
+
+    monkeypatch.setattr(s3, "upload_part", broken_part)
+    uploader = ArtifactUploader(s3, BUCKET, multipart_threshold=1)
+    with pytest.raises(ClientError):
+        uploader.upload_files({"screenshots": _file(tmp_path, "s.zip", b"x" * 100)})
+    assert not s3.list_multipart_uploads(Bucket=BUCKET).get("Uploads")
@@ -0,0 +1,53 @@
+"""API tests for the worker server (job acceptance, status and capacity)."""
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import server
+from app.job_queue import JobQueue
+
+BODY = {
+    "job": {"run_id": 5, "shard_index": 0, "shard_total": 1},
+    "context": {"repo_url": "https://example.com/org/repo.git"},
+}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """Worker app whose queue runs jobs with a runner that waits to be released."""
+    release = threading.Event()
+    queue = JobQueue(lambda job: 0 if release.wait(5) else 1, max_concurrent=1)
+    monkeypatch.setattr(server, "_job_queue", queue)
+    monkeypatch.setattr(server, "_post_run_status", lambda run_id, status, job=None: None)
+    yield TestClient(server.app)
+    release.set()
+    queue.shutdown()
+
+
+def test_execute_returns_job_id_immediately(client):
+    """/execute accepts the job (202) and its status is available under /jobs/{id}."""
+    response = client.post("/execute", json=BODY)
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+
+    status = client.get(f"/jobs/{job_id}")
+    assert status.status_code == 200
+    assert status.json()["status"] in ("queued", "running")
+    assert client.get("/jobs/unknown").status_code == 404
+
+
+def test_execute_dedupes_retried_shard(client):
+    """Posting the same shard twice returns the original job instead of a new one."""
+    first = client.post("/execute", json=BODY).json()
+    second = client.post("/execute", json=BODY)
+    assert second.status_code == 200
+    assert second.json()["job_id"] == first["job_id"]
+    assert second.json()["duplicate"] is True
+
+
+def test_capacity_and_validation(client):
+    """/capacity reports slots; jobs without a repo_url are rejected up front."""
+    assert client.get("/capacity").json()["max_concurrent"] == 1
+    response = client.post("/execute", json={"job": {"run_id": 6}, "context": {}})
+    assert response.status_code == 400
@@ -0,0 +1,172 @@
+"""Unit tests for app.venv_cache (content-hashed dependency environments)."""
+import os
+import subprocess
+
+import pytest
+
+from app import venv_cache as venv_cache_module
+from app.venv_cache import LAST_USED_MARKER, VenvCache, environment_key
+
+FRAMEWORK = "qatron-python==0.1.0"
+
+
+def _fake_build(self, workspace, venv_dir):
+    """Stand-in for the pip build: just materialize a directory of known size."""
+    (venv_dir / "bin").mkdir(parents=True)
+    (venv_dir / "bin" / "python").write_bytes(b"x" * 1000)
+    (venv_dir / LAST_USED_MARKER).write_text("1000")
+
+
+def _workspace(tmp_path, name, requirements):
+    ws = tmp_path / name
+    ws.mkdir()
+    (ws / "requirements.txt").write_text(requirements)
+    return ws
+
+
+def _stub_pip(monkeypatch, fail=False):
+    """Run `python -m venv` for real but record (or fail) every pip install call."""
+    real_run = subprocess.run
+    pip_calls = []
+
+    def run(cmd, *args, **kwargs):
+        if "pip" in cmd:
+            pip_calls.append(cmd)
+            if fail:
+                raise subprocess.CalledProcessError(1, cmd)
+            return subprocess.CompletedProcess(cmd, 0)
+        return real_run(cmd, *args, **kwargs)
+
+    monkeypatch.setattr(venv_cache_module.subprocess, "run", run)
+    return pip_calls
+
+
+def test_environment_key_tracks_dependency_files(tmp_path):
+    """Key changes with requirements, lock files, the Python version and the framework pin."""
+    ws = _workspace(tmp_path, "ws", "requests==2.31.0\n")
+    key = environment_key(ws, FRAMEWORK)
+    assert environment_key(ws, FRAMEWORK) == key
+    assert environment_key(ws, FRAMEWORK, python_version="3.12.0") != key
+    assert environment_key(ws, "qatron-python==0.2.0") != key
+    (ws / "poetry.lock").write_text("lock")
+    assert environment_key(ws, FRAMEWORK) != key
+
+
+def test_environment_key_follows_nested_includes(tmp_path):
+    """Files pulled in through -r/-c lines are part of the key."""
+    ws = _workspace(tmp_path, "ws", "-r requirements/base.txt\n--constraint=constraints/pins.txt\n")
+    (ws / "requirements").mkdir()
+    (ws / "requirements" / "base.txt").write_text("-rextra.txt\nrequests\n")
+    (ws / "requirements" / "extra.txt").write_text("pyyaml\n")
+    (ws / "constraints").mkdir()
+    (ws / "constraints" / "pins.txt").write_text("requests==2.31.0\n")
+    key = environment_key(ws, FRAMEWORK)
+
+    (ws / "requirements" / "extra.txt").write_text("pyyaml==6.0.1\n")
+    assert environment_key(ws, FRAMEWORK) != key
+    key = environment_key(ws, FRAMEWORK)
+    (ws / "constraints" / "pins.txt").write_text("requests==2.32.0\n")
+    assert environment_key(ws, FRAMEWORK) != key
+
+
+@pytest.mark.parametrize(
+    "requirements",
+    ["-e .\n", "./libs/helpers\n", "helpers @ file:///workspace/libs/helpers\n", "file:libs/x\n"],
+)
+def test_local_requirements_are_not_cached(tmp_path, requirements):
+    """Requirements that install from the workspace bypass the cache."""
+    ws = _workspace(tmp_path, "ws", "requests\n-r more.txt\n")
+    (ws / "more.txt").write_text(requirements)
+    assert environment_key(ws, FRAMEWORK) is None
+    cache = VenvCache(tmp_path / "cache", max_bytes=10**9, framework_requirement=FRAMEWORK)
+    assert cache.acquire(ws) is None
+
+
+def test_acquire_counts_miss_then_hit_and_links_env(tmp_path, monkeypatch):
+    """First job builds the environment; a second job with the same inputs reuses it."""
+    monkeypatch.setattr(VenvCache, "_build", _fake_build)
+    cache = VenvCache(tmp_path / "cache", max_bytes=10**9, framework_requirement=FRAMEWORK)
+
+    ws1 = _workspace(tmp_path, "ws1", "requests\n")
+    lease1 = cache.acquire(ws1)
+    ws2 = _workspace(tmp_path, "ws2", "requests\n")
+    lease2 = cache.acquire(ws2)
+
+    assert lease1.venv_dir == lease2.venv_dir
+    assert os.path.realpath(ws2 / ".venv") == str(lease2.venv_dir)
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hits"] == 1
+    lease1.release()
+    lease2.release()
+
+
+def test_fetched_environment_is_published_without_building(tmp_path, monkeypatch):
+    """A miss uses an environment unpacked by fetch; a failed fetch falls back to building."""
+    monkeypatch.setattr(VenvCache, "_build", _fake_build)
+    cache = VenvCache(tmp_path / "cache", max_bytes=10**9, framework_requirement=FRAMEWORK)
+
+    def fetch(key, venv_dir):
+        (venv_dir / "bin").mkdir(parents=True)
+        (venv_dir / "bin" / "fetched").write_text(key)
+        return True
+
+    lease = cache.acquire(_workspace(tmp_path, "ws1", "requests\n"), fetch=fetch)
+    assert (lease.venv_dir / "bin" / "fetched").read_text() == lease.key
+    assert (lease.venv_dir / LAST_USED_MARKER).exists()
+
+    def broken(key, venv_dir):
+        venv_dir.mkdir(parents=True)
+        raise OSError("truncated download")
+
+    lease2 = cache.acquire(_workspace(tmp_path, "ws2", "httpx\n"), fetch=broken)
+    assert (lease2.venv_dir / "bin" / "python").exists()  # built by _fake_build
+    assert cache.stats()["misses"] == 2
+    lease.release()
+    lease2.release()
+
+
+def test_build_creates_real_venv_and_installs_pinned_framework(tmp_path, monkeypatch):
+    """A miss creates a real virtualenv, installs requirements, then the pinned framework."""
+    pip_calls = _stub_pip(monkeypatch)
+    cache = VenvCache(tmp_path / "cache", max_bytes=10**9, framework_requirement=FRAMEWORK)
+    ws = _workspace(tmp_path, "ws", "")
+
+    lease = cache.acquire(ws)
+
+    assert (lease.bin_dir / "python").exists()
+    assert (lease.venv_dir / "pyvenv.cfg").exists()
+    assert int((lease.venv_dir / LAST_USED_MARKER).read_text()) > 0
+    assert pip_calls[0][-2:] == ["-r", str(ws / "requirements.txt")]
+    assert pip_calls[-1][-1] == FRAMEWORK
+    assert all(call[0] == str(lease.bin_dir / "python") for call in pip_calls)
+    lease.release()
+
+
+def test_failed_build_removes_partial_env(tmp_path, monkeypatch):
+    """A pip failure leaves no half-built environment behind and releases the lease."""
+    _stub_pip(monkeypatch, fail=True)
+    cache = VenvCache(tmp_path / "cache", max_bytes=10**9, framework_requirement=FRAMEWORK)
+    ws = _workspace(tmp_path, "ws", "")
+
+    with pytest.raises(subprocess.CalledProcessError):
+        cache.acquire(ws)
+
+    assert not cache.env_path(environment_key(ws, FRAMEWORK)).exists()
+
+
+def test_evict_respects_budget_and_active_leases(tmp_path, monkeypatch):
+    """Over budget, idle environments are evicted LRU-first; leased ones are kept."""
+    monkeypatch.setattr(VenvCache, "_build", _fake_build)
+    cache = VenvCache(tmp_path / "cache", max_bytes=10**9, framework_requirement=FRAMEWORK)
+
+    idle = cache.acquire(_workspace(tmp_path, "a", "a\n"))
+    idle.release()
+    os.utime(idle.venv_dir / LAST_USED_MARKER, (0, 0))
+    busy = cache.acquire(_workspace(tmp_path, "b", "b\n"))
+
+    cache.max_bytes = 0
+    assert cache.evict() == 1000
+    assert not idle.venv_dir.exists()
+    assert busy.venv_dir.exists()
+    assert cache.stats()["evictions"] == 1
+    busy.release()
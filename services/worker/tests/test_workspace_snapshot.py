@@ -0,0 +1,86 @@
+"""Tests for app.workspace_snapshot and the executor's prepare/restore steps (moto S3)."""
+import io
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from app.executor import JobExecutor
+from app.venv_cache import VenvCache
+from app.workspace_snapshot import extract_tarball, write_tarball
+
+BUCKET = "qatron-artifacts"
+
+
+@pytest.fixture
+def s3(worker_env, monkeypatch):
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        monkeypatch.setattr("app.executor.build_s3_client", lambda config: client)
+        yield client
+
+
+def _fake_build(self, workspace, venv_dir):
+    (venv_dir / "bin").mkdir(parents=True)
+    (venv_dir / "bin" / "python").symlink_to("/usr/bin/python3")
+    (venv_dir / "lib.py").write_text("built\n")
+
+
+def test_tarball_skips_excluded_names_and_is_reproducible(tmp_path):
+    """Excluded names are dropped at any depth; normalized archives of one tree are equal."""
+    tree = tmp_path / "tree"
+    (tree / "pkg" / "__pycache__").mkdir(parents=True)
+    (tree / "pkg" / "mod.py").write_text("x = 1\n")
+    (tree / "pkg" / "__pycache__" / "mod.pyc").write_bytes(b"\0")
+    (tree / ".git").write_text("gitdir: /cache/git/worktrees/x\n")
+
+    archives = []
+    for _ in range(2):
+        buffer = io.BytesIO()
+        write_tarball(tree, buffer, exclude=(".git", "__pycache__"), normalize=True)
+        archives.append(buffer.getvalue())
+    assert archives[0] == archives[1]
+
+    out = tmp_path / "out"
+    extract_tarball(io.BytesIO(archives[0]), out)
+    assert sorted(p.relative_to(out).as_posix() for p in out.rglob("*")) == ["pkg", "pkg/mod.py"]
+
+
+def test_shard_restores_prepared_workspace_and_environment(s3, worker_env, monkeypatch):
+    """Shards unpack the checkout and fetch the environment instead of cloning and installing."""
+    monkeypatch.setattr(VenvCache, "_build", _fake_build)
+    prepare = JobExecutor({"run_id": 5, "mode": "prepare"})
+    prepare.workspace.mkdir()
+    (prepare.workspace / "requirements.txt").write_text("requests\n")
+    (prepare.workspace / "tests").mkdir()
+    (prepare.workspace / "tests" / "test_a.py").write_text("def test_a():\n    pass\n")
+    prepare.install_dependencies()
+    pointer = prepare.upload_snapshot()
+    # A rerun of the same commit stores nothing new: same workspace blob, same environment
+    rerun = JobExecutor({"run_id": 6, "mode": "prepare"})
+    rerun.venv_lease = prepare.venv_lease
+    assert rerun.upload_snapshot() == pointer
+    blobs = s3.list_objects_v2(Bucket=BUCKET, Prefix="blobs/")["Contents"]
+    assert len(blobs) == 2
+    prepare.cleanup()
+
+    # The shard runs on another host: empty venv cache, building would fail
+    monkeypatch.setenv("VENV_CACHE_DIR", str(worker_env / "other-host" / "venvs"))
+    monkeypatch.setattr(VenvCache, "_build", lambda *args: pytest.fail("environment rebuilt"))
+    shard = JobExecutor({"run_id": 5, "shard_index": 1, "workspace_snapshot": True})
+    monkeypatch.setattr(shard, "clone_repository", lambda: pytest.fail("repository cloned"))
+
+    assert shard.restore_snapshot()
+    assert (shard.workspace / "tests" / "test_a.py").exists()
+    assert not (shard.workspace / ".venv").exists()
+    shard.install_dependencies()
+    venv_dir = shard.venv_lease.venv_dir
+    assert str(venv_dir).startswith(str(worker_env / "other-host"))
+    assert (venv_dir / "lib.py").read_text() == "built\n"
+    assert (venv_dir / "bin" / "python").readlink().as_posix() == "/usr/bin/python3"
+    shard.cleanup()
+
+    # No snapshot for the run: the shard sets up its own workspace
+    assert not JobExecutor({"run_id": 9, "workspace_snapshot": True}).restore_snapshot()
+    assert not JobExecutor({"run_id": 5}).restore_snapshot()